@@ -0,0 +1,213 @@
+import sqlite3
+import time
+from typing import Any
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from soccer_diffusion.dataset import logger
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.defaults import CHUNK_SIZE, ChunkDtype
+from soccer_diffusion.dataset.models import (
+    Base,
+    ImportProgress,
+    JointCommands,
+    JointCommandsChunk,
+    JointStates,
+    JointStatesChunk,
+    Recording,
+    Rotation,
+    RotationChunk,
+    SampleChunk,
+)
+
+# The model of the rows stored in each chunk model and the order of their columns in the chunks
+CHUNKED_MODELS: dict[type[SampleChunk], tuple[type[Base], list[str]]] = {
+    JointStatesChunk: (JointStates, JointStates.get_ordered_joint_names()),
+    JointCommandsChunk: (JointCommands, JointStates.get_ordered_joint_names()),
+    RotationChunk: (Rotation, ["x", "y", "z", "w"]),
+}
+
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+def encode_chunk(stamps: np.ndarray, values: np.ndarray, dtype: ChunkDtype = ChunkDtype.FLOAT32) -> dict[str, Any]:
+    """Encodes consecutive samples into the columns of a chunk.
+
+    :param stamps: Stamps of the samples in seconds, with shape (num_samples,)
+    :param values: Values of the samples, with shape (num_samples, num_columns)
+    :param dtype: Type to store the values with, chunks containing NaN values are always stored as float32
+    :return: The column values of the chunk, without its recording and position
+    """
+    values = np.asarray(values, dtype=np.float64)
+    offset, scale = 0.0, 1.0
+    if dtype == ChunkDtype.INT16 and np.isnan(values).any():
+        dtype = ChunkDtype.FLOAT32
+
+    if dtype == ChunkDtype.INT16:
+        low, high = float(values.min()), float(values.max())
+        offset = (low + high) / 2
+        scale = (high - low) / (2 * _INT16_MAX) or 1.0
+        data = np.round((values - offset) / scale).astype(np.int16)
+    else:
+        data = values.astype(np.float32)
+
+    return {
+        "num_samples": len(stamps),
+        "start_stamp": float(stamps[0]),
+        "end_stamp": float(stamps[-1]),
+        "dtype": dtype.value,
+        "value_offset": offset,
+        "value_scale": scale,
+        "stamps": (np.asarray(stamps) - stamps[0]).astype(np.float32).tobytes(),
+        "data": data.tobytes(),
+    }
+
+
+def decode_chunk(
+    start_stamp: float, dtype: str, offset: float, scale: float, stamps: bytes, data: bytes
+) -> tuple[np.ndarray, np.ndarray]:
+    """Decodes the samples of a chunk.
+
+    :param start_stamp: Stamp of the first sample
+    :param dtype: Type the values are stored with
+    :param offset: Offset of fixed-point values
+    :param scale: Scale of fixed-point values
+    :param stamps: The stamps relative to the first sample
+    :param data: The values
+    :return: The stamps with shape (num_samples,) and the float32 values with shape (num_samples, num_columns)
+    """
+    sample_stamps = np.frombuffer(stamps, dtype=np.float32).astype(np.float64) + start_stamp
+    values = np.frombuffer(data, dtype=np.dtype(dtype)).reshape(len(sample_stamps), -1)
+    if dtype == ChunkDtype.INT16:
+        values = (values * scale + offset).astype(np.float32)
+    return sample_stamps, values
+
+
+def write_chunks(
+    session: Session,
+    chunk_model: type[SampleChunk],
+    recording_id: int,
+    dtype: ChunkDtype = ChunkDtype.FLOAT32,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Writes the rows of a recording as chunks, replacing its existing chunks.
+    The chunks of a recording without rows are kept, they are its only copy after its rows were dropped.
+
+    :param session: The database session
+    :param chunk_model: The chunk model to write, e.g. JointStatesChunk for the JointStates rows
+    :param recording_id: The recording to write the chunks of
+    :param dtype: Type to store the values with
+    :param chunk_size: Number of samples per chunk
+    :return: Number of written samples
+    """
+    model, columns = CHUNKED_MODELS[chunk_model]
+    # Ordered by tick, so the index of a sample in the chunks is its tick, as for the rows read by tick
+    rows = session.execute(
+        select(model.stamp, *(model.__table__.c[column] for column in columns))
+        .where(model.recording_id == recording_id)
+        .order_by(model.tick)
+    ).all()
+    if not rows:
+        return 0
+
+    session.execute(delete(chunk_model).where(chunk_model.recording_id == recording_id))
+
+    samples = np.array(rows, dtype=np.float64)  # NULL values become NaN
+    chunks = []
+    for chunk_index, start in enumerate(range(0, len(samples), chunk_size)):
+        chunk_samples = samples[start : start + chunk_size]
+        chunks.append(
+            {
+                "recording_id": recording_id,
+                "chunk_index": chunk_index,
+                "start_index": start,
+                **encode_chunk(chunk_samples[:, 0], chunk_samples[:, 1:], dtype),
+            }
+        )
+    session.execute(insert(chunk_model), chunks)
+    return len(samples)
+
+
+def chunk_database(
+    db: Database, dtype: ChunkDtype = ChunkDtype.FLOAT32, chunk_size: int = CHUNK_SIZE, drop_rows: bool = False
+) -> None:
+    """Stores the joint states, joint commands and rotations of all completely imported recordings as chunks.
+    Running it again replaces the chunks of the recordings with rows, e.g. after importing more recordings
+    or to change the dtype. Recordings, whose rows were dropped, keep their chunks.
+
+    :param db: The database
+    :param dtype: Type to store the values with, int16 halves the size of float32 with a resolution of
+        1/65535 of the value range of each chunk
+    :param chunk_size: Number of samples per chunk
+    :param drop_rows: Whether to delete the rows after chunking them, run `db optimize` afterwards to reclaim
+        their space. The dataset can then only be read with chunks.
+    """
+    # Recordings of unfinished imports are chunked, once their import is complete
+    recording_ids = db.session.scalars(
+        select(Recording._id).where(Recording._id.not_in(select(ImportProgress.recording_id))).order_by(Recording._id)
+    ).all()
+    logger.info(f"Chunking {len(recording_ids)} recordings with {chunk_size} {dtype.value} samples per chunk...")
+    start = time.perf_counter()
+    for recording_id in recording_ids:
+        for chunk_model, (model, _) in CHUNKED_MODELS.items():
+            num_samples = write_chunks(db.session, chunk_model, recording_id, dtype, chunk_size)
+            if drop_rows:
+                db.session.execute(delete(model).where(model.recording_id == recording_id))
+            logger.debug(f"Chunked {num_samples} samples of {model.__tablename__} of recording {recording_id}")
+        # Commit each recording, so the memory usage does not grow with the number of recordings
+        db.session.commit()
+
+    num_chunks = sum(db.session.scalar(select(func.count()).select_from(model)) for model in CHUNKED_MODELS)
+    logger.info(f"Wrote {num_chunks} chunks in {time.perf_counter() - start:.1f} s")
+
+
+def count_samples(connection: sqlite3.Connection, chunk_model: type[SampleChunk]) -> dict[int, int]:
+    """Returns the number of chunked samples of each recording.
+
+    :param connection: The database connection
+    :param chunk_model: The chunk model to count the samples of
+    :return: Number of samples by recording id
+    """
+    return dict(
+        connection.execute(
+            f"SELECT recording_id, SUM(num_samples) FROM {chunk_model.__tablename__} GROUP BY recording_id"
+        ).fetchall()
+    )
+
+
+def read_samples(
+    connection: sqlite3.Connection, chunk_model: type[SampleChunk], recording_id: int, start: int, stop: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Reads a window of consecutive samples of a recording from its chunks,
+    which are usually one or two blobs. Equivalent to reading the rows ordered by stamp with an OFFSET and LIMIT.
+
+    :param connection: The database connection
+    :param chunk_model: The chunk model to read, e.g. JointStatesChunk for the joint states
+    :param recording_id: The recording to read the samples of
+    :param start: Index of the first sample in the recording
+    :param stop: Index after the last sample, fewer samples are returned at the end of the recording
+    :return: The stamps with shape (num_samples,) and the float32 values with shape (num_samples, num_columns),
+        with the columns in the order of `CHUNKED_MODELS`
+    """
+    table = chunk_model.__tablename__
+    chunks = connection.execute(
+        # Chunks from the one containing the first sample to the one containing the last sample
+        "SELECT start_index, start_stamp, dtype, value_offset, value_scale, stamps, data "
+        f"FROM {table} WHERE recording_id = ? AND start_index < ? AND start_index >= "
+        f"(SELECT COALESCE(MAX(start_index), 0) FROM {table} WHERE recording_id = ? AND start_index <= ?) "
+        "ORDER BY start_index ASC",
+        (recording_id, stop, recording_id, start),
+    ).fetchall()
+    if not chunks or stop <= start:
+        num_columns = len(CHUNKED_MODELS[chunk_model][1])
+        return np.empty(0, dtype=np.float64), np.empty((0, num_columns), dtype=np.float32)
+
+    stamps, values = [], []
+    for start_index, *chunk in chunks:
+        chunk_stamps, chunk_values = decode_chunk(*chunk)
+        window = slice(max(start - start_index, 0), stop - start_index)
+        stamps.append(chunk_stamps[window])
+        values.append(chunk_values[window])
+    return np.concatenate(stamps), np.concatenate(values).astype(np.float32, copy=False)
@@ -1,9 +1,19 @@
 import sys
-from argparse import ArgumentParser, Namespace
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
 from enum import Enum
 from pathlib import Path
 
 from soccer_diffusion import DB_PATH
+from soccer_diffusion.dataset.defaults import (
+    CHECKPOINT_INTERVAL,
+    CHUNK_SIZE,
+    COLUMNAR_BATCH_SIZE,
+    EXPORTED_TABLES,
+    MAX_WAL_SIZE,
+    PAGE_SIZES,
+    ChunkDtype,
+    ColumnarFormat,
+)
 from soccer_diffusion.dataset.errors import CLIArgumentError
 
 
@@ -15,18 +25,55 @@ class ImportType(str, Enum):
 class CLICommand(str, Enum):
     DB = "db"
     IMPORT = "import"
+    BENCHMARK = "benchmark"
 
 
 class DBCommand(str, Enum):
     CREATE_SCHEMA = "create-schema"
     DUMMY_DATA = "dummy-data"
     RECORDING2MCAP = "recording2mcap"
+    OPTIMIZE = "optimize"
+    CHUNK = "chunk"
+    MOVE_IMAGES = "move-images"
+    SHARD = "shard"
+    ADD_SHARDS = "add-shards"
+    EXPORT_COLUMNAR = "export-columnar"
 
     @classmethod
     def values(cls):
         return [e.value for e in cls]
 
 
+_SIZE_UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+def parse_size(value: str) -> int:
+    """Parses a size in bytes with an optional binary unit, e.g. "512M", "20G" or "1.5GB".
+
+    :param value: The size
+    :return: The size in bytes
+    """
+    number = value.strip().upper().removesuffix("B").removesuffix("I")
+    unit = number[-1:] if number[-1:] in _SIZE_UNITS else ""
+    try:
+        return int(float(number.removesuffix(unit)) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise ArgumentTypeError(f"Invalid size: '{value}'") from None
+
+
+def parse_resolution(value: str) -> tuple[int, int]:
+    """Parses an image resolution, e.g. "640x480".
+
+    :param value: The resolution
+    :return: The width and height in pixels
+    """
+    try:
+        width, height = map(int, value.lower().split("x"))
+    except ValueError:
+        raise ArgumentTypeError(f"Invalid resolution: '{value}', expected WIDTHxHEIGHT") from None
+    return width, height
+
+
 class CLIArgs:
     def __init__(self):
         self.parser = ArgumentParser(description="soccer_diffusion dataset CLI")
@@ -35,6 +82,7 @@ class CLIArgs:
         subparsers = self.parser.add_subparsers(dest="command", help="Command to run")
         self.add_import_command_parser(subparsers)
         self.add_db_command_parser(subparsers)
+        self.add_benchmark_command_parser(subparsers)
 
     def set_global_args(self, parser):
         parser.add_argument("--dry-run", action="store_true", help="Dry run")
@@ -60,13 +108,137 @@ class CLIArgs:
             "-s", "--num_samples_per_rec", type=int, default=72000, help="Number of samples per recording"
         )
         dummy_data_subparser.add_argument("-i", "--image_step", type=int, default=10, help="Step size for images")
+        dummy_data_subparser.add_argument("--seed", type=int, default=None, help="Seed of the random data")
+        dummy_data_subparser.add_argument(
+            "--target-size",
+            type=parse_size,
+            default=None,
+            help="Insert recordings until the database has this size, e.g. '20G', instead of --num_recordings",
+        )
+        dummy_data_subparser.add_argument(
+            "--workers", type=int, default=1, help="Number of worker processes rendering the images"
+        )
 
         # db recording2mcap subcommand
         recording2mcap_subparser = db_subcommand_parser.add_parser(
-            DBCommand.RECORDING2MCAP.value, help="Convert a recording to an mcap file"
+            DBCommand.RECORDING2MCAP.value, help="Convert recordings to mcap files"
+        )
+        recording2mcap_subparser.add_argument(
+            "recordings",
+            type=str,
+            nargs="*",
+            help="IDs or original filenames of the recordings to convert, "
+            "multiple recordings are written to a subdirectory each",
         )
-        recording2mcap_subparser.add_argument("recording", type=str, help="Recording to convert")
         recording2mcap_subparser.add_argument("output_dir", type=Path, help="Output directory to write to")
+        recording2mcap_subparser.add_argument("--team", type=str, default=None, help="Convert recordings of this team")
+        recording2mcap_subparser.add_argument(
+            "--location", type=str, default=None, help="Convert recordings of this location"
+        )
+        recording2mcap_subparser.add_argument(
+            "--robot-type", type=str, default=None, help="Convert recordings of this robot type"
+        )
+        recording2mcap_subparser.add_argument(
+            "--workers", type=int, default=4, help="Number of worker processes converting multiple recordings"
+        )
+
+        # db optimize subcommand
+        optimize_subparser = db_subcommand_parser.add_parser(
+            DBCommand.OPTIMIZE.value,
+            help="Create missing indexes, update the query planner statistics and rebuild the database for reading",
+        )
+        optimize_subparser.add_argument(
+            "--page-size",
+            type=int,
+            default=None,
+            help="Rebuild the database with this page size in bytes (power of two from 512 to 65536), "
+            "larger pages speed up reading large images",
+        )
+        optimize_subparser.add_argument(
+            "--no-vacuum", action="store_true", help="Do not rebuild the database, unless the page size changes"
+        )
+
+        # db chunk subcommand
+        chunk_subparser = db_subcommand_parser.add_parser(
+            DBCommand.CHUNK.value,
+            help="Store the joint states, joint commands and rotations as chunks of samples, "
+            "which are smaller and faster to read",
+        )
+        chunk_subparser.add_argument(
+            "--dtype",
+            type=ChunkDtype,
+            choices=list(ChunkDtype),
+            default=ChunkDtype.FLOAT32,
+            help="Type to store the values with, int16 stores them as fixed-point values",
+        )
+        chunk_subparser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Number of samples per chunk")
+        chunk_subparser.add_argument(
+            "--drop-rows",
+            action="store_true",
+            help="Delete the rows after chunking them, the dataset can then only be read with chunks. "
+            "Run 'db optimize' afterwards to reclaim their space",
+        )
+
+        # db move-images subcommand
+        move_images_subparser = db_subcommand_parser.add_parser(
+            DBCommand.MOVE_IMAGES.value,
+            help="Move the image data into append-only files per recording next to the database, "
+            "so the numeric tables fit in the page cache",
+        )
+        move_images_subparser.add_argument(
+            "--restore", action="store_true", help="Move the images back into the database"
+        )
+
+        # db shard subcommand
+        shard_subparser = db_subcommand_parser.add_parser(
+            DBCommand.SHARD.value,
+            help="Split the database into a catalog and one database file (shard) per recording, "
+            "the dataset reads all shards through the catalog",
+        )
+        shard_subparser.add_argument(
+            "output_dir", type=Path, help="Directory to write the catalog and its 'shards' subdirectory to"
+        )
+        shard_subparser.add_argument(
+            "--recordings", type=int, nargs="+", default=None, help="IDs of the recordings to shard (default: all)"
+        )
+
+        # db add-shards subcommand
+        add_shards_subparser = db_subcommand_parser.add_parser(
+            DBCommand.ADD_SHARDS.value,
+            help="Register the recordings of shards in the catalog given by --db-path, which is created if needed",
+        )
+        add_shards_subparser.add_argument(
+            "shards", type=Path, nargs="+", help="Shards in the directory of the catalog or below it"
+        )
+
+        # db export-columnar subcommand
+        export_columnar_subparser = db_subcommand_parser.add_parser(
+            DBCommand.EXPORT_COLUMNAR.value,
+            help="Export the numeric tables and the image metadata to one Arrow or Parquet file per table and "
+            "recording, which are loaded for analyses with pandas or NumPy",
+        )
+        export_columnar_subparser.add_argument("output_dir", type=Path, help="Directory to write the files to")
+        export_columnar_subparser.add_argument(
+            "--format",
+            type=ColumnarFormat,
+            choices=list(ColumnarFormat),
+            default=ColumnarFormat.ARROW,
+            help="Format of the files, Arrow files are memory-mapped when loaded, Parquet files are compressed",
+        )
+        export_columnar_subparser.add_argument(
+            "--tables",
+            type=str,
+            nargs="+",
+            choices=EXPORTED_TABLES,
+            default=list(EXPORTED_TABLES),
+            help="Tables to export (default: all)",
+        )
+        export_columnar_subparser.add_argument(
+            "--recordings", type=int, nargs="+", default=None, help="IDs of the recordings to export (default: all)"
+        )
+        export_columnar_subparser.add_argument(
+            "--batch-size", type=int, default=COLUMNAR_BATCH_SIZE, help="Number of rows read and written at once"
+        )
 
     def add_import_command_parser(self, subparsers):
         self.import_parser = subparsers.add_parser(CLICommand.IMPORT.value, help="Import data into the database")
@@ -74,7 +246,104 @@ class CLIArgs:
         self.import_parser.add_argument("file", type=Path, help="File to import")
         self.import_parser.add_argument("location", type=str, help="Location of the data")
         self.import_parser.add_argument("--caching", action="store_true", help="Enable file caching")
+        self.import_parser.add_argument(
+            "--cache-dir", type=Path, default=None, help="Directory of the file cache (default: temporary directory)"
+        )
         self.import_parser.add_argument("--video", action="store_true", help="Show video while importing")
+        self.import_parser.add_argument(
+            "--workers", type=int, default=1, help="Number of worker processes to convert B-Human logs with"
+        )
+        self.import_parser.add_argument(
+            "--image-threads",
+            type=int,
+            default=0,
+            help="Number of threads processing images concurrently to the conversion and writing, "
+            "which commits the import in resumable segments (0 converts all data before writing it)",
+        )
+        self.import_parser.add_argument(
+            "--checkpoint-interval",
+            type=float,
+            default=CHECKPOINT_INTERVAL,
+            help="Seconds between two commits of an import, an interrupted import resumes from its last commit",
+        )
+        self.import_parser.add_argument(
+            "--max-wal-size",
+            type=int,
+            default=MAX_WAL_SIZE // 2**20,
+            metavar="MIB",
+            help="Size of the write-ahead log in MiB, after which the import waits for readers of the database "
+            "(e.g. a training) to truncate it",
+        )
+        self.import_parser.add_argument(
+            "--deduplicate-images",
+            type=float,
+            nargs="?",
+            const=0.0,
+            default=None,
+            metavar="THRESHOLD",
+            help="Store duplicates of the last stored image as a reference to it. Without a threshold only exact "
+            "duplicates are detected, otherwise images whose 16x16 pixel block means differ by at most THRESHOLD "
+            "(0-255, e.g. 2) are near duplicates",
+        )
+        self.import_parser.add_argument(
+            "--replace", action="store_true", help="Replace the recording of an already imported file"
+        )
+        self.import_parser.add_argument(
+            "--shard",
+            action="store_true",
+            help="Import into a new shard of the catalog given by --db-path and register it once it is complete, "
+            "so imports of different files can run in parallel",
+        )
+        self.import_parser.add_argument(
+            "--report",
+            type=Path,
+            default=None,
+            help="Print a report of the read messages, time spent, memory usage and written rows "
+            "and save it as JSON to this file",
+        )
+
+    def add_benchmark_command_parser(self, subparsers):
+        self.benchmark_parser = subparsers.add_parser(
+            CLICommand.BENCHMARK.value, help="Benchmark the import of synthetic logs, without private recordings"
+        )
+        self.benchmark_parser.add_argument("type", type=ImportType, help="Type of the imported logs")
+        self.benchmark_parser.add_argument(
+            "work_dir", type=Path, help="Directory to write the logs, databases and results to"
+        )
+        self.benchmark_parser.add_argument(
+            "--durations", type=float, nargs="+", default=[10.0, 60.0], help="Durations of the logs in seconds"
+        )
+        self.benchmark_parser.add_argument(
+            "--image-size",
+            type=parse_resolution,
+            default=None,
+            help="Resolution of the (upper) camera images, e.g. '640x480'",
+        )
+        self.benchmark_parser.add_argument(
+            "--camera-rate", type=float, default=None, help="Frequency of the camera images in Hz"
+        )
+        self.benchmark_parser.add_argument(
+            "--joint-rate",
+            type=float,
+            default=None,
+            help="Frequency of the joint states and commands in Hz (Motion frames for B-Human)",
+        )
+        self.benchmark_parser.add_argument(
+            "--imu-rate",
+            type=float,
+            default=None,
+            help="Frequency of the Bit-Bots IMU data in Hz, 0 reads the rotation from /tf instead",
+        )
+        self.benchmark_parser.add_argument("--seed", type=int, default=0, help="Seed of the random data")
+        self.benchmark_parser.add_argument(
+            "--workers", type=int, default=1, help="Number of worker processes to convert B-Human logs with"
+        )
+        self.benchmark_parser.add_argument(
+            "--image-threads",
+            type=int,
+            default=0,
+            help="Number of threads processing images during the import (0 converts all data before writing it)",
+        )
 
     def parse_args(self) -> Namespace:
         return self.validate_args(self.parser.parse_args())
@@ -84,6 +353,8 @@ class CLIArgs:
             self.import_validation(args)
         elif args.command == CLICommand.DB.value:
             self.db_validation(args)
+        elif args.command == CLICommand.BENCHMARK.value:
+            self.benchmark_validation(args)
 
         return args
 
@@ -94,15 +365,79 @@ class CLIArgs:
         if args.type == ImportType.BIT_BOTS and not args.file.suffix == ".mcap":
             raise CLIArgumentError(f"Bit-Bots import file not '*.mcap': {args.file}")
 
+        if args.workers < 1:
+            raise CLIArgumentError(f"Number of workers must be at least 1: {args.workers}")
+
+        if args.image_threads < 0:
+            raise CLIArgumentError(f"Number of image threads must not be negative: {args.image_threads}")
+
+        if args.max_wal_size < 1:
+            raise CLIArgumentError(f"Maximum size of the write-ahead log must be at least 1 MiB: {args.max_wal_size}")
+
     def db_validation(self, args):
         if args.db_command not in DBCommand.values():
             self.print_help_and_exit(self.db_parser, exit_code=1)
 
-        if not args.db_path.exists() and not args.db_command == DBCommand.CREATE_SCHEMA.value:
+        if not args.db_path.exists() and args.db_command not in (
+            DBCommand.CREATE_SCHEMA.value,
+            DBCommand.ADD_SHARDS.value,
+        ):
             raise CLIArgumentError(
                 f"Database file does not exist: {args.db_path}. Run 'db create-schema' to create the database."
             )
 
+        if args.db_command == DBCommand.RECORDING2MCAP.value:
+            if not args.recordings and args.team is None and args.location is None and args.robot_type is None:
+                raise CLIArgumentError(
+                    "No recordings selected, give their IDs/filenames or a team, location or robot type"
+                )
+
+            if args.workers < 1:
+                raise CLIArgumentError(f"Number of workers must be at least 1: {args.workers}")
+
+        if args.db_command == DBCommand.OPTIMIZE.value:
+            if args.page_size is not None and args.page_size not in PAGE_SIZES:
+                raise CLIArgumentError(f"Page size must be a power of two from 512 to 65536: {args.page_size}")
+
+        if args.db_command == DBCommand.CHUNK.value:
+            if args.chunk_size < 1:
+                raise CLIArgumentError(f"Chunk size must be at least 1: {args.chunk_size}")
+
+        if args.db_command == DBCommand.SHARD.value:
+            if (args.output_dir / "shards").exists():
+                raise CLIArgumentError(f"Output directory already contains shards: {args.output_dir}")
+
+        if args.db_command == DBCommand.ADD_SHARDS.value:
+            for shard in args.shards:
+                if not shard.exists():
+                    raise CLIArgumentError(f"Shard does not exist: {shard}")
+                if not shard.resolve().is_relative_to(args.db_path.resolve().parent):
+                    raise CLIArgumentError(f"Shard is not in the directory of the catalog: {shard}")
+
+        if args.db_command == DBCommand.EXPORT_COLUMNAR.value:
+            if args.batch_size < 1:
+                raise CLIArgumentError(f"Batch size must be at least 1: {args.batch_size}")
+
+        if args.db_command == DBCommand.DUMMY_DATA.value:
+            if args.image_step < 1:
+                raise CLIArgumentError(f"Image step must be at least 1: {args.image_step}")
+
+            if args.workers < 1:
+                raise CLIArgumentError(f"Number of workers must be at least 1: {args.workers}")
+
+    def benchmark_validation(self, args):
+        if args.workers < 1:
+            raise CLIArgumentError(f"Number of workers must be at least 1: {args.workers}")
+
+        if args.image_threads < 0:
+            raise CLIArgumentError(f"Number of image threads must not be negative: {args.image_threads}")
+
+        if any(duration <= 0 for duration in args.durations):
+            raise CLIArgumentError(f"Durations must be positive: {args.durations}")
+
+        if args.image_size is not None and any(size < 2 or size % 2 for size in args.image_size):
+            raise CLIArgumentError(f"Image width and height must be even and at least 2: {args.image_size}")
+
     def print_help_and_exit(self, parser, exit_code: int = 0):
         parser.print_help()
         sys.exit(exit_code)
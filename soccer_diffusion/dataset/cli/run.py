@@ -26,7 +26,7 @@ from soccer_diffusion.dataset.converters.image_converter import (
     ImageConverter,
 )
 from soccer_diffusion.dataset.converters.synced_data_converter import SyncedDataConverter
-from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.db import Database, WalCheckpointPolicy
 from soccer_diffusion.dataset.imports.model_importer import ImportStrategy
 from soccer_diffusion.dataset.resampling.max_rate_resampler import MaxRateResampler
 from soccer_diffusion.dataset.resampling.original_rate_resampler import OriginalRateResampler
@@ -47,21 +47,82 @@ def main():
             logger.info(f"running soccer_diffusion CLI v{__version__}")
             sys.exit(0)
 
-        should_create_schema = args.command == CLICommand.DB and args.db_command == DBCommand.CREATE_SCHEMA
+        if args.command == CLICommand.BENCHMARK:
+            from soccer_diffusion.dataset.import_benchmark import benchmark_imports, log_configs
+
+            configs = log_configs(
+                args.type, args.durations, args.image_size, args.camera_rate, args.joint_rate, args.imu_rate, args.seed
+            )
+            import_args = ["--workers", str(args.workers), "--image-threads", str(args.image_threads)]
+            benchmark_imports(args.type, args.work_dir, configs, import_args)
+            sys.exit(0)
+
+        # The catalog of a sharded dataset is created with its first shard
+        should_create_schema = (
+            args.command == CLICommand.DB and args.db_command in (DBCommand.CREATE_SCHEMA, DBCommand.ADD_SHARDS)
+        ) or (args.command == CLICommand.IMPORT and args.shard)
         db = Database(args.db_path).create_session(create_schema=should_create_schema)
 
         match args.command:
             case CLICommand.DB:
                 match args.db_command:
                     case DBCommand.RECORDING2MCAP:
-                        from soccer_diffusion.dataset.recording2mcap import recording2mcap
+                        from soccer_diffusion.dataset.recording2mcap import (
+                            recording2mcap,
+                            recordings2mcap,
+                            select_recordings,
+                        )
+
+                        filters = (args.team, args.location, args.robot_type)
+                        if len(args.recordings) == 1 and filters == (None, None, None):
+                            recording2mcap(db.session, args.recordings[0], args.output_dir)
+                        else:
+                            recordings = select_recordings(db.session, args.recordings, *filters)
+                            recordings2mcap(args.db_path, recordings, args.output_dir, args.workers)
+
+                    case DBCommand.OPTIMIZE:
+                        from soccer_diffusion.dataset.optimize import optimize_database
+
+                        optimize_database(db, args.page_size, vacuum=not args.no_vacuum)
+
+                    case DBCommand.CHUNK:
+                        from soccer_diffusion.dataset.chunks import chunk_database
+
+                        chunk_database(db, args.dtype, args.chunk_size, args.drop_rows)
+
+                    case DBCommand.MOVE_IMAGES:
+                        from soccer_diffusion.dataset.image_store import move_images
 
-                        recording2mcap(db.session, args.recording, args.output_dir)
+                        move_images(db, args.restore)
+
+                    case DBCommand.SHARD:
+                        from soccer_diffusion.dataset.shards import shard_database
+
+                        shard_database(db, args.output_dir, args.recordings)
+
+                    case DBCommand.ADD_SHARDS:
+                        from soccer_diffusion.dataset.shards import add_shards
+
+                        add_shards(db, args.shards)
+
+                    case DBCommand.EXPORT_COLUMNAR:
+                        from soccer_diffusion.dataset.columnar import EXPORTED_MODELS, export_columnar
+
+                        models = [model for model in EXPORTED_MODELS if model.__tablename__ in args.tables]
+                        export_columnar(db, args.output_dir, args.format, models, args.recordings, args.batch_size)
 
                     case DBCommand.DUMMY_DATA:
                         from soccer_diffusion.dataset.dummy_data import insert_dummy_data
 
-                        insert_dummy_data(db.session, args.num_recordings, args.num_samples_per_rec, args.image_step)
+                        insert_dummy_data(
+                            db.session,
+                            args.num_recordings,
+                            args.num_samples_per_rec,
+                            args.image_step,
+                            args.seed,
+                            args.target_size,
+                            args.workers,
+                        )
 
             case CLICommand.IMPORT:
                 from soccer_diffusion.dataset.imports.model_importer import ImportMetadata, ModelImporter
@@ -98,7 +159,10 @@ def main():
                         )
 
                     case ImportType.B_HUMAN:
-                        from soccer_diffusion.dataset.imports.strategies.b_human import BHumanImportStrategy
+                        from soccer_diffusion.dataset.imports.strategies.b_human import (
+                            DEFAULT_CACHE_DIR,
+                            BHumanImportStrategy,
+                        )
 
                         metadata = ImportMetadata(
                             allow_public=False,
@@ -122,14 +186,45 @@ def main():
                             synced_data_converter,
                             args.caching,
                             args.video,
+                            args.cache_dir or DEFAULT_CACHE_DIR,
+                            args.workers,
                         )
 
                     case _:
                         raise ValueError(f"Unknown import type: {args.type}")
 
+                import_db = db
+                if args.shard:
+                    from soccer_diffusion.dataset.shards import import_shard_path
+
+                    # The shard is written without locking the catalog, which is only written once it is complete
+                    shard_path = import_shard_path(args.db_path, import_path)
+                    shard_path.parent.mkdir(parents=True, exist_ok=True)
+                    import_db = Database(shard_path).create_session(create_schema=True)
+
                 logger.info(f"Importing file '{import_path}' to database...")
-                importer = ModelImporter(db, import_strategy)
-                importer.import_to_db(import_path)
+                importer = ModelImporter(
+                    import_db,
+                    import_strategy,
+                    args.image_threads,
+                    args.replace,
+                    args.checkpoint_interval,
+                    args.deduplicate_images,
+                    WalCheckpointPolicy(max_wal_size=args.max_wal_size * 2**20),
+                )
+                if args.report is None:
+                    importer.import_to_db(import_path)
+                else:
+                    from soccer_diffusion.dataset.imports.report import ImportReport
+
+                    with ImportReport(import_path) as report:
+                        importer.import_to_db(import_path)
+                    report.print()
+                    report.save(args.report)
+                if args.shard:
+                    from soccer_diffusion.dataset.shards import add_shards
+
+                    add_shards(db, [shard_path])
 
         sys.exit(0)
     except Exception as e:
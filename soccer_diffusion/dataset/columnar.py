@@ -0,0 +1,261 @@
+import os
+import sqlite3
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import closing
+from pathlib import Path
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, LargeBinary, select
+
+from soccer_diffusion.dataset import logger
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.defaults import COLUMNAR_BATCH_SIZE, ColumnarFormat
+from soccer_diffusion.dataset.models import (
+    Base,
+    GameState,
+    Image,
+    ImportProgress,
+    JointCommands,
+    JointStates,
+    Recording,
+    Rotation,
+)
+from soccer_diffusion.dataset.shards import is_catalog, read_catalog
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow.fs import LocalFileSystem
+except ImportError:
+    # pyarrow is only required to export and load the columnar files
+    pa = None
+
+
+# Models exported by default, images without their data
+EXPORTED_MODELS: tuple[type[Base], ...] = (JointStates, JointCommands, Rotation, GameState, Image)
+
+# Number of rows read from the database and written at once, each batch is a record batch or row group in the files
+BATCH_SIZE = COLUMNAR_BATCH_SIZE
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("The columnar export requires pyarrow, install it with 'poetry install --extras columnar'")
+
+
+def exported_columns(model: type[Base]) -> list[str]:
+    """Returns the columns of a model in its columnar files,
+    without binary data and the recording id, which is the partition of the files.
+
+    :param model: The model
+    :return: The column names in the order of the table
+    """
+    return [
+        column.name
+        for column in model.__table__.columns
+        if not isinstance(column.type, LargeBinary) and column.name != "recording_id"
+    ]
+
+
+def arrow_schema(model: type[Base], columns: Sequence[str]) -> "pa.Schema":
+    """Returns the Arrow schema of columns of a model.
+
+    :param model: The model
+    :param columns: The column names
+    :return: The schema
+    """
+    _require_pyarrow()
+    fields = []
+    for name in columns:
+        column = model.__table__.columns[name]
+        match column.type:
+            case Boolean():
+                arrow_type = pa.bool_()
+            case Integer():
+                arrow_type = pa.int64()
+            case Float():
+                arrow_type = pa.float64()
+            case DateTime():
+                arrow_type = pa.timestamp("us")
+            case _:
+                arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type, nullable=column.nullable))
+    return pa.schema(fields)
+
+
+def partition_path(output_dir: Path, table: str, recording_id: int, fmt: ColumnarFormat) -> Path:
+    """Returns the path of the file of a recording in the columnar files of a table,
+    which are partitioned by recording in Hive-style directories.
+
+    :param output_dir: Directory of the columnar files
+    :param table: Name of the table
+    :param recording_id: Id of the recording
+    :param fmt: Format of the files
+    :return: The path, e.g. "JointStates/recording_id=3/part-0.arrow"
+    """
+    return output_dir / table / f"recording_id={recording_id}" / f"part-0.{fmt.value}"
+
+
+class _PartitionWriter:
+    """Writes record batches to the file of a partition, which replaces an existing file once it is complete."""
+
+    def __init__(self, path: Path, schema: "pa.Schema", fmt: ColumnarFormat):
+        self.path = path
+        # Files starting with a dot are ignored when the files are loaded, e.g. the file of an interrupted export
+        self.temporary_path = path.with_name(f".{path.name}.tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if fmt == ColumnarFormat.PARQUET:
+            self._writer = pq.ParquetWriter(self.temporary_path, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(self.temporary_path, schema)
+
+    def write(self, batch: "pa.RecordBatch") -> None:
+        self._writer.write_batch(batch)
+
+    def __enter__(self) -> "_PartitionWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._writer.close()
+        if exc_type is None:
+            os.replace(self.temporary_path, self.path)
+        else:
+            self.temporary_path.unlink(missing_ok=True)
+
+
+def _recording_sources(db: Database, recording_ids: Sequence[int] | None) -> Iterator[tuple[int, Path, int]]:
+    """Yields the completely imported recordings with the database they are stored in and their id in it,
+    which is a shard, if the database is the catalog of a sharded dataset.
+    """
+    with closing(sqlite3.connect(db.db_path)) as connection:
+        locations = read_catalog(connection, Path(db.db_path)) if is_catalog(connection) else None
+
+    query = select(Recording._id).where(Recording._id.not_in(select(ImportProgress.recording_id)))
+    if recording_ids is not None:
+        query = query.where(Recording._id.in_(recording_ids))
+    for recording_id in db.session.scalars(query.order_by(Recording._id)):
+        if locations is None:
+            yield recording_id, Path(db.db_path), recording_id
+        elif recording_id in locations:
+            yield recording_id, locations[recording_id].path, locations[recording_id].shard_recording_id
+
+
+def _export_recording_table(
+    connection: sqlite3.Connection,
+    model: type[Base],
+    source_recording_id: int,
+    path: Path,
+    fmt: ColumnarFormat,
+    batch_size: int,
+) -> int:
+    columns = exported_columns(model)
+    schema = arrow_schema(model, columns)
+    cursor = connection.execute(
+        f'SELECT {", ".join(columns)} FROM "{model.__tablename__}" WHERE recording_id = ? ORDER BY stamp',
+        (source_recording_id,),
+    )
+    num_rows = 0
+    with _PartitionWriter(path, schema, fmt) as writer:
+        while rows := cursor.fetchmany(batch_size):
+            values = list(zip(*rows))
+            writer.write(
+                pa.record_batch([pa.array(values[i], type=field.type) for i, field in enumerate(schema)], schema=schema)
+            )
+            num_rows += len(rows)
+    return num_rows
+
+
+def export_columnar(
+    db: Database,
+    output_dir: Path,
+    fmt: ColumnarFormat = ColumnarFormat.ARROW,
+    models: Sequence[type[Base]] = EXPORTED_MODELS,
+    recording_ids: Sequence[int] | None = None,
+    batch_size: int = BATCH_SIZE,
+) -> None:
+    """Exports tables of the completely imported recordings to columnar files for analyses,
+    one file per table and recording, which is written in batches of rows, so the memory usage is bounded.
+    Exporting a recording again replaces its files. The metadata of all completely imported recordings
+    is written to one "Recording" file. A catalog of a sharded dataset is exported with the recordings of its shards.
+    Load the files with `load_columnar`.
+
+    :param db: The database
+    :param output_dir: Directory of the columnar files, which contains one directory per table
+    :param fmt: Format of the files
+    :param models: The models to export
+    :param recording_ids: Ids of the recordings to export, all recordings if None
+    :param batch_size: Number of rows read and written at once
+    """
+    _require_pyarrow()
+    sources = list(_recording_sources(db, recording_ids))
+    logger.info(f"Exporting {len(sources)} recordings to {fmt.value} files in '{output_dir}'...")
+    start = time.perf_counter()
+    num_rows = 0
+    for recording_id, path, source_recording_id in sources:
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as connection:
+            for model in models:
+                num_rows += _export_recording_table(
+                    connection,
+                    model,
+                    source_recording_id,
+                    partition_path(output_dir, model.__tablename__, recording_id, fmt),
+                    fmt,
+                    batch_size,
+                )
+        logger.debug(f"Exported recording {recording_id}")
+
+    # The metadata of all recordings is written, so exporting a subset of them keeps the earlier exported ones.
+    # It is small and read with its types converted by SQLAlchemy.
+    columns = [column.name for column in Recording.__table__.columns]
+    recordings = db.session.execute(
+        select(*Recording.__table__.columns)
+        .where(Recording._id.in_([recording_id for recording_id, _, _ in _recording_sources(db, None)]))
+        .order_by(Recording._id)
+    ).all()
+    schema = arrow_schema(Recording, columns)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with _PartitionWriter(output_dir / f"{Recording.__tablename__}.{fmt.value}", schema, fmt) as writer:
+        writer.write(pa.RecordBatch.from_pylist([recording._asdict() for recording in recordings], schema=schema))
+
+    logger.info(f"Exported {num_rows} rows in {time.perf_counter() - start:.1f} s")
+
+
+def load_columnar(
+    directory: Path,
+    table: str,
+    columns: Sequence[str] | None = None,
+    recording_ids: Sequence[int] | None = None,
+) -> "pa.Table":
+    """Loads the columnar files of a table, the Arrow files are memory-mapped, so numeric columns without
+    NULL values are converted to NumPy arrays without copying them, e.g. with `table["stamp"].to_numpy()`.
+
+    :param directory: Directory of the columnar files
+    :param table: Name of the table, e.g. "JointStates" or "Recording"
+    :param columns: Columns to load, all if None. The recording id of each row is in the "recording_id" column.
+    :param recording_ids: Ids of the recordings to load, all if None
+    :return: The table, use `to_pandas()` for a DataFrame
+    """
+    _require_pyarrow()
+    for fmt in ColumnarFormat:
+        if (directory / f"{table}.{fmt.value}").exists():
+            # Tables of the recordings themselves are not partitioned
+            source = str(directory / f"{table}.{fmt.value}")
+            partitioning = None
+            break
+        if next((directory / table).glob(f"recording_id=*/*.{fmt.value}"), None) is not None:
+            source = str(directory / table)
+            partitioning = ds.partitioning(pa.schema([("recording_id", pa.int64())]), flavor="hive")
+            break
+    else:
+        raise FileNotFoundError(f"No columnar files of table '{table}' in '{directory}'")
+    dataset = ds.dataset(
+        source,
+        format="ipc" if fmt == ColumnarFormat.ARROW else "parquet",
+        partitioning=partitioning,
+        filesystem=LocalFileSystem(use_mmap=True),
+    )
+    row_filter = None
+    if recording_ids is not None:
+        row_filter = ds.field("recording_id" if partitioning else "_id").isin(list(recording_ids))
+    return dataset.to_table(columns=list(columns) if columns is not None else None, filter=row_filter)
@@ -27,6 +27,7 @@ class Converter(ABC):
         """
         Convert the input data to our domain model that can be stored in the database and later used for training.
         The model is contained in a ModelData DTO, for generic handling of different models.
+        Rows of the child tables are collected in columnar batches instead of individual db model instances.
 
         Args:
             data (InputData): The input data to convert to a model (e.g. a gamestate ros message)
@@ -34,6 +35,6 @@ class Converter(ABC):
             recording (Recording): The recording db model the created model will be associated with
 
         Returns:
-            ModelData: Dataclass containing list of models to be created from the data (fields can be empty)
+            ModelData: Dataclass containing batches of rows to be created from the data (fields can be empty)
         """
         pass
@@ -3,7 +3,8 @@ from enum import Enum, auto
 from soccer_diffusion.dataset import logger
 from soccer_diffusion.dataset.converters.converter import Converter
 from soccer_diffusion.dataset.imports.data import InputData, ModelData
-from soccer_diffusion.dataset.models import GameState, Recording, RobotState, TeamColor
+from soccer_diffusion.dataset.imports.report import measure
+from soccer_diffusion.dataset.models import Recording, RobotState, TeamColor
 from soccer_diffusion.dataset.resampling.original_rate_resampler import OriginalRateResampler
 
 # ruff: noqa: N815
@@ -146,13 +147,15 @@ class BHumanGameStateConverter(Converter):
     def convert_to_model(self, data: InputData, relative_timestamp: float, recording: Recording) -> ModelData:
         models = ModelData()
 
-        for sample in self.resampler.resample(data, relative_timestamp):
-            models.game_states.append(self._create_game_state(sample.data.game_state, sample.timestamp, recording))
+        with measure("resample", type(self.resampler).__name__):
+            samples = self.resampler.resample(data, relative_timestamp)
+        for sample in samples:
+            models.game_states.append_row(self._create_game_state(sample.data.game_state, sample.timestamp, recording))
 
         return models
 
-    def _create_game_state(self, msg, sampling_timestamp: float, recording: Recording) -> GameState:
-        return GameState(stamp=sampling_timestamp, recording=recording, state=self._get_state(msg))
+    def _create_game_state(self, msg, sampling_timestamp: float, recording: Recording) -> tuple[float, RobotState]:
+        return (sampling_timestamp, self._get_state(msg))
 
     def _get_state(self, data) -> RobotState:
         if State.is_positioning(data["state"]):
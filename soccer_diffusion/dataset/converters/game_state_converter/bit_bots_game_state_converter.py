@@ -3,7 +3,8 @@ from enum import Enum
 from soccer_diffusion.dataset import logger
 from soccer_diffusion.dataset.converters.converter import Converter
 from soccer_diffusion.dataset.imports.data import InputData, ModelData
-from soccer_diffusion.dataset.models import GameState, Recording, RobotState, TeamColor
+from soccer_diffusion.dataset.imports.report import measure
+from soccer_diffusion.dataset.models import Recording, RobotState, TeamColor
 from soccer_diffusion.dataset.resampling.original_rate_resampler import OriginalRateResampler
 
 
@@ -32,13 +33,15 @@ class BitBotsGameStateConverter(Converter):
     def convert_to_model(self, data: InputData, relative_timestamp: float, recording: Recording) -> ModelData:
         models = ModelData()
 
-        for sample in self.resampler.resample(data, relative_timestamp):
-            models.game_states.append(self._create_game_state(sample.data.game_state, sample.timestamp, recording))
+        with measure("resample", type(self.resampler).__name__):
+            samples = self.resampler.resample(data, relative_timestamp)
+        for sample in samples:
+            models.game_states.append_row(self._create_game_state(sample.data.game_state, sample.timestamp, recording))
 
         return models
 
-    def _create_game_state(self, msg, sampling_timestamp: float, recording: Recording) -> GameState:
-        return GameState(stamp=sampling_timestamp, recording=recording, state=self._robot_state_from_msg(msg))
+    def _create_game_state(self, msg, sampling_timestamp: float, recording: Recording) -> tuple[float, RobotState]:
+        return (sampling_timestamp, self._robot_state_from_msg(msg))
 
     def _robot_state_from_msg(self, msg) -> RobotState:
         if msg.penalized:
@@ -6,24 +6,54 @@ import numpy as np
 from soccer_diffusion.dataset import logger
 from soccer_diffusion.dataset.converters.converter import Converter
 from soccer_diffusion.dataset.imports.data import InputData, ModelData
-from soccer_diffusion.dataset.models import DEFAULT_IMG_SIZE, Image, Recording
+from soccer_diffusion.dataset.imports.pipeline import BoundedExecutor
+from soccer_diffusion.dataset.imports.report import measure
+from soccer_diffusion.dataset.models import DEFAULT_IMG_SIZE, Recording
 from soccer_diffusion.dataset.resampling.max_rate_resampler import MaxRateResampler
 
 
 class ImageConverter(Converter, abc.ABC):
+    # Executor to process images in the background, images are processed synchronously if it is None.
+    # Rows of background processed images contain a future of the image data.
+    executor: BoundedExecutor | None = None
+
     def __init__(self, resampler: MaxRateResampler) -> None:
         self.resampler = resampler
 
+    def __getstate__(self) -> dict:
+        # Executors are bound to the current process, copies process their images synchronously
+        state = self.__dict__.copy()
+        state.pop("executor", None)
+        return state
+
     def convert_to_model(self, data: InputData, relative_timestamp: float, recording: Recording) -> ModelData:
         models = ModelData()
-        for sample in self.resampler.resample(data, relative_timestamp):
-            models.images.append(self._create_image(sample.data, sample.timestamp, recording))
+        with measure("resample", type(self.resampler).__name__):
+            samples = self.resampler.resample(data, relative_timestamp)
+        for sample in samples:
+            if self.executor is None:
+                image_data = self._process_image(sample.data, sample.timestamp, recording)
+            else:
+                # The input data is updated while the image is processed, so only its current images are passed
+                images = InputData(image=sample.data.image, lower_image=sample.data.lower_image)
+                image_data = self.executor.submit(self._process_image, images, sample.timestamp, recording)
+            models.images.append_row((sample.timestamp, image_data))
         return models
 
+    def _process_image(self, data: InputData, sampling_timestamp: float, recording: Recording) -> bytes:
+        with measure("images", type(self).__name__):
+            return self._image_data(self._create_image(data, sampling_timestamp, recording), recording)
+
     @abc.abstractmethod
-    def _create_image(self, data, sampling_timestamp: float, recording: Recording) -> Image:
+    def _create_image(self, data, sampling_timestamp: float, recording: Recording) -> np.ndarray:
         pass
 
+    def _image_data(self, image: np.ndarray, recording: Recording) -> bytes:
+        # The image data should contain the image as bytes using an rgb8 format (3 channels) and uint8 type.
+        assert image.dtype == np.uint8, "Image must be of type np.uint8"
+        assert image.shape == (recording.img_height, recording.img_width, 3), "Image has unexpected dimensions"
+        return image.tobytes()
+
 
 class BitbotsImageConverter(ImageConverter):
     def __init__(self, resampler: MaxRateResampler) -> None:
@@ -45,7 +75,7 @@ class BitbotsImageConverter(ImageConverter):
                 "The image sizes changed during one recording! All images of a recording must have the same size."
             )
 
-    def _create_image(self, data, sampling_timestamp: float, recording: Recording) -> Image:
+    def _create_image(self, data, sampling_timestamp: float, recording: Recording) -> np.ndarray:
         image = data.image
         img_array = np.frombuffer(image.data, np.uint8).reshape((image.height, image.width, -1))
 
@@ -65,11 +95,7 @@ class BitbotsImageConverter(ImageConverter):
             case _:
                 raise AssertionError(f"Unsupported image encoding: {image.encoding}")
 
-        return Image(
-            stamp=sampling_timestamp,
-            recording=recording,
-            image=resized_rgb_img,
-        )
+        return resized_rgb_img
 
 
 class BHumanImageConverter(ImageConverter):
@@ -99,7 +125,7 @@ class BHumanImageConverter(ImageConverter):
                 "The image sizes changed during one recording! All images of a recording must have the same size."
             )
 
-    def _create_image(self, data, sampling_timestamp: float, recording: Recording) -> Image:
+    def _create_image(self, data, sampling_timestamp: float, recording: Recording) -> np.ndarray:
         image = data.image if data.image is not None else data.lower_image
         assert image is not None, "Image must be available"
 
@@ -118,8 +144,4 @@ class BHumanImageConverter(ImageConverter):
             3,
         ), "Converted image does not have the expected dimensions"
 
-        return Image(
-            stamp=sampling_timestamp,
-            recording=recording,
-            image=resized_rgb_img,
-        )
+        return resized_rgb_img
@@ -1,9 +1,29 @@
+import numpy as np
+from sqlalchemy import inspect
+
 from soccer_diffusion.dataset.converters.converter import Converter
-from soccer_diffusion.dataset.imports.data import InputData, ModelData
-from soccer_diffusion.dataset.models import JointCommands, JointStates, Recording, Rotation
+from soccer_diffusion.dataset.imports.data import (
+    JOINT_COMMANDS_DTYPE,
+    JOINT_NAMES,
+    JOINT_STATES_DTYPE,
+    ROTATIONS_DTYPE,
+    InputData,
+    ModelData,
+)
+from soccer_diffusion.dataset.imports.report import measure
+from soccer_diffusion.dataset.models import JointStates, Recording
 from soccer_diffusion.dataset.resampling.previous_interpolation_resampler import PreviousInterpolationResampler
 from soccer_diffusion.utils.utils import shift_radian_to_positive_range
 
+# Values of joints missing in the joint states of a robot: the default of their column (e.g. 0.0 for the elbow yaw),
+# otherwise NaN, which SQLite stores as NULL, so an unknown joint is not mistaken for a measured angle
+MISSING_JOINT_STATES = np.array(
+    [
+        default.arg if (default := inspect(JointStates).columns[name].default) is not None else np.nan
+        for name in JOINT_NAMES
+    ]
+)
+
 
 class SyncedDataConverter(Converter):
     def __init__(self, resampler: PreviousInterpolationResampler) -> None:
@@ -13,47 +33,62 @@ class SyncedDataConverter(Converter):
         pass
 
     def convert_to_model(self, data: InputData, relative_timestamp: float, recording: Recording) -> ModelData:
-        assert data.joint_state is not None, "joint_states are required in synced resampling data"
-        assert all(
-            command is not None for command in data.joint_command.values()
-        ), "joint_commands are required in synced resampling data"
+        assert data.has_joint_state, "joint_states are required in synced resampling data"
+        assert data.has_all_joint_commands, "joint_commands are required in synced resampling data"
         assert data.rotation is not None, "IMU rotation is required in synced resampling data"
 
         models = ModelData()
 
-        for sample in self.resampler.resample(data, relative_timestamp):
-            models.rotations.append(self._create_rotation(sample.data.rotation, sample.timestamp, recording))
-            models.joint_states.append(self._create_joint_states(sample.data.joint_state, sample.timestamp, recording))
-            models.joint_commands.append(
-                self._create_joint_commands(sample.data.joint_command, sample.timestamp, recording)
-            )
+        with measure("resample", type(self.resampler).__name__):
+            samples = self.resampler.resample(data, relative_timestamp)
+        if not samples:
+            return models
 
-        return models
+        stamps = np.array([sample.timestamp for sample in samples], dtype=np.float64)
+        # The samples are the last ones on the grid of the resampler
+        ticks = np.arange(self.resampler.num_samples - len(samples), self.resampler.num_samples)
 
-    def _create_rotation(self, msg, sampling_timestamp: float, recording: Recording) -> Rotation:
-        return Rotation(
-            stamp=sampling_timestamp,
-            recording=recording,
-            x=msg.x,
-            y=msg.y,
-            z=msg.z,
-            w=msg.w,
+        rotations = self._create_rotations([sample.data.rotation for sample in samples], stamps)
+        joint_states = self._create_joint_states(
+            np.stack([sample.data.joint_state_positions for sample in samples]),
+            np.stack([sample.data.joint_state_mask for sample in samples]),
+            stamps,
         )
+        joint_commands = self._create_joint_commands(
+            np.stack([sample.data.joint_command_positions for sample in samples]), stamps
+        )
+        # The synced models of a sample share its tick
+        for records in (rotations, joint_states, joint_commands):
+            records["tick"] = ticks
 
-    def _create_joint_states(self, joint_states_data, sampling_timestamp: float, recording: Recording) -> JointStates:
-        shifted_joint_states = {}
+        models.rotations.extend(rotations)
+        models.joint_states.extend(joint_states)
+        models.joint_commands.extend(joint_commands)
 
-        for joint, position in joint_states_data.items():
-            shifted_joint_states[joint] = shift_radian_to_positive_range(position)
+        return models
 
-        return JointStates(stamp=sampling_timestamp, recording=recording, **shifted_joint_states)
+    def _create_rotations(self, msgs, sampling_timestamps: np.ndarray) -> np.ndarray:
+        rotations = np.empty(len(msgs), dtype=ROTATIONS_DTYPE)
+        rotations["stamp"] = sampling_timestamps
+        rotations["x"] = [msg.x for msg in msgs]
+        rotations["y"] = [msg.y for msg in msgs]
+        rotations["z"] = [msg.z for msg in msgs]
+        rotations["w"] = [msg.w for msg in msgs]
+        return rotations
 
-    def _create_joint_commands(
-        self, joint_commands_data, sampling_timestamp: float, recording: Recording
-    ) -> JointCommands:
-        shifted_joint_commands = {}
+    def _create_joint_states(
+        self, positions: np.ndarray, valid: np.ndarray, sampling_timestamps: np.ndarray
+    ) -> np.ndarray:
+        shifted_positions = np.where(valid, shift_radian_to_positive_range(positions), MISSING_JOINT_STATES)
+        return self._joints_to_records(shifted_positions, sampling_timestamps, JOINT_STATES_DTYPE)
 
-        for joint, command in joint_commands_data.items():
-            shifted_joint_commands[joint] = shift_radian_to_positive_range(command)
+    def _create_joint_commands(self, commands: np.ndarray, sampling_timestamps: np.ndarray) -> np.ndarray:
+        shifted_commands = shift_radian_to_positive_range(commands)
+        return self._joints_to_records(shifted_commands, sampling_timestamps, JOINT_COMMANDS_DTYPE)
 
-        return JointCommands(stamp=sampling_timestamp, recording=recording, **shifted_joint_commands)
+    def _joints_to_records(self, joints: np.ndarray, sampling_timestamps: np.ndarray, dtype: np.dtype) -> np.ndarray:
+        records = np.empty(len(joints), dtype=dtype)
+        records["stamp"] = sampling_timestamps
+        for idx, name in enumerate(JOINT_NAMES):
+            records[name] = joints[:, idx]
+        return records
@@ -1,9 +1,12 @@
+import sqlite3
+from dataclasses import dataclass
 from pathlib import Path
 
-from sqlalchemy import Engine, create_engine, event
+from sqlalchemy import Connection, Engine, create_engine, event, text
 from sqlalchemy.orm import Session, sessionmaker
 
 from soccer_diffusion.dataset import logger
+from soccer_diffusion.dataset.defaults import MAX_WAL_SIZE
 from soccer_diffusion.dataset.models import Base
 
 
@@ -17,9 +20,83 @@ def _set_sqlite_pragmas(dbapi_connection, connection_record):
     cursor.close()
 
 
+def database_size(connection: Session | Connection) -> int:
+    """Returns the size of the database in bytes, including pages in the write-ahead log."""
+    page_count = connection.execute(text("PRAGMA page_count")).scalar_one()
+    page_size = connection.execute(text("PRAGMA page_size")).scalar_one()
+    return page_count * page_size
+
+
+def begin_snapshot(connection: sqlite3.Connection) -> None:
+    """Ends the read transaction of a connection and starts a new one, which pins the committed state of the
+    database until the next call. Concurrent writers, e.g. imports, continue to commit to the write-ahead log.
+
+    :param connection: A connection in autocommit mode (`isolation_level=None`), whose transactions are explicit
+    """
+    if connection.in_transaction:
+        connection.execute("COMMIT")
+    connection.execute("BEGIN")
+    # A deferred transaction takes its snapshot with its first read
+    connection.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+
+
+@dataclass
+class WalCheckpointPolicy:
+    """When a writer checkpoints the write-ahead log (WAL) into the database file, so the WAL does not grow
+    without bound during long imports, while the database is read concurrently.
+    SQLite only copies pages into the database file, which are not newer than the oldest snapshot of a reader,
+    and only restarts the WAL from its beginning, when no reader uses it anymore.
+
+    autocheckpoint_pages: Number of pages in the WAL, after which each commit checkpoints it passively
+    max_wal_size: Bytes of the WAL, after which the writer waits for readers to finish their snapshots,
+        to checkpoint all pages and truncate the WAL
+    journal_size_limit: Bytes the WAL file is truncated to, when it is restarted
+    busy_timeout: Seconds to wait for readers, before the WAL is kept until the next checkpoint
+    """
+
+    autocheckpoint_pages: int = 1000
+    max_wal_size: int = MAX_WAL_SIZE
+    journal_size_limit: int = 2**26
+    busy_timeout: float = 5.0
+
+    def apply(self, connection: Session | Connection) -> None:
+        """Sets the PRAGMAs of the policy on the connection of the writer.
+
+        :param connection: The connection or session of the writer
+        """
+        connection.execute(text(f"PRAGMA wal_autocheckpoint={self.autocheckpoint_pages}"))
+        connection.execute(text(f"PRAGMA journal_size_limit={self.journal_size_limit}"))
+
+    def checkpoint(self, connection: Session | Connection) -> bool:
+        """Checkpoints the WAL after a commit of the writer, without waiting for readers,
+        unless the WAL is larger than `max_wal_size`.
+
+        :param connection: The connection or session of the writer, outside of a write transaction
+        :return: Whether all pages of the WAL are checkpointed
+        """
+        busy, wal_pages, checkpointed_pages = connection.execute(text("PRAGMA wal_checkpoint(PASSIVE)")).one()
+        if wal_pages < 0:  # Not in WAL mode
+            return True
+        page_size = connection.execute(text("PRAGMA page_size")).scalar_one()
+        if wal_pages * page_size > self.max_wal_size:
+            busy_timeout = connection.execute(text("PRAGMA busy_timeout")).scalar_one()
+            connection.execute(text(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}"))
+            try:
+                busy, wal_pages, checkpointed_pages = connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)")).one()
+            finally:
+                connection.execute(text(f"PRAGMA busy_timeout={busy_timeout}"))
+            if busy:
+                logger.warning(
+                    f"The write-ahead log has {wal_pages * page_size / 2**20:.0f} MiB, "
+                    "but it can not be truncated while readers use older snapshots of the database"
+                )
+        return not busy and wal_pages == checkpointed_pages
+
+
 class Database:
-    def __init__(self, db_path: Path):
+    def __init__(self, db_path: Path, read_only: bool = False):
         self.db_path = db_path
+        self.read_only = read_only
         self.engine: Engine = self._setup_sqlite()
         self.session: Session
 
@@ -29,6 +106,9 @@ class Database:
         logger.info("Database connection closed")
 
     def _setup_sqlite(self) -> Engine:
+        if self.read_only:
+            # Read-only connections can be used concurrently by multiple processes, while the database is written
+            return create_engine(f"sqlite:///file:{self.db_path}?mode=ro&uri=true")
         return create_engine(f"sqlite:///{self.db_path}")
 
     def _create_schema(self) -> None:
@@ -48,7 +128,7 @@ class Database:
 
     def close_session(self) -> "Database":
         if self.session:
-            self.session.close_all()
+            self.session.close()
             logger.info("Database session closed")
         else:
             logger.warning("No database session to close")
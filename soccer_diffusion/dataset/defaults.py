@@ -0,0 +1,41 @@
+from enum import Enum
+
+# Defaults and choices of the dataset tools, which the CLI arguments are parsed with,
+# without importing the tools and their dependencies
+
+
+class ChunkDtype(str, Enum):
+    FLOAT32 = "float32"
+    # Fixed-point values with an offset and scale per chunk
+    INT16 = "int16"
+
+    @classmethod
+    def values(cls):
+        return [e.value for e in cls]
+
+
+class ColumnarFormat(str, Enum):
+    # Uncompressed Arrow IPC files, which are memory-mapped and loaded without copying
+    ARROW = "arrow"
+    # Compressed Parquet files, which are smaller, but decoded when they are loaded
+    PARQUET = "parquet"
+
+
+# Number of samples per chunk, about 20 s at the default resampling rate
+CHUNK_SIZE = 1024
+
+# Tables exported to columnar files by default, images without their data
+EXPORTED_TABLES = ("JointStates", "JointCommands", "Rotation", "GameState", "Image")
+
+# Number of rows read from the database and written at once by the columnar export,
+# each batch is a record batch or row group in the files
+COLUMNAR_BATCH_SIZE = 65_536
+
+# Seconds between two checkpoints of a pipelined import, each checkpoint commits the models converted before it
+CHECKPOINT_INTERVAL = 60.0
+
+# Bytes of the WAL, after which the writer waits for readers to checkpoint all pages and truncate the WAL
+MAX_WAL_SIZE = 2**30
+
+# Page sizes supported by SQLite
+PAGE_SIZES = [2**exponent for exponent in range(9, 17)]
@@ -1,14 +1,18 @@
 import datetime
-import math
-import random
+from concurrent.futures import ProcessPoolExecutor
 
 import cv2
 import numpy as np
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from tqdm import tqdm
 
 from soccer_diffusion.dataset import logger
+from soccer_diffusion.dataset.db import database_size
+from soccer_diffusion.dataset.game_state_intervals import append_game_state_intervals
+from soccer_diffusion.dataset.imports.data import JOINT_NAMES
 from soccer_diffusion.dataset.models import (
+    DEFAULT_IMG_SIZE,
     GameState,
     Image,
     JointCommands,
@@ -19,178 +23,188 @@ from soccer_diffusion.dataset.models import (
     TeamColor,
 )
 
-
-def insert_recordings(db_session: Session, n) -> list[int]:
-    logger.debug("Inserting recordings...")
-    for i in range(n):
-        db_session.add(
-            Recording(
-                allow_public=True,
-                original_file=f"dummy_original_file{i}",
-                team_name=f"dummy_team_name{i}",
-                team_color=random.choice(list(TeamColor)),
-                robot_type=f"dummy_robot_type{i}",
-                start_time=datetime.datetime.now(),
-                location=f"dummy_location{i}",
-                simulated=True,
-                img_width_scaling=1.0,
-                img_height_scaling=1.0,
-            ),
+# Number of rows inserted per bulk INSERT statement
+INSERT_BATCH_SIZE = 10_000
+# Number of distinct images rendered per run, the images of all recordings cycle through them
+NUM_IMAGE_TEMPLATES = 32
+# Sampling rate of the dummy data
+SAMPLE_RATE_HZ = 100
+
+
+def generate_test_image(width: int, height: int, timestamp: float) -> np.ndarray:
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+    # Draw a blue rectangle in the top left corner
+    cv2.rectangle(img, (0, 0), (width // 2, height // 2), (255, 0, 0), -1)
+    # Draw a red rectangle in the bottom right corner
+    cv2.rectangle(img, (width // 2, height // 2), (width, height), (0, 0, 255), -1)
+    # Write the string "RED" in red on the top right corner
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    cv2.putText(img, "RED", (width - 100, 50), font, 1, (0, 0, 255), 2, cv2.LINE_AA)
+    # Write the string "BLUE" in blue on the top right corner below the red text
+    cv2.putText(img, "BLUE", (width - 100, 100), font, 1, (255, 0, 0), 2, cv2.LINE_AA)
+    # Write the string "GREEN" in green on the top right corner below the blue text
+    cv2.putText(img, "GREEN", (width - 100, 150), font, 1, (0, 255, 0), 2, cv2.LINE_AA)
+    # Draw a white circle in the center
+    cv2.circle(img, (width // 2, height // 2), 50, (255, 255, 255), -1)
+    # Draw a smaller circle that changes color with the timestamp
+    color = (int(255 * (1 + np.sin(timestamp)) / 2), int(255 * (1 + np.cos(timestamp)) / 2), 0)
+    cv2.circle(img, (width // 2, height // 2), 25, color, -1)
+    # Draw a text with the timestamp
+    cv2.putText(img, f"{timestamp:.2f}", (10, height - 10), font, 1, (255, 255, 255), 2, cv2.LINE_AA)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def _render_template(timestamp: float) -> bytes:
+    return generate_test_image(DEFAULT_IMG_SIZE[0], DEFAULT_IMG_SIZE[1], timestamp).tobytes()
+
+
+def render_image_templates(num_templates: int = NUM_IMAGE_TEMPLATES, workers: int = 1) -> list[bytes]:
+    """Render the images, which are reused for the images of all dummy recordings.
+
+    :param num_templates: Number of distinct images
+    :param workers: Number of worker processes rendering the images
+    :return: The rgb8 image data of the templates
+    """
+    timestamps = [idx / num_templates * 2 * np.pi for idx in range(num_templates)]
+    if workers <= 1:
+        return [_render_template(timestamp) for timestamp in timestamps]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_render_template, timestamps))
+
+
+def _bulk_insert(db_session: Session, model: type, columns: dict[str, np.ndarray], recording_id: int) -> None:
+    """Inserts rows given as columns with bulk INSERT statements, without creating ORM objects."""
+    names = list(columns)
+    rows = np.rec.fromarrays(list(columns.values()), names=names).tolist()
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db_session.execute(
+            insert(model),
+            [dict(zip(names, row), recording_id=recording_id) for row in rows[start : start + INSERT_BATCH_SIZE]],
         )
-    recording = db_session.query(Recording).order_by(Recording._id.desc()).limit(n).all()
-    if recording is None:
-        raise ValueError("Failed to insert recordings")
-    return [r._id for r in reversed(recording)]
-
-
-def insert_images(db_session: Session, recording_ids: list[int], n: int, step: int) -> None:
-    logger.info("Generating images...")
-
-    def generate_test_image(width: int, height: int, timestamp: float) -> np.ndarray:
-        img = np.zeros((height, width, 3), dtype=np.uint8)
-        # Draw a blue rectangle in the top left corner
-        cv2.rectangle(img, (0, 0), (width // 2, height // 2), (255, 0, 0), -1)
-        # Draw a red rectangle in the bottom right corner
-        cv2.rectangle(img, (width // 2, height // 2), (width, height), (0, 0, 255), -1)
-        # Write the string "RED" in red on the top right corner
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        cv2.putText(img, "RED", (width - 100, 50), font, 1, (0, 0, 255), 2, cv2.LINE_AA)
-        # Write the string "BLUE" in blue on the top right corner below the red text
-        cv2.putText(img, "BLUE", (width - 100, 100), font, 1, (255, 0, 0), 2, cv2.LINE_AA)
-        # Write the string "GREEN" in green on the top right corner below the blue text
-        cv2.putText(img, "GREEN", (width - 100, 150), font, 1, (0, 255, 0), 2, cv2.LINE_AA)
-        # Draw a white circle in the center
-        cv2.circle(img, (width // 2, height // 2), 50, (255, 255, 255), -1)
-        # Draw a smaller circle that changes color with the timestamp
-        color = (int(255 * (1 + np.sin(timestamp)) / 2), int(255 * (1 + np.cos(timestamp)) / 2), 0)
-        cv2.circle(img, (width // 2, height // 2), 25, color, -1)
-        # Draw a text with the timestamp
-        cv2.putText(img, f"{timestamp:.2f}", (10, height - 10), font, 1, (255, 255, 255), 2, cv2.LINE_AA)
-        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-    for recording_id in tqdm(recording_ids):
-        # Get width and height from the recording
-        recording = db_session.query(Recording).get(recording_id)
-        if recording is None:
-            raise ValueError(f"Recording '{recording_id}' not found")
-        for i in range(0, n, step):
-            db_session.add(
-                Image(
-                    stamp=i / 100,
-                    recording_id=recording_id,
-                    image=generate_test_image(recording.img_height, recording.img_width, i / 100),
-                )
-            )
-
-
-def insert_rotations(db_session: Session, recording_ids: list[int], n: int, speed=0.1) -> None:
-    logger.info("Generating rotations...")
-    for recording_id in tqdm(recording_ids):
-        x_shift = random.random()
-        y_shift = random.random()
-        z_shift = random.random()
-        w_shift = random.random()
-
-        for i in range(n):
-            db_session.add(
-                Rotation(
-                    stamp=i / 100,
-                    recording_id=recording_id,
-                    x=math.sin(i * speed + x_shift),
-                    y=math.sin(i * speed + y_shift),
-                    z=math.sin(i * speed + z_shift),
-                    w=math.sin(i * speed + w_shift),
-                ),
-            )
-
-
-def insert_joint_states(db_session: Session, recording_ids: list[int], n: int, speed: float = 0.2) -> None:
-    logger.info("Generating joint states...")
-    for recording_id in tqdm(recording_ids):
-        offsets = [random.random() for _ in range(20)]
-        for i in range(n):
-            db_session.add(
-                JointStates(
-                    stamp=i / 100,
-                    recording_id=recording_id,
-                    r_shoulder_pitch=math.sin(speed * i + offsets[0]) + math.pi,
-                    l_shoulder_pitch=math.sin(speed * i + offsets[1]) + math.pi,
-                    r_shoulder_roll=math.sin(speed * i + offsets[2]) + math.pi,
-                    l_shoulder_roll=math.sin(speed * i + offsets[3]) + math.pi,
-                    r_elbow=math.sin(speed * i + offsets[4]) + math.pi,
-                    l_elbow=math.sin(speed * i + offsets[5]) + math.pi,
-                    r_hip_yaw=math.sin(speed * i + offsets[6]) + math.pi,
-                    l_hip_yaw=math.sin(speed * i + offsets[7]) + math.pi,
-                    r_hip_roll=math.sin(speed * i + offsets[8]) + math.pi,
-                    l_hip_roll=math.sin(speed * i + offsets[9]) + math.pi,
-                    r_hip_pitch=math.sin(speed * i + offsets[10]) + math.pi,
-                    l_hip_pitch=math.sin(speed * i + offsets[11]) + math.pi,
-                    r_knee=math.sin(speed * i + offsets[12]) + math.pi,
-                    l_knee=math.sin(speed * i + offsets[13]) + math.pi,
-                    r_ankle_pitch=math.sin(speed * i + offsets[14]) + math.pi,
-                    l_ankle_pitch=math.sin(speed * i + offsets[15]) + math.pi,
-                    r_ankle_roll=math.sin(speed * i + offsets[16]) + math.pi,
-                    l_ankle_roll=math.sin(speed * i + offsets[17]) + math.pi,
-                    head_pan=math.sin(speed * i + offsets[18]) + math.pi,
-                    head_tilt=math.sin(speed * i + offsets[19]) + math.pi,
-                ),
-            )
-
-
-def insert_joint_commands(db_session: Session, recording_ids: list[int], n: int, speed: float = 0.2) -> None:
-    logger.info("Generating joint commands...")
-    for recording_id in tqdm(recording_ids):
-        offsets = [random.random() for _ in range(20)]
-        for i in range(n):
-            db_session.add(
-                JointCommands(
-                    stamp=i / 100,
-                    recording_id=recording_id,
-                    r_shoulder_pitch=math.sin(speed * i + offsets[0]) + math.pi,
-                    l_shoulder_pitch=math.sin(speed * i + offsets[1]) + math.pi,
-                    r_shoulder_roll=math.sin(speed * i + offsets[2]) + math.pi,
-                    l_shoulder_roll=math.sin(speed * i + offsets[3]) + math.pi,
-                    r_elbow=math.sin(speed * i + offsets[4]) + math.pi,
-                    l_elbow=math.sin(speed * i + offsets[5]) + math.pi,
-                    r_hip_yaw=math.sin(speed * i + offsets[6]) + math.pi,
-                    l_hip_yaw=math.sin(speed * i + offsets[7]) + math.pi,
-                    r_hip_roll=math.sin(speed * i + offsets[8]) + math.pi,
-                    l_hip_roll=math.sin(speed * i + offsets[9]) + math.pi,
-                    r_hip_pitch=math.sin(speed * i + offsets[10]) + math.pi,
-                    l_hip_pitch=math.sin(speed * i + offsets[11]) + math.pi,
-                    r_knee=math.sin(speed * i + offsets[12]) + math.pi,
-                    l_knee=math.sin(speed * i + offsets[13]) + math.pi,
-                    r_ankle_pitch=math.sin(speed * i + offsets[14]) + math.pi,
-                    l_ankle_pitch=math.sin(speed * i + offsets[15]) + math.pi,
-                    r_ankle_roll=math.sin(speed * i + offsets[16]) + math.pi,
-                    l_ankle_roll=math.sin(speed * i + offsets[17]) + math.pi,
-                    head_pan=math.sin(speed * i + offsets[18]) + math.pi,
-                    head_tilt=math.sin(speed * i + offsets[19]) + math.pi,
-                ),
-            )
-
-
-def insert_game_states(db_session: Session, recording_ids: list[int], n: int) -> None:
-    logger.info("Generating game states...")
-    for recording_id in tqdm(recording_ids):
-        for i in range(n):
-            db_session.add(
-                GameState(
-                    stamp=i / 100,
-                    recording_id=recording_id,
-                    state=random.choice(list(RobotState)),
-                ),
-            )
-
-
-def insert_dummy_data(db_session: Session, num_recordings: int, num_samples_per_rec: int, image_step: int) -> None:
+
+
+def _joint_columns(rng: np.random.Generator, stamps: np.ndarray, speed: float) -> dict[str, np.ndarray]:
+    phases = speed * np.arange(len(stamps))[:, None] + rng.random(len(JOINT_NAMES))
+    positions = np.sin(phases) + np.pi
+    return (
+        {"stamp": stamps}
+        | {name: positions[:, idx] for idx, name in enumerate(JOINT_NAMES)}
+        | {"tick": np.arange(len(stamps))}
+    )
+
+
+def insert_recording(db_session: Session, idx: int, rng: np.random.Generator) -> int:
+    recording = Recording(
+        allow_public=True,
+        original_file=f"dummy_original_file{idx}",
+        team_name=f"dummy_team_name{idx}",
+        team_color=list(TeamColor)[rng.integers(len(TeamColor))],
+        robot_type=f"dummy_robot_type{idx}",
+        start_time=datetime.datetime.now(),
+        location=f"dummy_location{idx}",
+        simulated=True,
+        img_width_scaling=1.0,
+        img_height_scaling=1.0,
+    )
+    db_session.add(recording)
+    db_session.flush()
+    return recording._id
+
+
+def insert_samples(
+    db_session: Session,
+    recording_id: int,
+    num_samples: int,
+    image_step: int,
+    image_templates: list[bytes],
+    rng: np.random.Generator,
+) -> None:
+    """Insert the images, rotations, joint states, joint commands and game states of a recording.
+
+    :param db_session: The database session
+    :param recording_id: The recording ID
+    :param num_samples: Number of samples of the recording
+    :param image_step: Number of samples between two images
+    :param image_templates: The image data, which is reused for the images
+    :param rng: The random number generator
+    """
+    stamps = np.arange(num_samples) / SAMPLE_RATE_HZ
+
+    image_indices = np.arange(0, num_samples, image_step)
+    templates = np.empty(len(image_templates), dtype=object)
+    templates[:] = image_templates
+    _bulk_insert(
+        db_session,
+        Image,
+        {"stamp": stamps[image_indices], "data": templates[image_indices % len(templates)]},
+        recording_id,
+    )
+
+    phases = 0.1 * np.arange(num_samples)[:, None] + rng.random(4)
+    quaternions = np.sin(phases)
+    _bulk_insert(
+        db_session,
+        Rotation,
+        {"stamp": stamps}
+        | {axis: quaternions[:, idx] for idx, axis in enumerate("xyzw")}
+        | {"tick": np.arange(num_samples)},
+        recording_id,
+    )
+
+    _bulk_insert(db_session, JointStates, _joint_columns(rng, stamps, speed=0.2), recording_id)
+    _bulk_insert(db_session, JointCommands, _joint_columns(rng, stamps, speed=0.2), recording_id)
+
+    states = np.array([state.value for state in RobotState], dtype=object)
+    game_states = states[rng.integers(len(states), size=num_samples)]
+    _bulk_insert(db_session, GameState, {"stamp": stamps, "state": game_states}, recording_id)
+    append_game_state_intervals(db_session, recording_id, stamps, game_states)
+
+
+def insert_dummy_data(
+    db_session: Session,
+    num_recordings: int,
+    num_samples_per_rec: int,
+    image_step: int,
+    seed: int | None = None,
+    target_size: int | None = None,
+    workers: int = 1,
+) -> None:
+    """Insert recordings with generated data into the database.
+
+    :param db_session: The database session
+    :param num_recordings: Number of recordings to insert
+    :param num_samples_per_rec: Number of samples per recording, sampled at 100 Hz
+    :param image_step: Number of samples between two images
+    :param seed: Seed of the random data, the data is reproducible for the same seed
+    :param target_size: If set, recordings are inserted until the database has at least this size in bytes,
+        instead of inserting `num_recordings` recordings
+    :param workers: Number of worker processes rendering the images
+    """
     logger.info("Inserting dummy data...")
-    recording_ids: list[int] = insert_recordings(db_session, num_recordings)
-    insert_images(db_session, recording_ids, num_samples_per_rec, image_step)
-    insert_rotations(db_session, recording_ids, num_samples_per_rec)
-    insert_joint_states(db_session, recording_ids, num_samples_per_rec)
-    insert_joint_commands(db_session, recording_ids, num_samples_per_rec)
-    insert_game_states(db_session, recording_ids, num_samples_per_rec)
-    logger.info("Committing dummy data to database...")
-    db_session.commit()
+    rng = np.random.default_rng(seed)
+    image_templates = render_image_templates(workers=workers)
+
+    recording_ids: list[int] = []
+    if target_size is not None:
+        progress = tqdm(total=target_size, initial=database_size(db_session), unit="B", unit_scale=True)
+    else:
+        progress = tqdm(total=num_recordings, unit="recording")
+    while True:
+        if target_size is None and len(recording_ids) >= num_recordings:
+            break
+        if target_size is not None and database_size(db_session) >= target_size:
+            break
+
+        recording_id = insert_recording(db_session, len(recording_ids), rng)
+        insert_samples(db_session, recording_id, num_samples_per_rec, image_step, image_templates, rng)
+        # Commit each recording, so the memory usage does not grow with the number of recordings
+        db_session.commit()
+        recording_ids.append(recording_id)
+
+        if target_size is not None:
+            progress.update(database_size(db_session) - progress.n)
+        else:
+            progress.update(1)
+    progress.close()
+
     logger.info(f"Dummy data inserted. Recording IDs: {recording_ids}")
@@ -0,0 +1,48 @@
+from collections.abc import Sequence
+
+import numpy as np
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from soccer_diffusion.dataset.models import GameStateInterval, RobotState
+
+
+def append_game_state_intervals(
+    session: Session, recording_id: int, stamps: np.ndarray, states: Sequence[str | RobotState]
+) -> None:
+    """Extends the game state intervals of a recording with game states following its existing ones.
+    The last interval is extended while the state does not change, so the intervals of a recording
+    are identical, whether its game states are appended at once or in batches.
+
+    :param session: The database session
+    :param recording_id: The recording of the game states
+    :param stamps: Stamps of the game states in ascending order
+    :param states: The game states
+    """
+    if not len(stamps):
+        return
+    codes = np.array([int(RobotState(state)) for state in states])
+
+    last = session.execute(
+        select(GameStateInterval._id, GameStateInterval.state_code)
+        .where(GameStateInterval.recording_id == recording_id)
+        .order_by(GameStateInterval.start_stamp.desc(), GameStateInterval._id.desc())
+        .limit(1)
+    ).first()
+    previous_codes = np.concatenate(([-1 if last is None else last.state_code], codes[:-1]))
+    # Indices of the game states starting a new interval
+    starts = np.flatnonzero(codes != previous_codes)
+    # Each interval ends with the start of the next one, the last one with the last game state
+    ends = np.append(stamps[starts[1:]], stamps[-1])
+
+    if last is not None:
+        end_stamp = float(stamps[starts[0]]) if len(starts) else float(stamps[-1])
+        session.execute(update(GameStateInterval).where(GameStateInterval._id == last._id).values(end_stamp=end_stamp))
+    if len(starts):
+        session.execute(
+            insert(GameStateInterval),
+            [
+                {"recording_id": recording_id, "start_stamp": start, "end_stamp": end, "state_code": code}
+                for start, end, code in zip(stamps[starts].tolist(), ends.tolist(), codes[starts].tolist())
+            ],
+        )
@@ -0,0 +1,153 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from sqlalchemy import select, text, update
+from sqlalchemy.orm import Session
+
+from soccer_diffusion.dataset import logger
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.models import Image, Recording
+
+# Number of images moved at once, each batch is committed
+IMAGES_PER_BATCH = 256
+
+
+def image_store_dir(db_path: str | Path) -> Path:
+    """Returns the directory of the image store of a database, next to the database file.
+
+    :param db_path: Path of the database
+    :return: The directory, e.g. "db.images" for "db.sqlite3"
+    """
+    return Path(db_path).with_suffix(".images")
+
+
+def database_path(connection: sqlite3.Connection | Session) -> Path:
+    """Returns the path of the (main) database file of a connection.
+
+    :param connection: The database connection or session
+    :return: The path of the database file
+    """
+    if isinstance(connection, Session):
+        databases = connection.execute(text("PRAGMA database_list")).all()
+    else:
+        databases = connection.execute("PRAGMA database_list").fetchall()
+    return Path(next(file for _, name, file in databases if name == "main"))
+
+
+class ImageStore:
+    """Append-only files with the image data of each recording, which is moved out of the database,
+    so the numeric tables are not scattered between the images and images of a recording are read sequentially.
+    The images reference their data by its offset and size in the file of their recording.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        # Open file descriptors of the recordings, which are read from with pread
+        self._files: dict[int, int] = {}
+
+    @classmethod
+    def of(cls, connection: sqlite3.Connection | Session) -> "ImageStore":
+        """Returns the image store of the database of a connection.
+
+        :param connection: The database connection or session
+        :return: The image store
+        """
+        return cls(image_store_dir(database_path(connection)))
+
+    def path(self, recording_id: int) -> Path:
+        return self.directory / f"recording_{recording_id}.bin"
+
+    def append(self, recording_id: int, images: list[bytes]) -> list[int]:
+        """Appends images to the file of a recording and syncs it to disk.
+
+        :param recording_id: The recording of the images
+        :param images: The image data
+        :return: The offset of each image in the file
+        """
+        self.directory.mkdir(exist_ok=True)
+        offsets = []
+        with open(self.path(recording_id), "ab") as file:
+            # Data of an interrupted earlier append is not referenced, it is only skipped
+            offset = file.seek(0, os.SEEK_END)
+            for data in images:
+                offsets.append(offset)
+                offset += file.write(data)
+            file.flush()
+            # The data must be on disk before the database references it
+            os.fsync(file.fileno())
+        return offsets
+
+    def read(self, recording_id: int, offset: int, size: int) -> bytes:
+        """Reads an image from the file of a recording.
+
+        :param recording_id: The recording of the image
+        :param offset: Offset of the image in the file
+        :param size: Size of the image data in bytes
+        :return: The image data
+        """
+        if recording_id not in self._files:
+            self._files[recording_id] = os.open(self.path(recording_id), os.O_RDONLY)
+        data = os.pread(self._files[recording_id], size, offset)
+        assert len(data) == size, f"The image store of recording {recording_id} is truncated"
+        return data
+
+    def close(self) -> None:
+        for file in self._files.values():
+            os.close(file)
+        self._files.clear()
+
+    def __getstate__(self) -> dict:
+        # File descriptors are not valid in other processes, e.g. DataLoader workers
+        return {"directory": self.directory, "_files": {}}
+
+    def __del__(self):
+        self.close()
+
+
+def move_images(db: Database, restore: bool = False) -> None:
+    """Moves the image data of all recordings from the database to its image store, or back with `restore`.
+    It can be run again to move the images of recordings imported afterwards.
+    Run `db optimize` afterwards to reclaim the space of the moved images.
+
+    :param db: The database
+    :param restore: Whether to move the images back into the database and delete the image store
+    """
+    store = ImageStore(image_store_dir(db.db_path))
+    recording_ids = db.session.scalars(select(Recording._id).order_by(Recording._id)).all()
+    logger.info(f"{'Restoring' if restore else 'Moving'} the images of {len(recording_ids)} recordings...")
+    start = time.perf_counter()
+    num_images = 0
+    for recording_id in recording_ids:
+        # Duplicates do not contain data, only the images they reference are moved
+        query = select(Image._id, Image.data, Image.blob_offset, Image.blob_size).where(
+            Image.recording_id == recording_id,
+            Image.blob_offset.is_not(None) if restore else Image.blob_offset.is_(None),
+            Image.reference_id.is_(None),
+        )
+        # Images are appended in order, so they are read sequentially
+        query = query.order_by(Image.stamp).limit(IMAGES_PER_BATCH)
+        while rows := db.session.execute(query).all():
+            if restore:
+                values = [
+                    {"_id": _id, "data": store.read(recording_id, offset, size), "blob_offset": None, "blob_size": None}
+                    for _id, _, offset, size in rows
+                ]
+            else:
+                offsets = store.append(recording_id, [data for _, data, _, _ in rows])
+                values = [
+                    {"_id": _id, "data": b"", "blob_offset": offset, "blob_size": len(data)}
+                    for (_id, data, _, _), offset in zip(rows, offsets)
+                ]
+            db.session.execute(update(Image), values)
+            db.session.commit()
+            num_images += len(rows)
+
+    if restore:
+        store.close()
+        for path in store.directory.glob("recording_*.bin"):
+            path.unlink()
+        if store.directory.exists():
+            store.directory.rmdir()
+    logger.info(f"{'Restored' if restore else 'Moved'} {num_images} images in {time.perf_counter() - start:.1f} s")
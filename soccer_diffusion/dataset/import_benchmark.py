@@ -0,0 +1,214 @@
+import json
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from rich.console import Console
+from rich.table import Table
+
+from soccer_diffusion.dataset import logger
+from soccer_diffusion.dataset.cli.args import ImportType
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.synthetic_logs import (
+    BHumanLogConfig,
+    BitBotsLogConfig,
+    write_b_human_log,
+    write_bit_bots_mcap,
+)
+
+# Part of the import measured by the benchmark per log type. The synthetic B-Human logs are only written to the
+# frame cache, so their import skips parsing the log with pybh and extracting the fields of its records.
+MEASURED_IMPORT = {
+    ImportType.BIT_BOTS: "full import",
+    ImportType.B_HUMAN: "cached conversion",
+}
+# Explanation of the measured part of the import, if it is not the full import
+MEASURED_IMPORT_NOTES = {
+    ImportType.B_HUMAN: "B-Human logs are read from the filled frame cache, "
+    "parsing the logs with pybh and extracting their fields is not measured",
+}
+
+
+def log_configs(
+    import_type: ImportType,
+    durations: list[float],
+    image_size: tuple[int, int] | None = None,
+    camera_rate: float | None = None,
+    joint_rate: float | None = None,
+    imu_rate: float | None = None,
+    seed: int | None = None,
+) -> list[BitBotsLogConfig] | list[BHumanLogConfig]:
+    """Returns the configs of synthetic logs, with the defaults of the log type for all unset values.
+
+    :param import_type: Type of the logs
+    :param durations: Duration of each log in seconds
+    :param image_size: Resolution (width, height) of the (upper) camera images
+    :param camera_rate: Frequency of the camera images in Hz
+    :param joint_rate: Frequency of the joint states and commands in Hz (Motion frames for B-Human)
+    :param imu_rate: Frequency of the Bit-Bots IMU data in Hz, ignored for B-Human logs
+    :param seed: Seed of the random data
+    :return: One config per duration
+    """
+    values: dict[str, Any] = {"seed": seed}
+    if image_size is not None:
+        values["image_width"], values["image_height"] = image_size
+    if camera_rate is not None:
+        values["camera_rate"] = camera_rate
+
+    if import_type == ImportType.BIT_BOTS:
+        if joint_rate is not None:
+            values["joint_state_rate"] = values["joint_command_rate"] = joint_rate
+        if imu_rate is not None:
+            values["imu_rate"] = imu_rate
+        return [BitBotsLogConfig(duration=duration, **values) for duration in durations]
+
+    if joint_rate is not None:
+        values["motion_rate"] = joint_rate
+    return [BHumanLogConfig(duration=duration, **values) for duration in durations]
+
+
+def write_synthetic_log(
+    import_type: ImportType, log_dir: Path, name: str, config: BitBotsLogConfig | BHumanLogConfig
+) -> tuple[Path, int, list[str]]:
+    """Writes a synthetic log to import.
+
+    :param import_type: Type of the log
+    :param log_dir: Directory to write the log to
+    :param name: File name of the log without suffix
+    :param config: Contents of the log
+    :return: Path of the log, size of its data in bytes and the additional arguments of `cli import` to import it
+    """
+    if import_type == ImportType.BIT_BOTS:
+        assert isinstance(config, BitBotsLogConfig), "Bit-Bots recordings are written with a BitBotsLogConfig"
+        path = log_dir / f"{name}.mcap"
+        write_bit_bots_mcap(path, config)
+        return path, path.stat().st_size, []
+
+    assert isinstance(config, BHumanLogConfig), "B-Human logs are written with a BHumanLogConfig"
+    # The import reads the date of a B-Human log from its directories
+    path = log_dir / "2024-07-20_12-00" / f"{name}.log"
+    cache_dir = log_dir / "frame_cache"
+    cache = write_b_human_log(path, cache_dir, config)
+    size = sum(file.stat().st_size for file in cache.directory.iterdir())
+    return path, size, ["--caching", "--cache-dir", str(cache_dir)]
+
+
+def run_import(import_type: ImportType, log_path: Path, db_path: Path, import_args: list[str]) -> dict[str, Any]:
+    """Imports a log into a new database with `cli import` and returns its import report.
+
+    :param import_type: Type of the log
+    :param log_path: Path of the log
+    :param db_path: Path of the database, an existing database is replaced
+    :param import_args: Additional arguments of `cli import`
+    :return: The import report, with the wall time of the whole command as "wall_s"
+    """
+    db_path.unlink(missing_ok=True)
+    Database(db_path).create_session(create_schema=True).close_session()
+
+    report_path = log_path.with_suffix(".report.json")
+    command = [
+        sys.executable,
+        "-m",
+        "soccer_diffusion.dataset.cli.run",
+        "--db-path",
+        str(db_path),
+        "import",
+        import_type.value,
+        str(log_path),
+        "benchmark",
+        "--report",
+        str(report_path),
+        *import_args,
+    ]
+    logger.debug(f"Running {' '.join(command)}")
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    wall_s = time.perf_counter() - start
+
+    with open(report_path) as file:
+        return json.load(file) | {"wall_s": wall_s}
+
+
+def benchmark_imports(
+    import_type: ImportType,
+    work_dir: Path,
+    configs: list[BitBotsLogConfig] | list[BHumanLogConfig],
+    import_args: list[str] | None = None,
+) -> list[dict[str, Any]]:
+    """Measures the import throughput of synthetic logs, e.g. of different durations.
+    Each log is written to the work directory and imported with `cli import` into a new database.
+
+    :param import_type: Type of the logs
+    :param work_dir: Directory of the logs, databases and results
+    :param configs: Contents of the logs
+    :param import_args: Additional arguments of `cli import`, e.g. ["--workers", "4"]
+    :return: The results with the config, the measured part of the import (see `MEASURED_IMPORT`) and
+        the import report of each log, which are also saved to "benchmark.json" in the work directory
+    """
+    if note := MEASURED_IMPORT_NOTES.get(import_type):
+        logger.warning(f"The benchmark measures the {MEASURED_IMPORT[import_type]} only: {note}")
+    results = []
+    for idx, config in enumerate(configs):
+        name = f"synthetic_{idx}_{config.duration:g}s"
+        log_path, log_bytes, log_import_args = write_synthetic_log(import_type, work_dir, name, config)
+        logger.info(f"Importing '{log_path}'...")
+        db_path = log_path.with_suffix(".sqlite3")
+        report = run_import(import_type, log_path, db_path, log_import_args + (import_args or []))
+        results.append(
+            {
+                "type": import_type.value,
+                "measured": MEASURED_IMPORT[import_type],
+                "config": asdict(config),
+                "log_bytes": log_bytes,
+                "report": report,
+            }
+        )
+
+    with open(work_dir / "benchmark.json", "w") as file:
+        json.dump(results, file, indent=2, default=str)
+    print_results(results)
+    return results
+
+
+def print_results(results: list[dict[str, Any]], console: Console | None = None) -> None:
+    """Prints the import throughput per message type and log.
+
+    :param results: The results of `benchmark_imports`
+    :param console: The console to print to
+    """
+    console = console or Console()
+
+    import_types = {ImportType(result["type"]) for result in results}
+    measured = ", ".join(sorted(MEASURED_IMPORT[import_type] for import_type in import_types))
+    notes = [note for import_type in sorted(import_types) if (note := MEASURED_IMPORT_NOTES.get(import_type))]
+    throughput = Table(
+        title=f"Import Throughput of the {measured} (messages/s, MiB/s)", caption="\n".join(notes) or None
+    )
+    throughput.add_column("Topic", justify="right", no_wrap=True)
+    for result in results:
+        throughput.add_column(f"{result['config']['duration']:g} s log", justify="right")
+    topics = sorted({topic for result in results for topic in result["report"]["topics"]})
+    for topic in topics:
+        cells = []
+        for result in results:
+            duration = result["report"]["duration_s"]
+            counts = result["report"]["topics"].get(topic, {"messages": 0, "bytes": 0})
+            cells.append(f"{counts['messages'] / duration:.0f}, {counts['bytes'] / 2**20 / duration:.2f}")
+        throughput.add_row(f"[bold]{topic}", *cells)
+
+    reports = [result["report"] for result in results]
+    throughput.add_section()
+    throughput.add_row("[bold]Log MiB", *(f"{result['log_bytes'] / 2**20:.1f}" for result in results))
+    throughput.add_row("[bold]Import s", *(f"{report['duration_s']:.2f}" for report in reports))
+    throughput.add_row(
+        "[bold]Log MiB/s",
+        *(f"{result['log_bytes'] / 2**20 / result['report']['duration_s']:.2f}" for result in results),
+    )
+    throughput.add_row("[bold]Written rows", *(f"{sum(report['rows'].values())}" for report in reports))
+    throughput.add_row(
+        "[bold]Peak RSS MiB", *(f"{report['memory']['peak_rss_bytes'] / 2**20:.0f}" for report in reports)
+    )
+    console.print(throughput)
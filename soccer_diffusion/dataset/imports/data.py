@@ -1,18 +1,89 @@
 from dataclasses import dataclass, field
+from functools import lru_cache
+from types import SimpleNamespace
 from typing import Any
 
+import numpy as np
+
 from soccer_diffusion.dataset.models import GameState, Image, JointCommands, JointStates, Recording, Rotation
 from soccer_diffusion.utils.utils import camelcase_to_snakecase
 
+# Order of joints in the joint state and command arrays of the InputData
+JOINT_NAMES: tuple[str, ...] = (
+    "r_shoulder_pitch",
+    "l_shoulder_pitch",
+    "r_shoulder_roll",
+    "l_shoulder_roll",
+    "r_elbow",
+    "r_elbow_yaw",
+    "l_elbow",
+    "l_elbow_yaw",
+    "r_hip_yaw",
+    "l_hip_yaw",
+    "r_hip_roll",
+    "l_hip_roll",
+    "r_hip_pitch",
+    "l_hip_pitch",
+    "r_knee",
+    "l_knee",
+    "r_ankle_pitch",
+    "l_ankle_pitch",
+    "r_ankle_roll",
+    "l_ankle_roll",
+    "head_pan",
+    "head_tilt",
+)
+NUM_JOINTS: int = len(JOINT_NAMES)
+JOINT_INDEX: dict[str, int] = {name: idx for idx, name in enumerate(JOINT_NAMES)}
+
+ALL_JOINTS_MASK: int = (1 << NUM_JOINTS) - 1
+# The Wolfgang-OP has no elbow yaw joints, therefore we default their commands to 0.0
+DEFAULT_JOINT_COMMANDS_MASK: int = (1 << JOINT_INDEX["r_elbow_yaw"]) | (1 << JOINT_INDEX["l_elbow_yaw"])
+
+
+@lru_cache(maxsize=64)
+def joint_layout(names: tuple[str, ...]) -> tuple[list[int] | slice, list[int] | None, int]:
+    """
+    Map the joint names of a message to their indices in the `JOINT_NAMES` order.
+    The result is cached, as the joint names of a topic/representation rarely change during a recording.
+    Joints we do not store (e.g. additional joints of other robots) are skipped.
+
+    :param names: The (camelCase or snake_case) joint names of the message
+    :return: The target indices in `JOINT_NAMES` order, the indices of the known joints in the message
+        (None if all joints are known) and a bitmask of the contained joints
+    """
+    targets = []
+    sources = []
+    mask = 0
+    for source, name in enumerate(names):
+        target = JOINT_INDEX.get(camelcase_to_snakecase(name))
+        if target is None:
+            continue
+        targets.append(target)
+        sources.append(source)
+        mask |= 1 << target
+
+    all_known = len(sources) == len(names)
+    if all_known and targets == list(range(NUM_JOINTS)):
+        return slice(None), None, mask
+    return targets, None if all_known else sources, mask
 
-def joints_dict_from_msg_data(joints_data: list[tuple[str, float]]) -> dict[str, float]:
-    joints_dict = {}
 
-    for name, position in joints_data:
-        key = camelcase_to_snakecase(name)
-        joints_dict[key] = position
+@lru_cache(maxsize=64)
+def joint_mask_to_array(mask: int) -> np.ndarray:
+    """
+    Convert a bitmask of joints to a boolean array in the `JOINT_NAMES` order.
 
-    return joints_dict
+    :param mask: The bitmask of joints
+    :return: A read-only boolean array, True for every joint contained in the mask
+    """
+    array = np.array([bool(mask & (1 << idx)) for idx in range(NUM_JOINTS)])
+    array.flags.writeable = False
+    return array
+
+
+def _masked_joints_dict(positions: np.ndarray, mask: int) -> dict[str, float]:
+    return {name: float(positions[idx]) for idx, name in enumerate(JOINT_NAMES) if mask & (1 << idx)}
 
 
 @dataclass
@@ -24,95 +95,210 @@ class ImportMetadata:
     simulated: bool
 
 
-@dataclass
 class InputData:
-    image: Any = None
-    lower_image: Any = None
-    game_state: Any = None
-    rotation: Any = None
-    _joint_state: Any = None
-
-    # as we are not always sending joint commands for all joints at once
-    # we need to separate them here, to enable resampling on a per joint basis
-    r_shoulder_pitch_command: Any = None
-    l_shoulder_pitch_command: Any = None
-    r_shoulder_roll_command: Any = None
-    l_shoulder_roll_command: Any = None
-    r_elbow_command: Any = None
-    r_elbow_yaw_command: Any = 0.0  # Default
-    l_elbow_command: Any = None
-    l_elbow_yaw_command: Any = 0.0  # Default
-    r_hip_yaw_command: Any = None
-    l_hip_yaw_command: Any = None
-    r_hip_roll_command: Any = None
-    l_hip_roll_command: Any = None
-    r_hip_pitch_command: Any = None
-    l_hip_pitch_command: Any = None
-    r_knee_command: Any = None
-    l_knee_command: Any = None
-    r_ankle_pitch_command: Any = None
-    l_ankle_pitch_command: Any = None
-    r_ankle_roll_command: Any = None
-    l_ankle_roll_command: Any = None
-    head_pan_command: Any = None
-    head_tilt_command: Any = None
+    """
+    Holds the latest received data of every input topic/representation during an import.
+
+    Joint states and commands are kept in fixed-size arrays, indexed by `JOINT_NAMES`,
+    as this object is updated for every single message of a recording.
+    As we are not always receiving joint commands for all joints at once, a bitmask tracks,
+    which joint commands have already been received, to enable resampling on a per joint basis.
+    """
+
+    __slots__ = (
+        "image",
+        "lower_image",
+        "game_state",
+        "rotation",
+        "_joint_state_positions",
+        "_joint_state_mask",
+        "_joint_command_positions",
+        "_joint_command_mask",
+    )
+
+    def __init__(self, image: Any = None, lower_image: Any = None, game_state: Any = None, rotation: Any = None):
+        self.image = image
+        self.lower_image = lower_image
+        self.game_state = game_state
+        self.rotation = rotation
+
+        self._joint_state_positions = np.zeros(NUM_JOINTS, dtype=np.float64)
+        self._joint_state_mask = 0
+
+        self._joint_command_positions = np.zeros(NUM_JOINTS, dtype=np.float64)
+        self._joint_command_mask = DEFAULT_JOINT_COMMANDS_MASK
 
     @property
-    def joint_state(self):
-        return self._joint_state
+    def joint_state(self) -> dict[str, float] | None:
+        if not self._joint_state_mask:
+            return None
+        return _masked_joints_dict(self._joint_state_positions, self._joint_state_mask)
 
     @joint_state.setter
     def joint_state(self, msg):
-        joint_states_data = list(zip(msg.name, msg.position))
+        targets, sources, mask = joint_layout(tuple(msg.name))
+        positions = msg.position if sources is None else np.asarray(msg.position)[sources]
+        self._joint_state_positions[targets] = positions
+        self._joint_state_mask = mask
+
+    @property
+    def joint_state_positions(self) -> np.ndarray:
+        """Positions of all joints in the order of `JOINT_NAMES`, only valid if `has_joint_state` is True"""
+        return self._joint_state_positions
 
-        self._joint_state = joints_dict_from_msg_data(joint_states_data)
+    @property
+    def joint_state_mask(self) -> np.ndarray:
+        """Boolean array in the order of `JOINT_NAMES`, True for all joints contained in the last joint state"""
+        return joint_mask_to_array(self._joint_state_mask)
+
+    @property
+    def has_joint_state(self) -> bool:
+        return self._joint_state_mask != 0
 
     @property
-    def joint_command(self):
+    def joint_command(self) -> dict[str, float | None]:
         return {
-            "r_shoulder_pitch": self.r_shoulder_pitch_command,
-            "l_shoulder_pitch": self.l_shoulder_pitch_command,
-            "r_shoulder_roll": self.r_shoulder_roll_command,
-            "l_shoulder_roll": self.l_shoulder_roll_command,
-            "r_elbow": self.r_elbow_command,
-            "r_elbow_yaw": self.r_elbow_yaw_command,
-            "l_elbow": self.l_elbow_command,
-            "l_elbow_yaw": self.l_elbow_yaw_command,
-            "r_hip_yaw": self.r_hip_yaw_command,
-            "l_hip_yaw": self.l_hip_yaw_command,
-            "r_hip_roll": self.r_hip_roll_command,
-            "l_hip_roll": self.l_hip_roll_command,
-            "r_hip_pitch": self.r_hip_pitch_command,
-            "l_hip_pitch": self.l_hip_pitch_command,
-            "r_knee": self.r_knee_command,
-            "l_knee": self.l_knee_command,
-            "r_ankle_pitch": self.r_ankle_pitch_command,
-            "l_ankle_pitch": self.l_ankle_pitch_command,
-            "r_ankle_roll": self.r_ankle_roll_command,
-            "l_ankle_roll": self.l_ankle_roll_command,
-            "head_pan": self.head_pan_command,
-            "head_tilt": self.head_tilt_command,
+            name: (float(self._joint_command_positions[idx]) if self._joint_command_mask & (1 << idx) else None)
+            for idx, name in enumerate(JOINT_NAMES)
         }
 
     @joint_command.setter
     def joint_command(self, msg):
-        joint_commands_data = list(zip(msg.joint_names, msg.positions))
+        targets, sources, mask = joint_layout(tuple(msg.joint_names))
+        positions = msg.positions if sources is None else np.asarray(msg.positions)[sources]
+        self._joint_command_positions[targets] = positions
+        self._joint_command_mask |= mask
+
+    @property
+    def joint_command_positions(self) -> np.ndarray:
+        """Commands of all joints in the order of `JOINT_NAMES`, only valid if `has_all_joint_commands` is True"""
+        return self._joint_command_positions
 
-        for joint_name, command in joints_dict_from_msg_data(joint_commands_data).items():
-            setattr(self, f"{joint_name}_command", command)
+    @property
+    def has_all_joint_commands(self) -> bool:
+        return self._joint_command_mask == ALL_JOINTS_MASK
+
+    def is_all_synced_data_available(self) -> bool:
+        return self.has_all_joint_commands and self.has_joint_state and self.rotation is not None
+
+    def get_state(self) -> dict[str, Any]:
+        """
+        Returns the rotation and the joints as plain values, to resume an import from a checkpoint.
+        The images and the game state are added by the import strategy, as their types depend on the log format.
+        """
+        rotation = self.rotation
+        return {
+            "rotation": None
+            if rotation is None
+            else [float(rotation.x), float(rotation.y), float(rotation.z), float(rotation.w)],
+            "joint_state_positions": self._joint_state_positions.tolist(),
+            "joint_state_mask": self._joint_state_mask,
+            "joint_command_positions": self._joint_command_positions.tolist(),
+            "joint_command_mask": self._joint_command_mask,
+        }
+
+    def set_state(self, state: dict[str, Any]) -> None:
+        """Restores the rotation and the joints of a checkpoint, see `get_state`."""
+        if state["rotation"] is not None:
+            x, y, z, w = state["rotation"]
+            self.rotation = SimpleNamespace(x=x, y=y, z=z, w=w)
+        self._joint_state_positions = np.array(state["joint_state_positions"], dtype=np.float64)
+        self._joint_state_mask = state["joint_state_mask"]
+        self._joint_command_positions = np.array(state["joint_command_positions"], dtype=np.float64)
+        self._joint_command_mask = state["joint_command_mask"]
+
+
+class ColumnarBatch:
+    """
+    Append-only table of rows with a fixed NumPy record dtype.
+    Rows are stored in a single growing record array, instead of creating an ORM model instance per row.
+    """
+
+    __slots__ = ("dtype", "_buffer", "_size")
+
+    def __init__(self, dtype: np.dtype):
+        self.dtype = dtype
+        self._buffer: np.ndarray | None = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, num_rows: int) -> np.ndarray:
+        required = self._size + num_rows
+        if self._buffer is None or len(self._buffer) < required:
+            capacity = max(required, 2 * len(self._buffer) if self._buffer is not None else 64)
+            buffer = np.zeros(capacity, dtype=self.dtype)
+            if self._buffer is not None:
+                buffer[: self._size] = self._buffer[: self._size]
+            self._buffer = buffer
+        return self._buffer
+
+    def append_row(self, row: tuple) -> None:
+        buffer = self._reserve(1)
+        buffer[self._size] = row
+        self._size += 1
+
+    def extend(self, records: "np.ndarray | ColumnarBatch") -> None:
+        if isinstance(records, ColumnarBatch):
+            records = records.to_records()
+        if not len(records):
+            return
+        buffer = self._reserve(len(records))
+        buffer[self._size : self._size + len(records)] = records
+        self._size += len(records)
+
+    def to_records(self) -> np.ndarray:
+        """
+        Returns the rows as a record array.
+        The result is a view on the storage of the batch, so modifications are reflected in the batch.
+        """
+        if self._buffer is None:
+            return np.zeros(0, dtype=self.dtype)
+        return self._buffer[: self._size]
+
+
+def _joints_dtype() -> np.dtype:
+    return np.dtype([("stamp", np.float64)] + [(name, np.float64) for name in JOINT_NAMES] + [("tick", np.int64)])
+
+
+# Column layouts of the batches, field names match the attribute names of the corresponding db models
+JOINT_STATES_DTYPE: np.dtype = _joints_dtype()
+JOINT_COMMANDS_DTYPE: np.dtype = _joints_dtype()
+ROTATIONS_DTYPE: np.dtype = np.dtype(
+    [
+        ("stamp", np.float64),
+        ("x", np.float64),
+        ("y", np.float64),
+        ("z", np.float64),
+        ("w", np.float64),
+        ("tick", np.int64),
+    ]
+)
+GAME_STATES_DTYPE: np.dtype = np.dtype([("stamp", np.float64), ("state", object)])
+IMAGES_DTYPE: np.dtype = np.dtype([("stamp", np.float64), ("data", object)])
 
 
 @dataclass
 class ModelData:
     recording: Recording | None = None
-    game_states: list[GameState] = field(default_factory=list)
-    joint_states: list[JointStates] = field(default_factory=list)
-    joint_commands: list[JointCommands] = field(default_factory=list)
-    images: list[Image] = field(default_factory=list)
-    rotations: list[Rotation] = field(default_factory=list)
-
-    def model_instances(self):
-        return [self.recording] + self.game_states + self.joint_states + self.joint_commands + self.images
+    game_states: ColumnarBatch = field(default_factory=lambda: ColumnarBatch(GAME_STATES_DTYPE))
+    joint_states: ColumnarBatch = field(default_factory=lambda: ColumnarBatch(JOINT_STATES_DTYPE))
+    joint_commands: ColumnarBatch = field(default_factory=lambda: ColumnarBatch(JOINT_COMMANDS_DTYPE))
+    images: ColumnarBatch = field(default_factory=lambda: ColumnarBatch(IMAGES_DTYPE))
+    rotations: ColumnarBatch = field(default_factory=lambda: ColumnarBatch(ROTATIONS_DTYPE))
+
+    def batches_by_model(self) -> list[tuple[type, ColumnarBatch]]:
+        return [
+            (GameState, self.game_states),
+            (JointStates, self.joint_states),
+            (JointCommands, self.joint_commands),
+            (Image, self.images),
+            (Rotation, self.rotations),
+        ]
+
+    def num_rows(self) -> int:
+        return sum(len(batch) for _, batch in self.batches_by_model())
 
     def merge(self, other: "ModelData") -> "ModelData":
         self.game_states.extend(other.game_states)
@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+
+# Edge length in pixels of the blocks, whose mean colors are compared to detect near duplicate images
+BLOCK_SIZE = 16
+
+
+class DuplicateImageDetector:
+    """
+    Detects consecutive images of a recording, which are (nearly) identical to the last kept image,
+    e.g. while the robot stands still or the resampler repeats its last sampled image.
+
+    Images are compared to the last kept image instead of their predecessor,
+    so slow changes accumulate until an image is kept again.
+    Exact duplicates are detected by comparing the raw bytes.
+    Near duplicates are detected by comparing the mean colors of blocks of `BLOCK_SIZE` pixels,
+    which averages out sensor noise, but still detects small moving objects like the ball.
+    """
+
+    def __init__(self, threshold: float = 0.0):
+        """
+        :param threshold: Maximum difference of the mean color channel values of any block (0-255)
+            for an image to be a near duplicate, 0 only detects exact duplicates
+        """
+        self.threshold = threshold
+        self._kept_data: bytes | None = None
+        self._kept_blocks: np.ndarray | None = None
+
+    def is_duplicate(self, data: bytes, height: int, width: int) -> bool:
+        """Checks whether the image is a duplicate of the last kept image, otherwise the image is kept.
+
+        :param data: The rgb8 image data
+        :param height: Height of the image in pixels
+        :param width: Width of the image in pixels
+        :return: True if the image is a duplicate of the last kept image
+        """
+        if data == self._kept_data:
+            return True
+
+        blocks = None
+        if self.threshold > 0:
+            blocks = self._block_means(data, height, width)
+            if self._kept_blocks is not None and self._kept_blocks.shape == blocks.shape:
+                if np.abs(blocks - self._kept_blocks).max() <= self.threshold:
+                    return True
+
+        self._kept_data = data
+        self._kept_blocks = blocks
+        return False
+
+    def _block_means(self, data: bytes, height: int, width: int) -> np.ndarray:
+        image = np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+        size = (max(width // BLOCK_SIZE, 1), max(height // BLOCK_SIZE, 1))
+        return cv2.resize(image.astype(np.float32), size, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, TypeAlias
+
+import numpy as np
+
+from soccer_diffusion.dataset import logger
+
+# A frame of a log: (thread, {representation: nested record fields})
+CacheFrame: TypeAlias = tuple[str, dict[str, dict[str, Any]]]
+
+META_FILE = "meta.json"
+
+# Kinds of cached columns, bytes are stored in a raw blob file with an offsets array
+BOOL = "bool"
+INT = "int"
+FLOAT = "float"
+BYTES = "bytes"
+
+_DTYPES: dict[str, type] = {BOOL: np.bool_, INT: np.int64, FLOAT: np.float64, BYTES: np.int64}
+
+# Number of rows converted to Python values at once when iterating over memory mapped columns
+_READ_CHUNK_SIZE = 4096
+
+# Placeholder for a field, which is missing in a record
+_MISSING = object()
+
+# Number of bytes read at once to hash a file
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def content_hash(file_path: Path) -> str:
+    """Returns the SHA-256 hash of the content of a file.
+
+    :param file_path: Path to the file
+    :return: The hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while chunk := file.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(file_path: Path, version: str) -> str:
+    """Returns the key of the cache entry of a file.
+    The key changes, if either the content of the file or the version of the extraction changes.
+
+    :param file_path: Path to the file
+    :param version: Version of the extraction, that produces the cached frames
+    :return: The cache key
+    """
+    return f"{content_hash(file_path)}-{version}"
+
+
+def _column_kind(value: Any) -> str:
+    match value:
+        case bool() | np.bool_():
+            return BOOL
+        case int() | np.integer():
+            return INT
+        case float() | np.floating():
+            return FLOAT
+        case bytes() | bytearray() | memoryview():
+            return BYTES
+        case _:
+            raise TypeError(f"Values of type '{type(value).__name__}' can not be cached")
+
+
+def _flatten(record: dict[str, Any], prefix: tuple[str, ...] = ()) -> Iterator[tuple[tuple[str, ...], Any]]:
+    for key, value in record.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, (*prefix, key))
+        else:
+            yield (*prefix, key), value
+
+
+def _unflatten(paths: list[tuple[str, ...]], values: Iterable[Any]) -> dict[str, Any]:
+    record: dict[str, Any] = {}
+    for path, value in zip(paths, values):
+        if value is _MISSING:
+            continue
+        node = record
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return record
+
+
+class _ColumnWriter:
+    def __init__(self, kind: str, num_rows: int, blob_path: Path) -> None:
+        self.kind = kind
+        self.values: list = [0] * num_rows
+        self.valid: list[bool] = [False] * num_rows
+        self.blob_file = open(blob_path, "wb") if kind == BYTES else None
+        self.blob_size = 0
+
+    def append(self, value: Any) -> None:
+        if value is _MISSING:
+            self.valid.append(False)
+            self.values.append(self.blob_size if self.blob_file is not None else 0)
+            return
+
+        kind = _column_kind(value)
+        if kind != self.kind:
+            if {kind, self.kind} == {INT, FLOAT}:
+                self.kind = FLOAT  # Promote integer columns, which also contain floats
+            else:
+                raise TypeError(f"Can not cache '{kind}' values in a '{self.kind}' column")
+
+        self.valid.append(True)
+        if self.blob_file is not None:
+            self.blob_size += self.blob_file.write(value)
+            self.values.append(self.blob_size)
+        else:
+            self.values.append(value)
+
+    def save(self, path: Path) -> bool:
+        """Saves the values of the column and returns, whether all rows are valid."""
+        if self.blob_file is not None:
+            self.blob_file.close()
+            np.save(path, np.array([0, *self.values], dtype=_DTYPES[BYTES]))  # Offsets of the blobs
+        else:
+            np.save(path, np.array(self.values, dtype=_DTYPES[self.kind]))
+
+        all_valid = all(self.valid)
+        if not all_valid:
+            np.save(path.with_suffix(".valid.npy"), np.array(self.valid, dtype=np.bool_))
+        return all_valid
+
+
+class FrameCache:
+    """Columnar on-disk cache of the extracted frames of a log.
+
+    Each representation is stored as one array per (nested) field and read with memory mapping,
+    so loading the cache neither parses the log again nor keeps all frames in memory.
+    Bytes fields (e.g. encoded images) are stored as they are in one blob file per field.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """Opens an existing cache entry.
+
+        :param directory: Directory of the cache entry
+        """
+        self.directory = directory
+        with open(directory / META_FILE) as file:
+            self.meta: dict[str, Any] = json.load(file)
+
+        self.threads: list[str] = self.meta["threads"]
+        self.representations: list[str] = list(self.meta["representations"])
+        self.frame_threads = self._load("frame_threads.npy")
+        self.frame_records = self._load("frame_records.npy")  # Offsets of the records of each frame
+        self.record_representations = self._load("record_representations.npy")
+
+    def __len__(self) -> int:
+        return len(self.frame_threads)
+
+    def __iter__(self) -> Iterator[CacheFrame]:
+        readers = {
+            representation: self._iter_records(columns)
+            for representation, columns in self.meta["representations"].items()
+        }
+        representations = [readers[representation] for representation in self.representations]
+
+        record_representations = self._iter_values(self.record_representations)
+        frame_records = self._iter_values(self.frame_records)
+        start = next(frame_records)
+        for thread, end in zip(self._iter_values(self.frame_threads), frame_records):
+            records = {}
+            for _ in range(end - start):
+                code = next(record_representations)
+                records[self.representations[code]] = next(representations[code])
+            yield self.threads[thread], records
+            start = end
+
+    @staticmethod
+    def entry(root: Path, key: str) -> "FrameCache | None":
+        """Returns the cache entry with the given key, if it exists.
+
+        :param root: Root directory of the cache
+        :param key: Key of the cache entry
+        :return: The cache entry or None
+        """
+        directory = root / key
+        if not (directory / META_FILE).exists():
+            return None
+        return FrameCache(directory)
+
+    @staticmethod
+    def write(root: Path, key: str, frames: Iterable[CacheFrame]) -> "FrameCache":
+        """Writes the frames to a new cache entry.
+        The entry is written to a temporary directory first, so incomplete entries are never read.
+
+        :param root: Root directory of the cache
+        :param key: Key of the cache entry
+        :param frames: The frames to cache
+        :return: The written cache entry
+        """
+        directory = root / key
+        tmp_directory = root / f"{key}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        tmp_directory.mkdir(parents=True)
+
+        try:
+            num_frames = FrameCache._write_columns(tmp_directory, frames)
+        except BaseException:
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+            raise
+
+        try:
+            tmp_directory.rename(directory)
+        except OSError:  # Another import wrote the same entry in the meantime
+            shutil.rmtree(tmp_directory, ignore_errors=True)
+        logger.debug(f"Cached {num_frames} frames in '{directory}'")
+        return FrameCache(directory)
+
+    @staticmethod
+    def _write_columns(directory: Path, frames: Iterable[CacheFrame]) -> int:
+        threads: dict[str, int] = {}
+        representations: dict[str, int] = {}
+        num_rows: list[int] = []
+        columns: list[dict[tuple[str, ...], _ColumnWriter]] = []
+        frame_threads: list[int] = []
+        frame_records: list[int] = [0]
+        record_representations: list[int] = []
+
+        for thread, records in frames:
+            frame_threads.append(threads.setdefault(thread, len(threads)))
+            for representation, record in records.items():
+                if (code := representations.setdefault(representation, len(representations))) == len(columns):
+                    num_rows.append(0)
+                    columns.append({})
+                record_representations.append(code)
+
+                representation_columns = columns[code]
+                fields = dict(_flatten(record))
+                for path, value in fields.items():
+                    if path not in representation_columns:
+                        blob_path = directory / f"{code}.{len(representation_columns)}.bin"
+                        representation_columns[path] = _ColumnWriter(_column_kind(value), num_rows[code], blob_path)
+                for path, column in representation_columns.items():
+                    column.append(fields.get(path, _MISSING))
+                num_rows[code] += 1
+            frame_records.append(len(record_representations))
+
+        meta: dict[str, Any] = {"threads": list(threads), "representations": {}}
+        np.save(directory / "frame_threads.npy", np.array(frame_threads, dtype=np.uint8))
+        np.save(directory / "frame_records.npy", np.array(frame_records, dtype=np.int64))
+        np.save(directory / "record_representations.npy", np.array(record_representations, dtype=np.uint8))
+        for representation, code in representations.items():
+            meta["representations"][representation] = [
+                {
+                    "path": list(path),
+                    "kind": column.kind,
+                    "all_valid": column.save(directory / f"{code}.{index}.npy"),
+                    "file": f"{code}.{index}",
+                }
+                for index, (path, column) in enumerate(columns[code].items())
+            ]
+        with open(directory / META_FILE, "w") as file:
+            json.dump(meta, file)
+        return len(frame_threads)
+
+    def _load(self, file_name: str) -> np.ndarray:
+        path = self.directory / file_name
+        if path.stat().st_size == 0:
+            return np.empty(0, dtype=np.uint8)
+        if path.suffix == ".bin":
+            return np.memmap(path, dtype=np.uint8, mode="r")
+        return np.load(path, mmap_mode="r")
+
+    @staticmethod
+    def _iter_values(array: np.ndarray) -> Iterator[Any]:
+        for start in range(0, len(array), _READ_CHUNK_SIZE):
+            yield from array[start : start + _READ_CHUNK_SIZE].tolist()
+
+    def _iter_column(self, column: dict[str, Any]) -> Iterator[Any]:
+        values = self._iter_values(self._load(f"{column['file']}.npy"))
+        if column["kind"] == BYTES:
+            blob = memoryview(self._load(f"{column['file']}.bin"))
+            start = next(values)
+            for end in values:
+                yield blob[start:end]
+                start = end
+        else:
+            yield from values
+
+    def _iter_records(self, columns: list[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        paths = [tuple(column["path"]) for column in columns]
+        column_values = []
+        for column in columns:
+            values = self._iter_column(column)
+            if not column["all_valid"]:
+                valid = self._iter_values(self._load(f"{column['file']}.valid.npy"))
+                values = (value if is_valid else _MISSING for value, is_valid in zip(values, valid))
+            column_values.append(values)
+
+        if not column_values:  # Records without any cached field
+            while True:
+                yield {}
+        for values in zip(*column_values):
+            yield _unflatten(paths, values)
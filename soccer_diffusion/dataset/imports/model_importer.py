@@ -1,12 +1,101 @@
 from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
+from typing import Any
 
+import numpy as np
+from sqlalchemy import delete, insert, inspect, select
+
+from soccer_diffusion.dataset import logger
 from soccer_diffusion.dataset.converters.converter import Converter
-from soccer_diffusion.dataset.db import Database
-from soccer_diffusion.dataset.imports.data import ImportMetadata, ModelData
+from soccer_diffusion.dataset.converters.image_converter import ImageConverter
+from soccer_diffusion.dataset.db import Database, WalCheckpointPolicy
+from soccer_diffusion.dataset.defaults import CHECKPOINT_INTERVAL
+from soccer_diffusion.dataset.game_state_intervals import append_game_state_intervals
+from soccer_diffusion.dataset.imports.data import ColumnarBatch, ImportMetadata, ModelData
+from soccer_diffusion.dataset.imports.deduplication import DuplicateImageDetector
+from soccer_diffusion.dataset.imports.frame_cache import content_hash
+from soccer_diffusion.dataset.imports.pipeline import (
+    BoundedExecutor,
+    Checkpoint,
+    CheckpointStateError,
+    ModelDataQueue,
+    RecordingUpdate,
+    StageCounter,
+    dump_state,
+    load_state,
+)
+from soccer_diffusion.dataset.imports.report import count_rows, measure
+from soccer_diffusion.dataset.models import (
+    GameState,
+    GameStateInterval,
+    Image,
+    ImportProgress,
+    JointCommands,
+    JointCommandsChunk,
+    JointStates,
+    JointStatesChunk,
+    Recording,
+    Rotation,
+    RotationChunk,
+)
+
+# Number of rows inserted per bulk INSERT statement
+INSERT_BATCH_SIZE = 10_000
+
+# Number of converted batches queued for writing, before the conversion blocks
+PIPELINE_QUEUE_SIZE = 4
+# Number of images, which are processed or waiting to be processed per image thread, before the conversion blocks
+PENDING_IMAGES_PER_THREAD = 8
+
+# Models, which belong to a recording
+CHILD_MODELS = (
+    GameState,
+    GameStateInterval,
+    Image,
+    JointCommands,
+    JointStates,
+    Rotation,
+    JointCommandsChunk,
+    JointStatesChunk,
+    RotationChunk,
+    ImportProgress,
+)
+
+# Fields of the ModelData, which must contain models, and their models
+REQUIRED_FIELDS = {
+    "images": Image,
+    "game_states": GameState,
+    "joint_states": JointStates,
+    "joint_commands": JointCommands,
+    "rotations": Rotation,
+}
+
+# Columns of the recording, which are populated by the conversion, the id and file hash are set by the importer
+RECORDING_COLUMNS = [column.key for column in inspect(Recording).column_attrs if column.key not in ("_id", "file_hash")]
+
+
+def recording_values(recording: Recording) -> dict[str, Any]:
+    """Returns the values of the columns of a recording, which are set, without its id and file hash."""
+    values = inspect(recording).dict
+    return {key: values[key] for key in RECORDING_COLUMNS if key in values}
 
 
 class ImportStrategy(ABC):
+    # Whether the strategy creates checkpoints and resumes a partial import from them, see `_checkpoint`
+    supports_resume: bool = False
+    # Version of the conversion state of the checkpoints, increment it on incompatible changes of the state
+    state_version: int = 1
+
+    model_data: ModelData
+    # Queue of the import pipeline, converted models are collected in `model_data` if it is None
+    output: ModelDataQueue | None = None
+    # Position in the file and recording of a partially imported file, which are set to resume its import
+    resume_position: int = 0
+    resume_recording: Recording | None = None
+
     def __init__(
         self,
         metadata: ImportMetadata,
@@ -23,19 +112,367 @@ class ImportStrategy(ABC):
     def convert_to_model_data(self, file_path: Path) -> ModelData:
         pass
 
+    def image_converters(self) -> list[Converter]:
+        return [self.image_converter]
+
+    def recording_values(self) -> dict[str, Any] | None:
+        """Returns the column values of the converted recording, or None if it is not created yet."""
+        model_data = getattr(self, "model_data", None)
+        if model_data is None or model_data.recording is None:
+            return None
+        return recording_values(model_data.recording)
+
+    def restore(self, checkpoint: Checkpoint, recording: Recording) -> None:
+        """Restores the conversion state of a checkpoint, to resume the import of a partially imported file.
+
+        :param checkpoint: The last checkpoint of the import
+        :param recording: A copy of the recording of the partially imported file, which is not in a database session
+        :raises CheckpointStateError: If the state of the checkpoint was created by another version of the strategy
+        """
+        assert self.supports_resume, f"Imports of {type(self).__name__} can not be resumed"
+        checkpoint_state = load_state(checkpoint.state)
+        strategy, version = checkpoint_state.get("strategy"), checkpoint_state.get("version")
+        if (strategy, version) != (type(self).__name__, self.state_version):
+            raise CheckpointStateError(
+                f"The checkpoint was created by version {version} of {strategy}, which can not be resumed "
+                f"by version {self.state_version} of {type(self).__name__}, import the file again replacing it"
+            )
+        self.resume_position = checkpoint.position
+        self.resume_recording = recording
+        self._restore_state(checkpoint_state["state"])
+
+    def _restore_state(self, state: dict[str, Any]) -> None:
+        """Restores the conversion state of a checkpoint, which strategies supporting resumes implement.
+
+        :param state: The conversion state passed to `_checkpoint`
+        """
+        raise NotImplementedError(f"Imports of {type(self).__name__} can not be resumed")
+
+    def _checkpoint_due(self) -> bool:
+        return self.supports_resume and self.output is not None and self.output.checkpoint_due()
+
+    def _checkpoint(self, position: int, stamp: float, state: dict[str, Any]) -> None:
+        """Marks, that all models before the position in the file are collected.
+        The state is serialized immediately, so it may be changed afterwards.
+
+        :param position: Number of frames/messages converted before the checkpoint
+        :param stamp: Relative timestamp in seconds, up to which all models are collected
+        :param state: The conversion state to resume from, which is passed to `_restore_state`.
+            It may only contain plain values, see `dump_state`.
+        """
+        assert self.supports_resume, f"Imports of {type(self).__name__} can not be resumed"
+        assert self.output is not None, "Checkpoints are only created in an import pipeline"
+        checkpoint_state = {"strategy": type(self).__name__, "version": self.state_version, "state": state}
+        self.output.checkpoint(Checkpoint(position, stamp, dump_state(checkpoint_state)))
+
+    def _collect(self, model_data: ModelData) -> None:
+        """Passes converted models to the import pipeline or collects them in `model_data` without a pipeline."""
+        if self.output is not None:
+            self.output.put(model_data)
+        else:
+            self.model_data = self.model_data.merge(model_data)
+
 
 class ModelImporter:
-    def __init__(self, db: Database, strategy: ImportStrategy):
+    def __init__(
+        self,
+        db: Database,
+        strategy: ImportStrategy,
+        image_threads: int = 0,
+        replace: bool = False,
+        checkpoint_interval: float = CHECKPOINT_INTERVAL,
+        duplicate_image_threshold: float | None = None,
+        wal_policy: WalCheckpointPolicy | None = None,
+    ):
+        """
+        :param db: The database to import to
+        :param strategy: The strategy to convert a file to models
+        :param image_threads: Number of threads processing images, if > 0 the file is imported in a pipeline
+            of concurrent stages (converting, processing images and writing to the database),
+            which commits the models in segments and can be resumed after a crash, if the strategy supports it.
+            Otherwise all models are converted, before they are written.
+        :param replace: Replace the recordings of already imported files, instead of skipping or resuming them
+        :param checkpoint_interval: Seconds between two checkpoints of a pipelined import
+        :param duplicate_image_threshold: If set, images which are duplicates of an earlier image are stored
+            as a reference to it, see `DuplicateImageDetector` for the threshold of near duplicates
+        :param wal_policy: When the write-ahead log is checkpointed after the commits of the import,
+            so it does not grow without bound while the database is read during the import
+        """
         self.db = db
         self.strategy = strategy
+        self.image_threads = image_threads
+        self.replace = replace
+        self.checkpoint_interval = checkpoint_interval
+        self.duplicate_image_threshold = duplicate_image_threshold
+        self.wal_policy = wal_policy or WalCheckpointPolicy()
+        self._file_hash: str | None = None
+        self._duplicate_images: DuplicateImageDetector | None = None
+        # Id of the last image containing data, which is referenced by its duplicates
+        self._kept_image_id: int | None = None
+        # The imported recording in the database session, the strategy populates its own copy of it
+        self._recording: Recording | None = None
 
     def import_to_db(self, file_path: Path):
+        self.wal_policy.apply(self.db.session)
+        self._file_hash = content_hash(file_path)
+        if self.duplicate_image_threshold is not None:
+            self._duplicate_images = DuplicateImageDetector(self.duplicate_image_threshold)
+        self._kept_image_id = None
+        self._recording = None
+        if recordings := self._imported_recordings(self._file_hash):
+            recording_ids = list(recordings)
+            if self.replace:
+                logger.info(f"Replacing recording(s) {recording_ids} of the already imported file '{file_path}'")
+                # The recordings are deleted in the transaction of the import (or its first segment)
+                self._delete_recordings(recording_ids)
+            elif None in recordings.values():
+                logger.info(f"File '{file_path}' is already imported as recording(s) {recording_ids}, skipping it")
+                return
+            elif not self.strategy.supports_resume:
+                logger.info(
+                    f"Replacing the partial import of '{file_path}' in recording(s) {recording_ids}, "
+                    f"as imports of {type(self.strategy).__name__} can not be resumed"
+                )
+                self._delete_recordings(recording_ids)
+            else:
+                progress = next(iter(recordings.values()))
+                assert progress is not None
+                logger.info(
+                    f"Resuming the partial import of '{file_path}' into recording {progress.recording_id} "
+                    f"at {progress.stamp:.2f} s"
+                )
+                self._recording = progress.recording
+                self.strategy.restore(
+                    Checkpoint(progress.position, progress.stamp, progress.state),
+                    Recording(**recording_values(progress.recording)),
+                )
+
+        if self.image_threads > 0:
+            self._import_pipelined(file_path)
+            return
+
         model_data: ModelData = self.strategy.convert_to_model_data(file_path)
+        self._check_required_fields(
+            Counter({field: len(getattr(model_data, field)) for field in REQUIRED_FIELDS}), self._recording
+        )
+
+        recording = self._update_recording(self.strategy.recording_values())
+        for model, batch in model_data.batches_by_model():
+            self._insert_batch(model, batch, recording)
+
+        self._finalize(recording)
+
+    def _import_pipelined(self, file_path: Path) -> None:
+        """Imports the file in concurrent stages, which are connected by bounded queues:
+        The strategy converts the file in a background thread, images are processed in a thread pool
+        and the models are written to the database in this thread, as the session is bound to it.
+        The recording is populated by the conversion, its values are queued and written in this thread as well.
+        """
+        convert_counter = StageCounter("convert")
+        image_counter = StageCounter("images", unit="images")
+        write_counter = StageCounter("write")
+
+        output = ModelDataQueue(
+            PIPELINE_QUEUE_SIZE,
+            INSERT_BATCH_SIZE,
+            convert_counter,
+            # Without checkpoints the import is committed at once, as it could not be resumed from a segment
+            self.checkpoint_interval if self.strategy.supports_resume else None,
+            recording=self.strategy.recording_values,
+        )
+        image_executor = BoundedExecutor(
+            self.image_threads, self.image_threads * PENDING_IMAGES_PER_THREAD, image_counter
+        )
+        image_converters = [
+            converter for converter in self.strategy.image_converters() if isinstance(converter, ImageConverter)
+        ]
+        for converter in image_converters:
+            converter.executor = image_executor
+        self.strategy.output = output
+
+        def convert() -> None:
+            try:
+                self.strategy.convert_to_model_data(file_path)
+            finally:
+                output.close()
+
+        num_rows: Counter[str] = Counter()
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="convert") as conversion:
+                conversion_done = conversion.submit(convert)
+                try:
+                    for item in output:
+                        if isinstance(item, RecordingUpdate):
+                            self._update_recording(item.values)
+                            continue
+                        if isinstance(item, Checkpoint):
+                            self._commit_segment(item)
+                            continue
+                        with write_counter.measure(item.num_rows()):
+                            for field in REQUIRED_FIELDS:
+                                num_rows[field] += len(getattr(item, field))
+                            self._resolve_images(item)
+                            for model, records in item.batches_by_model():
+                                self._insert_batch(model, records, self._recording)
+                except BaseException:
+                    output.abort()
+                    raise
+                conversion_done.result()
+
+            self._check_required_fields(num_rows, self._recording)
+            self._finalize(self._recording)
+        except BaseException:
+            # Committed segments are kept, so the import can be resumed from the last checkpoint
+            self.db.session.rollback()
+            raise
+        finally:
+            image_executor.shutdown()
+            for converter in image_converters:
+                converter.executor = None
+            self.strategy.output = None
+
+        for counter in (convert_counter, image_counter, write_counter):
+            logger.info(f"Import stage {counter}")
+
+    def _commit_segment(self, checkpoint: Checkpoint) -> None:
+        """Commits the models written before the checkpoint together with the checkpoint."""
+        assert self._recording is not None, "Recording must be imported to commit its models"
+        recording_id = self._recording._id
+        self.db.session.merge(
+            ImportProgress(
+                recording_id=recording_id,
+                position=checkpoint.position,
+                stamp=checkpoint.stamp,
+                state=checkpoint.state,
+                updated=datetime.now(),
+            )
+        )
+        with measure("db", "commit"):
+            self.db.session.commit()
+        with measure("db", "checkpoint"):
+            self.wal_policy.checkpoint(self.db.session)
+        logger.debug(f"Committed the import of recording {recording_id} up to {checkpoint.stamp:.2f} s")
+
+    def _check_required_fields(self, num_rows: Counter[str], recording: Recording | None) -> None:
+        for field, model in REQUIRED_FIELDS.items():
+            if num_rows[field]:
+                continue
+            # Models of a resumed import may have been committed before
+            if recording is not None and recording._id is not None and self._has_models(model, recording._id):
+                continue
+            self.db.session.rollback()
+            raise ValueError(f"No {field} models extracted from the file, aborting import.")
+
+    def _has_models(self, model: type, recording_id: int) -> bool:
+        return self.db.session.scalar(select(model._id).where(model.recording_id == recording_id).limit(1)) is not None
+
+    def _finalize(self, recording: Recording | None) -> None:
+        """Writes the final metadata of the recording and removes its import progress in one transaction."""
+        assert recording is not None and recording._id is not None, "Recording must be imported to finalize it"
+        self.db.session.execute(delete(ImportProgress).where(ImportProgress.recording_id == recording._id))
+        with measure("db", "commit"):
+            self.db.session.commit()
+        with measure("db", "checkpoint"):
+            self.wal_policy.checkpoint(self.db.session)
+
+    def _update_recording(self, values: dict[str, Any] | None) -> Recording:
+        """Adds the imported recording with the column values populated by the conversion, or updates them."""
+        assert values is not None, "Recording must be defined to import its data"
+        if self._recording is None:
+            self._recording = Recording(**values, file_hash=self._file_hash)
+            self.db.session.add(self._recording)
+            # Flush to get the id of the recording, which is required for inserting the batches
+            self.db.session.flush()
+        else:
+            for key, value in values.items():
+                setattr(self._recording, key, value)
+        return self._recording
+
+    def _imported_recordings(self, file_hash: str) -> dict[int, ImportProgress | None]:
+        """Returns the ids of the recordings of a file and the progress of their import, if it is not complete."""
+        rows = self.db.session.execute(
+            select(Recording._id, ImportProgress)
+            .outerjoin(ImportProgress, ImportProgress.recording_id == Recording._id)
+            .where(Recording.file_hash == file_hash)
+        )
+        return {recording_id: progress for recording_id, progress in rows}
+
+    def _delete_recordings(self, recording_ids: list[int]) -> None:
+        """Deletes recordings with set-based DELETE statements, without loading their models into memory."""
+        with measure("db", "delete"):
+            for model in CHILD_MODELS:
+                self.db.session.execute(
+                    delete(model).where(model.recording_id.in_(recording_ids)),
+                    execution_options={"synchronize_session": False},
+                )
+            # Deleted recordings are removed from the session, as they may still be referenced, e.g. by a failed import
+            self.db.session.execute(
+                delete(Recording).where(Recording._id.in_(recording_ids)),
+                execution_options={"synchronize_session": "fetch"},
+            )
+
+    def _resolve_images(self, batch: ModelData) -> None:
+        images = batch.images.to_records()
+        for idx, data in enumerate(images["data"]):
+            if isinstance(data, Future):
+                images["data"][idx] = data.result()
+
+    def _insert_batch(self, model: type, batch: ColumnarBatch, recording: Recording | None) -> None:
+        assert recording is not None and recording._id is not None, "Recording must be imported to insert its models"
+        if model is Image and self._duplicate_images is not None:
+            self._insert_deduplicated_images(batch, recording)
+            return
+
+        recording_id = recording._id
+        records: np.ndarray = batch.to_records()
+        columns = records.dtype.names
+        assert columns is not None, "Batches must be record arrays"
+
+        with measure("db", "insert"):
+            for start in range(0, len(records), INSERT_BATCH_SIZE):
+                rows = [
+                    dict(zip(columns, row), recording_id=recording_id)
+                    for row in records[start : start + INSERT_BATCH_SIZE].tolist()
+                ]
+                self.db.session.execute(insert(model), rows)
+            if model is GameState:
+                append_game_state_intervals(self.db.session, recording_id, records["stamp"], records["state"])
+        count_rows(model.__tablename__, len(records))
 
-        required_fields = ["images", "game_states", "joint_states", "joint_commands", "rotations"]
-        for field in required_fields:
-            if not len(getattr(model_data, field)):
-                raise ValueError(f"No {field} models extracted from the file, aborting import.")
+    def _insert_deduplicated_images(self, batch: ColumnarBatch, recording: Recording) -> None:
+        """Inserts the images of a batch, duplicates are inserted without data, referencing the image containing it.
+        The images containing data are inserted first, as their ids are required for the references.
+        """
+        assert self._duplicate_images is not None
+        kept_images: list[dict[str, Any]] = []
+        # Duplicates and the index of their referenced image in `kept_images`, -1 for an image of an earlier batch
+        duplicates: list[tuple[float, int]] = []
+        with measure("images", "deduplicate"):
+            for stamp, data in batch.to_records().tolist():
+                if self._duplicate_images.is_duplicate(data, recording.img_height, recording.img_width):
+                    duplicates.append((stamp, len(kept_images) - 1))
+                else:
+                    kept_images.append({"stamp": stamp, "data": data, "recording_id": recording._id})
 
-        self.db.session.add_all(model_data.model_instances())
-        self.db.session.commit()
+        kept_ids: list[int] = []
+        with measure("db", "insert"):
+            for start in range(0, len(kept_images), INSERT_BATCH_SIZE):
+                kept_ids += self.db.session.scalars(
+                    insert(Image).returning(Image._id, sort_by_parameter_order=True),
+                    kept_images[start : start + INSERT_BATCH_SIZE],
+                ).all()
+            rows = [
+                {
+                    "stamp": stamp,
+                    "data": b"",
+                    "reference_id": kept_ids[idx] if idx >= 0 else self._kept_image_id,
+                    "recording_id": recording._id,
+                }
+                for stamp, idx in duplicates
+            ]
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                self.db.session.execute(insert(Image), rows[start : start + INSERT_BATCH_SIZE])
+        if kept_ids:
+            self._kept_image_id = kept_ids[-1]
+        count_rows(Image.__tablename__, len(kept_images) + len(duplicates))
+        count_rows(f"{Image.__tablename__} (duplicates)", len(duplicates))
@@ -0,0 +1,249 @@
+import io
+import pickle
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from soccer_diffusion.dataset.imports.data import ModelData
+
+T = TypeVar("T")
+
+# Seconds to wait for a full queue, before checking whether the pipeline was aborted
+_PUT_TIMEOUT = 0.1
+
+
+class PipelineAbortedError(RuntimeError):
+    pass
+
+
+@dataclass
+class Checkpoint:
+    """Position in an imported file, up to which all models are converted, and the conversion state there."""
+
+    position: int  # Number of frames/messages converted before the checkpoint
+    stamp: float  # Relative timestamp in seconds, up to which all models are converted
+    state: bytes  # Serialized conversion state (e.g. the latest received data and the resampling state)
+
+
+@dataclass
+class RecordingUpdate:
+    """Column values of the converted recording, which are written to the recording in the database.
+    The conversion stage only changes its own recording, the database session is only used by the writing stage.
+    """
+
+    values: dict[str, Any]
+
+
+class CheckpointStateError(ValueError):
+    """Raised when the conversion state of a checkpoint can not be restored, e.g. as its version is outdated."""
+
+
+class _PlainPickler(pickle.Pickler):
+    def reducer_override(self, obj: Any) -> Any:
+        # This is called for all objects except None, booleans and exact ints, floats, bytes, strings,
+        # dicts, sets, frozensets, lists and tuples, which are the plain values of a state
+        raise TypeError(f"Conversion states may only contain plain values, not {type(obj).__name__}")
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> Any:
+        raise CheckpointStateError(f"Conversion states may only contain plain values, not {module}.{name}")
+
+
+def dump_state(state: dict[str, Any]) -> bytes:
+    """Serializes the conversion state of a checkpoint.
+
+    :param state: The conversion state, which may only contain plain values (e.g. numbers, strings, bytes,
+        dicts and lists), so it is independent of the classes of the converters and decoded messages
+    :return: The serialized state
+    """
+    buffer = io.BytesIO()
+    _PlainPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(state)
+    return buffer.getvalue()
+
+
+def load_state(data: bytes) -> dict[str, Any]:
+    """Deserializes the conversion state of a checkpoint, without creating instances of any class.
+
+    :param data: The serialized state
+    :return: The conversion state
+    """
+    try:
+        return _PlainUnpickler(io.BytesIO(data)).load()
+    except CheckpointStateError:
+        raise
+    except Exception as error:
+        raise CheckpointStateError(f"The conversion state can not be read: {error}") from error
+
+
+class StageCounter:
+    """Counts the processed items and the busy time of a pipeline stage, to report its throughput."""
+
+    def __init__(self, name: str, unit: str = "rows") -> None:
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    @contextmanager
+    def measure(self, items: int = 1) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(items, time.perf_counter() - start)
+
+    @property
+    def throughput(self) -> float:
+        """Processed items per busy second."""
+        return self.items / self.busy_seconds if self.busy_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.items} {self.unit} in {self.busy_seconds:.2f} s "
+            f"({self.throughput:.1f} {self.unit}/s)"
+        )
+
+
+class BoundedExecutor:
+    """Thread pool, which blocks the submission of new tasks while too many tasks are pending (backpressure).
+    Suited for work which releases the GIL, e.g. OpenCV image processing.
+    """
+
+    def __init__(self, workers: int, max_pending: int, counter: StageCounter) -> None:
+        self.counter = counter
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=counter.name)
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> Future[T]:
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._run, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self.counter.measure():
+            return fn(*args)
+
+
+class ModelDataQueue:
+    """Bounded queue of converted models between the conversion and the writing stage of an import.
+    Models are merged into batches of at least `batch_rows` rows, before they are queued.
+    Checkpoints are queued in order with the models, so all models before a checkpoint are written before it.
+    """
+
+    _CLOSED = object()
+
+    def __init__(
+        self,
+        maxsize: int,
+        batch_rows: int,
+        counter: StageCounter,
+        checkpoint_interval: float | None = None,
+        recording: Callable[[], dict[str, Any] | None] | None = None,
+    ) -> None:
+        """
+        :param maxsize: Maximum number of queued batches, before puts block
+        :param batch_rows: Minimum number of rows of a batch
+        :param counter: Counter of the converted rows
+        :param checkpoint_interval: Seconds between two checkpoints, no checkpoints are due if None
+        :param recording: Returns the column values of the converted recording, or None if it is not created yet.
+            It is called by the conversion stage, changed values are queued as a `RecordingUpdate`
+            before the following batch, checkpoint or the end of the conversion.
+        """
+        self.counter = counter
+        self.batch_rows = batch_rows
+        self.checkpoint_interval = checkpoint_interval
+        self.recording = recording
+        self._recording_values: dict[str, Any] | None = None
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._pending = ModelData()
+        self._aborted = threading.Event()
+        self._last_put = time.perf_counter()
+        self._last_checkpoint = time.monotonic()
+
+    def put(self, model_data: ModelData) -> None:
+        """Adds converted models, this blocks while the queue is full.
+
+        :param model_data: The converted models
+        """
+        self._pending.merge(model_data)
+        if self._pending.num_rows() >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Queues the pending models, even if they are less than `batch_rows` rows."""
+        if not self._pending.num_rows():
+            return
+        batch, self._pending = self._pending, ModelData()
+        # The time since the last put is the time spent converting the batch
+        self.counter.add(batch.num_rows(), time.perf_counter() - self._last_put)
+        self._put_recording()
+        self._put(batch)
+        self._last_put = time.perf_counter()
+
+    def checkpoint_due(self) -> bool:
+        """Returns, whether the conversion should create a checkpoint."""
+        return (
+            self.checkpoint_interval is not None
+            and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+        )
+
+    def checkpoint(self, checkpoint: Checkpoint) -> None:
+        """Queues the pending models followed by a checkpoint, this blocks while the queue is full.
+
+        :param checkpoint: The checkpoint after the pending models
+        """
+        self.flush()
+        self._put_recording()
+        self._put(checkpoint)
+        self._last_checkpoint = time.monotonic()
+
+    def close(self) -> None:
+        """Queues the pending models and marks the end of the conversion."""
+        try:
+            self.flush()
+            self._put_recording()
+        finally:
+            self._put(self._CLOSED)
+
+    def abort(self) -> None:
+        """Stops the conversion stage, e.g. if writing failed. Further puts raise a PipelineAbortedError."""
+        self._aborted.set()
+
+    def __iter__(self) -> Iterator[ModelData | Checkpoint | RecordingUpdate]:
+        while (item := self._queue.get()) is not self._CLOSED:
+            yield item
+
+    def _put_recording(self) -> None:
+        if self.recording is None or (values := self.recording()) is None or values == self._recording_values:
+            return
+        self._put(RecordingUpdate(values))
+        self._recording_values = values
+
+    def _put(self, item: ModelData | Checkpoint | RecordingUpdate | object) -> None:
+        while not self._aborted.is_set():
+            try:
+                self._queue.put(item, timeout=_PUT_TIMEOUT)
+                return
+            except queue.Full:
+                pass
+        raise PipelineAbortedError("The import pipeline was aborted")
@@ -0,0 +1,247 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, TypeVar
+
+from rich.console import Console
+from rich.table import Table
+
+from soccer_diffusion.dataset import logger
+
+T = TypeVar("T")
+
+# Seconds between two samples of the resident set size
+MEMORY_SAMPLE_INTERVAL = 0.5
+
+# Report of the running import, sections are only measured while a report is active
+_active_report: "ImportReport | None" = None
+_NOT_MEASURED = nullcontext()
+_EXHAUSTED = object()
+
+
+def measure(category: str, name: str = "") -> AbstractContextManager:
+    """Measures the time spent in a section of the running import, if an import report is active.
+
+    :param category: Category of the section, e.g. "convert" or "db"
+    :param name: Name of the section in its category, e.g. the converter class
+    :return: A context manager measuring the time spent in its body
+    """
+    if _active_report is None:
+        return _NOT_MEASURED
+    return _active_report.measure(category, name)
+
+
+def measured_iter(iterable: Iterable[T], category: str, name: str = "") -> Iterator[T]:
+    """Measures the time spent producing the items of an iterable, e.g. reading and decoding messages.
+
+    :param iterable: The iterable to measure
+    :param category: Category of the section
+    :param name: Name of the section in its category
+    :return: An iterator over the items of the iterable
+    """
+    iterator = iter(iterable)
+    while True:
+        with measure(category, name):
+            item = next(iterator, _EXHAUSTED)
+        if item is _EXHAUSTED:
+            return
+        yield item  # type: ignore[misc]
+
+
+def count_message(topic: str, num_bytes: int = 0, count: int = 1) -> None:
+    """Counts read messages of a topic/representation of the running import, if an import report is active.
+
+    :param topic: The topic/representation of the messages
+    :param num_bytes: The size of the messages in bytes
+    :param count: The number of messages
+    """
+    if _active_report is not None:
+        _active_report.count_message(topic, num_bytes, count)
+
+
+def count_rows(table: str, count: int) -> None:
+    """Counts rows written to a database table by the running import, if an import report is active.
+
+    :param table: Name of the table
+    :param count: The number of rows
+    """
+    if _active_report is not None:
+        _active_report.rows[table] += count
+
+
+def _peak_rss() -> int:
+    """Returns the peak resident set size of this process and its terminated child processes in bytes,
+    or 0 if it is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        # The resource module is not available on Windows, the peak is taken from the samples instead
+        return 0
+    # ru_maxrss is given in kilobytes on Linux, but in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return (
+        max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        )
+        * scale
+    )
+
+
+def _current_rss() -> int:
+    """Returns the current resident set size of this process in bytes, or its peak if it is unavailable."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+    try:
+        # psutil is optional, it provides the resident set size on platforms without procfs
+        import psutil
+    except ImportError:
+        return _peak_rss()
+    return psutil.Process().memory_info().rss
+
+
+class ImportReport:
+    """Structured report of an import, with the read messages, time spent in each section,
+    written rows per table and the memory usage over time.
+
+    The report is collected, while it is active::
+
+        with ImportReport(file_path) as report:
+            importer.import_to_db(file_path)
+        report.print()
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = file_path
+        self.messages: Counter[str] = Counter()
+        self.message_bytes: Counter[str] = Counter()
+        self.seconds: defaultdict[str, defaultdict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.calls: defaultdict[str, Counter[str]] = defaultdict(Counter)
+        self.rows: Counter[str] = Counter()
+        self.memory: list[tuple[float, int]] = []  # (seconds since the start, resident set size in bytes)
+        self.peak_rss = 0
+        self.duration = 0.0
+
+        self._lock = threading.Lock()
+        self._start = 0.0
+        self._stopped = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def __enter__(self) -> "ImportReport":
+        global _active_report
+        if _active_report is not None:
+            raise RuntimeError("Another import report is already active")
+        _active_report = self
+
+        self._start = time.perf_counter()
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample_memory, name="memory sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        global _active_report
+        _active_report = None
+
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.duration = time.perf_counter() - self._start
+        self.peak_rss = max(_peak_rss(), *(rss for _, rss in self.memory))
+
+    @contextmanager
+    def measure(self, category: str, name: str = "") -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.seconds[category][name] += seconds
+                self.calls[category][name] += 1
+
+    def count_message(self, topic: str, num_bytes: int = 0, count: int = 1) -> None:
+        self.messages[topic] += count
+        self.message_bytes[topic] += num_bytes
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "file": str(self.file_path),
+            "file_bytes": self.file_path.stat().st_size if self.file_path.exists() else None,
+            "duration_s": self.duration,
+            "topics": {
+                topic: {"messages": count, "bytes": self.message_bytes[topic]} for topic, count in self.messages.items()
+            },
+            "timings": {
+                category: {
+                    name: {"seconds": seconds, "calls": self.calls[category][name]} for name, seconds in names.items()
+                }
+                for category, names in self.seconds.items()
+            },
+            "rows": dict(self.rows),
+            "memory": {
+                "peak_rss_bytes": self.peak_rss,
+                "samples": [{"time_s": elapsed, "rss_bytes": rss} for elapsed, rss in self.memory],
+            },
+        }
+
+    def save(self, path: Path) -> None:
+        """Saves the report as JSON.
+
+        :param path: Path of the JSON file
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+        logger.info(f"Saved import report to '{path}'")
+
+    def print(self, console: Console | None = None) -> None:
+        """Prints the report as tables.
+
+        :param console: The console to print to
+        """
+        console = console or Console()
+
+        topics = Table(title=f"Read Messages ({len(self.messages)} Topics)")
+        topics.add_column("Topic", justify="right", no_wrap=True)
+        topics.add_column("messages", justify="right")
+        topics.add_column("MiB", justify="right")
+        for topic, count in sorted(self.messages.items()):
+            topics.add_row(f"[bold]{topic}", f"{count}", f"{self.message_bytes[topic] / 2**20:.2f}")
+        console.print(topics)
+
+        timings = Table(title=f"Time Spent ({self.duration:.2f} s Total)")
+        timings.add_column("Section", justify="right", no_wrap=True)
+        timings.add_column("calls", justify="right")
+        timings.add_column("seconds", justify="right")
+        timings.add_column("µs/call", justify="right")
+        for category, names in sorted(self.seconds.items()):
+            for name, seconds in sorted(names.items()):
+                calls = self.calls[category][name]
+                section = f"{category}: {name}" if name else category
+                timings.add_row(f"[bold]{section}", f"{calls}", f"{seconds:.3f}", f"{seconds / calls * 1e6:.1f}")
+        console.print(timings)
+
+        rows = Table(title=f"Written Rows ({len(self.rows)} Tables)")
+        rows.add_column("Table", justify="right", no_wrap=True)
+        rows.add_column("rows", justify="right")
+        for table, count in sorted(self.rows.items()):
+            rows.add_row(f"[bold]{table}", f"{count}")
+        console.print(rows)
+        console.print(f"[bold]Peak RSS:[/bold] {self.peak_rss / 2**20:.0f} MiB ({len(self.memory)} samples)")
+
+    def _sample_memory(self) -> None:
+        while True:
+            self.memory.append((time.perf_counter() - self._start, _current_rss()))
+            if self._stopped.wait(MEMORY_SAMPLE_INTERVAL):
+                return
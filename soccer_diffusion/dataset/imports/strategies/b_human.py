@@ -1,19 +1,25 @@
+import copy
+import hashlib
 import io
+import json
+import math
+import multiprocessing
 import re
 import sys
-from collections import defaultdict
-from collections.abc import MutableMapping
+import tempfile
+from collections import Counter, defaultdict, deque
+from collections.abc import Iterable, Iterator, MutableMapping
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
 from types import SimpleNamespace
-from typing import TypeAlias, TypeVar
+from typing import Any, TypeAlias, TypeVar
 
 import cv2
 import numpy as np
-import pandas as pd
 from PIL import Image
-from pybh.logs import Array, Frame, Log, Record, Value
 from rich.console import Console
 from rich.table import Table
 from tqdm import tqdm
@@ -27,9 +33,22 @@ from soccer_diffusion.dataset.converters.game_state_converter.b_human_game_state
 from soccer_diffusion.dataset.converters.image_converter import ImageConverter
 from soccer_diffusion.dataset.converters.synced_data_converter import SyncedDataConverter
 from soccer_diffusion.dataset.imports.data import InputData, ModelData
+from soccer_diffusion.dataset.imports.frame_cache import FrameCache, cache_key
 from soccer_diffusion.dataset.imports.model_importer import ImportMetadata, ImportStrategy
+from soccer_diffusion.dataset.imports.report import count_message, measure
 from soccer_diffusion.dataset.models import DEFAULT_IMG_SIZE, Recording
 
+try:
+    from pybh.logs import Array, Frame, Log, Record, Value
+except ImportError:
+    # pybh is only required to read log files, cached logs (e.g. synthetic ones) are imported without it
+    Log = None
+
+    class _PybhUnavailable:
+        """Stand-in for the pybh types, of which no instances exist without pybh."""
+
+    Array = Frame = Record = Value = _PybhUnavailable  # type: ignore[assignment, misc]
+
 
 class Representation(str, Enum):
     FRAME_INFO = "FrameInfo"
@@ -49,35 +68,83 @@ class Thread(str, Enum):
     Lower = "Lower"
 
 
-global GLOBAL_TIME_OFFSET
-global JPEG_IMAGE_DATE_OFFSET
+# Index of every representation, e.g. to store the representations of raw times in an integer array
+REPRESENTATION_INDEX: dict[str, int] = {representation: i for i, representation in enumerate(Representation.values())}
 
-GLOBAL_TIME_OFFSET: int | None = None
-JPEG_IMAGE_DATE_OFFSET: int | None = None
+SmartValue: TypeAlias = bool | int | float | str | bytes | list | dict | Value
 
-global UPPER_IMAGE_RESOLUTION
-global LOWER_IMAGE_RESOLUTION
+# Nested field names to extract from a record, None extracts a (nested) field completely
+FieldTree: TypeAlias = dict[str, "FieldTree | None"]
+
+# Time fields, which are extracted from every representation
+TIME_FIELDS: tuple[str, ...] = ("time", "timestamp")
+
+# Paths of the fields we use per representation, all other fields are skipped during extraction
+EXTRACTED_FIELDS: dict[str, tuple[str, ...]] = {
+    Representation.FRAME_INFO.value: (),
+    Representation.GAME_STATE.value: ("state", "playerState", "ownTeam.fieldPlayerColor"),
+    Representation.INERTIAL_SENSOR_DATA.value: ("angle",),
+    Representation.JOINT_REQUEST.value: ("angles",),
+    Representation.JOINT_SENSOR_DATA.value: ("angles",),
+    Representation.JPEG_IMAGE.value: ("size", "height", "width", "_data"),
+}
+
+
+def field_tree(paths: Iterable[str]) -> FieldTree:
+    """Builds a tree of nested field names from dot-separated field paths.
+
+    :param paths: Field paths, e.g. "ownTeam.fieldPlayerColor"
+    :return: The field tree, e.g. {"ownTeam": {"fieldPlayerColor": None}}
+    """
+    tree: FieldTree = {}
+    for path in paths:
+        node = tree
+        *parents, name = path.split(".")
+        for parent in parents:
+            child = node.setdefault(parent, {})
+            if child is None:  # The parent is already extracted completely
+                break
+            node = child
+        else:
+            node[name] = None
+    return tree
 
-UPPER_IMAGE_RESOLUTION: tuple[int, int] | None = None
-LOWER_IMAGE_RESOLUTION: tuple[int, int] | None = None
 
-SmartValue: TypeAlias = bool | int | float | str | bytes | list | dict | Value
+EXTRACTION_SCHEMA: dict[str, FieldTree] = {
+    representation: field_tree(TIME_FIELDS + paths) for representation, paths in EXTRACTED_FIELDS.items()
+}
+
+# Version of the frame extraction, increase it whenever the extracted frames change without a change of the schema.
+# Cached frames of older versions or other schemas are not used.
+EXTRACTION_VERSION: int = 1
+CACHE_VERSION: str = (
+    f"{EXTRACTION_VERSION}-" + hashlib.sha256(json.dumps(EXTRACTION_SCHEMA, sort_keys=True).encode()).hexdigest()[:8]
+)
+
+DEFAULT_CACHE_DIR: Path = Path(tempfile.gettempdir()) / "soccer_diffusion" / "b_human"
 
 
 class SmartRecord(MutableMapping):
-    def __init__(self, record: Record) -> None:
+    def __init__(self, record: Record, fields: FieldTree | None = None) -> None:
+        """Copies the fields of a pybh record.
+
+        :param record: The pybh record
+        :param fields: The fields to extract, all fields are extracted if None
+        """
         self.data: dict[str, SmartValue] = {}
-        for key in record:
+        keys = record if fields is None else [key for key in record if key in fields]
+        for key in keys:
             value = record.__getattr__(key)
+            sub_fields = None if fields is None else fields[key]
             match value:
                 case Record():
-                    self.data[key] = SmartRecord(value).data
+                    self.data[key] = SmartRecord(value, sub_fields).data
                 case Array():
                     array_values = []
                     for array_value in value:
                         match array_value:
                             case Record():
-                                array_values.append(SmartRecord(array_value))
+                                array_values.append(SmartRecord(array_value, sub_fields))
                             case _:
                                 array_values.append(array_value)
                     self.data[key] = array_values
@@ -105,14 +172,31 @@ class SmartRecord(MutableMapping):
     def get(self, key: str, default: T_default = None) -> SmartValue | T_default:
         return self.data.get(key, default)
 
+    @staticmethod
+    def from_data(data: dict[str, SmartValue]) -> "SmartRecord":
+        """Creates a record from already extracted fields.
+
+        :param data: The extracted fields
+        :return: The record
+        """
+        record = SmartRecord.__new__(SmartRecord)
+        record.data = data
+        return record
+
+
+# Sentinel for a not yet decoded image of a frame
+_NOT_DECODED = object()
+
+# Channel order to gather two YUV pixels (Y0, U, V) and (Y1, U, V) from a YUYV pixel (Y0, U, Y1, V)
+YUYV_TO_YUV_CHANNELS = np.array([0, 1, 3, 2, 1, 3])
+
 
 class SmartFrame(MutableMapping):
-    def __init__(self, frame: Frame):
-        self.data: dict[str, SmartRecord] = {
-            repr: SmartRecord(frame[repr]) for repr in frame.representations if repr in Representation.values()
-        }
-        self.thread: str = frame.thread
+    def __init__(self, data: dict[str, SmartRecord], thread: str):
+        self.data: dict[str, SmartRecord] = data
+        self.thread: str = thread
         self._time: int | None = None
+        self._image: np.ndarray | None | object = _NOT_DECODED
 
     def __getitem__(self, key: str) -> SmartRecord:
         return self.data[key]
@@ -134,7 +218,12 @@ class SmartFrame(MutableMapping):
 
     @staticmethod
     def from_frame(frame: Frame) -> "SmartFrame":
-        return SmartFrame(frame)
+        data = {
+            repr: SmartRecord(frame[repr], EXTRACTION_SCHEMA[repr])
+            for repr in frame.representations
+            if repr in Representation.values()
+        }
+        return SmartFrame(data, frame.thread)
 
     @property
     def time(self) -> int | None:
@@ -147,60 +236,35 @@ class SmartFrame(MutableMapping):
         else:
             raise RuntimeWarning("Time is already set!")
 
-    def scrape_time_ms(self) -> int | None:
-        """Returns the zero-shifted time of the frame in milliseconds.
-
-        :return: The zero-shifted time of the frame in milliseconds, if available
-        """
-        global GLOBAL_TIME_OFFSET, JPEG_IMAGE_DATE_OFFSET
-
-        # Case JPEGImage timestamp is available
-        # Shift the time using the GLOBAL_TIME_OFFSET and JPEGImage_DATE_OFFSET if they are defined
-        if (image := self.get(Representation.JPEG_IMAGE.value)) is not None and isinstance(
-            (timestamp := image.get("timestamp")), int
-        ):
-            if GLOBAL_TIME_OFFSET is not None and JPEG_IMAGE_DATE_OFFSET is not None:
-                return timestamp - GLOBAL_TIME_OFFSET - JPEG_IMAGE_DATE_OFFSET
-
-        # Search for times in other representations
-        times: list[int] = []
-        for representation, record in self.items():
-            if representation != Representation.JPEG_IMAGE.value:
-                if (time := record.get("time")) is not None:
-                    times.append(time)
-                if (timestamp := record.get("timestamp")) is not None:
-                    times.append(timestamp)
-
-        # Case other timestamp is available
-        # Shift the time using the GLOBAL_TIME_OFFSET if it is defined
-        if times:
-            assert len(set(times)) == 1, f"Frame has conflicting time definitions: {times}!"
-            if GLOBAL_TIME_OFFSET is not None:
-                return times[0] - GLOBAL_TIME_OFFSET
-
-        # If no time is available, return None
-        return None
+    def __getstate__(self) -> dict:
+        # Frames are sent to worker processes without their decoded image and with memory mapped data copied
+        state = self.__dict__.copy()
+        state.pop("_image")
+        state["data"] = {
+            repr: SmartRecord.from_data(
+                {key: bytes(value) if isinstance(value, memoryview) else value for key, value in record.items()}
+            )
+            for repr, record in self.data.items()
+        }
+        return state
 
-    def scrape_raw_time_ms_meta(self) -> list[tuple[int, str, str]]:
-        """Returns a list of raw times contained in the frame in milliseconds since the start of the log.
-        Meta data is the thread name of the frame and the representation of the frame.
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._image = _NOT_DECODED
 
-        :return: A list of (time, thread, representation) tuples.
-        """
-        times: list[tuple[int, str, str]] = []
-        for representation, record in self.items():
-            if (time := record.get("time")) is not None:
-                times.append((time, self.thread, representation))
-            if (timestamp := record.get("timestamp")) is not None:
-                times.append((timestamp, self.thread, representation))
-        return times
-
-    def image(self) -> np.ndarray | None:
+    def image(self, lower_image_resolution: tuple[int, int] | None = None) -> np.ndarray | None:
         """Returns the BGR image of the frame, if available.
-        An lower camera image is resized to the upper camera resolution, if sizes are known.
+        The image is only decoded once per frame.
 
+        :param lower_image_resolution: Resolution (width, height) to resize a lower camera image to, if any
         :return: The BGR image of the frame, if available.
         """
+        if self._image is _NOT_DECODED:
+            with measure("decode", "image"):
+                self._image = self._decode_image(lower_image_resolution)
+        return self._image  # type: ignore
+
+    def _decode_image(self, lower_image_resolution: tuple[int, int] | None) -> np.ndarray | None:
         if (jpeg_image := self.get(Representation.JPEG_IMAGE.value)) is not None:
             timestamp: int = jpeg_image.get("timestamp")  # type: ignore
             assert timestamp is not None, f"Timestamp must be defined for {Representation.JPEG_IMAGE.value}"
@@ -214,42 +278,138 @@ class SmartFrame(MutableMapping):
             width: int = jpeg_image.get("width")  # type: ignore
             assert width is not None, f"Width must be defined for {Representation.JPEG_IMAGE.value}"
 
-            data: bytes = jpeg_image.get("_data")  # type: ignore
+            data: bytes | memoryview = jpeg_image.get("_data")  # type: ignore
             assert data is not None, f"Data must be defined for {Representation.JPEG_IMAGE.value}"
             data = data[-size:]
 
-            # Load YUYV data
+            # Load YUYV data, each 4-channel pixel contains (Y0, U, Y1, V) of two neighboring pixels
             img = Image.open(io.BytesIO(data))
-            img_yuyv = np.array(img)
-
-            # Convert YUYV to YUV format (2 channels per pixel)
-            # Prepare empty YUV image
-            img_yuv = np.empty((height * 2, width * 2, 3), dtype=np.uint8)
-            # Extract Y, U, V channels
-            y0 = img_yuyv[:, :, 0]
-            u = img_yuyv[:, :, 1]
-            y1 = img_yuyv[:, :, 2]
-            v = img_yuyv[:, :, 3]
-            # Fill YUV image with Y, U, V channels
-            img_yuv[:, ::2, 0] = y0
-            img_yuv[:, 1::2, 0] = y1
-            img_yuv[:, ::2, 1] = u
-            img_yuv[:, 1::2, 1] = u
-            img_yuv[:, ::2, 2] = v
-            img_yuv[:, 1::2, 2] = v
-
-            # Convert YUV to BGR
-            img_bgr = 255 - cv2.cvtColor(img_yuv, cv2.COLOR_YUV2BGR)
-
-            # Resize lower camera image to upper camera resolution
-            if self.thread == Thread.Lower.value:
-                global UPPER_IMAGE_RESOLUTION, LOWER_IMAGE_RESOLUTION
-                if UPPER_IMAGE_RESOLUTION is not None and LOWER_IMAGE_RESOLUTION is not None:
-                    img_bgr = cv2.resize(img_bgr, UPPER_IMAGE_RESOLUTION)
+            img_yuyv = np.asarray(img)
+            assert img_yuyv.shape == (height * 2, width, 4), "Unexpected shape of the YUYV image"
+
+            # Convert YUYV to YUV format, by gathering (Y0, U, V, Y1, U, V) for each YUYV pixel
+            # and splitting them into two YUV pixels.
+            # OpenCV's COLOR_YUV2BGR_YUYV is not used, as it assumes limited range YUV,
+            # which would change the colors compared to already imported recordings.
+            img_yuv = img_yuyv[:, :, YUYV_TO_YUV_CHANNELS].reshape(height * 2, width * 2, 3)
+
+            # Convert YUV to BGR and invert it
+            img_bgr = cv2.cvtColor(img_yuv, cv2.COLOR_YUV2BGR)
+            cv2.bitwise_not(img_bgr, dst=img_bgr)
+
+            # Resize lower camera image, e.g. to the upper camera resolution
+            if (
+                self.thread == Thread.Lower.value
+                and lower_image_resolution is not None
+                and lower_image_resolution != (img_bgr.shape[1], img_bgr.shape[0])
+            ):
+                img_bgr = cv2.resize(img_bgr, lower_image_resolution)
             return img_bgr
+        return None
+
+
+# A raw time of a frame: (time [ms], representation, field name)
+RawTime: TypeAlias = tuple[int, str, str]
+
+
+def _record_field(record: Record | SmartRecord, key: str) -> SmartValue | None:
+    if isinstance(record, SmartRecord):
+        return record.get(key)
+    return record.__getattr__(key) if key in record else None
+
+
+def _plain_values(value: SmartValue) -> SmartValue:
+    """Converts the extracted fields of a record to plain values, e.g. to store them in a checkpoint."""
+    match value:
+        case dict() | SmartRecord():
+            return {key: _plain_values(item) for key, item in value.items()}
+        case list() | tuple():
+            return [_plain_values(item) for item in value]
+        case np.generic():
+            return value.item()
+        case bool():
+            return bool(value)
+        case int():
+            return int(value)
+        case float():
+            return float(value)
+        case _:
+            return value
+
+
+def scrape_raw_times(frame: Frame | SmartFrame) -> list[RawTime]:
+    """Reads only the time fields of the relevant representations of a frame, without converting the whole frame.
+
+    :param frame: The pybh frame or an already converted SmartFrame
+    :return: A list of (time, representation, field) tuples.
+    """
+    times: list[RawTime] = []
+    representations = frame.representations if isinstance(frame, Frame) else list(frame.keys())
+    for representation in representations:
+        if representation not in Representation.values():
+            continue
+        record = frame[representation]
+        for key in TIME_FIELDS:
+            if (time := _record_field(record, key)) is not None:
+                times.append((time, representation, key))  # type: ignore
+    return times
+
+
+class LogIndex:
+    """Lightweight summary of a log, collected in a first pass without converting any frame data."""
+
+    def __init__(self) -> None:
+        self.threads: list[str] = []
+
+        # Raw times of all frames, as columns of (frame index, time [ms], representation index, time field index)
+        self.time_frames: list[int] = []
+        self.times: list[int] = []
+        self.time_representations: list[int] = []
+        self.time_fields: list[int] = []
+        self.representation_counts: Counter[str] = Counter()
+        self.first_image_frame: dict[str, int] = {}  # Index of the first image frame per thread
+
+    def __len__(self) -> int:
+        return len(self.threads)
+
+    def add_frame(self, frame: Frame | SmartFrame) -> None:
+        index = len(self.threads)
+        representations = frame.representations if isinstance(frame, Frame) else list(frame.keys())
+
+        self.threads.append(frame.thread)
+        for time, representation, key in scrape_raw_times(frame):
+            self.time_frames.append(index)
+            self.times.append(time)
+            self.time_representations.append(REPRESENTATION_INDEX[representation])
+            self.time_fields.append(TIME_FIELDS.index(key))
+        self.representation_counts.update(repr for repr in representations if repr in Representation.values())
+        if Representation.JPEG_IMAGE.value in representations:
+            self.first_image_frame.setdefault(frame.thread, index)
+
+
+# Minimal number of frames per chunk of a parallel conversion
+MIN_CHUNK_SIZE: int = 1000
+# Number of chunks per worker process, to balance the load of the workers
+CHUNKS_PER_WORKER: int = 4
+
+
+class CachedLog:
+    """Log, which is read from the frame cache instead of the log file."""
+
+    def __init__(self, cache: FrameCache) -> None:
+        self.cache = cache
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def __iter__(self) -> Iterator[SmartFrame]:
+        for thread, records in self.cache:
+            yield SmartFrame({repr: SmartRecord.from_data(data) for repr, data in records.items()}, thread)
 
 
 class BHumanImportStrategy(ImportStrategy):
+    supports_resume = True
+
     def __init__(
         self,
         metadata: ImportMetadata,
@@ -259,6 +419,8 @@ class BHumanImportStrategy(ImportStrategy):
         synced_data_converter: SyncedDataConverter,
         caching: bool = False,
         video: bool = False,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        workers: int = 1,
     ):
         self.metadata = metadata
         self.upper_image_converter = upper_image_converter
@@ -266,10 +428,23 @@ class BHumanImportStrategy(ImportStrategy):
         self.game_state_converter = game_state_converter
         self.synced_data_converter = synced_data_converter
         self.caching = caching
+        self.cache_dir = cache_dir
         self.video = video
+        self.workers = workers
 
         self.datetime: datetime | None = None
 
+        # Offsets of the raw times, which are determined by _handle_timestamps
+        self.global_time_offset: int | None = None
+        self.jpeg_image_date_offset: int | None = None
+
+        # Resolutions (width, height) of the camera images, which are determined by _extract_image_resolutions
+        self.upper_image_resolution: tuple[int, int] | None = None
+        self.lower_image_resolution: tuple[int, int] | None = None
+
+        # Latest received data before the first frame of a resumed import
+        self._resume_data: InputData | None = None
+
         self.model_data = ModelData()
 
     # TODO: Resample images, game_states with correct frequency
@@ -279,16 +454,46 @@ class BHumanImportStrategy(ImportStrategy):
         self.verify_file(file_path)
         self.datetime = self.get_datetime_from_file_path(file_path)
 
-        self.model_data.recording = self._create_recording(file_path)
-        log, frames = self._read_log_file(file_path)
-        frames = self._handle_timestamps(frames)
-        self._extract_image_resolutions(frames)
+        self.model_data.recording = self.resume_recording or self._create_recording(file_path)
+        with measure("decode", "log"):
+            log = self._read_log_file(file_path)
+            log_index = self._index_log(log)
+        frame_times = self._handle_timestamps(log_index)
+        self._extract_image_resolutions(log, log_index)
+
+        self._statistics(log_index)
+
+        frames = tqdm(
+            self._iter_frames_in_time_order(log, frame_times, self.resume_position),
+            total=len(frame_times),
+            initial=self.resume_position,
+            desc="Converting frames",
+            unit="frames",
+        )
+        data = self._resume_data if self._resume_data is not None else InputData()
+        if self.workers > 1 and not self.video:
+            self._convert_frames_in_parallel(frames, len(frame_times) - self.resume_position, data)
+        else:
+            self._convert_frames(frames, data, start_position=self.resume_position)
+
+        return self.model_data
 
-        self._statistics(frames)
+    def _convert_frames(
+        self, frames: Iterable[SmartFrame], data: InputData, dry_run: bool = False, start_position: int = 0
+    ) -> None:
+        """Converts the frames in time order and collects the resulting models.
 
-        data = InputData()
+        :param frames: The frames in time order, with their time set
+        :param data: The latest received data, which is updated with the data of every frame
+        :param dry_run: Only updates the data and the resampling state of the converters, without creating models
+            or decoding images
+        :param start_position: Position of the first frame in time order, e.g. when resuming an import
+        """
+        stamp = 0.0
+        for position, frame in enumerate(frames, start_position):
+            if not dry_run and self._checkpoint_due():
+                self._checkpoint(position, stamp, self._state(data, self._converters()))
 
-        for frame in tqdm(frames, total=len(frames), desc="Converting frames", unit="frames"):
             self._show_video(frame)
 
             converter: Converter | None = None
@@ -296,6 +501,7 @@ class BHumanImportStrategy(ImportStrategy):
             if frame.time is None:
                 continue
             relative_timestamp: float = frame.time / 1000.0  # Timestamp relative to the beginning in seconds
+            stamp = relative_timestamp
 
             for representation, record in frame.items():
                 match representation:
@@ -397,8 +603,8 @@ class BHumanImportStrategy(ImportStrategy):
                         converter = self.synced_data_converter
                     case Representation.JPEG_IMAGE.value:
                         thread = frame.thread
-                        image = frame.image()
-                        if image is not None:
+                        image = None if dry_run else frame.image(self._lower_image_target_resolution())
+                        if image is not None or dry_run:
                             match thread:
                                 case Thread.Upper.value:
                                     data.image = image
@@ -415,16 +621,134 @@ class BHumanImportStrategy(ImportStrategy):
                         logger.error(f"Unknown representation: {representation}")
 
                 if self._is_all_synced_data_available(data) and converter is not None:
-                    assert self.model_data.recording is not None, "Recording must be defined to create child models"
-                    converter.populate_recording_metadata(data, self.model_data.recording)
-                    model_data = converter.convert_to_model(data, relative_timestamp, self.model_data.recording)
-                    self.model_data = self.model_data.merge(model_data)
+                    if dry_run:
+                        converter.resampler.resample(data, relative_timestamp)  # type: ignore[attr-defined]
+                    else:
+                        assert self.model_data.recording is not None, "Recording must be defined to create models"
+                        converter.populate_recording_metadata(data, self.model_data.recording)
+                        with measure("convert", type(converter).__name__):
+                            model_data = converter.convert_to_model(data, relative_timestamp, self.model_data.recording)
+                        self._collect(model_data)
+
+    def _convert_frames_in_parallel(self, frames: Iterable[SmartFrame], num_frames: int, data: InputData) -> None:
+        """Converts consecutive time chunks of the frames in parallel worker processes.
+
+        The frames are only read and dry-run converted in this process, which updates the latest received data
+        and the resampling state of the converters without decoding any images.
+        Each chunk is seeded with a copy of both at its first frame,
+        so the models of all chunks concatenated in order are identical to a serial conversion.
+
+        Checkpoints are created between chunks, with the state the following chunk is seeded with.
+
+        :param frames: The frames in time order, with their time set
+        :param num_frames: The number of frames
+        :param data: The latest received data before the first frame
+        """
+        assert self.model_data.recording is not None, "Recording must be defined to create child models"
+        chunk_size = max(MIN_CHUNK_SIZE, math.ceil(num_frames / (self.workers * CHUNKS_PER_WORKER)))
+
+        chunk = self._conversion_chunk(data)
+        position = self.resume_position
+        stamp = 0.0
+        # Converted chunks with the position, timestamp and conversion state after their last frame
+        pending: deque[tuple[Future[ModelData], int, float, tuple | None]] = deque()
+        # The workers are started from the conversion thread of the import pipeline, while other threads
+        # (e.g. the writer, image and report threads) hold locks, which forked workers would inherit locked
+        context = multiprocessing.get_context("forkserver")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            for frame in frames:
+                chunk.frames.append(frame)
+                self._convert_frames([frame], data, dry_run=True)
+                position += 1
+                stamp = frame.time / 1000.0 if frame.time is not None else stamp
+
+                if len(chunk.frames) == chunk_size:
+                    future = executor.submit(convert_chunk, chunk)
+                    chunk = self._conversion_chunk(data)
+                    pending.append((future, position, stamp, (chunk.data, chunk.converters)))
+
+                # Limit the number of chunks waiting for a worker, as they keep their frames in memory
+                while len(pending) > self.workers * CHUNKS_PER_WORKER:
+                    self._merge_chunk(*pending.popleft())
+
+            if chunk.frames:
+                pending.append((executor.submit(convert_chunk, chunk), position, stamp, None))
+            while pending:
+                self._merge_chunk(*pending.popleft())
+
+    def _conversion_chunk(self, data: InputData) -> "ConversionChunk":
+        assert self.model_data.recording is not None, "Recording must be defined to create child models"
+        # Copy the data and converters together, as the resamplers keep references to the data
+        chunk_data, converters = copy.deepcopy((data, self._converters()))
+        return ConversionChunk(
+            metadata=self.metadata,
+            data=chunk_data,
+            converters=converters,
+            recording=self.model_data.recording,
+            image_resolutions=(self.upper_image_resolution, self.lower_image_resolution),
+            frames=[],
+        )
 
-        return self.model_data
+    def _merge_chunk(
+        self,
+        future: Future[ModelData],
+        position: int,
+        stamp: float,
+        state: tuple[InputData, tuple[Converter, ...]] | None,
+    ) -> None:
+        model_data = future.result()
+        recording = self.model_data.recording
+        chunk_recording = model_data.recording
+        assert recording is not None and chunk_recording is not None, "Recordings must be defined"
+
+        # The metadata is populated from the first frames, which provide it, as in a serial conversion
+        if recording.team_color is None:
+            recording.team_color = chunk_recording.team_color
+        if recording.img_width_scaling == 0.0 and recording.img_height_scaling == 0.0:
+            recording.img_width_scaling = chunk_recording.img_width_scaling
+            recording.img_height_scaling = chunk_recording.img_height_scaling
+        self._collect(model_data)
+        if state is not None and self._checkpoint_due():
+            self._checkpoint(position, stamp, self._state(*state))
+
+    def image_converters(self) -> list[Converter]:
+        return [self.upper_image_converter, self.lower_image_converter]
+
+    def _state(self, data: InputData, converters: tuple[Converter, ...]) -> dict[str, Any]:
+        """Returns the conversion state of a checkpoint as plain values.
+
+        :param data: The latest received data
+        :param converters: The converters in the order of `_converters`, whose resampling state is kept
+        """
+        data_state = data.get_state()
+        for key, image in (("image", data.image), ("lower_image", data.lower_image)):
+            data_state[key] = None if image is None else {"shape": list(image.shape), "data": image.tobytes()}
+        data_state["game_state"] = None if data.game_state is None else _plain_values(data.game_state)
+        return {
+            "data": data_state,
+            "resamplers": [converter.resampler.get_state() for converter in converters],
+        }
+
+    def _restore_state(self, state: dict[str, Any]) -> None:
+        data = InputData(game_state=state["data"]["game_state"])
+        data.set_state(state["data"])
+        for key in ("image", "lower_image"):
+            if (image := state["data"][key]) is not None:
+                setattr(data, key, np.frombuffer(image["data"], dtype=np.uint8).reshape(image["shape"]))
+        for converter, resampler_state in zip(self._converters(), state["resamplers"], strict=True):
+            converter.resampler.set_state(resampler_state, data)
+        self._resume_data = data
+
+    def _converters(self) -> tuple[Converter, Converter, Converter, Converter]:
+        return (
+            self.upper_image_converter,
+            self.lower_image_converter,
+            self.game_state_converter,
+            self.synced_data_converter,
+        )
 
     def _is_all_synced_data_available(self, data: InputData) -> bool:
-        commands_for_all_joints_available = all(command is not None for command in data.joint_command.values())
-        return commands_for_all_joints_available and data.joint_state is not None and data.rotation is not None
+        return data.is_all_synced_data_available()
 
     def verify_file(self, file_path: Path) -> bool:
         # Check file prefix .log
@@ -484,42 +808,87 @@ class BHumanImportStrategy(ImportStrategy):
         logger.error(f"Could not extract datetime from file path: {file_path}")
         sys.exit(1)
 
-    def _read_log_file(self, file_path: Path) -> tuple[Log, list[SmartFrame]]:
-        log = Log(str(file_path), keep_going=True)
+    def _read_log_file(self, file_path: Path) -> Iterable[Frame] | CachedLog:
+        """Opens the log file for (repeated) sequential reading.
+        With caching enabled, the extracted frames are read from or written to the frame cache instead.
+        Cache entries are keyed by the content of the log file and the version of the extraction.
 
-        cache_file = Path("/tmp") / Path(file_path.name).with_suffix(".pkl")
-        if self.caching and cache_file.exists():
-            import pickle
-
-            logger.info(f"Reading B-Human data from cached file '{cache_file}'...")
-            with open(cache_file, "rb") as file:
-                frames = pickle.load(file)
-            return log, frames
-
-        logger.debug(f"Reading B-Human data from file '{file_path}'...")
-        # Read and pre-process frames
-        frames: list[SmartFrame] = [
-            SmartFrame.from_frame(frame)
-            for frame in tqdm(
-                log,
-                desc="Reading frames",
-                unit="frames",
-                total=len(log),
+        :param file_path: Path to the log file
+        :return: The iterable log or the cached log
+        """
+        if self.caching:
+            key = cache_key(file_path, CACHE_VERSION)
+            if (cache := FrameCache.entry(self.cache_dir, key)) is not None:
+                logger.info(f"Reading B-Human data from cache '{cache.directory}'...")
+                return CachedLog(cache)
+
+        if Log is None:
+            raise ImportError(
+                f"Reading the B-Human log '{file_path}' requires pybh, install it with 'poetry install --with b_human'"
             )
-        ]
+        log = Log(str(file_path), keep_going=True)
 
         logger.debug(
-            f"Read log with {len(log)} Frames: {log.bodyName=}, {log.headName=}, {log.identifier=}, {log.location=}, "
-            f"{log.playerNumber=}, {log.scenario=}, {log.suffix=}"
+            f"Opened log with {len(log)} Frames: {log.bodyName=}, {log.headName=}, {log.identifier=}, "
+            f"{log.location=}, {log.playerNumber=}, {log.scenario=}, {log.suffix=}"
         )
 
-        if self.caching:
-            # Pickle dump frames
-            import pickle
+        if not self.caching:
+            return log
+
+        logger.debug(f"Caching B-Human data from file '{file_path}'...")
+        frames = (
+            (frame.thread, {repr: record.data for repr, record in SmartFrame.from_frame(frame).items()})
+            for frame in tqdm(log, desc="Caching frames", unit="frames", total=len(log))
+        )
+        return CachedLog(FrameCache.write(self.cache_dir, key, frames))
 
-            with open(cache_file, "wb") as file:
-                pickle.dump(frames, file)
-        return log, frames
+    def _index_log(self, log: Iterable[Frame] | CachedLog) -> LogIndex:
+        """First pass over the log, which only reads the threads, representations and times of all frames.
+
+        :param log: The log or cached log
+        :return: The index of the log
+        """
+        log_index = LogIndex()
+        for frame in tqdm(log, desc="Indexing frames", unit="frames", total=len(log)):  # type: ignore
+            log_index.add_frame(frame)
+        return log_index
+
+    def _iter_frames_in_time_order(
+        self, log: Iterable[Frame] | CachedLog, frame_times: np.ndarray, start: int = 0
+    ) -> Iterator[SmartFrame]:
+        """Second pass over the log, which lazily converts the frames and yields them in time order.
+        Frames are read sequentially, only frames that are logged before earlier frames are buffered.
+
+        :param log: The log or cached log
+        :param frame_times: Array of (frame index, time) rows, sorted by time
+        :param start: Position in time order of the first yielded frame, earlier frames are skipped
+        :return: Iterator of converted frames in time order, with their time set
+        """
+        position_by_frame_index = np.empty(len(frame_times), dtype=np.int64)
+        position_by_frame_index[frame_times[:, 0]] = np.arange(len(frame_times))
+        positions: list[int] = position_by_frame_index.tolist()
+        times: list[int] = frame_times[:, 1].tolist()
+
+        pending: dict[int, SmartFrame] = {}
+        next_position = start
+        max_pending = 0
+
+        for frame_index, frame in enumerate(log):
+            position = positions[frame_index]
+            if position < start:
+                continue
+            smart_frame = frame if isinstance(frame, SmartFrame) else SmartFrame.from_frame(frame)
+            smart_frame.time = times[position]
+            pending[position] = smart_frame
+            max_pending = max(max_pending, len(pending))
+
+            while next_position in pending:
+                yield pending.pop(next_position)
+                next_position += 1
+
+        assert not pending, "All frames must have been yielded"
+        logger.debug(f"Buffered at most {max_pending} frames to sort them by time")
 
     def _create_recording(self, file_path: Path) -> Recording:
         recording = Recording(
@@ -539,44 +908,34 @@ class BHumanImportStrategy(ImportStrategy):
         )
         return recording
 
-    def _handle_timestamps(self, frames: list[SmartFrame]) -> list[SmartFrame]:
+    def _handle_timestamps(self, log_index: LogIndex) -> np.ndarray:
         """Shifts the timestamps of the frames to start at 0 ms and populates the recording start and end times.
 
-        :param frames: List of frames
-        :return: List of sorted frames with shifted timestamps (Drops frames without timestamps)
+        :param log_index: Index of the log, containing the raw times of all frames
+        :return: Array of (frame index, time) rows sorted by the shifted time (Infers missing times of frames)
         """
-
-        global GLOBAL_TIME_OFFSET, JPEG_IMAGE_DATE_OFFSET
-
-        times: list[tuple[int, int, str, str]] = []  # Frame index, time, thread, representation
-        for i, frame in enumerate(frames):
-            for time, thread, representation in frame.scrape_raw_time_ms_meta():
-                times.append((i, time, thread, representation))
-        df_times = pd.DataFrame(times, columns=["Frame Index", "Time [ms]", "Thread", "Representation"])
+        time_frames = np.asarray(log_index.time_frames, dtype=np.int64)
+        times = np.asarray(log_index.times, dtype=np.int64)
+        representations = np.asarray(log_index.time_representations, dtype=np.int64)
+        is_jpeg_image = representations == REPRESENTATION_INDEX[Representation.JPEG_IMAGE.value]
 
         # Timestamps of JPEGImage frames are offset to everything else by about 25 days.
         # Therefore, we need to subtract the offset from the timestamps of JPEGImage frames.
         # We assume that the offset is constant for all JPEGImage frames.
         # We calculate the offset by taking the average time of all JPEGImage frames and
-        # subtracting the average time of all frames.
-        avg_times = df_times.groupby("Representation")["Time [ms]"].mean().reset_index()
-        JPEG_IMAGE_DATE_OFFSET = int(
-            avg_times[avg_times["Representation"] == Representation.JPEG_IMAGE.value]["Time [ms]"].values[0]
-            - avg_times[avg_times["Representation"] != Representation.JPEG_IMAGE.value]["Time [ms]"].mean()
-        )
+        # subtracting the average of the average times of all other representations.
+        self.jpeg_image_date_offset = self._jpeg_image_date_offset(times, representations)
 
         # Subtract the offset from the timestamps of JPEGImage frames
-        df_times.loc[df_times["Representation"] == Representation.JPEG_IMAGE.value, "Time [ms]"] -= (
-            JPEG_IMAGE_DATE_OFFSET
-        )
+        shifted_times = times - np.where(is_jpeg_image, self.jpeg_image_date_offset, 0)
 
         # Shift all timestamps to start at 0 ms
         # Get the minimum timestamp of all frames and subtract it from all timestamps
-        GLOBAL_TIME_OFFSET = int(df_times["Time [ms]"].min())
-        df_times["Time [ms]"] -= GLOBAL_TIME_OFFSET
+        self.global_time_offset = int(shifted_times.min())
+        shifted_times -= self.global_time_offset
 
-        first_timestamp: timedelta = timedelta(milliseconds=int(df_times["Time [ms]"].min()))
-        last_timestamp: timedelta = timedelta(milliseconds=int(df_times["Time [ms]"].max()))
+        first_timestamp: timedelta = timedelta(milliseconds=int(shifted_times.min()))
+        last_timestamp: timedelta = timedelta(milliseconds=int(shifted_times.max()))
 
         assert self.datetime is not None, "Datetime must be defined to populate timestamps"
         start_time: datetime = self.datetime + first_timestamp
@@ -592,52 +951,90 @@ class BHumanImportStrategy(ImportStrategy):
 
         logger.info(f"Recording duration {duration.total_seconds()} [s]" f" from {start_time.isoformat()}")
 
+        num_frames = len(log_index)
+        frame_times = np.zeros(num_frames, dtype=np.int64)
+        has_time = np.zeros(num_frames, dtype=bool)
+
+        # Frames with other times use them, which must not conflict within a frame
+        other_frames = time_frames[~is_jpeg_image]
+        other_times = shifted_times[~is_jpeg_image]
+        if len(other_frames):
+            starts = np.flatnonzero(np.diff(other_frames, prepend=-1))  # Raw times are grouped by frame
+            min_times = np.minimum.reduceat(other_times, starts)
+            max_times = np.maximum.reduceat(other_times, starts)
+            frame_times[other_frames[starts]] = min_times
+            has_time[other_frames[starts]] = True
+
+        # Frames with a JPEGImage timestamp use the first one, instead of all other times
+        is_jpeg_image_timestamp = is_jpeg_image & (np.asarray(log_index.time_fields) == TIME_FIELDS.index("timestamp"))
+        jpeg_image_frames, first_indices = np.unique(time_frames[is_jpeg_image_timestamp], return_index=True)
+        frame_times[jpeg_image_frames] = shifted_times[is_jpeg_image_timestamp][first_indices]
+        has_time[jpeg_image_frames] = True
+
+        if len(other_frames):
+            conflicts = (min_times != max_times) & ~np.isin(other_frames[starts], jpeg_image_frames)
+            if conflicts.any():
+                conflicting_frame = other_frames[starts[np.argmax(conflicts)]]
+                conflicting_times = times[(time_frames == conflicting_frame) & ~is_jpeg_image]
+                raise AssertionError(f"Frame has conflicting time definitions: {conflicting_times.tolist()}!")
+
         # Handle missing times:
-        # Infer a frame's missing time from the previous times
-        repaired_frames: list[SmartFrame] = []
-        max_time: int = 0
-        for frame in frames:
-            time = frame.scrape_time_ms()
-            if time is None:
-                time = max_time
-            elif time > max_time:
-                max_time = time
-            frame.time = time
-            repaired_frames.append(frame)
-
-        del frames
-
-        # Sort frames by time_ms() in ascending order
-        repaired_frames.sort(key=lambda frame: frame.time)  # type: ignore
-
-        # # Scatter plot the time of sorted frames
-        # import matplotlib.pyplot as plt
-
-        # times = [frame.time_ms() for frame in frames]
-        # plt.scatter(range(len(times)), times)  # type: ignore
-        # plt.xlabel("Frame Index")
-        # plt.ylabel("Time [ms]")
-        # plt.title("Time of Sorted Frames")
-        # plt.show()
-        return repaired_frames
-
-    def _extract_image_resolutions(self, frames: list[SmartFrame]) -> None:
-        global UPPER_IMAGE_RESOLUTION, LOWER_IMAGE_RESOLUTION
-
-        for frame in frames:
-            if UPPER_IMAGE_RESOLUTION is not None and LOWER_IMAGE_RESOLUTION is not None:
+        # Infer a frame's missing time from the maximum of the previous times
+        max_times_so_far = np.maximum.accumulate(np.where(has_time, frame_times, 0))
+        frame_times = np.where(has_time, frame_times, max_times_so_far)
+
+        # Sort frames by time in ascending order
+        order = np.argsort(frame_times, kind="stable")
+        return np.column_stack((order, frame_times[order]))
+
+    @staticmethod
+    def _jpeg_image_date_offset(times: np.ndarray, representations: np.ndarray) -> int:
+        """Returns the offset of the JPEGImage timestamps to the times of all other representations.
+
+        :param times: The raw times
+        :param representations: The representation index of each raw time
+        :return: The offset [ms]
+        """
+        jpeg_image_index = REPRESENTATION_INDEX[Representation.JPEG_IMAGE.value]
+        # Average relative to the minimum time, to not lose precision for large times
+        min_time = int(times.min())
+        counts = np.bincount(representations, minlength=len(REPRESENTATION_INDEX))
+        sums = np.bincount(representations, weights=times - min_time, minlength=len(REPRESENTATION_INDEX))
+        is_present = counts > 0
+        avg_times = sums[is_present] / counts[is_present] + min_time
+        present_representations = np.flatnonzero(is_present)
+        is_jpeg_image = present_representations == jpeg_image_index
+        return int(avg_times[is_jpeg_image][0] - avg_times[~is_jpeg_image].mean())
+
+    def _extract_image_resolutions(self, log: Iterable[Frame] | CachedLog, log_index: LogIndex) -> None:
+        image_frames: dict[int, str] = {index: thread for thread, index in log_index.first_image_frame.items()}
+        if not image_frames:
+            return
+
+        last_image_frame = max(image_frames)
+        for frame_index, frame in enumerate(log):
+            if frame_index > last_image_frame:
                 return
+            if frame_index not in image_frames:
+                continue
 
-            thread = frame.thread
-            image = frame.image()
+            thread = image_frames[frame_index]
+            smart_frame = frame if isinstance(frame, SmartFrame) else SmartFrame.from_frame(frame)
+            image = smart_frame.image(self._lower_image_target_resolution())
 
             if image is not None:
-                if thread == Thread.Upper.value and UPPER_IMAGE_RESOLUTION is None:
-                    UPPER_IMAGE_RESOLUTION = (image.shape[1], image.shape[0])
-                elif thread == Thread.Lower.value and LOWER_IMAGE_RESOLUTION is None:
-                    LOWER_IMAGE_RESOLUTION = (image.shape[1], image.shape[0])
-
-    def _statistics(self, frames: list[SmartFrame]) -> None:
+                if thread == Thread.Upper.value and self.upper_image_resolution is None:
+                    self.upper_image_resolution = (image.shape[1], image.shape[0])
+                elif thread == Thread.Lower.value and self.lower_image_resolution is None:
+                    self.lower_image_resolution = (image.shape[1], image.shape[0])
+
+    def _lower_image_target_resolution(self) -> tuple[int, int] | None:
+        """Lower camera images are resized to the upper camera resolution, once both resolutions are known."""
+        if self.upper_image_resolution is None or self.lower_image_resolution is None:
+            return None
+        return self.upper_image_resolution
+
+    def _statistics(self, log_index: LogIndex) -> None:
         """
         Log some statistics about the representations of the frames.
         For each Representation, we measure the count and average frequency.
@@ -653,10 +1050,10 @@ class BHumanImportStrategy(ImportStrategy):
         total_key: str = "TOTAL FRAMES"
 
         # Count
-        statistics[total_key].count = len(frames)
-        for frame in frames:
-            for representation in frame.keys():
-                statistics[representation].count += 1
+        statistics[total_key].count = len(log_index)
+        for representation, count in log_index.representation_counts.items():
+            statistics[representation].count = count
+            count_message(representation, count=count)
 
         # Average frequency
         if (recording := self.model_data.recording) is not None and (duration := recording.duration()) is not None:
@@ -682,6 +1079,31 @@ class BHumanImportStrategy(ImportStrategy):
         console.print(table)
 
     def _show_video(self, frame: SmartFrame) -> None:
-        if self.video and (img := frame.image()) is not None:
+        if self.video and (img := frame.image(self._lower_image_target_resolution())) is not None:
             cv2.imshow(frame.thread, img)
             cv2.waitKey(1)
+
+
+@dataclass
+class ConversionChunk:
+    """Consecutive frames in time order, with the state of the conversion at the first frame."""
+
+    metadata: ImportMetadata
+    data: InputData
+    converters: tuple[Converter, Converter, Converter, Converter]
+    recording: Recording
+    image_resolutions: tuple[tuple[int, int] | None, tuple[int, int] | None]
+    frames: list[SmartFrame]
+
+
+def convert_chunk(chunk: ConversionChunk) -> ModelData:
+    """Converts the frames of a chunk in a worker process.
+
+    :param chunk: The chunk to convert
+    :return: The converted models, with the recording of the chunk
+    """
+    strategy = BHumanImportStrategy(chunk.metadata, *chunk.converters)  # type: ignore[arg-type]
+    strategy.model_data.recording = chunk.recording
+    strategy.upper_image_resolution, strategy.lower_image_resolution = chunk.image_resolutions
+    strategy._convert_frames(chunk.frames, chunk.data)
+    return strategy.model_data
@@ -1,6 +1,9 @@
+import itertools
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
 
 import transforms3d as t3d
 from mcap.reader import make_reader
@@ -16,7 +19,8 @@ from soccer_diffusion.dataset.converters.image_converter import ImageConverter
 from soccer_diffusion.dataset.converters.synced_data_converter import SyncedDataConverter
 from soccer_diffusion.dataset.imports.data import InputData, ModelData
 from soccer_diffusion.dataset.imports.model_importer import ImportMetadata, ImportStrategy
-from soccer_diffusion.dataset.models import DEFAULT_IMG_SIZE, Recording, Rotation
+from soccer_diffusion.dataset.imports.report import count_message, measure, measured_iter
+from soccer_diffusion.dataset.models import DEFAULT_IMG_SIZE, Recording
 
 USED_TOPICS = [
     "/DynamixelController/command",
@@ -30,6 +34,8 @@ USED_TOPICS = [
 
 
 class BitBotsImportStrategy(ImportStrategy):
+    supports_resume = True
+
     def __init__(
         self,
         metadata: ImportMetadata,
@@ -43,6 +49,10 @@ class BitBotsImportStrategy(ImportStrategy):
         self.game_state_converter = game_state_converter
         self.synced_data_converter = synced_data_converter
 
+        # Latest received messages, time of the first used message, log time of the next message and
+        # the number of messages with this log time, which were read before, to resume an import from
+        self._resume_state: tuple[InputData, int | None, int | None, int] | None = None
+
         self.model_data = ModelData()
 
     def convert_to_model_data(self, file_path: Path) -> ModelData:
@@ -53,17 +63,35 @@ class BitBotsImportStrategy(ImportStrategy):
                 logger.error("No summary found in the MCAP file, skipping processing.")
                 return self.model_data
 
-            first_used_msg_time = None
+            first_used_msg_time: int | None = None
             last_messages_by_topic = InputData()
+            log_time: int | None = None
+            num_read_at_log_time = 0
+            if self._resume_state is not None:
+                last_messages_by_topic, first_used_msg_time, log_time, num_read_at_log_time = self._resume_state
 
-            self.model_data.recording = self._create_recording(summary, file_path)
+            self.model_data.recording = self.resume_recording or self._create_recording(summary, file_path)
 
             self._log_debug_info(summary, self.model_data.recording)
 
             # Check if we got any imu messages
             has_imu_data = any(channel.topic == "/imu/data" for channel in summary.channels.values())
 
-            for _, channel, message, ros_msg in reader.iter_decoded_messages(topics=USED_TOPICS):
+            messages = measured_iter(
+                reader.iter_decoded_messages(topics=USED_TOPICS, start_time=log_time), "decode", "mcap"
+            )
+            # Skip the messages with the same log time as the next message, which were read before resuming
+            messages = itertools.islice(messages, num_read_at_log_time, None)
+            stamp = 0.0
+            for position, (_, channel, message, ros_msg) in enumerate(messages, self.resume_position):
+                if message.log_time != log_time:
+                    log_time, num_read_at_log_time = message.log_time, 0
+                if self._checkpoint_due():
+                    state = self._state(last_messages_by_topic, first_used_msg_time, log_time, num_read_at_log_time)
+                    self._checkpoint(position, stamp, state)
+                num_read_at_log_time += 1
+
+                count_message(channel.topic, len(message.data))
                 converter: Converter | None = None
 
                 match channel.topic:
@@ -92,7 +120,7 @@ class BitBotsImportStrategy(ImportStrategy):
                                     # to base_link instead of the other way around
                                     # This is necessary to get pitch and roll angles in the correct frame
                                     w, x, y, z = t3d.quaternions.qinverse([quat.w, quat.x, quat.y, quat.z])
-                                    last_messages_by_topic.rotation = Rotation(x=x, y=y, z=z, w=w)
+                                    last_messages_by_topic.rotation = SimpleNamespace(x=x, y=y, z=z, w=w)
                                     converter = self.synced_data_converter
                     case _:
                         logger.warning(f"Unhandled topic: {channel.topic} without conversion. Skipping...")
@@ -103,6 +131,7 @@ class BitBotsImportStrategy(ImportStrategy):
                         self._initial_conversion(last_messages_by_topic)
                     else:
                         relative_msg_timestamp = (message.publish_time - first_used_msg_time) / 1e9
+                        stamp = relative_msg_timestamp
                         if converter:
                             self._create_models(converter, last_messages_by_topic, relative_msg_timestamp)
 
@@ -122,20 +151,63 @@ class BitBotsImportStrategy(ImportStrategy):
         assert self.model_data.recording is not None, "Recording must be defined to create child models"
 
         converter.populate_recording_metadata(data, self.model_data.recording)
-        model_data = converter.convert_to_model(data, relative_timestamp, self.model_data.recording)
+        with measure("convert", type(converter).__name__):
+            model_data = converter.convert_to_model(data, relative_timestamp, self.model_data.recording)
 
         # @TODO: find a better way to handle interpolation of head movements
-        for idx, command in enumerate(model_data.joint_commands):
-            command.head_pan = model_data.joint_states[idx].head_pan
-            command.head_tilt = model_data.joint_states[idx].head_tilt
+        joint_commands = model_data.joint_commands.to_records()
+        joint_states = model_data.joint_states.to_records()
+        joint_commands["head_pan"] = joint_states["head_pan"]
+        joint_commands["head_tilt"] = joint_states["head_tilt"]
 
-        self.model_data = self.model_data.merge(model_data)
+        self._collect(model_data)
 
         return self.model_data
 
+    def _state(
+        self, data: InputData, first_used_msg_time: int | None, log_time: int | None, num_read_at_log_time: int
+    ) -> dict[str, Any]:
+        data_state = data.get_state()
+        # Only the fields of the messages, which are converted, are kept
+        data_state["image"] = None
+        if (image := data.image) is not None:
+            data_state["image"] = {
+                "width": int(image.width),
+                "height": int(image.height),
+                "encoding": str(image.encoding),
+                "data": bytes(image.data),
+            }
+        data_state["game_state"] = None
+        if (game_state := data.game_state) is not None:
+            data_state["game_state"] = {
+                "game_state": int(game_state.game_state),
+                "penalized": bool(game_state.penalized),
+                "team_color": int(game_state.team_color),
+            }
+        return {
+            "data": data_state,
+            "resamplers": [converter.resampler.get_state() for converter in self._converters()],
+            "first_used_msg_time": first_used_msg_time,
+            "log_time": log_time,
+            "num_read_at_log_time": num_read_at_log_time,
+        }
+
+    def _restore_state(self, state: dict[str, Any]) -> None:
+        data = InputData()
+        data.set_state(state["data"])
+        if state["data"]["image"] is not None:
+            data.image = SimpleNamespace(**state["data"]["image"])
+        if state["data"]["game_state"] is not None:
+            data.game_state = SimpleNamespace(**state["data"]["game_state"])
+        for converter, resampler_state in zip(self._converters(), state["resamplers"], strict=True):
+            converter.resampler.set_state(resampler_state, data)
+        self._resume_state = (data, state["first_used_msg_time"], state["log_time"], state["num_read_at_log_time"])
+
+    def _converters(self) -> tuple[Converter, Converter, Converter]:
+        return self.image_converter, self.game_state_converter, self.synced_data_converter
+
     def _is_all_synced_data_available(self, data: InputData) -> bool:
-        commands_for_all_joints_available = all(command is not None for command in data.joint_command.values())
-        return commands_for_all_joints_available and data.joint_state is not None and data.rotation is not None
+        return data.is_all_synced_data_available()
 
     def _create_recording(self, summary: Summary, mcap_file_path: Path) -> Recording:
         start_timestamp, end_timestamp = self._extract_timeframe(summary)
@@ -0,0 +1,34 @@
+"""Add image reference
+
+Revision ID: 3f6e1a8b9c52
+Revises: b71e5a9c2d40
+Create Date: 2025-03-11 09:27:45.813204
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f6e1a8b9c52"
+down_revision: Union[str, None] = "b71e5a9c2d40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite adds a nullable column with a foreign key in place, without copying the (large) image table,
+    # but Alembic only supports adding foreign keys in batch mode, which copies the table
+    op.execute('ALTER TABLE "Image" ADD COLUMN reference_id INTEGER REFERENCES "Image" (_id)')
+
+
+def downgrade() -> None:
+    # Duplicates do not contain their data, so it is copied from the referenced images
+    op.execute(
+        'UPDATE "Image" SET data = (SELECT reference.data FROM "Image" AS reference '
+        'WHERE reference._id = "Image".reference_id) WHERE reference_id IS NOT NULL'
+    )
+    with op.batch_alter_table("Image") as batch_op:
+        batch_op.drop_column("reference_id")
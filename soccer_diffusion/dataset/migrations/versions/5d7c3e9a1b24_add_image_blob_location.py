@@ -0,0 +1,35 @@
+"""Add image blob location
+
+Revision ID: 5d7c3e9a1b24
+Revises: e2b8f4a6c931
+Create Date: 2025-03-20 09:27:51.614370
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d7c3e9a1b24"
+down_revision: Union[str, None] = "e2b8f4a6c931"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("Image", sa.Column("blob_offset", sa.Integer(), nullable=True))
+    op.add_column("Image", sa.Column("blob_size", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    moved_images = op.get_bind().scalar(sa.text('SELECT COUNT(*) FROM "Image" WHERE blob_offset IS NOT NULL'))
+    if moved_images:
+        raise RuntimeError(
+            f"{moved_images} images are in the image store, move them back with 'cli db move-images --restore'"
+        )
+    with op.batch_alter_table("Image") as batch_op:
+        batch_op.drop_column("blob_size")
+        batch_op.drop_column("blob_offset")
@@ -0,0 +1,31 @@
+"""Add file hash to recording
+
+Revision ID: 8d2c4b7e1f3a
+Revises: 14ae0e795470
+Create Date: 2025-03-04 10:12:31.402117
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d2c4b7e1f3a"
+down_revision: Union[str, None] = "14ae0e795470"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("Recording") as batch_op:
+        batch_op.add_column(sa.Column("file_hash", sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f("ix_Recording_file_hash"), ["file_hash"], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("Recording") as batch_op:
+        batch_op.drop_index(batch_op.f("ix_Recording_file_hash"))
+        batch_op.drop_column("file_hash")
@@ -0,0 +1,40 @@
+"""Add sample ticks
+
+Revision ID: 9a4f2c6e8d13
+Revises: 5d7c3e9a1b24
+Create Date: 2025-03-24 11:05:37.428916
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9a4f2c6e8d13"
+down_revision: Union[str, None] = "5d7c3e9a1b24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SYNCED_TABLES = ["JointStates", "JointCommands", "Rotation"]
+
+
+def upgrade() -> None:
+    for table in SYNCED_TABLES:
+        op.add_column(table, sa.Column("tick", sa.Integer(), nullable=True))
+        # The synced models are resampled without gaps, so the tick of a sample is its index in the recording
+        op.execute(
+            f'UPDATE "{table}" SET tick = ranked.tick FROM ('
+            f"SELECT _id, ROW_NUMBER() OVER (PARTITION BY recording_id ORDER BY stamp, _id) - 1 AS tick "
+            f'FROM "{table}") AS ranked WHERE "{table}"._id = ranked._id'
+        )
+        op.create_index(op.f(f"ix_{table}_tick"), table, ["recording_id", "tick"], unique=True)
+
+
+def downgrade() -> None:
+    for table in reversed(SYNCED_TABLES):
+        op.drop_index(op.f(f"ix_{table}_tick"), table_name=table)
+        # SQLite drops columns in place, without copying the table
+        op.drop_column(table, "tick")
@@ -0,0 +1,37 @@
+"""Add shard catalog
+
+Revision ID: b6e2a8d4f917
+Revises: f3c81d5b7a62
+Create Date: 2025-03-31 10:12:45.381920
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b6e2a8d4f917"
+down_revision: Union[str, None] = "f3c81d5b7a62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "Shard",
+        sa.Column("recording_id", sa.Integer(), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("shard_recording_id", sa.Integer(), nullable=False),
+        sa.Column("num_samples", sa.Integer(), nullable=False),
+        sa.CheckConstraint("num_samples >= 0", name=op.f("ck_Shard_num_samples_value")),
+        sa.ForeignKeyConstraint(["recording_id"], ["Recording._id"], name=op.f("fk_Shard_recording_id_Recording")),
+        sa.PrimaryKeyConstraint("recording_id", name=op.f("pk_Shard")),
+        sa.UniqueConstraint("path", "shard_recording_id", name=op.f("uq_Shard_path")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("Shard")
@@ -0,0 +1,38 @@
+"""Add import progress
+
+Revision ID: b71e5a9c2d40
+Revises: 8d2c4b7e1f3a
+Create Date: 2025-03-06 14:47:09.118734
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b71e5a9c2d40"
+down_revision: Union[str, None] = "8d2c4b7e1f3a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ImportProgress",
+        sa.Column("recording_id", sa.Integer(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("stamp", sa.Float(), nullable=False),
+        sa.Column("state", sa.LargeBinary(), nullable=False),
+        sa.Column("updated", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["recording_id"], ["Recording._id"], name=op.f("fk_ImportProgress_recording_id_Recording")
+        ),
+        sa.PrimaryKeyConstraint("recording_id", name=op.f("pk_ImportProgress")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ImportProgress")
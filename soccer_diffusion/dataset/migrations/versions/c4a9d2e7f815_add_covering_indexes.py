@@ -0,0 +1,37 @@
+"""Add covering indexes
+
+Revision ID: c4a9d2e7f815
+Revises: 3f6e1a8b9c52
+Create Date: 2025-03-14 16:41:08.275391
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a9d2e7f815"
+down_revision: Union[str, None] = "3f6e1a8b9c52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_Rotation_recording_id", table_name="Rotation")
+    op.create_index(
+        "ix_Rotation_recording_id", "Rotation", ["recording_id", sa.text("stamp ASC"), "x", "y", "z", "w"], unique=False
+    )
+    op.drop_index("ix_GameState_recording_id", table_name="GameState")
+    op.create_index(
+        "ix_GameState_recording_id", "GameState", ["recording_id", sa.text("stamp ASC"), "state"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_GameState_recording_id", table_name="GameState")
+    op.create_index("ix_GameState_recording_id", "GameState", ["recording_id", sa.text("stamp ASC")], unique=False)
+    op.drop_index("ix_Rotation_recording_id", table_name="Rotation")
+    op.create_index("ix_Rotation_recording_id", "Rotation", ["recording_id", sa.text("stamp ASC")], unique=False)
@@ -0,0 +1,52 @@
+"""Add sample chunks
+
+Revision ID: e2b8f4a6c931
+Revises: c4a9d2e7f815
+Create Date: 2025-03-18 10:12:45.903127
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b8f4a6c931"
+down_revision: Union[str, None] = "c4a9d2e7f815"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHUNK_TABLES = ["JointStatesChunk", "JointCommandsChunk", "RotationChunk"]
+
+
+def upgrade() -> None:
+    for table in CHUNK_TABLES:
+        op.create_table(
+            table,
+            sa.Column("recording_id", sa.Integer(), nullable=False),
+            sa.Column("chunk_index", sa.Integer(), nullable=False),
+            sa.Column("start_index", sa.Integer(), nullable=False),
+            sa.Column("num_samples", sa.Integer(), nullable=False),
+            sa.Column("start_stamp", sa.Float(), nullable=False),
+            sa.Column("end_stamp", sa.Float(), nullable=False),
+            sa.Column("dtype", sa.String(), nullable=False),
+            sa.Column("value_offset", sa.Float(), nullable=False),
+            sa.Column("value_scale", sa.Float(), nullable=False),
+            sa.Column("stamps", sa.LargeBinary(), nullable=False),
+            sa.Column("data", sa.LargeBinary(), nullable=False),
+            sa.CheckConstraint("num_samples > 0", name=op.f(f"ck_{table}_num_samples_value")),
+            sa.CheckConstraint("dtype IN ('float32', 'int16')", name=op.f(f"ck_{table}_dtype_enum")),
+            sa.ForeignKeyConstraint(
+                ["recording_id"], ["Recording._id"], name=op.f(f"fk_{table}_recording_id_Recording")
+            ),
+            sa.PrimaryKeyConstraint("recording_id", "chunk_index", name=op.f(f"pk_{table}")),
+        )
+        op.create_index(op.f(f"ix_{table}_recording_id"), table, ["recording_id", "start_index"], unique=False)
+
+
+def downgrade() -> None:
+    for table in reversed(CHUNK_TABLES):
+        op.drop_index(op.f(f"ix_{table}_recording_id"), table_name=table)
+        op.drop_table(table)
@@ -0,0 +1,66 @@
+"""Add game state intervals
+
+Revision ID: f3c81d5b7a62
+Revises: 9a4f2c6e8d13
+Create Date: 2025-03-27 15:48:12.570284
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c81d5b7a62"
+down_revision: Union[str, None] = "9a4f2c6e8d13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Codes of the states, their index in the sorted state names
+STATE_CODES = {"PLAYING": 0, "POSITIONING": 1, "STOPPED": 2, "UNKNOWN": 3}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "GameStateInterval",
+        sa.Column("_id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("recording_id", sa.Integer(), nullable=False),
+        sa.Column("start_stamp", sa.Float(), nullable=False),
+        sa.Column("end_stamp", sa.Float(), nullable=False),
+        sa.Column("state_code", sa.Integer(), nullable=False),
+        sa.CheckConstraint("end_stamp >= start_stamp", name=op.f("ck_GameStateInterval_end_stamp_ge_start_stamp")),
+        sa.CheckConstraint("state_code >= 0 AND state_code < 4", name=op.f("ck_GameStateInterval_state_code_value")),
+        sa.ForeignKeyConstraint(
+            ["recording_id"], ["Recording._id"], name=op.f("fk_GameStateInterval_recording_id_Recording")
+        ),
+        sa.PrimaryKeyConstraint("_id", name=op.f("pk_GameStateInterval")),
+    )
+    op.create_index(
+        op.f("ix_GameStateInterval_recording_id"),
+        "GameStateInterval",
+        ["recording_id", sa.text("start_stamp ASC")],
+        unique=False,
+    )
+
+    # Each game state with a different state than the previous one of its recording starts an interval,
+    # which ends with the start of the next one or the last game state of the recording
+    state_code = " ".join(f"WHEN '{state}' THEN {code}" for state, code in STATE_CODES.items())
+    op.execute(
+        'INSERT INTO "GameStateInterval" (recording_id, start_stamp, end_stamp, state_code) '
+        "SELECT recording_id, stamp, COALESCE("
+        "LEAD(stamp) OVER (PARTITION BY recording_id ORDER BY stamp, _id), "
+        '(SELECT MAX(stamp) FROM "GameState" AS last WHERE last.recording_id = starts.recording_id)), '
+        f"CASE state {state_code} END "
+        "FROM (SELECT _id, recording_id, stamp, state, "
+        "LAG(state) OVER (PARTITION BY recording_id ORDER BY stamp, _id) AS previous_state "
+        'FROM "GameState") AS starts '
+        "WHERE previous_state IS NULL OR previous_state != state "
+        "ORDER BY recording_id, stamp, _id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_GameStateInterval_recording_id"), table_name="GameStateInterval")
+    op.drop_table("GameStateInterval")
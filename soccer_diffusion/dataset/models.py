@@ -3,10 +3,24 @@ from enum import Enum
 from typing import Optional
 
 import numpy as np
-from sqlalchemy import Boolean, CheckConstraint, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, asc
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy import (
+    Boolean,
+    CheckConstraint,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    UniqueConstraint,
+    asc,
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, object_session, relationship
 from sqlalchemy.types import LargeBinary
 
+from soccer_diffusion.dataset.defaults import ChunkDtype
+
 DEFAULT_IMG_SIZE = (480, 480)
 
 
@@ -24,6 +38,10 @@ class RobotState(str, Enum):
         # Use index of sorted strings
         return self.values().index(self.value)
 
+    @classmethod
+    def from_int(cls, code: int) -> "RobotState":
+        return cls(cls.values()[code])
+
 
 class TeamColor(str, Enum):
     BLUE = "BLUE"
@@ -62,6 +80,8 @@ class Recording(Base):
     _id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     allow_public: Mapped[bool] = mapped_column(Boolean, default=False)
     original_file: Mapped[str] = mapped_column(String, nullable=False)
+    # SHA-256 hash of the content of the original file, to detect already imported files
+    file_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     team_name: Mapped[str] = mapped_column(String, nullable=False)
     team_color: Mapped[Optional[TeamColor]] = mapped_column(String, nullable=True)
     robot_type: Mapped[str] = mapped_column(String, nullable=False)
@@ -88,12 +108,17 @@ class Recording(Base):
     game_states: Mapped[list["GameState"]] = relationship(
         "GameState", back_populates="recording", cascade="all, delete-orphan"
     )
+    game_state_intervals: Mapped[list["GameStateInterval"]] = relationship(
+        "GameStateInterval", back_populates="recording", cascade="all, delete-orphan"
+    )
 
     __table_args__ = (
         CheckConstraint(img_width > 0, name="img_width_value"),
         CheckConstraint(img_height > 0, name="img_height_value"),
         CheckConstraint(team_color.in_(TeamColor.values()), name="team_color_enum"),
         CheckConstraint(end_time >= start_time, name="end_time_ge_start_time"),
+        # Index to look up recordings by the hash of their original file
+        Index(None, "file_hash"),
     )
 
     def duration(self) -> Optional[timedelta]:
@@ -111,8 +136,15 @@ class Image(Base):
     # The image data should contain the image as bytes using an rgb8 format (3 channels) and uint8 type.
     # and should be of size (img_width, img_height) as specified in the recording (default 480x480)
     data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # Duplicates of an earlier image of the recording store no data, but reference the image containing it
+    reference_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("Image._id"), nullable=True)
+    # Images moved to the image store of the database (see `cli db move-images`) store no data,
+    # but the offset and size of their data in the file of their recording
+    blob_offset: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    blob_size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     recording: Mapped["Recording"] = relationship("Recording", back_populates="images")
+    reference: Mapped[Optional["Image"]] = relationship("Image", remote_side=[_id])
 
     __table_args__ = (
         CheckConstraint("stamp >= 0", name="stamp_value"),
@@ -133,12 +165,29 @@ class Image(Base):
         else:
             super().__init__(stamp=stamp, recording=recording, data=image.tobytes())
 
+    @property
+    def resolved_data(self) -> bytes:
+        """The image data, which is stored in the referenced image for duplicates
+        and in the image store for moved images
+        """
+        image = self if self.reference is None else self.reference
+        if image.blob_offset is None:
+            return image.data
+
+        from soccer_diffusion.dataset.image_store import ImageStore
+
+        session = object_session(image)
+        assert session is not None, "Images in the image store can only be read with a session"
+        return ImageStore.of(session).read(image.recording_id, image.blob_offset, image.blob_size)
+
 
 class Rotation(Base):
     __tablename__ = "Rotation"
 
     _id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     stamp: Mapped[float] = mapped_column(Float, nullable=False)
+    # Index of the sample on the resampled grid of the recording, shared by the synced models
+    tick: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     recording_id: Mapped[int] = mapped_column(Integer, ForeignKey("Recording._id"), nullable=False)
     x: Mapped[float] = mapped_column(Float, nullable=False)
     y: Mapped[float] = mapped_column(Float, nullable=False)
@@ -153,8 +202,10 @@ class Rotation(Base):
         CheckConstraint("y >= -1 AND y <= 1", name="y_value"),
         CheckConstraint("z >= -1 AND z <= 1", name="z_value"),
         CheckConstraint("w >= -1 AND w <= 1", name="w_value"),
-        # Index to retrieve rotations in order from a given recording
-        Index(None, "recording_id", asc("stamp")),
+        # Covering index to retrieve rotations in order from a given recording, without reading the table
+        Index(None, "recording_id", asc("stamp"), "x", "y", "z", "w"),
+        # Index to retrieve rotations by their tick, at most one per tick
+        Index("ix_Rotation_tick", "recording_id", "tick", unique=True),
     )
 
 
@@ -163,6 +214,8 @@ class JointStates(Base):
 
     _id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     stamp: Mapped[float] = mapped_column(Float, nullable=False)
+    # Index of the sample on the resampled grid of the recording, shared by the synced models
+    tick: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     recording_id: Mapped[int] = mapped_column(Integer, ForeignKey("Recording._id"), nullable=False)
     r_shoulder_pitch: Mapped[float] = mapped_column(Float, name="RShoulderPitch")
     l_shoulder_pitch: Mapped[float] = mapped_column(Float, name="LShoulderPitch")
@@ -217,6 +270,8 @@ class JointStates(Base):
         CheckConstraint("HeadTilt >= 0 AND HeadTilt < 2 * pi()", name="HeadTilt_value"),
         # Index to retrieve joint states in order from a given recording
         Index(None, "recording_id", asc("stamp")),
+        # Index to retrieve joint states by their tick, at most one per tick
+        Index("ix_JointStates_tick", "recording_id", "tick", unique=True),
     )
 
     @staticmethod
@@ -252,6 +307,8 @@ class JointCommands(Base):
 
     _id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     stamp: Mapped[float] = mapped_column(Float, nullable=False)
+    # Index of the sample on the resampled grid of the recording, shared by the synced models
+    tick: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     recording_id: Mapped[int] = mapped_column(Integer, ForeignKey("Recording._id"), nullable=False)
     r_shoulder_pitch: Mapped[float] = mapped_column(Float, name="RShoulderPitch")
     l_shoulder_pitch: Mapped[float] = mapped_column(Float, name="LShoulderPitch")
@@ -306,6 +363,8 @@ class JointCommands(Base):
         CheckConstraint("HeadTilt >= 0 AND HeadTilt < 2 * pi()", name="HeadTilt_value"),
         # Index to retrieve joint commands in order from a given recording
         Index(None, "recording_id", asc("stamp")),
+        # Index to retrieve joint commands by their tick, at most one per tick
+        Index("ix_JointCommands_tick", "recording_id", "tick", unique=True),
     )
 
 
@@ -321,8 +380,124 @@ class GameState(Base):
 
     __table_args__ = (
         CheckConstraint(state.in_(RobotState.values()), name="state_enum"),
-        # Index to retrieve game states in order from a given recording
-        Index(None, "recording_id", asc("stamp")),
+        # Covering index to retrieve game states in order from a given recording, without reading the table
+        Index(None, "recording_id", asc("stamp"), "state"),
+    )
+
+
+class GameStateInterval(Base):
+    """Run of consecutive game states of a recording with the same state"""
+
+    __tablename__ = "GameStateInterval"
+
+    _id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    recording_id: Mapped[int] = mapped_column(Integer, ForeignKey("Recording._id"), nullable=False)
+    start_stamp: Mapped[float] = mapped_column(Float, nullable=False)
+    # Start of the following interval, or the stamp of the last game state for the last interval
+    end_stamp: Mapped[float] = mapped_column(Float, nullable=False)
+    # The state as int(RobotState)
+    state_code: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    recording: Mapped["Recording"] = relationship("Recording", back_populates="game_state_intervals")
+
+    __table_args__ = (
+        CheckConstraint(end_stamp >= start_stamp, name="end_stamp_ge_start_stamp"),
+        CheckConstraint(f"state_code >= 0 AND state_code < {len(RobotState)}", name="state_code_value"),
+        # Index to look up the interval containing a stamp
+        Index(None, "recording_id", asc("start_stamp")),
+    )
+
+    @property
+    def state(self) -> RobotState:
+        return RobotState.from_int(self.state_code)
+
+
+class SampleChunk(Base):
+    """Fixed-size chunk of consecutive samples of a time series of a recording,
+    stored as blobs instead of one row per sample. Each chunk table stores the columns of one model,
+    see `soccer_diffusion.dataset.chunks`.
+    """
+
+    __abstract__ = True
+
+    recording_id: Mapped[int] = mapped_column(Integer, ForeignKey("Recording._id"), primary_key=True)
+    chunk_index: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Index of the first sample of the chunk in the recording
+    start_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    num_samples: Mapped[int] = mapped_column(Integer, nullable=False)
+    start_stamp: Mapped[float] = mapped_column(Float, nullable=False)
+    end_stamp: Mapped[float] = mapped_column(Float, nullable=False)
+    dtype: Mapped[ChunkDtype] = mapped_column(String, nullable=False)
+    # The values are stored as (value - value_offset) / value_scale, which is only used for fixed-point dtypes
+    value_offset: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    value_scale: Mapped[float] = mapped_column(Float, nullable=False, default=1.0)
+    # float32 stamps relative to start_stamp, followed by the (num_samples, num_columns) values in row-major order
+    stamps: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    @staticmethod
+    def table_args() -> tuple:
+        """The constraints and indexes of a chunk table, which can not be shared between the tables"""
+        return (
+            CheckConstraint("num_samples > 0", name="num_samples_value"),
+            CheckConstraint(f"dtype IN ({', '.join(repr(value) for value in ChunkDtype.values())})", name="dtype_enum"),
+            # Index to find the chunks containing a range of samples
+            Index(None, "recording_id", "start_index"),
+        )
+
+
+class JointStatesChunk(SampleChunk):
+    __tablename__ = "JointStatesChunk"
+    __table_args__ = SampleChunk.table_args()
+
+
+class JointCommandsChunk(SampleChunk):
+    __tablename__ = "JointCommandsChunk"
+    __table_args__ = SampleChunk.table_args()
+
+
+class RotationChunk(SampleChunk):
+    __tablename__ = "RotationChunk"
+    __table_args__ = SampleChunk.table_args()
+
+
+class ImportProgress(Base):
+    """Last checkpoint of a partially imported recording, the import is complete once it is removed."""
+
+    __tablename__ = "ImportProgress"
+
+    recording_id: Mapped[int] = mapped_column(Integer, ForeignKey("Recording._id"), primary_key=True)
+    # Number of frames/messages of the file converted before the checkpoint
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Relative timestamp in seconds, up to which all models are imported
+    stamp: Mapped[float] = mapped_column(Float, nullable=False)
+    # Serialized conversion state to resume the import from, see `dump_state`
+    state: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    updated: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    recording: Mapped["Recording"] = relationship("Recording")
+
+
+class Shard(Base):
+    """Location of a recording in the catalog database of a sharded dataset,
+    in which each recording is stored in its own database file (its shard).
+    """
+
+    __tablename__ = "Shard"
+
+    recording_id: Mapped[int] = mapped_column(Integer, ForeignKey("Recording._id"), primary_key=True)
+    # Path of the shard, relative to the directory of the catalog
+    path: Mapped[str] = mapped_column(String, nullable=False)
+    # Id of the recording in its shard
+    shard_recording_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Number of synced samples (ticks) of the recording, so the dataset is indexed without opening the shards
+    num_samples: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    recording: Mapped["Recording"] = relationship("Recording")
+
+    __table_args__ = (
+        UniqueConstraint("path", "shard_recording_id"),
+        CheckConstraint("num_samples >= 0", name="num_samples_value"),
     )
 
 
@@ -0,0 +1,80 @@
+import time
+
+from sqlalchemy import Connection, Index, text
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from soccer_diffusion.dataset import logger
+from soccer_diffusion.dataset.db import Database, database_size
+from soccer_diffusion.dataset.models import Base
+
+
+def _index_columns(index: Index) -> list[str]:
+    """Returns the names of the indexed columns, also of ordered columns like asc("stamp")."""
+    columns = []
+    for expression in index.expressions:
+        element = getattr(expression, "element", expression)
+        columns.append(getattr(element, "name", None) or str(element))
+    return columns
+
+
+def create_indexes(connection: Connection) -> None:
+    """Creates the indexes of the models, which are missing or differ, e.g. the covering indexes
+    of the dataset's queries in a database, which was created before they were added.
+
+    :param connection: The database connection
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index_info = connection.execute(text(f'PRAGMA index_info("{index.name}")')).all()
+            existing_columns = [column for _, _, column in index_info]
+            if existing_columns == _index_columns(index):
+                continue
+
+            logger.info(f"Creating index '{index.name}' on {_index_columns(index)}...")
+            start = time.perf_counter()
+            if existing_columns:
+                connection.execute(DropIndex(index))
+            connection.execute(CreateIndex(index))
+            logger.info(f"Created index '{index.name}' in {time.perf_counter() - start:.1f} s")
+
+
+def optimize_database(db: Database, page_size: int | None = None, vacuum: bool = True) -> None:
+    """Optimizes the database for reading, e.g. before training on it.
+    Creates missing indexes, updates the statistics of the query planner (ANALYZE) and
+    rebuilds the database file (VACUUM), which defragments it and reclaims the space of deleted rows.
+    Nothing else may access the database meanwhile, which takes a while for large databases.
+
+    :param db: The database
+    :param page_size: Page size in bytes to rebuild the database with, e.g. 65536 for large images
+    :param vacuum: Whether to rebuild the database, a different page size always rebuilds it
+    """
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        size_before = database_size(connection)
+
+        create_indexes(connection)
+
+        logger.info("Updating the statistics of the query planner (ANALYZE)...")
+        connection.execute(text("ANALYZE"))
+
+        current_page_size = connection.execute(text("PRAGMA page_size")).scalar_one()
+        if page_size is not None and page_size != current_page_size:
+            # The page size of a database in write-ahead logging mode can not be changed
+            connection.execute(text("PRAGMA journal_mode=DELETE"))
+            connection.execute(text(f"PRAGMA page_size={page_size}"))
+            logger.info(f"Changing the page size from {current_page_size} to {page_size} bytes")
+            vacuum = True
+
+        if vacuum:
+            logger.info("Rebuilding the database (VACUUM)...")
+            start = time.perf_counter()
+            # VACUUM copies the whole database into a temporary database, which must not be held in memory
+            connection.execute(text("PRAGMA temp_store=FILE"))
+            connection.execute(text("VACUUM"))
+            connection.execute(text("PRAGMA temp_store=MEMORY"))
+            logger.info(f"Rebuilt the database in {time.perf_counter() - start:.1f} s")
+
+        connection.execute(text("PRAGMA journal_mode=WAL"))
+        connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        size_after = database_size(connection)
+
+    logger.info(f"Optimized the database: {size_before / 2**20:.1f} MiB -> {size_after / 2**20:.1f} MiB")
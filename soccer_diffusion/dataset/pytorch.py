@@ -3,6 +3,8 @@ import os
 import sqlite3
 from collections.abc import Iterable
 from dataclasses import asdict, dataclass
+from enum import Enum
+from functools import partial
 from pathlib import Path
 from typing import Literal, Optional
 
@@ -14,27 +16,98 @@ from tabulate import tabulate
 from torch.utils.data import DataLoader, Dataset
 from torchvision.transforms import v2
 
-from soccer_diffusion import DB_PATH
+from soccer_diffusion import DB_PATH, DEFAULT_RESAMPLE_RATE_HZ
 from soccer_diffusion.dataset import logger
-from soccer_diffusion.dataset.models import JointStates, RobotState
+from soccer_diffusion.dataset.chunks import count_samples, read_samples
+from soccer_diffusion.dataset.db import begin_snapshot
+from soccer_diffusion.dataset.image_store import ImageStore, database_path
+from soccer_diffusion.dataset.models import JointCommandsChunk, JointStates, JointStatesChunk, RobotState, RotationChunk
+from soccer_diffusion.dataset.shards import MAX_OPEN_SHARDS, ShardConnections, is_catalog, read_catalog
 from soccer_diffusion.ml.model.encoder.imu import IMUEncoder
 from soccer_diffusion.utils.utils import quats_to_5d
 
 
-def connect_to_db(data_base_path: str | Path = DB_PATH, worker_id: int | None = None) -> sqlite3.Connection:
+class ReadMode(str, Enum):
+    # Nothing writes to the database while it is read, so SQLite skips locking and the write-ahead log
+    IMMUTABLE = "immutable"
+    # Recordings may be imported while the database is read, each connection reads a consistent snapshot,
+    # which is pinned from the start of an epoch (see `SoccerDiffusionDataset.update_sample_index`)
+    SNAPSHOT = "snapshot"
+
+
+@dataclass
+class ReadPragmas:
+    """SQLite PRAGMAs of the read-only dataset connections, which are tuned for large databases.
+
+    mmap_size: Bytes of the database file to memory-map per connection. The mapped pages are shared
+        between the workers via the page cache of the OS, so this does not multiply with the workers.
+    cache_size: Bytes of the page caches of all connections, which is divided between the workers,
+        as each connection has its own private cache.
+    temp_store: Where temporary tables and indexes of e.g. sorts are stored ("DEFAULT", "FILE" or "MEMORY").
+    """
+
+    mmap_size: int = 2**30
+    cache_size: int = 2**28
+    temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+
+    def statements(self, num_workers: int = 1) -> list[str]:
+        """Returns the PRAGMA statements of one of the connections.
+
+        :param num_workers: Number of connections, e.g. DataLoader workers, sharing the cache size
+        :return: The PRAGMA statements
+        """
+        # A negative cache size is the size in KiB instead of pages
+        cache_size_kib = max(self.cache_size // max(num_workers, 1) // 1024, 1)
+        return [
+            f"PRAGMA mmap_size={self.mmap_size}",
+            f"PRAGMA cache_size=-{cache_size_kib}",
+            f"PRAGMA temp_store={self.temp_store}",
+        ]
+
+
+def connect_to_db(
+    data_base_path: str | Path = DB_PATH,
+    worker_id: int | None = None,
+    num_workers: int = 1,
+    pragmas: ReadPragmas | None = None,
+    read_mode: ReadMode = ReadMode.IMMUTABLE,
+) -> sqlite3.Connection:
     logger.info(f"Connecting to database at {data_base_path} in worker {worker_id}")
     # The Data exists in a sqlite database
     data_base_path = str(data_base_path)
     assert data_base_path.endswith(".sqlite3"), "The database should be a sqlite file"
     assert os.path.exists(data_base_path), f"The database file '{data_base_path}' does not exist"
 
-    return sqlite3.connect(f"file:{data_base_path}?immutable=1", uri=True)  # Open the database in read-only mode
+    # Open the database in read-only mode
+    if read_mode == ReadMode.SNAPSHOT:
+        # Transactions are explicit, so a read transaction keeps its snapshot while imports commit
+        connection = sqlite3.connect(f"file:{data_base_path}?mode=ro", uri=True, isolation_level=None)
+    else:
+        connection = sqlite3.connect(f"file:{data_base_path}?immutable=1", uri=True)
+    for statement in (pragmas or ReadPragmas()).statements(num_workers):
+        connection.execute(statement)
+    if read_mode == ReadMode.SNAPSHOT:
+        begin_snapshot(connection)
+    # SQLite limits the memory-mapped size to its compile-time maximum
+    mmap_size = connection.execute("PRAGMA mmap_size").fetchone()[0]
+    logger.debug(f"Memory-mapping {mmap_size / 2**20:.0f} MiB of the database in worker {worker_id}")
+    return connection
 
 
 def worker_init_fn(worker_id):
     worker_info = torch.utils.data.get_worker_info()
     dataset = worker_info.dataset  # The dataset copy in the worker process
-    dataset.db_connection = connect_to_db(worker_id=worker_id)
+    dataset.db_connection = connect_to_db(
+        worker_id=worker_id,
+        num_workers=worker_info.num_workers,
+        pragmas=dataset.read_pragmas,
+        read_mode=dataset.read_mode,
+    )
+    if dataset.shards is not None:
+        # The connections to the shards are opened lazily by each worker
+        dataset.shards = ShardConnections(
+            dataset.shards.locations, dataset.connect_to_shard(worker_id, worker_info.num_workers)
+        )
 
 
 class SoccerDiffusionDataset(Dataset):
@@ -59,7 +132,7 @@ class SoccerDiffusionDataset(Dataset):
         num_samples_joint_states: int = 100,
         num_samples_joint_trajectory: int = 100,
         num_samples_joint_trajectory_future: int = 10,
-        sampling_rate: int = 100,
+        sampling_rate: int = DEFAULT_RESAMPLE_RATE_HZ,
         max_fps_video: int = 10,
         num_frames_video: int = 50,
         image_resolution: int = 480,
@@ -70,9 +143,16 @@ class SoccerDiffusionDataset(Dataset):
         use_joint_states: bool = True,
         use_action_history: bool = True,
         use_game_state: bool = True,
+        read_pragmas: ReadPragmas | None = None,
+        use_chunks: bool = False,
+        read_mode: ReadMode = ReadMode.IMMUTABLE,
     ):
-        # Initialize the database connection
-        self.db_connection: sqlite3.Connection = db_connection if db_connection else connect_to_db()
+        # Initialize the database connection, the workers of a DataLoader open their own connections
+        self.read_pragmas = read_pragmas or ReadPragmas()
+        self.read_mode = read_mode
+        self.db_connection: sqlite3.Connection = (
+            db_connection if db_connection else connect_to_db(pragmas=self.read_pragmas, read_mode=self.read_mode)
+        )
 
         # Store the parameters
         self.num_samples_imu = num_samples_imu
@@ -92,6 +172,14 @@ class SoccerDiffusionDataset(Dataset):
         self.use_joint_states = use_joint_states
         self.use_action_history = use_action_history
         self.use_game_state = use_game_state
+        # Images moved out of the database are read from its image store, next to the database file
+        self.image_store = ImageStore.of(self.db_connection)
+        # The database may be the catalog of a sharded dataset, whose recordings are stored in their own databases
+        self.shards: ShardConnections | None = None
+        if is_catalog(self.db_connection):
+            self.shards = ShardConnections({}, self.connect_to_shard())
+        # Read the joint data and rotations from their chunks (see `cli db chunk`) instead of their rows
+        self.use_chunks = use_chunks
 
         # Print out metadata
         cursor = self.db_connection.cursor()
@@ -100,17 +188,51 @@ class SoccerDiffusionDataset(Dataset):
         table = tabulate(recordings, headers=["Team name", "Start time", "Location", "Original file"])
         logger.info(f"Using the following recordings:\n{table}")
 
-        # SQL query that get the first and last timestamp of the joint command for each recording
+        self.num_samples = 0
+        self.sample_boundaries: list[tuple[int, int, int]] = []
+        self.update_sample_index()
+
+    def update_sample_index(self) -> bool:
+        """Builds the index of the samples of all completely imported recordings.
+        In snapshot mode, it is built in a new snapshot of the database, so recordings imported since the last
+        update are added. Call it at the start of an epoch and create the iterator of the DataLoader afterwards:
+        Its workers pin the snapshot they start with, so use `persistent_workers=False` in snapshot mode,
+        otherwise the workers neither read the new recordings nor release their snapshot,
+        which keeps the write-ahead log of the imports from being truncated.
+
+        :return: Whether the sample index changed
+        """
+        if self.read_mode == ReadMode.SNAPSHOT:
+            begin_snapshot(self.db_connection)
+
+        # Recordings, whose import is not complete, are still growing or may be replaced
         cursor = self.db_connection.cursor()
-        cursor.execute(
-            "SELECT recording_id, COUNT(*) AS num_entries_in_recording FROM JointCommands GROUP BY recording_id"
-        )
-        recording_timestamps = cursor.fetchall()
+        cursor.execute("SELECT recording_id FROM ImportProgress")
+        incomplete_recordings = {recording_id for (recording_id,) in cursor.fetchall()}
+
+        # SQL query that get the first and last timestamp of the joint command for each recording
+        if self.shards is not None:
+            # The catalog contains the number of samples of the recordings in its shards
+            self.shards.locations = read_catalog(self.db_connection, database_path(self.db_connection))
+            recording_timestamps = [
+                (recording_id, location.num_samples) for recording_id, location in self.shards.locations.items()
+            ]
+        elif self.use_chunks:
+            recording_timestamps = list(count_samples(self.db_connection, JointCommandsChunk).items())
+        else:
+            cursor = self.db_connection.cursor()
+            cursor.execute(
+                "SELECT recording_id, COUNT(*) AS num_entries_in_recording FROM JointCommands GROUP BY recording_id"
+            )
+            recording_timestamps = cursor.fetchall()
 
         # Calculate how many batches can be build from each recording
+        previous_boundaries = self.sample_boundaries
         self.num_samples = 0
         self.sample_boundaries = []
         for recording_id, num_data_points in recording_timestamps:
+            if recording_id in incomplete_recordings:
+                continue
             assert num_data_points > 0, "Recording length is negative or zero"
             total_samples_before = self.num_samples
             # Calculate the number of batches that can be build from the recording including the stride
@@ -120,18 +242,49 @@ class SoccerDiffusionDataset(Dataset):
             # Store the boundaries of the samples for later retrieval
             self.sample_boundaries.append((total_samples_before, self.num_samples, recording_id))
 
+        if previous_boundaries and self.sample_boundaries != previous_boundaries:
+            logger.info(
+                f"Updated the sample index to {len(self.sample_boundaries)} recordings with {self.num_samples} samples"
+            )
+        return self.sample_boundaries != previous_boundaries
+
     def __len__(self):
         return self.num_samples
 
+    def connect_to_shard(self, worker_id: int | None = None, num_workers: int = 1) -> partial:
+        # The open shards of a worker share its part of the page cache
+        return partial(
+            connect_to_db,
+            worker_id=worker_id,
+            num_workers=num_workers * MAX_OPEN_SHARDS,
+            pragmas=self.read_pragmas,
+            read_mode=self.read_mode,
+        )
+
+    def recording_connection(self, recording_id: int) -> tuple[sqlite3.Connection, ImageStore, int]:
+        # In a sharded dataset, the recording is read from its shard, in which it may have a different id
+        if self.shards is None:
+            return self.db_connection, self.image_store, recording_id
+        return self.shards.get(recording_id)
+
     def query_joint_data(
         self, recording_id: int, start_sample: int, num_samples: int, table: Literal["JointCommands", "JointStates"]
     ) -> torch.Tensor:
-        # Get the joint state
+        connection, _, recording_id = self.recording_connection(recording_id)
+        if self.use_chunks:
+            # The chunks contain the joint angles in alphabetical order
+            chunk_model = JointCommandsChunk if table == "JointCommands" else JointStatesChunk
+            _, joint_data = read_samples(
+                connection, chunk_model, recording_id, start_sample, start_sample + num_samples
+            )
+            assert joint_data.shape[1] == self.num_joints, "The number of joints is not correct"
+            return torch.from_numpy(joint_data)
+
+        # Get the joint state, the sample index is the tick of the synced models
         raw_joint_data = pd.read_sql_query(
-            f"SELECT * FROM {table} WHERE recording_id = {recording_id} "
-            f"ORDER BY stamp ASC LIMIT {num_samples} OFFSET {start_sample}",
-            # TODO other direction  TODO make params correct
-            self.db_connection,
+            f"SELECT * FROM {table} WHERE recording_id = ? AND tick >= ? AND tick < ? ORDER BY tick ASC",
+            connection,
+            params=(recording_id, start_sample, start_sample + num_samples),
         )
 
         # Convert to numpy array, keep only the joint angle columns in alphabetical order
@@ -142,6 +295,17 @@ class SoccerDiffusionDataset(Dataset):
         # We don't need padding here, because we sample the data in the correct length for the targets
         return torch.from_numpy(raw_joint_data)
 
+    def query_stamp(self, recording_id: int, tick: int) -> float:
+        # The stamp of the joint command at the tick, which is shared by all synced models
+        connection, _, recording_id = self.recording_connection(recording_id)
+        if self.use_chunks:
+            stamps, _ = read_samples(connection, JointCommandsChunk, recording_id, tick, tick + 1)
+            return float(stamps[0])
+
+        cursor = connection.cursor()
+        cursor.execute("SELECT stamp FROM JointCommands WHERE recording_id = ? AND tick = ?", (recording_id, tick))
+        return cursor.fetchone()[0]
+
     def query_joint_data_history(
         self, recording_id: int, end_sample: int, num_samples: int, table: Literal["JointCommands", "JointStates"]
     ) -> torch.Tensor:
@@ -174,12 +338,17 @@ class SoccerDiffusionDataset(Dataset):
         self, recording_id: int, end_time_stamp: float, context_len: float, num_frames: int, resolution: int
     ) -> tuple[torch.Tensor, torch.Tensor]:
         # Get the image data
-        cursor = self.db_connection.cursor()
+        connection, image_store, recording_id = self.recording_connection(recording_id)
+        cursor = connection.cursor()
         cursor.execute(
             # Select the last num_samples images before the current time stamp
             # and order them by time stamp in ascending order
-            "SELECT stamp, data FROM Image "
-            "WHERE recording_id = $1 AND stamp BETWEEN $2 - $3 AND $2 ORDER BY stamp ASC;",
+            # Duplicate images reference the image containing their data, moved images their location in the store
+            "SELECT Image.stamp, COALESCE(Reference.data, Image.data), "
+            "COALESCE(Reference.blob_offset, Image.blob_offset), COALESCE(Reference.blob_size, Image.blob_size) "
+            "FROM Image "
+            "LEFT JOIN Image AS Reference ON Reference._id = Image.reference_id "
+            "WHERE Image.recording_id = $1 AND Image.stamp BETWEEN $2 - $3 AND $2 ORDER BY Image.stamp ASC;",
             (recording_id, end_time_stamp, context_len),
         )
 
@@ -204,7 +373,9 @@ class SoccerDiffusionDataset(Dataset):
         )
 
         # Get the raw image data
-        for stamp, data in response:
+        for stamp, data, blob_offset, blob_size in response:
+            if blob_offset is not None:
+                data = image_store.read(recording_id, blob_offset, blob_size)
             # Deserialize the image data
             image = np.frombuffer(data, dtype=np.uint8).reshape(480, 480, 3)
             # Resize the image
@@ -234,15 +405,18 @@ class SoccerDiffusionDataset(Dataset):
         num_samples_to_query = end_sample - start_sample
 
         # Get the imu data
-        raw_imu_data = pd.read_sql_query(
-            f"SELECT * FROM Rotation WHERE recording_id = {recording_id} "
-            f"ORDER BY stamp ASC LIMIT {num_samples_to_query} OFFSET {start_sample}",
-            # TODO make params correct
-            self.db_connection,
-        )
+        connection, _, recording_id = self.recording_connection(recording_id)
+        if self.use_chunks:
+            _, raw_imu_data = read_samples(connection, RotationChunk, recording_id, start_sample, end_sample)
+        else:
+            raw_imu_data = pd.read_sql_query(
+                "SELECT x, y, z, w FROM Rotation WHERE recording_id = ? AND tick >= ? AND tick < ? ORDER BY tick ASC",
+                connection,
+                params=(recording_id, start_sample, start_sample + num_samples_to_query),
+            )
 
-        # Convert to numpy array
-        raw_imu_data = raw_imu_data[["x", "y", "z", "w"]].to_numpy(dtype=np.float32)
+            # Convert to numpy array
+            raw_imu_data = raw_imu_data[["x", "y", "z", "w"]].to_numpy(dtype=np.float32)
 
         # Add padding if necessary (identity quaternion)
         if raw_imu_data.shape[0] < num_samples:
@@ -274,21 +448,23 @@ class SoccerDiffusionDataset(Dataset):
         return torch.from_numpy(imu_data).float()
 
     def query_current_game_state(self, recording_id: int, stamp: float) -> torch.Tensor:
-        cursor = self.db_connection.cursor()
-        # Select last game state before the current stamp
+        connection, _, recording_id = self.recording_connection(recording_id)
+        cursor = connection.cursor()
+        # Select the game state interval containing the current stamp, i.e. the last one starting before it
         cursor.execute(
-            "SELECT state FROM GameState WHERE recording_id = $1 AND stamp <= $2 ORDER BY stamp DESC LIMIT 1",
+            "SELECT state_code FROM GameStateInterval WHERE recording_id = $1 AND start_stamp <= $2 "
+            "ORDER BY start_stamp DESC, _id DESC LIMIT 1",
             (recording_id, stamp),
         )
 
         # Get the game state
-        game_state: RobotState = cursor.fetchone()
+        game_state = cursor.fetchone()
 
         # If no game state is found set it to unknown
         if game_state is None:
             game_state = RobotState.UNKNOWN
         else:
-            game_state = RobotState(game_state[0])
+            game_state = RobotState.from_int(game_state[0])
 
         return torch.tensor(int(game_state))
 
@@ -310,8 +486,8 @@ class SoccerDiffusionDataset(Dataset):
         # We assume that the joint command, joint state and imu data are roughly synchronized
         # Therefore we can use the joint command index as a reference
         sample_joint_command_index = sample_index * self.trajectory_stride
-        # Calculate the time stamp of the sample
-        stamp = sample_joint_command_index / self.sampling_rate
+        # Get the time stamp of the sample, images and game states are selected by it
+        stamp = self.query_stamp(recording_id, sample_joint_command_index)
 
         # Get the image data
         if self.use_images:
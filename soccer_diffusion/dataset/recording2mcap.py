@@ -1,27 +1,106 @@
 import json
 import shutil
 import sys
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Any
 
-from sqlalchemy.orm import Session
+from mcap.records import Schema
+from mcap_ros2.writer import Writer
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session, aliased
+from tqdm import tqdm
 from transforms3d.euler import quat2euler
 
 from soccer_diffusion.dataset import logger
-from soccer_diffusion.dataset.models import Recording, stamp_to_nanoseconds, stamp_to_seconds_nanoseconds
-
-try:
-    import rosbag2_py
-    from builtin_interfaces.msg import Time
-    from geometry_msgs.msg import Quaternion, Vector3
-    from rclpy.serialization import serialize_message
-    from sensor_msgs.msg import Image, JointState
-    from std_msgs.msg import Header, String
-except ImportError:
-    logger.error(
-        "Failed to import ROS 2 packages. These are necessary to convert recordings to .mcap files. "
-        "Make sure ROS 2 installed and sourced."
-    )
-    sys.exit(1)
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.image_store import ImageStore
+from soccer_diffusion.dataset.models import (
+    GameState,
+    GameStateInterval,
+    Image,
+    JointCommands,
+    JointStates,
+    Recording,
+    RobotState,
+    Rotation,
+    stamp_to_nanoseconds,
+    stamp_to_seconds_nanoseconds,
+)
+
+# Number of rows fetched from the database at once, the rows of a table are streamed instead of loaded at once
+ROWS_PER_FETCH = 10_000
+# Images are large (~690 KB each), so fewer of them are fetched at once
+IMAGES_PER_FETCH = 32
+
+# Joints written to the joint state and command messages
+JOINT_NAMES: list[str] = [
+    "r_shoulder_pitch",
+    "l_shoulder_pitch",
+    "r_shoulder_roll",
+    "l_shoulder_roll",
+    "r_elbow",
+    "l_elbow",
+    "r_hip_yaw",
+    "l_hip_yaw",
+    "r_hip_roll",
+    "l_hip_roll",
+    "r_hip_pitch",
+    "l_hip_pitch",
+    "r_knee",
+    "l_knee",
+    "r_ankle_pitch",
+    "l_ankle_pitch",
+    "r_ankle_roll",
+    "l_ankle_roll",
+    "head_pan",
+    "head_tilt",
+]
+
+# ROS 2 message definitions of the written messages, including the definitions of their nested messages
+_SEPARATOR = "=" * 80 + "\n"
+_TIME_MSGDEF = "int32 sec\nuint32 nanosec\n"
+_HEADER_MSGDEF = (
+    "builtin_interfaces/Time stamp\nstring frame_id\n" + _SEPARATOR + "MSG: builtin_interfaces/Time\n" + _TIME_MSGDEF
+)
+_HEADER_DEPENDENCY = _SEPARATOR + "MSG: std_msgs/Header\n" + _HEADER_MSGDEF
+MSGDEFS: dict[str, str] = {
+    "std_msgs/msg/String": "string data\n",
+    "sensor_msgs/msg/Image": (
+        "std_msgs/Header header\nuint32 height\nuint32 width\nstring encoding\nuint8 is_bigendian\nuint32 step\n"
+        "uint8[] data\n" + _HEADER_DEPENDENCY
+    ),
+    "geometry_msgs/msg/Quaternion": "float64 x\nfloat64 y\nfloat64 z\nfloat64 w\n",
+    "geometry_msgs/msg/Vector3": "float64 x\nfloat64 y\nfloat64 z\n",
+    "sensor_msgs/msg/JointState": (
+        "std_msgs/Header header\nstring[] name\nfloat64[] position\nfloat64[] velocity\nfloat64[] effort\n"
+        + _HEADER_DEPENDENCY
+    ),
+}
+
+
+class McapWriter:
+    """Writes ROS 2 messages to an mcap file, without requiring a ROS 2 installation."""
+
+    def __init__(self, writer: Writer, msgdefs: dict[str, str] = MSGDEFS):
+        self.writer = writer
+        self.msgdefs = msgdefs
+        self._schemas: dict[str, Schema] = {}
+
+    def write(self, topic: str, datatype: str, message: dict[str, Any], stamp: float) -> None:
+        """Write a message to a topic
+
+        param topic: The topic
+        param datatype: The ROS 2 message type, e.g. "std_msgs/msg/String", which has a definition in `msgdefs`
+        param message: The message as a (nested) dict of its fields
+        param stamp: The time stamp of the message in seconds
+        """
+        schema = self._schemas.get(datatype)
+        if schema is None:
+            schema = self._schemas[datatype] = self.writer.register_msgdef(datatype, self.msgdefs[datatype])
+        self.writer.write_message(topic, schema, message, log_time=stamp_to_nanoseconds(stamp))
 
 
 def get_recording(db_session: Session, recording_id_or_filename: str | int) -> Recording:
@@ -35,12 +114,14 @@ def get_recording(db_session: Session, recording_id_or_filename: str | int) -> R
     if isinstance(recording_id_or_filename, int) or recording_id_or_filename.isdigit():
         # Verify that the recording exists
         recording_id = int(recording_id_or_filename)
-        recording = db_session.query(Recording).get(recording_id)
+        recording = db_session.get(Recording, recording_id)
         if recording is None:
             raise ValueError(f"Recording '{recording_id}' not found")
         return recording
     elif isinstance(recording_id_or_filename, str):
-        recording = db_session.query(Recording).filter(Recording.original_file == recording_id_or_filename).first()
+        recording = db_session.scalars(
+            select(Recording).where(Recording.original_file == recording_id_or_filename).limit(1)
+        ).first()
         if recording is None:
             raise ValueError(f"Recording with original filename '{recording_id_or_filename}' not found")
         return recording
@@ -48,255 +129,269 @@ def get_recording(db_session: Session, recording_id_or_filename: str | int) -> R
         raise TypeError("Recording ID must be an integer or string")
 
 
-def get_writer(output_dir: Path) -> rosbag2_py.SequentialWriter:
+def select_recordings(
+    db_session: Session,
+    recording_ids_or_filenames: list[str],
+    team_name: str | None = None,
+    location: str | None = None,
+    robot_type: str | None = None,
+) -> list[Recording]:
+    """Select recordings by their IDs or original filenames and/or their team, location and robot type
+
+    param db_session: The database session
+    param recording_ids_or_filenames: The recording IDs or original filenames, all recordings if empty
+    param team_name: Only select recordings of this team
+    param location: Only select recordings of this location
+    param robot_type: Only select recordings of this robot type
+    raises ValueError: If a given recording does not exist
+    return: The selected recordings ordered by their ID
+    """
+    query = select(Recording).order_by(Recording._id)
+    if recording_ids_or_filenames:
+        recording_ids = [get_recording(db_session, recording)._id for recording in recording_ids_or_filenames]
+        query = query.where(Recording._id.in_(recording_ids))
+    if team_name is not None:
+        query = query.where(Recording.team_name == team_name)
+    if location is not None:
+        query = query.where(Recording.location == location)
+    if robot_type is not None:
+        query = query.where(Recording.robot_type == robot_type)
+    return list(db_session.scalars(query))
+
+
+def confirm_overwrite(output_dirs: list[Path]) -> None:
+    """Ask the user whether existing output directories should be overwritten and remove them
+
+    param output_dirs: The output directories
+    """
+    existing = [output_dir for output_dir in output_dirs if output_dir.exists()]
+    if not existing:
+        return
+    question = (
+        f"Output directory '{existing[0]}' already exists."
+        if len(existing) == 1
+        else f"{len(existing)} output directories already exist, e.g. '{existing[0]}'."
+    )
+    if not input(f"{question} Overwrite? (y/n): ").lower().startswith("y"):
+        logger.info("Exiting")
+        sys.exit(0)
+    # Remove the existing directories
+    for output_dir in existing:
+        shutil.rmtree(output_dir)
+
+
+def get_writer(output_dir: Path) -> Writer:
     """Get the mcap writer.
+    The mcap file is written to the output directory and named like the files of ROS 2 bags.
 
     param output_dir: The output directory
     return: The mcap writer
     """
-    if output_dir.exists():
-        # Ask the user if they want to overwrite the existing file
-        if not input(f"Output directory '{output_dir}' already exists. Overwrite? (y/n): ").lower().startswith("y"):
-            logger.info("Exiting")
-            sys.exit(0)
-        # Remove the existing directory
-        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True)
+    return Writer(str(output_dir / f"{output_dir.name}_0.mcap"))
+
+
+def stream_rows(db_session: Session, query: Select, rows_per_fetch: int = ROWS_PER_FETCH) -> Iterator[Any]:
+    """Stream the rows of a query in batches, instead of loading all of them into memory
+
+    param db_session: The database session
+    param query: The query
+    param rows_per_fetch: The number of rows fetched at once
+    return: An iterator over the rows
+    """
+    return iter(db_session.execute(query.execution_options(yield_per=rows_per_fetch)))
+
+
+def count_rows(db_session: Session, model: type, recording_id: int) -> int:
+    """Count the rows of a model belonging to a recording
+
+    param db_session: The database session
+    param model: The model
+    param recording_id: The recording ID
+    return: The number of rows
+    """
+    return db_session.scalar(select(func.count()).select_from(model).where(model.recording_id == recording_id))
 
-    writer = rosbag2_py.SequentialWriter()
-    writer.open(
-        rosbag2_py.StorageOptions(uri=str(output_dir), storage_id="mcap"),
-        rosbag2_py.ConverterOptions(
-            input_serialization_format="cdr",
-            output_serialization_format="cdr",
-        ),
-    )
-    return writer
 
+def header(stamp: float, frame_id: str) -> dict[str, Any]:
+    seconds, nanoseconds = stamp_to_seconds_nanoseconds(stamp)
+    return {"stamp": {"sec": seconds, "nanosec": nanoseconds}, "frame_id": frame_id}
 
-def write_recording_info(recording: Recording, writer: rosbag2_py.SequentialWriter) -> None:
+
+def write_recording_info(db_session: Session, recording: Recording, writer: McapWriter) -> None:
     """Write the recording info as a JSON encoded String message to the mcap file
 
+    param db_session: The database session
     param recording: The recording
     param writer: The mcap writer
     """
-    # Create topic
-    writer.create_topic(
-        rosbag2_py.TopicMetadata(name="/recording", type="std_msgs/msg/String", serialization_format="cdr")
-    )
-
-    # Write recording info
     logger.info("Writing recording info")
-    recording_info_msg = String(
-        data=json.dumps(
-            {
-                "id": recording._id,
-                "allow_public": recording.allow_public,
-                "original_file": recording.original_file,
-                "team_name": recording.team_name,
-                "team_color": recording.team_color,
-                "robot_type": recording.robot_type,
-                "start_time": str(recording.start_time),
-                "location": recording.location,
-                "simulated": recording.simulated,
-                "img_width": recording.img_width,
-                "img_height": recording.img_height,
-                "img_width_scaling": recording.img_width_scaling,
-                "img_height_scaling": recording.img_height_scaling,
-                "num_images": len(recording.images),
-                "num_rotations": len(recording.rotations),
-                "num_joint_states": len(recording.joint_states),
-                "num_joint_commands": len(recording.joint_commands),
-                "num_game_states": len(recording.game_states),
-            }
-        )
-    )
-    writer.write("/recording", serialize_message(recording_info_msg), 0)
-
-
-def write_images(recording: Recording, writer: rosbag2_py.SequentialWriter) -> None:
+    info = {
+        "id": recording._id,
+        "allow_public": recording.allow_public,
+        "original_file": recording.original_file,
+        "team_name": recording.team_name,
+        "team_color": recording.team_color,
+        "robot_type": recording.robot_type,
+        "start_time": str(recording.start_time),
+        "location": recording.location,
+        "simulated": recording.simulated,
+        "img_width": recording.img_width,
+        "img_height": recording.img_height,
+        "img_width_scaling": recording.img_width_scaling,
+        "img_height_scaling": recording.img_height_scaling,
+        "num_images": count_rows(db_session, Image, recording._id),
+        "num_rotations": count_rows(db_session, Rotation, recording._id),
+        "num_joint_states": count_rows(db_session, JointStates, recording._id),
+        "num_joint_commands": count_rows(db_session, JointCommands, recording._id),
+        "num_game_states": count_rows(db_session, GameState, recording._id),
+    }
+    writer.write("/recording", "std_msgs/msg/String", {"data": json.dumps(info)}, 0.0)
+
+
+def write_images(db_session: Session, recording: Recording, writer: McapWriter) -> None:
     """Write the images to the mcap file
 
+    param db_session: The database session
     param recording: The recording
     param writer: The mcap writer
     """
-    # Create topic
-    writer.create_topic(
-        rosbag2_py.TopicMetadata(name="/image", type="sensor_msgs/msg/Image", serialization_format="cdr")
-    )
-
-    # Write images
     logger.info("Writing images")
-    for image in recording.images:
-        seconds, nanoseconds = stamp_to_seconds_nanoseconds(image.stamp)
-        image_msg = Image(
-            header=Header(stamp=Time(sec=seconds, nanosec=nanoseconds), frame_id="camera_optical"),
-            height=recording.img_height,
-            width=recording.img_width,
-            encoding="rgb8",
-            is_bigendian=0,
-            step=recording.img_width * 3,
-            data=image.data,
+    # Duplicate images reference the image containing their data
+    reference = aliased(Image)
+    query = (
+        select(
+            Image.stamp,
+            func.coalesce(reference.data, Image.data),
+            func.coalesce(reference.blob_offset, Image.blob_offset),
+            func.coalesce(reference.blob_size, Image.blob_size),
         )
-        writer.write("/image", serialize_message(image_msg), stamp_to_nanoseconds(image.stamp))
-
-
-def write_rotations(
-    recording: Recording,
-    writer: rosbag2_py.SequentialWriter,
-) -> None:
+        .outerjoin(reference, reference._id == Image.reference_id)
+        .where(Image.recording_id == recording._id)
+        .order_by(Image.stamp)
+    )
+    store = ImageStore.of(db_session)
+    for stamp, data, blob_offset, blob_size in stream_rows(db_session, query, IMAGES_PER_FETCH):
+        # Moved images are read from the image store
+        if blob_offset is not None:
+            data = store.read(recording._id, blob_offset, blob_size)
+        image_msg = {
+            "header": header(stamp, "camera_optical"),
+            "height": recording.img_height,
+            "width": recording.img_width,
+            "encoding": "rgb8",
+            "is_bigendian": 0,
+            "step": recording.img_width * 3,
+            "data": data,
+        }
+        writer.write("/image", "sensor_msgs/msg/Image", image_msg, stamp)
+
+
+def write_rotations(db_session: Session, recording: Recording, writer: McapWriter) -> None:
     """Write the rotations to the mcap file
 
+    param db_session: The database session
     param recording: The recording
     param writer: The mcap writer
     """
-    # Create topics
-    writer.create_topic(
-        rosbag2_py.TopicMetadata(name="/rotation", type="geometry_msgs/msg/Quaternion", serialization_format="cdr")
-    )
-    writer.create_topic(
-        rosbag2_py.TopicMetadata(name="/rotation/euler", type="geometry_msgs/msg/Vector3", serialization_format="cdr")
-    )
-
-    # Write rotations
     logger.info("Writing rotations")
-    for rotation in recording.rotations:
-        rotation_msg = Quaternion(
-            x=rotation.x,
-            y=rotation.y,
-            z=rotation.z,
-            w=rotation.w,
-        )
-        writer.write("/rotation", serialize_message(rotation_msg), stamp_to_nanoseconds(rotation.stamp))
+    query = (
+        select(Rotation.stamp, Rotation.x, Rotation.y, Rotation.z, Rotation.w)
+        .where(Rotation.recording_id == recording._id)
+        .order_by(Rotation.stamp)
+    )
+    for stamp, x, y, z, w in stream_rows(db_session, query):
+        writer.write("/rotation", "geometry_msgs/msg/Quaternion", {"x": x, "y": y, "z": z, "w": w}, stamp)
 
         # Convert quaternion to euler angles
-        ax, ay, az = quat2euler([rotation.w, rotation.x, rotation.y, rotation.z], axes="sxyz")
-        euler = Vector3(
-            x=ax,
-            y=ay,
-            z=az,
-        )
-        writer.write("/rotation/euler", serialize_message(euler), stamp_to_nanoseconds(rotation.stamp))
+        ax, ay, az = quat2euler([w, x, y, z], axes="sxyz")
+        writer.write("/rotation/euler", "geometry_msgs/msg/Vector3", {"x": ax, "y": ay, "z": az}, stamp)
 
 
-def write_joint_states(
-    recording: Recording,
-    writer: rosbag2_py.SequentialWriter,
+def write_joints(
+    db_session: Session, recording: Recording, writer: McapWriter, model: type[JointStates | JointCommands], topic: str
 ) -> None:
-    """Write the joint states to the mcap file
+    """Write the joint states or commands as JointState messages to the mcap file
 
+    param db_session: The database session
     param recording: The recording
     param writer: The mcap writer
+    param model: JointStates or JointCommands
+    param topic: The topic of the messages
     """
-    # Create topic
-    writer.create_topic(
-        rosbag2_py.TopicMetadata(name="/joint_states", type="sensor_msgs/msg/JointState", serialization_format="cdr")
+    query = (
+        select(model.stamp, *(getattr(model, name) for name in JOINT_NAMES))
+        .where(model.recording_id == recording._id)
+        .order_by(model.stamp)
     )
+    zeros = [0.0] * len(JOINT_NAMES)
+    for stamp, *positions in stream_rows(db_session, query):
+        joint_state_msg = {
+            "header": header(stamp, "base_link"),
+            "name": JOINT_NAMES,
+            "position": positions,
+            "velocity": zeros,
+            "effort": zeros,
+        }
+        writer.write(topic, "sensor_msgs/msg/JointState", joint_state_msg, stamp)
+
+
+def write_joint_states(db_session: Session, recording: Recording, writer: McapWriter) -> None:
+    """Write the joint states to the mcap file
 
-    # Write joint states
+    param db_session: The database session
+    param recording: The recording
+    param writer: The mcap writer
+    """
     logger.info("Writing joint states")
-    for joint_state in recording.joint_states:
-        seconds, nanoseconds = stamp_to_seconds_nanoseconds(joint_state.stamp)
-        joints: list[tuple[str, float]] = [
-            ("r_shoulder_pitch", joint_state.r_shoulder_pitch),
-            ("l_shoulder_pitch", joint_state.l_shoulder_pitch),
-            ("r_shoulder_roll", joint_state.r_shoulder_roll),
-            ("l_shoulder_roll", joint_state.l_shoulder_roll),
-            ("r_elbow", joint_state.r_elbow),
-            ("l_elbow", joint_state.l_elbow),
-            ("r_hip_yaw", joint_state.r_hip_yaw),
-            ("l_hip_yaw", joint_state.l_hip_yaw),
-            ("r_hip_roll", joint_state.r_hip_roll),
-            ("l_hip_roll", joint_state.l_hip_roll),
-            ("r_hip_pitch", joint_state.r_hip_pitch),
-            ("l_hip_pitch", joint_state.l_hip_pitch),
-            ("r_knee", joint_state.r_knee),
-            ("l_knee", joint_state.l_knee),
-            ("r_ankle_pitch", joint_state.r_ankle_pitch),
-            ("l_ankle_pitch", joint_state.l_ankle_pitch),
-            ("r_ankle_roll", joint_state.r_ankle_roll),
-            ("l_ankle_roll", joint_state.l_ankle_roll),
-            ("head_pan", joint_state.head_pan),
-            ("head_tilt", joint_state.head_tilt),
-        ]
-        joint_state_msg = JointState(
-            header=Header(stamp=Time(sec=seconds, nanosec=nanoseconds), frame_id="base_link"),
-            name=[name for name, _ in joints],
-            position=[position for _, position in joints],
-            velocity=[0.0] * len(joints),
-            effort=[0.0] * len(joints),
-        )
-        writer.write("/joint_states", serialize_message(joint_state_msg), stamp_to_nanoseconds(joint_state.stamp))
+    write_joints(db_session, recording, writer, JointStates, "/joint_states")
 
 
-def write_joint_commands(
-    recording: Recording,
-    writer: rosbag2_py.SequentialWriter,
-) -> None:
+def write_joint_commands(db_session: Session, recording: Recording, writer: McapWriter) -> None:
     """Write the joint commands to the mcap file
 
+    param db_session: The database session
     param recording: The recording
     param writer: The mcap writer
     """
-    # Create topic
-    writer.create_topic(
-        rosbag2_py.TopicMetadata(name="/joint_commands", type="sensor_msgs/msg/JointState", serialization_format="cdr")
-    )
-
-    # Write joint commands
     logger.info("Writing joint commands")
-    for joint_command in recording.joint_commands:
-        seconds, nanoseconds = stamp_to_seconds_nanoseconds(joint_command.stamp)
-        joints: list[tuple[str, float | None]] = [
-            ("r_shoulder_pitch", joint_command.r_shoulder_pitch),
-            ("l_shoulder_pitch", joint_command.l_shoulder_pitch),
-            ("r_shoulder_roll", joint_command.r_shoulder_roll),
-            ("l_shoulder_roll", joint_command.l_shoulder_roll),
-            ("r_elbow", joint_command.r_elbow),
-            ("l_elbow", joint_command.l_elbow),
-            ("r_hip_yaw", joint_command.r_hip_yaw),
-            ("l_hip_yaw", joint_command.l_hip_yaw),
-            ("r_hip_roll", joint_command.r_hip_roll),
-            ("l_hip_roll", joint_command.l_hip_roll),
-            ("r_hip_pitch", joint_command.r_hip_pitch),
-            ("l_hip_pitch", joint_command.l_hip_pitch),
-            ("r_knee", joint_command.r_knee),
-            ("l_knee", joint_command.l_knee),
-            ("r_ankle_pitch", joint_command.r_ankle_pitch),
-            ("l_ankle_pitch", joint_command.l_ankle_pitch),
-            ("r_ankle_roll", joint_command.r_ankle_roll),
-            ("l_ankle_roll", joint_command.l_ankle_roll),
-            ("head_pan", joint_command.head_pan),
-            ("head_tilt", joint_command.head_tilt),
-        ]
-        joint_command_msg = JointState(
-            header=Header(stamp=Time(sec=seconds, nanosec=nanoseconds), frame_id="base_link"),
-            name=[name for name, _ in joints],
-            position=[position for _, position in joints],
-            velocity=[0.0] * len(joints),
-            effort=[0.0] * len(joints),
-        )
-        writer.write("/joint_commands", serialize_message(joint_command_msg), stamp_to_nanoseconds(joint_command.stamp))
+    write_joints(db_session, recording, writer, JointCommands, "/joint_commands")
 
 
-def write_game_states(
-    recording: Recording,
-    writer: rosbag2_py.SequentialWriter,
-) -> None:
+def write_game_states(db_session: Session, recording: Recording, writer: McapWriter) -> None:
     """Write the game states to the mcap file
 
+    param db_session: The database session
     param recording: The recording
     param writer: The mcap writer
     """
-    # Create topic
-    writer.create_topic(
-        rosbag2_py.TopicMetadata(name="/game_state", type="std_msgs/msg/String", serialization_format="cdr")
+    logger.info("Writing game states")
+    # Only changes of the game state are written, as the game states are stored as intervals of the same state
+    query = (
+        select(GameStateInterval.start_stamp, GameStateInterval.state_code)
+        .where(GameStateInterval.recording_id == recording._id)
+        .order_by(GameStateInterval.start_stamp, GameStateInterval._id)
     )
+    for stamp, state_code in stream_rows(db_session, query):
+        writer.write("/game_state", "std_msgs/msg/String", {"data": RobotState.from_int(state_code).value}, stamp)
 
-    # Write game states
-    logger.info("Writing game states")
-    for game_state in recording.game_states:
-        game_state_msg = String(data=game_state.state)
-        writer.write("/game_state", serialize_message(game_state_msg), stamp_to_nanoseconds(game_state.stamp))
+
+def write_mcap(db_session: Session, recording: Recording, output: Path) -> None:
+    """Write all data of a recording to an mcap file.
+    The rows of the recording are streamed from the database, so the memory usage does not grow with its length.
+
+    param db_session: The database session
+    param recording: The recording
+    param output: The output directory of the mcap file
+    """
+    with get_writer(output) as mcap_writer:
+        writer = McapWriter(mcap_writer)
+        write_recording_info(db_session, recording, writer)
+        write_images(db_session, recording, writer)
+        write_rotations(db_session, recording, writer)
+        write_joint_states(db_session, recording, writer)
+        write_joint_commands(db_session, recording, writer)
+        write_game_states(db_session, recording, writer)
 
 
 def recording2mcap(db_session: Session, recording_id_or_filename: str | int, output: Path) -> None:
@@ -304,17 +399,61 @@ def recording2mcap(db_session: Session, recording_id_or_filename: str | int, out
 
     param db: The database
     param recording_id_or_filename: The recording ID or original filename
-    param output: The output mcap file
+    param output: The output directory of the mcap file
     """
     recording = get_recording(db_session, recording_id_or_filename)
     logger.info(f"Converting recording '{recording._id}' to mcap file '{output}'")
 
-    writer = get_writer(output)
-    write_recording_info(recording, writer)
-    write_images(recording, writer)
-    write_rotations(recording, writer)
-    write_joint_states(recording, writer)
-    write_joint_commands(recording, writer)
-    write_game_states(recording, writer)
+    confirm_overwrite([output])
+    write_mcap(db_session, recording, output)
 
     logger.info(f"Recording '{recording._id}' converted to mcap file '{output}'")
+
+
+def export_recording(db_path: Path, recording_id: int, output: Path) -> tuple[int, float, int]:
+    """Convert a recording to an mcap file in a worker process, using its own read-only database connection
+
+    param db_path: Path to the database
+    param recording_id: The recording ID
+    param output: The output directory of the mcap file
+    return: The recording ID, the duration of the conversion in seconds and the size of the mcap file in bytes
+    """
+    start = time.perf_counter()
+    db = Database(db_path, read_only=True).create_session(create_schema=False)
+    recording = get_recording(db.session, recording_id)
+    write_mcap(db.session, recording, output)
+    db.close_session()
+    size = sum(file.stat().st_size for file in output.iterdir())
+    return recording_id, time.perf_counter() - start, size
+
+
+def recordings2mcap(db_path: Path, recordings: list[Recording], output_dir: Path, workers: int) -> None:
+    """Convert multiple recordings to mcap files in parallel worker processes.
+    Each recording is written to the directory 'recording_<ID>' in the output directory.
+
+    param db_path: Path to the database
+    param recordings: The recordings, e.g. selected with `select_recordings`
+    param output_dir: The output directory
+    param workers: Number of worker processes
+    """
+    outputs = {recording._id: output_dir / f"recording_{recording._id}" for recording in recordings}
+    confirm_overwrite(list(outputs.values()))
+    logger.info(f"Converting {len(outputs)} recordings to mcap files in '{output_dir}' with {workers} workers")
+
+    start = time.perf_counter()
+    total_size = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(export_recording, db_path, recording_id, output) for recording_id, output in outputs.items()
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Converting recordings", unit="recording"):
+            recording_id, seconds, size = future.result()
+            total_size += size
+            logger.info(
+                f"Recording '{recording_id}' converted to '{outputs[recording_id]}' "
+                f"in {seconds:.1f} s ({size / 2**20:.0f} MiB)"
+            )
+
+    logger.info(
+        f"{len(outputs)} recordings converted in {time.perf_counter() - start:.1f} s ({total_size / 2**20:.0f} MiB)"
+    )
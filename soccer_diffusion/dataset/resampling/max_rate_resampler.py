@@ -1,3 +1,5 @@
+from typing import Any
+
 from soccer_diffusion.dataset.imports.data import InputData
 from soccer_diffusion.dataset.resampling.resampler import Resampler, Sample
 
@@ -17,6 +19,23 @@ class MaxRateResampler(Resampler):
         else:
             return self._samples_until(data, relative_timestamp)
 
+    def get_state(self) -> dict[str, Any]:
+        if self.last_sample_step_timestamp is None:
+            return {}
+        # The timestamps may be NumPy floats, which are converted to plain floats
+        return {
+            "last_sampled_timestamp": float(self.last_sampled_timestamp),
+            "last_sample_step_timestamp": float(self.last_sample_step_timestamp),
+        }
+
+    def set_state(self, state: dict[str, Any], data: InputData) -> None:
+        if not state:
+            return
+        self.last_sampled_timestamp = state["last_sampled_timestamp"]
+        self.last_sample_step_timestamp = state["last_sample_step_timestamp"]
+        # The input data DTO is updated in place during a conversion, so the last sampled data is the current one
+        self.last_sampled_data = data
+
     def _initial_sample(self, data: InputData, relative_timestamp: float) -> Sample[InputData]:
         self.last_sampled_data = data
         self.last_sampled_timestamp = relative_timestamp
@@ -1,3 +1,5 @@
+from typing import Any
+
 from soccer_diffusion.dataset.imports.data import InputData
 from soccer_diffusion.dataset.resampling.resampler import Resampler, Sample
 
@@ -10,12 +12,31 @@ class PreviousInterpolationResampler(Resampler):
         self.last_received_data = None
         self.last_sampled_data = None
         self.last_sample_step_timestamp = None
+        # Number of samples on the grid so far, which is the tick of the next sample
+        self.num_samples = 0
 
     def resample(self, data: InputData, relative_timestamp: float) -> list[Sample[InputData]]:
         if self.last_sample_step_timestamp is None:
-            return [self._initial_sample(data, relative_timestamp)]
+            samples = [self._initial_sample(data, relative_timestamp)]
         else:
-            return self._samples_until(data, relative_timestamp)
+            samples = self._samples_until(data, relative_timestamp)
+        self.num_samples += len(samples)
+        return samples
+
+    def get_state(self) -> dict[str, Any]:
+        if self.last_sample_step_timestamp is None:
+            return {}
+        # The timestamp may be a NumPy float, which is converted to a plain float
+        return {"last_sample_step_timestamp": float(self.last_sample_step_timestamp), "num_samples": self.num_samples}
+
+    def set_state(self, state: dict[str, Any], data: InputData) -> None:
+        if not state:
+            return
+        self.last_sample_step_timestamp = state["last_sample_step_timestamp"]
+        self.num_samples = state["num_samples"]
+        # The input data DTO is updated in place during a conversion, so the last received data is the current one
+        self.last_received_data = data
+        self.last_sampled_data = data
 
     def _initial_sample(self, data: InputData, relative_timestamp: float) -> Sample[InputData]:
         self.last_received_data = data
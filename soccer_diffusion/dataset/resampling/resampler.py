@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Generic, TypeVar
+from typing import Any, Generic, TypeVar
 
 from soccer_diffusion.dataset.imports.data import InputData
 
@@ -30,3 +30,22 @@ class Resampler(ABC):
             list[Sample[InputData]]: A list of samples, where each sample contains resampled data and a timestamp
         """
         pass
+
+    def get_state(self) -> dict[str, Any]:
+        """
+        Get the resampling state as plain values, to resume a conversion from a checkpoint.
+
+        Returns:
+            dict[str, Any]: The resampling state, which is empty before the first sample or for stateless resamplers
+        """
+        return {}
+
+    def set_state(self, state: dict[str, Any], data: InputData) -> None:
+        """
+        Restore the resampling state of a checkpoint.
+
+        Args:
+            state (dict[str, Any]): The resampling state returned by `get_state`
+            data (InputData): The restored input data DTO, which the resampler has received last
+        """
+        assert not state, f"{type(self).__name__} is stateless and can not restore a resampling state"
@@ -0,0 +1,270 @@
+import hashlib
+import shutil
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import delete, func, inspect, select
+from sqlalchemy.orm import Session
+
+from soccer_diffusion.dataset import logger
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.image_store import ImageStore, image_store_dir
+from soccer_diffusion.dataset.models import (
+    Base,
+    ImportProgress,
+    JointCommands,
+    JointCommandsChunk,
+    Recording,
+    Shard,
+)
+
+# Name of the catalog database in the directory of a sharded dataset
+CATALOG_NAME = "catalog.sqlite3"
+# Directory of the shards, relative to the catalog
+SHARDS_DIR = "shards"
+# Number of shard connections kept open by a reader, e.g. in each DataLoader worker
+MAX_OPEN_SHARDS = 64
+
+
+def shard_path(catalog_path: Path, name: str) -> Path:
+    """Returns the path of a shard of a catalog.
+
+    :param catalog_path: Path of the catalog database
+    :param name: Name of the shard, without its suffix
+    :return: The path of the shard in the shard directory next to the catalog
+    """
+    return catalog_path.parent / SHARDS_DIR / f"{name}.sqlite3"
+
+
+def import_shard_path(catalog_path: Path, file_path: Path) -> Path:
+    """Returns the path of the shard a file is imported into,
+    which is the same for each import of the file, so an interrupted import is resumed in its shard.
+
+    :param catalog_path: Path of the catalog database
+    :param file_path: The imported file
+    :return: The path of the shard
+    """
+    # Log files of different games often have the same name, e.g. "game.log" in the directory of the game
+    path_hash = hashlib.sha1(str(file_path.resolve()).encode()).hexdigest()[:8]
+    return shard_path(catalog_path, f"{file_path.stem}-{path_hash}")
+
+
+def is_catalog(connection: sqlite3.Connection) -> bool:
+    """Returns whether a database is the catalog of a sharded dataset, i.e. it contains shards.
+
+    :param connection: The database connection
+    :return: Whether the database is a catalog
+    """
+    if connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Shard'").fetchone() is None:
+        return False
+    return connection.execute("SELECT 1 FROM Shard LIMIT 1").fetchone() is not None
+
+
+@dataclass
+class ShardLocation:
+    path: Path
+    shard_recording_id: int
+    num_samples: int
+
+
+def read_catalog(connection: sqlite3.Connection, catalog_path: Path) -> dict[int, ShardLocation]:
+    """Reads the locations of the recordings of a catalog, whose shards exist.
+    Shards, which are missing, e.g. as only a subset was copied to the machine, are skipped.
+
+    :param connection: The connection to the catalog
+    :param catalog_path: Path of the catalog database
+    :return: The location of each recording by its id in the catalog
+    """
+    locations = {}
+    missing = 0
+    for recording_id, path, shard_recording_id, num_samples in connection.execute(
+        "SELECT recording_id, path, shard_recording_id, num_samples FROM Shard ORDER BY recording_id"
+    ):
+        location = ShardLocation(catalog_path.parent / path, shard_recording_id, num_samples)
+        if location.path.exists():
+            locations[recording_id] = location
+        else:
+            missing += 1
+    if missing:
+        logger.info(f"Skipping {missing} recordings of the catalog, whose shards do not exist")
+    return locations
+
+
+def _count_samples(session: Session, recording_id: int) -> int:
+    # The rows may have been dropped after chunking them
+    num_rows = session.scalar(select(func.count()).where(JointCommands.recording_id == recording_id))
+    num_chunked = session.scalar(
+        select(func.coalesce(func.sum(JointCommandsChunk.num_samples), 0)).where(
+            JointCommandsChunk.recording_id == recording_id
+        )
+    )
+    return max(num_rows, num_chunked)
+
+
+def add_shards(catalog: Database, shard_paths: Iterable[Path]) -> list[int]:
+    """Registers the completely imported recordings of shards in a catalog, replacing earlier registrations of them.
+
+    :param catalog: The catalog database
+    :param shard_paths: Paths of the shards, which are in the directory of the catalog or below it
+    :return: Ids of the registered recordings in the catalog
+    """
+    columns = [column.key for column in inspect(Recording).column_attrs if not column.expression.primary_key]
+    recording_ids = []
+    for path in shard_paths:
+        relative_path = str(Path(path).resolve().relative_to(Path(catalog.db_path).resolve().parent))
+        shard = Database(Path(path)).create_session(create_schema=False)
+        try:
+            recordings = shard.session.scalars(
+                select(Recording)
+                .where(Recording._id.not_in(select(ImportProgress.recording_id)))
+                .order_by(Recording._id)
+            ).all()
+            metadata = {
+                recording._id: {column: getattr(recording, column) for column in columns} for recording in recordings
+            }
+            num_samples = {recording._id: _count_samples(shard.session, recording._id) for recording in recordings}
+        finally:
+            shard.close_session().engine.dispose()
+        # Recordings of earlier registrations may have been replaced by a new import
+        _remove_shard(catalog.session, relative_path)
+
+        for shard_recording_id, values in metadata.items():
+            recording = Recording(**values)
+            catalog.session.add(recording)
+            catalog.session.flush()
+            catalog.session.add(
+                Shard(
+                    recording_id=recording._id,
+                    path=relative_path,
+                    shard_recording_id=shard_recording_id,
+                    num_samples=num_samples[shard_recording_id],
+                )
+            )
+            recording_ids.append(recording._id)
+        catalog.session.commit()
+        logger.info(f"Registered {len(metadata)} recordings of shard '{relative_path}'")
+    return recording_ids
+
+
+def _remove_shard(session: Session, relative_path: str) -> None:
+    recording_ids = session.scalars(select(Shard.recording_id).where(Shard.path == relative_path)).all()
+    session.execute(delete(Shard).where(Shard.path == relative_path))
+    session.execute(delete(Recording).where(Recording._id.in_(recording_ids)))
+
+
+def shard_database(db: Database, output_dir: Path, recording_ids: list[int] | None = None) -> Path:
+    """Splits a database into a catalog and one shard per recording, which keeps its id.
+    Recordings, whose import is not complete, are not sharded.
+
+    :param db: The database to split
+    :param output_dir: Directory of the catalog, the shards are written to its "shards" subdirectory
+    :param recording_ids: Ids of the recordings to shard, all recordings if None
+    :return: The path of the catalog
+    """
+    query = select(Recording._id).where(Recording._id.not_in(select(ImportProgress.recording_id)))
+    if recording_ids is not None:
+        query = query.where(Recording._id.in_(recording_ids))
+    recording_ids = db.session.scalars(query.order_by(Recording._id)).all()
+
+    catalog_path = output_dir / CATALOG_NAME
+    (output_dir / SHARDS_DIR).mkdir(parents=True, exist_ok=True)
+    catalog = Database(catalog_path).create_session(create_schema=True)
+    source_store = ImageStore(image_store_dir(db.db_path))
+    logger.info(f"Sharding {len(recording_ids)} recordings into '{output_dir}'...")
+    start = time.perf_counter()
+
+    shard_paths = []
+    for recording_id in recording_ids:
+        path = shard_path(catalog_path, f"recording_{recording_id}")
+        if path.exists():
+            raise FileExistsError(f"Shard '{path}' already exists")
+        # Creates the schema of the shard
+        Database(path).create_session(create_schema=True).close_session().engine.dispose()
+        _copy_recording(db.db_path, path, recording_id)
+        # Moved images are copied with the file of their recording in the image store
+        if source_store.path(recording_id).exists():
+            image_store_dir(path).mkdir()
+            shutil.copyfile(source_store.path(recording_id), ImageStore(image_store_dir(path)).path(recording_id))
+        shard_paths.append(path)
+        logger.debug(f"Wrote recording {recording_id} to '{path}'")
+
+    add_shards(catalog, shard_paths)
+    # Closing the last connection to a database checkpoints its write-ahead log into the database file,
+    # so the shards can be copied without it
+    catalog.close_session().engine.dispose()
+    logger.info(f"Sharded {len(recording_ids)} recordings in {time.perf_counter() - start:.1f} s")
+    return catalog_path
+
+
+def _copy_recording(db_path: Path, shard_path: Path, recording_id: int) -> None:
+    with closing(sqlite3.connect(db_path)) as connection:
+        connection.execute("ATTACH DATABASE ? AS shard", (str(shard_path),))
+        for table in Base.metadata.sorted_tables:
+            if table.name in (Shard.__tablename__, ImportProgress.__tablename__):
+                continue
+            # The columns may be in a different order, e.g. if they are added by migrations
+            columns = ", ".join(f'"{column.name}"' for column in table.columns)
+            key = "_id" if table.name == Recording.__tablename__ else "recording_id"
+            connection.execute(
+                f'INSERT INTO shard."{table.name}" ({columns}) '
+                f'SELECT {columns} FROM main."{table.name}" WHERE {key} = ?',
+                (recording_id,),
+            )
+        connection.commit()
+        connection.execute("DETACH DATABASE shard")
+
+
+class ShardConnections:
+    """Lazily opened connections to the shards of the recordings of a catalog, for reading them.
+    The least recently used connections are closed, if more than `max_open` shards are read.
+    """
+
+    def __init__(
+        self,
+        locations: dict[int, ShardLocation],
+        connect: Callable[[Path], sqlite3.Connection],
+        max_open: int = MAX_OPEN_SHARDS,
+    ):
+        """
+        :param locations: The location of each recording by its id in the catalog
+        :param connect: Opens a connection to a shard, it must be picklable to be used by DataLoader workers
+        :param max_open: Number of shards kept open
+        """
+        self.locations = locations
+        self.connect = connect
+        self.max_open = max_open
+        self._connections: OrderedDict[Path, tuple[sqlite3.Connection, ImageStore]] = OrderedDict()
+
+    def get(self, recording_id: int) -> tuple[sqlite3.Connection, ImageStore, int]:
+        """Returns the connection and image store of the shard of a recording.
+
+        :param recording_id: Id of the recording in the catalog
+        :return: The connection, the image store and the id of the recording in its shard
+        """
+        location = self.locations[recording_id]
+        if location.path in self._connections:
+            self._connections.move_to_end(location.path)
+        else:
+            connection = self.connect(location.path)
+            self._connections[location.path] = (connection, ImageStore.of(connection))
+            if len(self._connections) > self.max_open:
+                _, (oldest, oldest_store) = self._connections.popitem(last=False)
+                oldest_store.close()
+                oldest.close()
+        connection, image_store = self._connections[location.path]
+        return connection, image_store, location.shard_recording_id
+
+    def close(self) -> None:
+        for connection, image_store in self._connections.values():
+            image_store.close()
+            connection.close()
+        self._connections.clear()
+
+    def __getstate__(self) -> dict:
+        # Connections are not valid in other processes, e.g. DataLoader workers
+        return {**self.__dict__, "_connections": OrderedDict()}
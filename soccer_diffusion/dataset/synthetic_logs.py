@@ -0,0 +1,464 @@
+import heapq
+import io
+import json
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+from mcap_ros2.writer import Writer
+from PIL import Image
+from tqdm import tqdm
+
+from soccer_diffusion.dataset import logger
+from soccer_diffusion.dataset.dummy_data import NUM_IMAGE_TEMPLATES, generate_test_image
+from soccer_diffusion.dataset.imports.frame_cache import CacheFrame, FrameCache, cache_key
+from soccer_diffusion.dataset.imports.strategies.b_human import CACHE_VERSION, Representation, Thread
+from soccer_diffusion.dataset.recording2mcap import MSGDEFS, McapWriter, header
+
+# Joints of the Wolfgang-OP, as they are named in the /joint_states and /DynamixelController/command messages
+BIT_BOTS_JOINT_NAMES: list[str] = [
+    "HeadPan",
+    "HeadTilt",
+    "LAnklePitch",
+    "LAnkleRoll",
+    "LElbow",
+    "LHipPitch",
+    "LHipRoll",
+    "LHipYaw",
+    "LKnee",
+    "LShoulderPitch",
+    "LShoulderRoll",
+    "RAnklePitch",
+    "RAnkleRoll",
+    "RElbow",
+    "RHipPitch",
+    "RHipRoll",
+    "RHipYaw",
+    "RKnee",
+    "RShoulderPitch",
+    "RShoulderRoll",
+]
+
+# Joints of the NAO, as they are named in the JointRequest and JointSensorData representations
+B_HUMAN_JOINT_NAMES: list[str] = [
+    "headYaw",
+    "headPitch",
+    "lShoulderPitch",
+    "lShoulderRoll",
+    "lElbowYaw",
+    "lElbowRoll",
+    "lWristYaw",
+    "lHand",
+    "rShoulderPitch",
+    "rShoulderRoll",
+    "rElbowYaw",
+    "rElbowRoll",
+    "rWristYaw",
+    "rHand",
+    "lHipYawPitch",
+    "lHipRoll",
+    "lHipPitch",
+    "lKneePitch",
+    "lAnklePitch",
+    "lAnkleRoll",
+    "rHipYawPitch",
+    "rHipRoll",
+    "rHipPitch",
+    "rKneePitch",
+    "rAnklePitch",
+    "rAnkleRoll",
+]
+
+# Phases of a synthetic game: (start as fraction of the duration, Bit-Bots game state, B-Human state, penalized)
+# The game states are the GameStateMessage values of the Bit-Bots and the State values of the B-Human game state.
+GAME_PHASES: list[tuple[float, int, int, bool]] = [
+    (0.0, 0, 1, False),  # Initial, standby
+    (0.05, 1, 5, False),  # Ready, setupOwnKickOff
+    (0.1, 2, 7, False),  # Set, waitForOwnKickOff
+    (0.15, 3, 4, False),  # Playing
+    (0.5, 3, 4, True),  # Playing, but the robot is penalized
+    (0.55, 3, 4, False),  # Playing
+    (0.95, 4, 2, False),  # Finished, afterHalf
+]
+# B-Human player states of active and penalized (penalizedManual) robots
+B_HUMAN_PLAYER_STATES: dict[bool, int] = {False: 15, True: 2}
+# B-Human logs JPEGImage timestamps with an offset of about 25 days to all other times
+B_HUMAN_JPEG_IMAGE_DATE_OFFSET_MS = 25 * 24 * 60 * 60 * 1000
+
+# ROS 2 definitions of the nested messages, which are not written by recording2mcap
+_SEPARATOR = "=" * 80 + "\n"
+_DEFINITIONS: dict[str, str] = {
+    "builtin_interfaces/Time": "int32 sec\nuint32 nanosec\n",
+    "std_msgs/Header": "builtin_interfaces/Time stamp\nstring frame_id\n",
+    "geometry_msgs/Quaternion": MSGDEFS["geometry_msgs/msg/Quaternion"],
+    "geometry_msgs/Vector3": MSGDEFS["geometry_msgs/msg/Vector3"],
+    "geometry_msgs/Transform": "geometry_msgs/Vector3 translation\ngeometry_msgs/Quaternion rotation\n",
+    "geometry_msgs/TransformStamped": (
+        "std_msgs/Header header\nstring child_frame_id\ngeometry_msgs/Transform transform\n"
+    ),
+}
+
+
+def _msgdef(definition: str, *dependencies: str) -> str:
+    return definition + "".join(f"{_SEPARATOR}MSG: {name}\n{_DEFINITIONS[name]}" for name in dependencies)
+
+
+_STAMPED = ("std_msgs/Header", "builtin_interfaces/Time")
+BIT_BOTS_MSGDEFS: dict[str, str] = MSGDEFS | {
+    "bitbots_msgs/msg/JointCommand": _msgdef(
+        "std_msgs/Header header\nstring[] joint_names\nfloat64[] positions\nfloat64[] velocities\n"
+        "float64[] accelerations\nfloat64[] max_currents\n",
+        *_STAMPED,
+    ),
+    "sensor_msgs/msg/Imu": _msgdef(
+        "std_msgs/Header header\ngeometry_msgs/Quaternion orientation\nfloat64[9] orientation_covariance\n"
+        "geometry_msgs/Vector3 angular_velocity\nfloat64[9] angular_velocity_covariance\n"
+        "geometry_msgs/Vector3 linear_acceleration\nfloat64[9] linear_acceleration_covariance\n",
+        *_STAMPED,
+        "geometry_msgs/Quaternion",
+        "geometry_msgs/Vector3",
+    ),
+    "tf2_msgs/msg/TFMessage": _msgdef(
+        "geometry_msgs/TransformStamped[] transforms\n",
+        "geometry_msgs/TransformStamped",
+        *_STAMPED,
+        "geometry_msgs/Transform",
+        "geometry_msgs/Vector3",
+        "geometry_msgs/Quaternion",
+    ),
+    "game_controller_hl_interfaces/msg/GameState": _msgdef(
+        "std_msgs/Header header\nuint8 game_state\nbool penalized\nuint8 team_color\n", *_STAMPED
+    ),
+}
+
+
+@dataclass
+class BitBotsLogConfig:
+    """Contents of a synthetic Bit-Bots recording, the defaults resemble a recording of a Wolfgang-OP."""
+
+    duration: float = 60.0  # Seconds
+    joint_state_rate: float = 200.0  # Hz of /joint_states
+    joint_command_rate: float = 200.0  # Hz of /DynamixelController/command
+    imu_rate: float = 200.0  # Hz of /imu/data, without IMU data the rotation is read from /tf
+    tf_rate: float = 100.0  # Hz of /tf
+    game_state_rate: float = 2.0  # Hz of /gamestate
+    camera_rate: float = 10.0  # Hz of /camera/image_to_record
+    image_width: int = 640
+    image_height: int = 480
+    start_time: datetime = datetime(2024, 7, 20, 12)
+    seed: int | None = None
+
+
+@dataclass
+class BHumanLogConfig:
+    """Contents of a synthetic B-Human log, the defaults resemble a log of a NAO6."""
+
+    duration: float = 60.0  # Seconds
+    motion_rate: float = 1000 / 12  # Hz of the Motion frames with the joint and inertial sensor data
+    camera_rate: float = 30.0  # Hz of the frames of each camera thread (Upper and Lower)
+    image_width: int = 640  # Resolution of the upper camera, the lower camera has half the resolution
+    image_height: int = 480
+    seed: int | None = None
+
+
+def _stamps(rate: float, duration: float, rng: np.random.Generator) -> np.ndarray:
+    """Returns the stamps [s] of messages with the rate and a small jitter, which never reorders them."""
+    if rate <= 0:
+        return np.empty(0)
+    stamps = np.arange(0, duration, 1 / rate)
+    return stamps + rng.uniform(0, 0.1 / rate, size=len(stamps))
+
+
+def _joint_positions(stamps: np.ndarray, num_joints: int, rng: np.random.Generator) -> np.ndarray:
+    """Smooth, periodic joint positions [rad] like the ones of a walking robot."""
+    frequencies = rng.uniform(0.5, 2.0, size=num_joints)
+    phases = rng.uniform(0, 2 * np.pi, size=num_joints)
+    amplitudes = rng.uniform(0.1, 0.8, size=num_joints)
+    return amplitudes * np.sin(2 * np.pi * frequencies * stamps[:, None] + phases)
+
+
+def _torso_angles(stamps: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Small roll and pitch angles [rad] of a swaying torso."""
+    return 0.05 * np.sin(2 * np.pi * 1.0 * stamps), 0.1 + 0.05 * np.sin(2 * np.pi * 2.0 * stamps)
+
+
+def _orientations(stamps: np.ndarray) -> np.ndarray:
+    """Quaternions (x, y, z, w) of the torso orientations."""
+    roll, pitch = _torso_angles(stamps)
+    cr, sr, cp, sp = np.cos(roll / 2), np.sin(roll / 2), np.cos(pitch / 2), np.sin(pitch / 2)
+    return np.stack([sr * cp, cr * sp, -sr * sp, cr * cp], axis=1)
+
+
+def _game_phase(stamp: float, duration: float) -> tuple[int, int, bool]:
+    """Returns the Bit-Bots game state, B-Human state and whether the robot is penalized at the stamp."""
+    phase = next(phase for phase in reversed(GAME_PHASES) if stamp >= phase[0] * duration)
+    return phase[1], phase[2], phase[3]
+
+
+def _template_timestamps() -> list[float]:
+    """Timestamps of the rendered test images, which the camera images cycle through."""
+    return [idx / NUM_IMAGE_TEMPLATES * 2 * np.pi for idx in range(NUM_IMAGE_TEMPLATES)]
+
+
+def _quaternion(values: np.ndarray) -> dict[str, float]:
+    return dict(zip("xyzw", map(float, values)))
+
+
+def _bit_bots_messages(
+    config: BitBotsLogConfig, rng: np.random.Generator
+) -> Iterator[tuple[float, str, str, dict[str, Any]]]:
+    """Generates the messages of a synthetic Bit-Bots recording in time order.
+
+    :param config: Contents of the recording
+    :param rng: The random number generator
+    :return: An iterator over the (stamp relative to the start [s], topic, datatype, message) tuples
+    """
+    start = config.start_time.timestamp()
+    images = [
+        generate_test_image(config.image_width, config.image_height, timestamp).tobytes()
+        for timestamp in _template_timestamps()
+    ]
+
+    def joint_states(stamps: np.ndarray) -> Iterator[tuple[float, str, str, dict[str, Any]]]:
+        zeros = [0.0] * len(BIT_BOTS_JOINT_NAMES)
+        for stamp, positions in zip(stamps, _joint_positions(stamps, len(BIT_BOTS_JOINT_NAMES), rng).tolist()):
+            message = {
+                "header": header(start + stamp, ""),
+                "name": BIT_BOTS_JOINT_NAMES,
+                "position": positions,
+                "velocity": zeros,
+                "effort": zeros,
+            }
+            yield stamp, "/joint_states", "sensor_msgs/msg/JointState", message
+
+    def joint_commands(stamps: np.ndarray) -> Iterator[tuple[float, str, str, dict[str, Any]]]:
+        speeds = [5.0] * len(BIT_BOTS_JOINT_NAMES)
+        currents = [-1.0] * len(BIT_BOTS_JOINT_NAMES)
+        for stamp, positions in zip(stamps, _joint_positions(stamps, len(BIT_BOTS_JOINT_NAMES), rng).tolist()):
+            message = {
+                "header": header(start + stamp, ""),
+                "joint_names": BIT_BOTS_JOINT_NAMES,
+                "positions": positions,
+                "velocities": speeds,
+                "accelerations": speeds,
+                "max_currents": currents,
+            }
+            yield stamp, "/DynamixelController/command", "bitbots_msgs/msg/JointCommand", message
+
+    def imu(stamps: np.ndarray) -> Iterator[tuple[float, str, str, dict[str, Any]]]:
+        covariance = [0.0] * 9
+        for stamp, orientation in zip(stamps, _orientations(stamps)):
+            message = {
+                "header": header(start + stamp, "imu_frame"),
+                "orientation": _quaternion(orientation),
+                "orientation_covariance": covariance,
+                "angular_velocity": {"x": 0.0, "y": 0.0, "z": 0.0},
+                "angular_velocity_covariance": covariance,
+                "linear_acceleration": {"x": 0.0, "y": 0.0, "z": 9.81},
+                "linear_acceleration_covariance": covariance,
+            }
+            yield stamp, "/imu/data", "sensor_msgs/msg/Imu", message
+
+    def tf(stamps: np.ndarray) -> Iterator[tuple[float, str, str, dict[str, Any]]]:
+        # The inverse of the torso orientation, as the importer inverts the base_link to base_footprint transform
+        inverse = _orientations(stamps) * [-1, -1, -1, 1]
+        for stamp, rotation in zip(stamps, inverse):
+            message = {
+                "transforms": [
+                    {
+                        "header": header(start + stamp, "base_link"),
+                        "child_frame_id": "base_footprint",
+                        "transform": {
+                            "translation": {"x": 0.0, "y": 0.0, "z": -0.4},
+                            "rotation": _quaternion(rotation),
+                        },
+                    },
+                    {
+                        "header": header(start + stamp, "odom"),
+                        "child_frame_id": "base_link",
+                        "transform": {
+                            "translation": {"x": 0.1 * stamp, "y": 0.0, "z": 0.4},
+                            "rotation": {"x": 0.0, "y": 0.0, "z": 0.0, "w": 1.0},
+                        },
+                    },
+                ]
+            }
+            yield stamp, "/tf", "tf2_msgs/msg/TFMessage", message
+
+    def game_states(stamps: np.ndarray) -> Iterator[tuple[float, str, str, dict[str, Any]]]:
+        for stamp in stamps:
+            game_state, _, penalized = _game_phase(stamp, config.duration)
+            message = {
+                "header": header(start + stamp, ""),
+                "game_state": game_state,
+                "penalized": penalized,
+                "team_color": 0,
+            }
+            yield stamp, "/gamestate", "game_controller_hl_interfaces/msg/GameState", message
+
+    def camera(stamps: np.ndarray) -> Iterator[tuple[float, str, str, dict[str, Any]]]:
+        for idx, stamp in enumerate(stamps):
+            message = {
+                "header": header(start + stamp, "camera_optical_frame"),
+                "height": config.image_height,
+                "width": config.image_width,
+                "encoding": "rgb8",
+                "is_bigendian": 0,
+                "step": config.image_width * 3,
+                "data": images[idx % len(images)],
+            }
+            yield stamp, "/camera/image_to_record", "sensor_msgs/msg/Image", message
+
+    topics = [
+        joint_states(_stamps(config.joint_state_rate, config.duration, rng)),
+        joint_commands(_stamps(config.joint_command_rate, config.duration, rng)),
+        imu(_stamps(config.imu_rate, config.duration, rng)),
+        tf(_stamps(config.tf_rate, config.duration, rng)),
+        game_states(_stamps(config.game_state_rate, config.duration, rng)),
+        camera(_stamps(config.camera_rate, config.duration, rng)),
+    ]
+    yield from heapq.merge(*topics, key=lambda message: message[0])
+
+
+def write_bit_bots_mcap(path: Path, config: BitBotsLogConfig) -> None:
+    """Writes a synthetic Bit-Bots recording to an mcap file, e.g. to benchmark imports without private recordings.
+    It contains all topics, which are used by the Bit-Bots import, with smooth joint and IMU data,
+    a game with all game states and camera images, which cycle through rendered test images.
+
+    :param path: Path of the mcap file
+    :param config: Contents of the recording
+    """
+    logger.info(f"Writing synthetic Bit-Bots recording '{path}'...")
+    rng = np.random.default_rng(config.seed)
+    start = config.start_time.timestamp()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer = Writer(str(path))
+    mcap_writer = McapWriter(writer, BIT_BOTS_MSGDEFS)
+    for stamp, topic, datatype, message in tqdm(
+        _bit_bots_messages(config, rng), desc="Writing messages", unit="messages"
+    ):
+        mcap_writer.write(topic, datatype, message, start + stamp)
+    writer.finish()
+
+
+def encode_b_human_jpeg(image: np.ndarray) -> tuple[bytes, int, int]:
+    """Encodes a BGR image like the JPEGImage representation of B-Human,
+    as a JPEG of the inverted YUYV image, which stores two neighboring pixels (Y0, U, Y1, V) in one CMYK pixel.
+
+    :param image: The BGR image with an even width and height
+    :return: The JPEG data and the width and height of the JPEGImage, which are half the ones of the image
+    """
+    height, width = image.shape[0] // 2, image.shape[1] // 2
+    yuv = cv2.cvtColor(cv2.bitwise_not(image), cv2.COLOR_BGR2YUV)
+    yuyv = np.stack([yuv[:, 0::2, 0], yuv[:, 0::2, 1], yuv[:, 1::2, 0], yuv[:, 0::2, 2]], axis=2)
+    buffer = io.BytesIO()
+    Image.fromarray(np.ascontiguousarray(yuyv), "CMYK").save(buffer, "JPEG")
+    return buffer.getvalue(), width, height
+
+
+def _b_human_frames(config: BHumanLogConfig, rng: np.random.Generator) -> Iterator[CacheFrame]:
+    """Generates the frames of a synthetic B-Human log in log order.
+    Like in real logs, the frames of the camera threads are logged after they are processed
+    and therefore after motion frames, which are newer than them.
+
+    :param config: Contents of the log
+    :param rng: The random number generator
+    :return: An iterator over the (thread, records) frames, with the extracted fields of each representation
+    """
+    start_ms = int(rng.integers(10_000, 1_000_000))  # Times of B-Human logs start at the boot of the robot
+    resolutions = {
+        Thread.Upper.value: (config.image_width, config.image_height),
+        Thread.Lower.value: (config.image_width // 2, config.image_height // 2),
+    }
+    templates = {
+        thread: [
+            encode_b_human_jpeg(cv2.cvtColor(generate_test_image(width, height, timestamp), cv2.COLOR_RGB2BGR))
+            for timestamp in _template_timestamps()
+        ]
+        for thread, (width, height) in resolutions.items()
+    }
+
+    motion_stamps = _stamps(config.motion_rate, config.duration, rng)
+    motion_times = start_ms + (motion_stamps * 1000).astype(np.int64)
+    requests = _joint_positions(motion_stamps, len(B_HUMAN_JOINT_NAMES), rng)
+    # The joints follow their requests with a delay of three motion frames
+    sensor_data = requests[np.maximum(np.arange(len(requests)) - 3, 0)]
+    rolls, pitches = _torso_angles(motion_stamps)
+
+    motion_frames = (
+        (
+            time,
+            (
+                "Motion",
+                {
+                    Representation.FRAME_INFO.value: {"time": time},
+                    Representation.JOINT_REQUEST.value: {"angles": dict(zip(B_HUMAN_JOINT_NAMES, request))},
+                    Representation.JOINT_SENSOR_DATA.value: {
+                        "angles": dict(zip(B_HUMAN_JOINT_NAMES, sensor)),
+                        "timestamp": time,
+                    },
+                    Representation.INERTIAL_SENSOR_DATA.value: {"angle": {"x": roll, "y": pitch, "z": 0.0}},
+                },
+            ),
+        )
+        for time, request, sensor, roll, pitch in zip(
+            motion_times.tolist(), requests.tolist(), sensor_data.tolist(), rolls.tolist(), pitches.tolist()
+        )
+    )
+
+    def camera_frames(thread: str) -> Iterator[tuple[int, CacheFrame]]:
+        stamps = _stamps(config.camera_rate, config.duration, rng)
+        for idx, stamp in enumerate(stamps):
+            time = start_ms + int(stamp * 1000)
+            _, state, penalized = _game_phase(stamp, config.duration)
+            data, width, height = templates[thread][idx % NUM_IMAGE_TEMPLATES]
+            records = {
+                Representation.FRAME_INFO.value: {"time": time},
+                Representation.JPEG_IMAGE.value: {
+                    "timestamp": time + B_HUMAN_JPEG_IMAGE_DATE_OFFSET_MS + int(rng.integers(-3, 4)),
+                    "size": len(data),
+                    "height": height,
+                    "width": width,
+                    "_data": data,
+                },
+                Representation.GAME_STATE.value: {
+                    "state": state,
+                    "playerState": B_HUMAN_PLAYER_STATES[penalized],
+                    "ownTeam": {"fieldPlayerColor": 1},
+                },
+            }
+            # The frame is logged after it is processed, which takes about 10 ms
+            yield time + 10, (thread, records)
+
+    frames = heapq.merge(
+        motion_frames, camera_frames(Thread.Upper.value), camera_frames(Thread.Lower.value), key=lambda f: f[0]
+    )
+    for _, frame in frames:
+        yield frame
+
+
+def write_b_human_log(path: Path, cache_dir: Path, config: BHumanLogConfig) -> FrameCache:
+    """Writes a synthetic B-Human log, e.g. to benchmark imports without private logs.
+    The binary log format can only be written by the B-Human code, therefore the frames are written to
+    the frame cache entry of the log instead. The log file itself only identifies the cache entry,
+    so importing it with caching enabled reads the synthetic frames.
+    The frames contain all representations of `Representation`, with smooth joint and inertial sensor data,
+    a game with all game states and camera images of both cameras, which cycle through rendered test images.
+
+    :param path: Path of the log file, its directories should contain the date of the log, e.g. "2024-07-20_12-00"
+    :param cache_dir: Directory of the frame cache, which is used by the import
+    :param config: Contents of the log
+    :return: The frame cache entry of the log
+    """
+    logger.info(f"Writing synthetic B-Human log '{path}'...")
+    rng = np.random.default_rng(config.seed)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"Synthetic B-Human log, its frames are cached in '{cache_dir}'\n{json.dumps(asdict(config))}\n")
+    frames = tqdm(_b_human_frames(config, rng), desc="Writing frames", unit="frames")
+    return FrameCache.write(cache_dir, cache_key(path, CACHE_VERSION), frames)
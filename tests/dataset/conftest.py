@@ -3,6 +3,9 @@ from types import SimpleNamespace
 import numpy as np
 import pytest
 
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.dummy_data import insert_dummy_data
+
 joint_names = [
     "RShoulderPitch",
     "LShoulderPitch",
@@ -63,3 +66,19 @@ def joint_command_msg():
 @pytest.fixture
 def joint_position_msg():
     return SimpleNamespace(name=joint_names, position=positions)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "dummy_data(**kwargs): fill the db fixture with insert_dummy_data(**kwargs)")
+
+
+@pytest.fixture
+def db(request, tmp_path):
+    """An empty database, or one with dummy data, if the test or its module is marked with
+    `pytest.mark.dummy_data(num_recordings=..., image_step=...)`, 100 samples per recording by default.
+    """
+    db = Database(tmp_path / "db.sqlite3").create_session(create_schema=True)
+    marker = request.node.get_closest_marker("dummy_data")
+    if marker is not None:
+        insert_dummy_data(db.session, **{"num_samples_per_rec": 100, "seed": 0, **marker.kwargs})
+    return db
@@ -1,3 +1,4 @@
+from types import SimpleNamespace
 from unittest.mock import Mock
 
 import numpy as np
@@ -45,15 +46,16 @@ def test_converts_all_resampled_rotations(converter, input_data, recording):
 
     models = converter.convert_to_model(input_data, 1.13, recording)
 
-    assert len(models.rotations) == 2
-    assert models.rotations[0].stamp == 0.0
-    assert models.rotations[1].stamp == 1.0
+    rotations = models.rotations.to_records()
+    assert len(rotations) == 2
+    assert rotations[0]["stamp"] == 0.0
+    assert rotations[1]["stamp"] == 1.0
 
-    for rotation in models.rotations:
-        assert rotation.recording == recording
-        assert rotation.x == input_data.rotation.x
-        assert rotation.y == input_data.rotation.y
-        assert rotation.z == input_data.rotation.z
+    for rotation in rotations:
+        assert rotation["x"] == input_data.rotation.x
+        assert rotation["y"] == input_data.rotation.y
+        assert rotation["z"] == input_data.rotation.z
+        assert rotation["w"] == input_data.rotation.w
 
 
 def test_converts_all_resampled_joint_states(converter, input_data, recording):
@@ -64,17 +66,17 @@ def test_converts_all_resampled_joint_states(converter, input_data, recording):
 
     models = converter.convert_to_model(input_data, 1.13, recording)
 
-    assert len(models.joint_states) == 2
-    assert models.joint_states[0].stamp == 0.0
-    assert models.joint_states[1].stamp == 1.0
+    joint_states = models.joint_states.to_records()
+    assert len(joint_states) == 2
+    assert joint_states[0]["stamp"] == 0.0
+    assert joint_states[1]["stamp"] == 1.0
 
-    for joint_state in models.joint_states:
-        assert joint_state.recording == recording
-        assert joint_state.r_shoulder_pitch == 0.0
-        assert joint_state.l_shoulder_pitch == pytest.approx(0, abs=1e-5)
-        assert joint_state.r_hip_yaw == np.pi
-        assert joint_state.l_hip_yaw == pytest.approx(np.pi, abs=1e-5)
-        assert joint_state.head_tilt == 0.0
+    for joint_state in joint_states:
+        assert joint_state["r_shoulder_pitch"] == 0.0
+        assert joint_state["l_shoulder_pitch"] == pytest.approx(0, abs=1e-5)
+        assert joint_state["r_hip_yaw"] == np.pi
+        assert joint_state["l_hip_yaw"] == pytest.approx(np.pi, abs=1e-5)
+        assert joint_state["head_tilt"] == 0.0
 
 
 def test_converts_all_resampled_joint_commands(converter, input_data, recording):
@@ -85,17 +87,50 @@ def test_converts_all_resampled_joint_commands(converter, input_data, recording)
 
     models = converter.convert_to_model(input_data, 1.13, recording)
 
-    assert len(models.joint_commands) == 2
-    assert models.joint_commands[0].stamp == 0.0
-    assert models.joint_commands[1].stamp == 1.0
+    joint_commands = models.joint_commands.to_records()
+    assert len(joint_commands) == 2
+    assert joint_commands[0]["stamp"] == 0.0
+    assert joint_commands[1]["stamp"] == 1.0
 
-    for joint_command in models.joint_commands:
-        assert joint_command.recording == recording
-        assert joint_command.r_shoulder_pitch == 0.0
-        assert joint_command.l_shoulder_pitch == pytest.approx(0, abs=1e-5)
-        assert joint_command.r_hip_yaw == np.pi
-        assert joint_command.l_hip_yaw == pytest.approx(np.pi, abs=1e-5)
-        assert joint_command.head_tilt == 0.0
+    for joint_command in joint_commands:
+        assert joint_command["r_shoulder_pitch"] == 0.0
+        assert joint_command["l_shoulder_pitch"] == pytest.approx(0, abs=1e-5)
+        assert joint_command["r_hip_yaw"] == np.pi
+        assert joint_command["l_hip_yaw"] == pytest.approx(np.pi, abs=1e-5)
+        assert joint_command["head_tilt"] == 0.0
+
+
+def test_joint_states_missing_in_input_default_to_zero(converter, input_data, recording):
+    converter.resampler.resample.return_value = [Sample(data=input_data, timestamp=0.0)]
+
+    models = converter.convert_to_model(input_data, 1.13, recording)
+
+    assert models.joint_states.to_records()[0]["r_elbow_yaw"] == 0.0
+    assert models.joint_commands.to_records()[0]["r_elbow_yaw"] == np.pi  # Shifted default command
+
+
+def test_joint_states_missing_in_input_without_default_are_nan(converter, input_data, recording, joint_position_msg):
+    input_data.joint_state = SimpleNamespace(
+        name=joint_position_msg.name[:-1], position=joint_position_msg.position[:-1]
+    )
+    converter.resampler.resample.return_value = [Sample(data=input_data, timestamp=0.0)]
+
+    joint_state = converter.convert_to_model(input_data, 1.13, recording).joint_states.to_records()[0]
+
+    assert np.isnan(joint_state["head_tilt"])
+    assert not np.isnan(joint_state["head_pan"])
+    assert joint_state["r_elbow_yaw"] == 0.0
+
+
+def test_synced_models_share_the_ticks_of_the_resampler_grid(input_data, recording):
+    converter = SyncedDataConverter(PreviousInterpolationResampler(10))
+
+    first = converter.convert_to_model(input_data, 0.0, recording)
+    second = converter.convert_to_model(input_data, 0.35, recording)
+
+    for models, ticks in ((first, [0]), (second, [1, 2, 3])):
+        for batch in (models.rotations, models.joint_states, models.joint_commands):
+            assert batch.to_records()["tick"].tolist() == ticks
 
 
 @pytest.fixture
@@ -112,6 +147,7 @@ def input_data(imu_msg, joint_position_msg, joint_command_msg):
 def converter():
     resampler = Mock(PreviousInterpolationResampler)
     resampler.resample.return_value = []
+    resampler.num_samples = 0
 
     return SyncedDataConverter(resampler)
 
@@ -0,0 +1,374 @@
+import io
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from soccer_diffusion import DEFAULT_RESAMPLE_RATE_HZ, IMAGE_MAX_RESAMPLE_RATE_HZ
+from soccer_diffusion.dataset.converters.game_state_converter.b_human_game_state_converter import (
+    BHumanGameStateConverter,
+)
+from soccer_diffusion.dataset.converters.image_converter import BHumanImageConverter
+from soccer_diffusion.dataset.converters.synced_data_converter import SyncedDataConverter
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.dummy_data import generate_test_image
+from soccer_diffusion.dataset.imports.model_importer import ImportMetadata, ModelImporter
+from soccer_diffusion.dataset.imports.strategies import b_human
+from soccer_diffusion.dataset.imports.strategies.b_human import (
+    EXTRACTION_SCHEMA,
+    BHumanImportStrategy,
+    CachedLog,
+    FieldTree,
+    Representation,
+    SmartFrame,
+    SmartRecord,
+    Thread,
+)
+from soccer_diffusion.dataset.models import Base
+from soccer_diffusion.dataset.resampling.max_rate_resampler import MaxRateResampler
+from soccer_diffusion.dataset.resampling.original_rate_resampler import OriginalRateResampler
+from soccer_diffusion.dataset.resampling.previous_interpolation_resampler import PreviousInterpolationResampler
+from soccer_diffusion.dataset.synthetic_logs import (
+    B_HUMAN_JPEG_IMAGE_DATE_OFFSET_MS,
+    BHumanLogConfig,
+    encode_b_human_jpeg,
+    write_b_human_log,
+)
+
+METADATA = ImportMetadata(False, "B-Human", "NAO6", "Location", False)
+
+
+class FakeRecord:
+    """Stand-in for a pybh record, whose fields are read with `__getattr__`."""
+
+    def __init__(self, **fields):
+        self._fields = fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._fields
+
+    def __getattr__(self, key: str):
+        return self.__dict__["_fields"][key]
+
+
+class FakeArray(list):
+    """Stand-in for a pybh array."""
+
+
+class FakeFrame:
+    """Stand-in for a pybh frame."""
+
+    def __init__(self, thread: str, **records: FakeRecord):
+        self.thread = thread
+        self.representations = list(records)
+        self._records = records
+
+    def __getitem__(self, representation: str) -> FakeRecord:
+        return self._records[representation]
+
+
+@pytest.fixture
+def pybh_types(monkeypatch):
+    monkeypatch.setattr(b_human, "Record", FakeRecord)
+    monkeypatch.setattr(b_human, "Array", FakeArray)
+    monkeypatch.setattr(b_human, "Frame", FakeFrame)
+
+
+def create_strategy(cache_dir, workers: int = 1) -> BHumanImportStrategy:
+    return BHumanImportStrategy(
+        METADATA,
+        BHumanImageConverter(MaxRateResampler(IMAGE_MAX_RESAMPLE_RATE_HZ)),
+        BHumanImageConverter(MaxRateResampler(IMAGE_MAX_RESAMPLE_RATE_HZ)),
+        BHumanGameStateConverter(OriginalRateResampler()),
+        SyncedDataConverter(PreviousInterpolationResampler(DEFAULT_RESAMPLE_RATE_HZ)),
+        caching=True,
+        cache_dir=cache_dir,
+        workers=workers,
+    )
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "2024-07-20_12-00" / "game.log"
+    write_b_human_log(path, tmp_path / "cache", BHumanLogConfig(duration=2.0, image_width=64, image_height=48, seed=0))
+    return path
+
+
+@pytest.fixture
+def strategy(tmp_path, log_file):
+    strategy = create_strategy(tmp_path / "cache")
+    strategy.datetime = datetime(2024, 7, 20, 12)
+    strategy.model_data.recording = strategy._create_recording(log_file)
+    return strategy
+
+
+def frame_time(frame: SmartFrame) -> int:
+    return frame[Representation.FRAME_INFO.value]["time"]  # type: ignore[return-value]
+
+
+def test_frames_are_read_in_time_order(strategy, log_file):
+    log = strategy._read_log_file(log_file)
+    assert isinstance(log, CachedLog)
+    frame_times = strategy._handle_timestamps(strategy._index_log(log))
+
+    log_order = [(frame.thread, frame_time(frame)) for frame in log]
+    frames = list(strategy._iter_frames_in_time_order(log, frame_times))
+
+    # Camera frames are logged after they are processed, i.e. after newer motion frames
+    late_frames = [
+        frame for previous, frame in zip(log_order, log_order[1:]) if frame[1] < previous[1] and frame[0] != "Motion"
+    ]
+    assert late_frames
+    assert [frame.time for frame in frames] == sorted(frame.time for frame in frames)
+    assert sorted((frame.thread, frame_time(frame)) for frame in frames) == sorted(log_order)
+    # Late camera frames are sorted before the motion frames logged before them
+    assert [(frame.thread, frame_time(frame)) for frame in frames] != log_order
+    assert {frame.thread for frame in frames} == {"Motion", Thread.Upper.value, Thread.Lower.value}
+
+
+def test_frames_before_the_start_position_are_skipped(strategy, log_file):
+    log = strategy._read_log_file(log_file)
+    frame_times = strategy._handle_timestamps(strategy._index_log(log))
+
+    frames = list(strategy._iter_frames_in_time_order(log, frame_times))
+    resumed = list(strategy._iter_frames_in_time_order(log, frame_times, start=100))
+
+    assert [(frame.thread, frame.time) for frame in resumed] == [(frame.thread, frame.time) for frame in frames[100:]]
+
+
+def extract(data: dict, fields: FieldTree) -> dict:
+    """Selects the fields of a completely extracted record."""
+    return {
+        key: data[key] if sub_fields is None else extract(data[key], sub_fields)
+        for key, sub_fields in fields.items()
+        if key in data
+    }
+
+
+def test_extracted_fields_equal_the_full_representations(pybh_types):
+    angles = FakeRecord(headYaw=0.1, headPitch=-0.2, rShoulderPitch=1.5)
+    player = FakeRecord(number=2, penalty=0)
+    frame = FakeFrame(
+        "Upper",
+        FrameInfo=FakeRecord(time=1000, cycleTime=0.012),
+        GameState=FakeRecord(
+            state="playing",
+            playerState="active",
+            timeWhenStateStarted=900,
+            ownTeam=FakeRecord(number=5, fieldPlayerColor=1, players=FakeArray([player, player])),
+            opponentTeam=FakeRecord(number=7, fieldPlayerColor=2, players=FakeArray([player])),
+        ),
+        JointSensorData=FakeRecord(
+            angles=angles, currents=FakeArray([1, 2, 3]), temperatures=FakeArray([40, 41]), timestamp=1000
+        ),
+        JPEGImage=FakeRecord(size=3, height=2, width=4, _data=b"jpg", timestamp=2000, name="upper"),
+        BallModel=FakeRecord(seenPercentage=80, timeWhenLastSeen=950),
+    )
+
+    extracted = SmartFrame.from_frame(frame)
+
+    assert extracted.thread == "Upper"
+    assert set(extracted) == {"FrameInfo", "GameState", "JointSensorData", "JPEGImage"}
+    for representation, record in extracted.items():
+        full = SmartRecord(frame[representation])
+        assert record.data == extract(full.data, EXTRACTION_SCHEMA[representation])
+    assert extracted["FrameInfo"].data == {"time": 1000}
+    assert extracted["GameState"].data == {
+        "state": "playing",
+        "playerState": "active",
+        "ownTeam": {"fieldPlayerColor": 1},
+    }
+    assert extracted["JointSensorData"].data == {
+        "angles": {"headYaw": 0.1, "headPitch": -0.2, "rShoulderPitch": 1.5},
+        "timestamp": 1000,
+    }
+    assert extracted["JPEGImage"].data == {"size": 3, "height": 2, "width": 4, "_data": b"jpg", "timestamp": 2000}
+    assert b_human.scrape_raw_times(frame) == b_human.scrape_raw_times(extracted)
+
+
+def decode_yuyv_channelwise(data: bytes, width: int, height: int) -> np.ndarray:
+    """Decodes a JPEGImage like the importer did before gathering the channels with `YUYV_TO_YUV_CHANNELS`."""
+    img_yuyv = np.array(Image.open(io.BytesIO(data)))
+    img_yuv = np.empty((height * 2, width * 2, 3), dtype=np.uint8)
+    img_yuv[:, ::2, 0] = img_yuyv[:, :, 0]
+    img_yuv[:, 1::2, 0] = img_yuyv[:, :, 2]
+    img_yuv[:, ::2, 1] = img_yuyv[:, :, 1]
+    img_yuv[:, 1::2, 1] = img_yuyv[:, :, 1]
+    img_yuv[:, ::2, 2] = img_yuyv[:, :, 3]
+    img_yuv[:, 1::2, 2] = img_yuyv[:, :, 3]
+    return 255 - cv2.cvtColor(img_yuv, cv2.COLOR_YUV2BGR)
+
+
+@pytest.mark.parametrize("thread", [Thread.Upper.value, Thread.Lower.value])
+def test_yuyv_gather_equals_channelwise_decoding(thread):
+    image = cv2.cvtColor(generate_test_image(320, 240, 1.0), cv2.COLOR_RGB2BGR)
+    data, width, height = encode_b_human_jpeg(image)
+    # Data of the JPEGImage is preceded by its header
+    jpeg_image = {"timestamp": 0, "size": len(data), "height": height, "width": width, "_data": b"header" + data}
+
+    frame = SmartFrame({"JPEGImage": SmartRecord.from_data(jpeg_image)}, thread)
+    decoded = frame.image()
+
+    assert decoded is not None
+    np.testing.assert_array_equal(decoded, decode_yuyv_channelwise(data, width, height))
+    # The image is decoded once per frame
+    assert frame.image() is decoded
+
+
+def table_rows(db_path) -> dict[str, list[tuple]]:
+    with sqlite3.connect(db_path) as connection:
+        return {
+            table.name: connection.execute(f'SELECT * FROM "{table.name}" ORDER BY rowid').fetchall()
+            for table in Base.metadata.sorted_tables
+        }
+
+
+def test_parallel_conversion_equals_serial_conversion(tmp_path, log_file, monkeypatch):
+    # Convert the short log in several chunks
+    monkeypatch.setattr(b_human, "MIN_CHUNK_SIZE", 40)
+    for workers in (1, 3):
+        db = Database(tmp_path / f"workers_{workers}.sqlite3").create_session(create_schema=True)
+        ModelImporter(db, create_strategy(tmp_path / "cache", workers), image_threads=0).import_to_db(log_file)
+        db.close_session()
+
+    serial = table_rows(tmp_path / "workers_1.sqlite3")
+    parallel = table_rows(tmp_path / "workers_3.sqlite3")
+    assert serial["JointStates"] and serial["Image"] and serial["GameState"]
+    assert parallel == serial
+
+
+def interrupt_after(strategy: BHumanImportStrategy, num_collected: int) -> None:
+    """Interrupts the conversion of the strategy, when models are collected the `num_collected` + 1 time."""
+    collect = strategy._collect
+    collected = []
+
+    def interrupted_collect(model_data):
+        if len(collected) == num_collected:
+            raise RuntimeError("Interrupted import")
+        collected.append(model_data)
+        collect(model_data)
+
+    strategy._collect = interrupted_collect  # type: ignore[method-assign]
+
+
+@pytest.mark.parametrize(("workers", "num_collected"), [(1, 300), (3, 3)])
+def test_resumed_import_equals_uninterrupted_import(tmp_path, log_file, monkeypatch, workers, num_collected):
+    # Convert the short log in several chunks, each merged chunk is followed by a checkpoint
+    monkeypatch.setattr(b_human, "MIN_CHUNK_SIZE", 40)
+    db = Database(tmp_path / "uninterrupted.sqlite3").create_session(create_schema=True)
+    ModelImporter(db, create_strategy(tmp_path / "cache", workers), image_threads=1).import_to_db(log_file)
+    db.close_session()
+
+    db = Database(tmp_path / "resumed.sqlite3").create_session(create_schema=True)
+    interrupted = create_strategy(tmp_path / "cache", workers)
+    interrupt_after(interrupted, num_collected)
+    with pytest.raises(RuntimeError, match="Interrupted import"):
+        ModelImporter(db, interrupted, image_threads=1, checkpoint_interval=0).import_to_db(log_file)
+    partial = table_rows(tmp_path / "resumed.sqlite3")
+    assert partial["ImportProgress"] and partial["JointStates"]
+    ModelImporter(db, create_strategy(tmp_path / "cache", workers), image_threads=1).import_to_db(log_file)
+    db.close_session()
+
+    assert table_rows(tmp_path / "resumed.sqlite3") == table_rows(tmp_path / "uninterrupted.sqlite3")
+
+
+def repair_times_per_frame(frames: list[SmartFrame]) -> tuple[int, int, list[tuple[int, int]]]:
+    """Repairs the times of the frames like the importer did frame by frame before vectorising it.
+
+    :return: The JPEGImage date offset, the global time offset and the (frame index, time) rows in time order
+    """
+    jpeg_image = Representation.JPEG_IMAGE.value
+    raw_times: dict[str, list[int]] = {}
+    for frame in frames:
+        for representation, record in frame.items():
+            for key in ("time", "timestamp"):
+                if (time := record.get(key)) is not None:
+                    raw_times.setdefault(representation, []).append(time)
+    avg_times = {representation: np.mean(times) for representation, times in raw_times.items()}
+    date_offset = int(
+        avg_times[jpeg_image]
+        - np.mean([avg for representation, avg in avg_times.items() if representation != jpeg_image])
+    )
+    global_offset = min(
+        time - (date_offset if representation == jpeg_image else 0)
+        for representation, times in raw_times.items()
+        for time in times
+    )
+
+    frame_times = []
+    max_time = 0
+    for index, frame in enumerate(frames):
+        if (image := frame.get(jpeg_image)) is not None and isinstance(image.get("timestamp"), int):
+            time = image["timestamp"] - global_offset - date_offset
+        else:
+            times = [
+                time
+                for representation, record in frame.items()
+                if representation != jpeg_image
+                for key in ("time", "timestamp")
+                if (time := record.get(key)) is not None
+            ]
+            assert len(set(times)) <= 1
+            time = times[0] - global_offset if times else None
+        if time is None:
+            time = max_time
+        elif time > max_time:
+            max_time = time
+        frame_times.append((index, time))
+    return date_offset, global_offset, sorted(frame_times, key=lambda row: row[1])
+
+
+def test_timestamps_are_repaired_like_frame_by_frame(strategy, log_file):
+    frames = list(strategy._read_log_file(log_file))
+    # A frame without any time gets the latest time of the frames before it
+    frames.insert(50, SmartFrame({"GameState": SmartRecord.from_data({"state": "playing"})}, Thread.Upper.value))
+
+    frame_times = strategy._handle_timestamps(strategy._index_log(frames))
+
+    date_offset, global_offset, expected = repair_times_per_frame(frames)
+    # The JPEGImage times are jittered and the camera frames are logged out of order
+    jpeg_image_offsets = {
+        frame["JPEGImage"]["timestamp"] - frame_time(frame) for frame in frames if "JPEGImage" in frame
+    }
+    assert len(jpeg_image_offsets) > 1
+    assert [index for index, _ in expected] != list(range(len(frames)))
+    assert [tuple(row) for row in frame_times.tolist()] == expected
+    assert (strategy.jpeg_image_date_offset, strategy.global_time_offset) == (date_offset, global_offset)
+    assert abs(date_offset - B_HUMAN_JPEG_IMAGE_DATE_OFFSET_MS) < 50
+    recording = strategy.model_data.recording
+    assert recording.start_time == strategy.datetime
+    assert recording.end_time == strategy.datetime + timedelta(milliseconds=expected[-1][1])
+
+
+def test_timestamps_are_repaired_by_hand():
+    log = [
+        # FrameInfo and JointSensorData of the same motion frame
+        ("Motion", {"FrameInfo": {"time": 1000}, "JointSensorData": {"timestamp": 1000}}),
+        ("Motion", {"FrameInfo": {"time": 1012}, "JointSensorData": {"timestamp": 1012}}),
+        # A camera frame, whose JPEGImage time is about 500 ms ahead, is logged after a newer motion frame
+        ("Upper", {"FrameInfo": {"time": 1004}, "JPEGImage": {"timestamp": 1503}}),
+        ("Upper", {"GameState": {"state": "playing"}}),
+        ("Upper", {"FrameInfo": {"time": 1024}, "JPEGImage": {"timestamp": 1525}}),
+    ]
+    frames = [
+        SmartFrame({representation: SmartRecord.from_data(data) for representation, data in records.items()}, thread)
+        for thread, records in log
+    ]
+    strategy = create_strategy(None)
+    strategy.datetime = datetime(2024, 7, 20, 12)
+    strategy.model_data.recording = strategy._create_recording(Path("game.log"))
+
+    frame_times = strategy._handle_timestamps(strategy._index_log(frames))
+
+    # Mean JPEGImage time 1514 minus the mean of the mean times of FrameInfo (1010) and JointSensorData (1006)
+    assert strategy.jpeg_image_date_offset == 506
+    assert strategy.global_time_offset == 997
+    # The camera frames use their JPEGImage time, the frame without time the latest time of the frames before it
+    assert frame_times.tolist() == [[2, 0], [0, 3], [1, 15], [3, 15], [4, 22]]
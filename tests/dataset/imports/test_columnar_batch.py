@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from soccer_diffusion.dataset.imports.data import ROTATIONS_DTYPE, ColumnarBatch
+
+
+def test_empty_batch():
+    batch = ColumnarBatch(ROTATIONS_DTYPE)
+
+    assert len(batch) == 0
+    assert len(batch.to_records()) == 0
+    assert batch.to_records().dtype == ROTATIONS_DTYPE
+
+
+def test_append_rows_and_extend(rotations):
+    batch = ColumnarBatch(ROTATIONS_DTYPE)
+    batch.append_row((0.0, 0.0, 0.0, 0.0, 1.0, 0))
+    batch.extend(rotations)
+
+    records = batch.to_records()
+    assert len(batch) == len(rotations) + 1
+    assert records[0]["w"] == 1.0
+    np.testing.assert_array_equal(records[1:], rotations)
+
+
+def test_extend_with_batch_grows_buffer(rotations):
+    batch = ColumnarBatch(ROTATIONS_DTYPE)
+    other = ColumnarBatch(ROTATIONS_DTYPE)
+    other.extend(rotations)
+
+    for _ in range(100):
+        batch.extend(other)
+
+    assert len(batch) == 100 * len(rotations)
+    np.testing.assert_array_equal(batch.to_records()[-len(rotations) :], rotations)
+
+
+def test_to_records_is_a_view(rotations):
+    batch = ColumnarBatch(ROTATIONS_DTYPE)
+    batch.extend(rotations)
+
+    batch.to_records()["x"] = 0.5
+
+    assert np.all(batch.to_records()["x"] == 0.5)
+
+
+@pytest.fixture
+def rotations() -> np.ndarray:
+    rotations = np.zeros(3, dtype=ROTATIONS_DTYPE)
+    rotations["stamp"] = [0.02, 0.04, 0.06]
+    rotations["x"] = [0.1, 0.2, 0.3]
+    rotations["w"] = 1.0
+    return rotations
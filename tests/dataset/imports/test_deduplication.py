@@ -0,0 +1,47 @@
+import numpy as np
+
+from soccer_diffusion.dataset.imports.deduplication import DuplicateImageDetector
+
+HEIGHT, WIDTH = 64, 64
+
+
+def image(value: int = 100, ball_at: tuple[int, int] | None = None, noise_seed: int | None = None) -> bytes:
+    pixels = np.full((HEIGHT, WIDTH, 3), value, dtype=np.uint8)
+    if noise_seed is not None:
+        pixels += np.random.default_rng(noise_seed).integers(0, 3, pixels.shape, dtype=np.uint8)
+    if ball_at is not None:
+        y, x = ball_at
+        pixels[y : y + 6, x : x + 6] = 255
+    return pixels.tobytes()
+
+
+def test_exact_duplicates_are_detected():
+    detector = DuplicateImageDetector()
+
+    assert not detector.is_duplicate(image(), HEIGHT, WIDTH)
+    assert detector.is_duplicate(image(), HEIGHT, WIDTH)
+    assert not detector.is_duplicate(image(noise_seed=0), HEIGHT, WIDTH)
+
+
+def test_noisy_images_are_near_duplicates():
+    detector = DuplicateImageDetector(threshold=2.0)
+
+    assert not detector.is_duplicate(image(noise_seed=0), HEIGHT, WIDTH)
+    assert detector.is_duplicate(image(noise_seed=1), HEIGHT, WIDTH)
+
+
+def test_moving_ball_is_no_near_duplicate():
+    detector = DuplicateImageDetector(threshold=2.0)
+
+    assert not detector.is_duplicate(image(ball_at=(10, 10)), HEIGHT, WIDTH)
+    assert not detector.is_duplicate(image(ball_at=(10, 40)), HEIGHT, WIDTH)
+
+
+def test_images_are_compared_to_the_last_kept_image():
+    detector = DuplicateImageDetector(threshold=2.0)
+
+    assert not detector.is_duplicate(image(100), HEIGHT, WIDTH)
+    assert detector.is_duplicate(image(102), HEIGHT, WIDTH)
+    # Slow changes accumulate, instead of being compared to the previous duplicate
+    assert not detector.is_duplicate(image(104), HEIGHT, WIDTH)
+    assert detector.is_duplicate(image(105), HEIGHT, WIDTH)
@@ -0,0 +1,67 @@
+import hashlib
+
+import pytest
+
+from soccer_diffusion.dataset.imports import frame_cache
+from soccer_diffusion.dataset.imports.frame_cache import FrameCache, cache_key, content_hash
+
+FRAMES = [
+    ("Motion", {"FrameInfo": {"time": 10}, "JointSensorData": {"timestamp": 10, "angles": {"a": 0.5, "b": -1.0}}}),
+    ("Upper", {"FrameInfo": {"time": 12}, "JPEGImage": {"timestamp": 9, "valid": True, "_data": b"\xff\xd8jpeg"}}),
+    ("Motion", {"JointSensorData": {"timestamp": 20, "angles": {"a": 1.5}}, "FrameInfo": {}}),
+    ("Lower", {}),
+    ("Upper", {"JPEGImage": {"timestamp": 30, "_data": b""}}),
+]
+
+
+def test_cached_frames_equal_written_frames(tmp_path):
+    FrameCache.write(tmp_path, "key", FRAMES)
+    cache = FrameCache.entry(tmp_path, "key")
+
+    assert cache is not None
+    assert len(cache) == len(FRAMES)
+    for (thread, records), (expected_thread, expected_records) in zip(cache, FRAMES, strict=True):
+        assert thread == expected_thread
+        assert list(records) == list(expected_records)  # Order of the representations is kept
+        for representation, record in records.items():
+            expected_record = expected_records[representation]
+            if "_data" in record:
+                assert bytes(record.pop("_data")) == expected_record["_data"]
+                expected_record = {key: value for key, value in expected_record.items() if key != "_data"}
+            assert record == expected_record
+
+
+def test_cached_values_keep_their_python_types(tmp_path):
+    cache = FrameCache.write(tmp_path, "key", FRAMES)
+    _, records = next(iter(cache))
+
+    assert type(records["FrameInfo"]["time"]) is int
+    assert type(records["JointSensorData"]["angles"]["a"]) is float
+
+
+def test_missing_entry(tmp_path):
+    assert FrameCache.entry(tmp_path, "key") is None
+
+
+def test_unsupported_values_are_rejected(tmp_path):
+    with pytest.raises(TypeError):
+        FrameCache.write(tmp_path, "key", [("Motion", {"JointSensorData": {"temperatures": [1, 2]}})])
+    assert not any(tmp_path.iterdir())  # Incomplete entries are removed
+
+
+def test_cache_key_depends_on_content_and_version(tmp_path):
+    log_file = tmp_path / "game.log"
+    log_file.write_bytes(b"log")
+    key = cache_key(log_file, "1")
+
+    assert cache_key(log_file, "2") != key
+    log_file.write_bytes(b"other log")
+    assert cache_key(log_file, "1") != key
+
+
+def test_content_hash_is_read_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(frame_cache, "_HASH_CHUNK_SIZE", 4)
+    log_file = tmp_path / "game.log"
+    log_file.write_bytes(b"a log of ten chunks, read in chunks of 4")
+
+    assert content_hash(log_file) == hashlib.sha256(log_file.read_bytes()).hexdigest()
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+from soccer_diffusion.dataset.imports.data import JOINT_NAMES, InputData, joint_layout
+
+
+def test_joint_state_is_none_initially():
+    data = InputData()
+
+    assert data.joint_state is None
+    assert not data.has_joint_state
+
+
+def test_joint_state_from_msg(joint_position_msg):
+    data = InputData()
+    data.joint_state = joint_position_msg
+
+    assert data.has_joint_state
+    assert len(data.joint_state) == len(joint_position_msg.name)
+    assert data.joint_state["r_shoulder_pitch"] == joint_position_msg.position[0]
+    assert data.joint_state["head_tilt"] == joint_position_msg.position[-1]
+    assert "r_elbow_yaw" not in data.joint_state
+
+
+def test_joint_state_positions_in_joint_names_order(joint_position_msg):
+    data = InputData()
+    data.joint_state = joint_position_msg
+
+    for name, position in data.joint_state.items():
+        assert data.joint_state_positions[JOINT_NAMES.index(name)] == position
+
+
+def test_joint_commands_require_all_joints(joint_command_msg):
+    data = InputData()
+
+    assert not data.has_all_joint_commands
+    assert data.joint_command["r_knee"] is None
+    assert data.joint_command["r_elbow_yaw"] == 0.0  # Default
+
+    data.joint_command = SimpleNamespace(
+        joint_names=joint_command_msg.joint_names[:10], positions=joint_command_msg.positions[:10]
+    )
+    assert not data.has_all_joint_commands
+
+    data.joint_command = SimpleNamespace(
+        joint_names=joint_command_msg.joint_names[10:], positions=joint_command_msg.positions[10:]
+    )
+    assert data.has_all_joint_commands
+    assert data.joint_command["r_knee"] == joint_command_msg.positions[joint_command_msg.joint_names.index("RKnee")]
+
+
+def test_is_all_synced_data_available(imu_msg, joint_position_msg, joint_command_msg):
+    data = InputData()
+    assert not data.is_all_synced_data_available()
+
+    data.joint_state = joint_position_msg
+    data.joint_command = joint_command_msg
+    assert not data.is_all_synced_data_available()
+
+    data.rotation = imu_msg
+    assert data.is_all_synced_data_available()
+
+
+def test_unknown_joints_are_skipped():
+    data = InputData()
+    data.joint_state = SimpleNamespace(name=["RKnee", "LWrist", "LKnee"], position=[1.0, 2.0, 3.0])
+
+    assert data.joint_state == {"r_knee": 1.0, "l_knee": 3.0}
+
+
+@pytest.mark.parametrize("names", [("RKnee", "LKnee"), ("r_knee", "l_knee")])
+def test_joint_layout_accepts_camel_and_snake_case(names):
+    targets, sources, mask = joint_layout(names)
+
+    assert targets == [JOINT_NAMES.index("r_knee"), JOINT_NAMES.index("l_knee")]
+    assert sources is None
+    assert mask == (1 << JOINT_NAMES.index("r_knee")) | (1 << JOINT_NAMES.index("l_knee"))
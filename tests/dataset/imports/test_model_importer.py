@@ -0,0 +1,254 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+
+from soccer_diffusion.dataset.chunks import chunk_database
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.imports.data import ImportMetadata, ModelData
+from soccer_diffusion.dataset.imports.model_importer import REQUIRED_FIELDS, ImportStrategy, ModelImporter
+from soccer_diffusion.dataset.imports.pipeline import CheckpointStateError
+from soccer_diffusion.dataset.models import (
+    DEFAULT_IMG_SIZE,
+    Image,
+    ImportProgress,
+    JointCommandsChunk,
+    JointStatesChunk,
+    Recording,
+    Rotation,
+    RotationChunk,
+)
+
+
+class RowsImportStrategy(ImportStrategy):
+    """Creates a recording with a single row of each model for every imported file."""
+
+    def __init__(self):
+        super().__init__(ImportMetadata(False, "Team", "Robot", "Location", True), None, None, None)  # type: ignore
+        self.conversions = 0
+
+    def convert_to_model_data(self, file_path: Path) -> ModelData:
+        self.conversions += 1
+        self.model_data = ModelData(
+            recording=Recording(
+                allow_public=False,
+                original_file=file_path.name,
+                team_name="Team",
+                robot_type="Robot",
+                img_width=DEFAULT_IMG_SIZE[0],
+                img_height=DEFAULT_IMG_SIZE[1],
+                img_width_scaling=1.0,
+                img_height_scaling=1.0,
+            )
+        )
+        rows = ModelData()
+        rows.game_states.append_row((0.0, "PLAYING"))
+        rows.images.append_row((0.0, b"image"))
+        rows.joint_states.append_row(np.zeros(1, dtype=rows.joint_states.dtype)[0])
+        rows.joint_commands.append_row(np.zeros(1, dtype=rows.joint_commands.dtype)[0])
+        rows.rotations.append_row((0.0, 0.0, 0.0, 0.0, 1.0, 0))
+        self._collect(rows)
+        return self.model_data
+
+
+class StepsImportStrategy(RowsImportStrategy):
+    """Converts a file in steps with a rotation each, checkpointing before every step and failing at `fail_at`."""
+
+    supports_resume = True
+
+    def __init__(self, num_steps: int, fail_at: int | None = None):
+        super().__init__()
+        self.num_steps = num_steps
+        self.fail_at = fail_at
+        self.converted_steps: list[int] = []
+
+    def convert_to_model_data(self, file_path: Path) -> ModelData:
+        if self.resume_recording is None:
+            super().convert_to_model_data(file_path)
+        else:
+            self.model_data = ModelData(recording=self.resume_recording)
+        for step in range(self.resume_position, self.num_steps):
+            if self._checkpoint_due():
+                self._checkpoint(step, float(step), {"step": step})
+            if step == self.fail_at:
+                raise RuntimeError("Interrupted import")
+            self.converted_steps.append(step)
+            rows = ModelData()
+            rows.rotations.append_row((float(step), 0.0, 0.0, 0.0, 1.0, step + 1))
+            self._collect(rows)
+        return self.model_data
+
+    def _restore_state(self, state) -> None:
+        assert state == {"step": self.resume_position}
+
+
+class LocationsImportStrategy(StepsImportStrategy):
+    """Changes the location of the recording in every step, after the first steps are committed."""
+
+    def convert_to_model_data(self, file_path: Path) -> ModelData:
+        super().convert_to_model_data(file_path)
+        return self.model_data
+
+    def _collect(self, model_data: ModelData) -> None:
+        assert self.model_data.recording is not None
+        self.model_data.recording.location = f"Location {len(self.converted_steps)}"
+        super()._collect(model_data)
+
+
+class ImagesImportStrategy(RowsImportStrategy):
+    """Collects the given images after the rows of every model."""
+
+    def __init__(self, images: list[bytes]):
+        super().__init__()
+        self.images = images
+
+    def convert_to_model_data(self, file_path: Path) -> ModelData:
+        super().convert_to_model_data(file_path)
+        rows = ModelData()
+        for idx, data in enumerate(self.images):
+            rows.images.append_row((float(idx + 1), data))
+        self._collect(rows)
+        return self.model_data
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    log_file = tmp_path / "game.mcap"
+    log_file.write_bytes(b"log")
+    return log_file
+
+
+def count(db: Database, model: type) -> int:
+    return db.session.scalar(select(func.count()).select_from(model))
+
+
+def test_already_imported_file_is_skipped(db, log_file):
+    strategy = RowsImportStrategy()
+    ModelImporter(db, strategy).import_to_db(log_file)
+    ModelImporter(db, strategy).import_to_db(log_file)
+
+    assert strategy.conversions == 1
+    assert count(db, Recording) == 1
+    recording = db.session.scalars(select(Recording)).one()
+    assert recording.file_hash is not None
+
+
+def test_already_imported_file_is_replaced(db, log_file):
+    strategy = RowsImportStrategy()
+    ModelImporter(db, strategy).import_to_db(log_file)
+    ModelImporter(db, strategy, replace=True).import_to_db(log_file)
+
+    assert strategy.conversions == 2
+    assert count(db, Recording) == 1
+    for model in REQUIRED_FIELDS.values():
+        assert count(db, model) == 1
+
+
+def test_replaced_recording_keeps_no_chunks(db, log_file):
+    strategy = RowsImportStrategy()
+    ModelImporter(db, strategy).import_to_db(log_file)
+    chunk_database(db)
+    ModelImporter(db, strategy, replace=True).import_to_db(log_file)
+
+    # The chunks of the replaced recording are deleted with it, they are written again by chunking the new rows
+    for model in (JointStatesChunk, JointCommandsChunk, RotationChunk):
+        assert count(db, model) == 0
+    chunk_database(db)
+    recording_id = db.session.scalars(select(Recording._id)).one()
+    for model in (JointStatesChunk, JointCommandsChunk, RotationChunk):
+        assert db.session.scalars(select(model.recording_id)).all() == [recording_id]
+
+
+def test_changed_file_is_imported_again(db, log_file):
+    strategy = RowsImportStrategy()
+    ModelImporter(db, strategy).import_to_db(log_file)
+    log_file.write_bytes(b"changed log")
+    ModelImporter(db, strategy, image_threads=1).import_to_db(log_file)
+
+    assert count(db, Recording) == 2
+
+
+def test_interrupted_import_is_resumed(db, log_file):
+    interrupted = StepsImportStrategy(10, fail_at=6)
+    with pytest.raises(RuntimeError):
+        ModelImporter(db, interrupted, image_threads=1, checkpoint_interval=0).import_to_db(log_file)
+    assert count(db, Recording) == 1
+    assert db.session.scalars(select(ImportProgress)).one().position == 6
+
+    resumed = StepsImportStrategy(10)
+    ModelImporter(db, resumed, image_threads=1, checkpoint_interval=0).import_to_db(log_file)
+
+    assert resumed.converted_steps == list(range(6, 10))
+    assert count(db, Recording) == 1
+    assert count(db, ImportProgress) == 0
+    # A single rotation is collected with the recording, the others by the steps
+    assert count(db, Rotation) == 11
+
+
+@pytest.mark.parametrize("image_threads", [0, 1])
+def test_recording_populated_during_the_import_is_written(db, log_file, image_threads):
+    strategy = LocationsImportStrategy(10)
+    ModelImporter(db, strategy, image_threads, checkpoint_interval=0).import_to_db(log_file)
+
+    # The strategy populates its own recording, which is written by the importer
+    assert strategy.model_data.recording not in db.session
+    assert db.session.scalars(select(Recording.location)).one() == "Location 10"
+
+
+def test_partial_import_is_replaced_without_resume_support(db, log_file):
+    with pytest.raises(RuntimeError):
+        ModelImporter(db, StepsImportStrategy(10, fail_at=6), image_threads=1, checkpoint_interval=0).import_to_db(
+            log_file
+        )
+
+    replacing = StepsImportStrategy(10)
+    replacing.supports_resume = False
+    ModelImporter(db, replacing, image_threads=1, checkpoint_interval=0).import_to_db(log_file)
+
+    assert replacing.converted_steps == list(range(10))
+    assert count(db, Recording) == 1
+    assert count(db, Rotation) == 11
+
+
+def test_interrupted_import_without_resume_support_is_not_committed(db, log_file):
+    interrupted = StepsImportStrategy(10, fail_at=6)
+    interrupted.supports_resume = False
+    with pytest.raises(RuntimeError):
+        ModelImporter(db, interrupted, image_threads=1, checkpoint_interval=0).import_to_db(log_file)
+
+    assert count(db, Recording) == 0
+
+
+def test_checkpoint_of_another_state_version_is_not_resumed(db, log_file):
+    with pytest.raises(RuntimeError):
+        ModelImporter(db, StepsImportStrategy(10, fail_at=6), image_threads=1, checkpoint_interval=0).import_to_db(
+            log_file
+        )
+
+    resumed = StepsImportStrategy(10)
+    resumed.state_version = 2
+    with pytest.raises(CheckpointStateError, match="version 1 of StepsImportStrategy"):
+        ModelImporter(db, resumed, image_threads=1, checkpoint_interval=0).import_to_db(log_file)
+    assert not resumed.converted_steps
+
+
+def test_interrupted_serial_import_is_not_committed(db, log_file):
+    with pytest.raises(RuntimeError):
+        ModelImporter(db, StepsImportStrategy(10, fail_at=6)).import_to_db(log_file)
+    assert count(db, Recording) == 0
+
+    ModelImporter(db, StepsImportStrategy(10)).import_to_db(log_file)
+    assert count(db, Rotation) == 11
+
+
+@pytest.mark.parametrize("image_threads", [0, 1])
+def test_duplicate_images_reference_the_kept_image(db, log_file, image_threads):
+    strategy = ImagesImportStrategy([b"image", b"other", b"other", b"image"])
+    ModelImporter(db, strategy, image_threads, duplicate_image_threshold=0.0).import_to_db(log_file)
+
+    images = db.session.scalars(select(Image).order_by(Image.stamp)).all()
+    assert [image.resolved_data for image in images] == [b"image", b"image", b"other", b"other", b"image"]
+    assert [image.data for image in images] == [b"image", b"", b"other", b"", b"image"]
+    assert images[1].reference_id == images[0]._id
+    assert images[3].reference_id == images[2]._id
@@ -0,0 +1,127 @@
+import pickle
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from soccer_diffusion.dataset.imports.data import ModelData
+from soccer_diffusion.dataset.imports.pipeline import (
+    BoundedExecutor,
+    Checkpoint,
+    CheckpointStateError,
+    ModelDataQueue,
+    PipelineAbortedError,
+    RecordingUpdate,
+    StageCounter,
+    dump_state,
+    load_state,
+)
+
+
+def model_data(num_rotations: int) -> ModelData:
+    models = ModelData()
+    for idx in range(num_rotations):
+        models.rotations.append_row((float(idx), 0.0, 0.0, 0.0, 1.0, idx))
+    return models
+
+
+def test_stage_counter_throughput():
+    counter = StageCounter("write")
+    counter.add(10, 2.0)
+    counter.add(30, 2.0)
+
+    assert counter.items == 40
+    assert counter.throughput == 10.0
+    assert StageCounter("idle").throughput == 0.0
+
+
+def test_bounded_executor_blocks_while_too_many_tasks_are_pending():
+    release = threading.Event()
+    executor = BoundedExecutor(1, 2, StageCounter("images"))
+    futures = [executor.submit(release.wait) for _ in range(2)]
+
+    submitted = threading.Event()
+    blocked = threading.Thread(target=lambda: (futures.append(executor.submit(lambda: 42)), submitted.set()))
+    blocked.start()
+    assert not submitted.wait(0.2)
+
+    release.set()
+    blocked.join()
+    assert futures[-1].result() == 42
+    executor.shutdown()
+    assert executor.counter.items == 3
+
+
+def test_model_data_queue_batches_models():
+    queue = ModelDataQueue(4, batch_rows=3, counter=StageCounter("convert"))
+    for _ in range(4):
+        queue.put(model_data(1))
+    queue.close()
+
+    assert [len(batch.rotations) for batch in queue] == [3, 1]
+    assert queue.counter.items == 4
+
+
+def test_model_data_queue_checkpoint_follows_its_models():
+    queue = ModelDataQueue(4, batch_rows=3, counter=StageCounter("convert"), checkpoint_interval=0)
+    queue.put(model_data(1))
+    assert queue.checkpoint_due()
+    queue.checkpoint(Checkpoint(1, 0.0, b""))
+    queue.put(model_data(1))
+    queue.close()
+
+    items = list(queue)
+    assert [type(item) for item in items] == [ModelData, Checkpoint, ModelData]
+    assert items[1].position == 1
+
+
+def test_model_data_queue_recording_changes_precede_the_models():
+    recording = {"location": "Field"}
+    queue = ModelDataQueue(8, batch_rows=1, counter=StageCounter("convert"), recording=lambda: dict(recording))
+    queue.put(model_data(1))
+    queue.put(model_data(1))
+    recording["location"] = "Other field"
+    queue.close()
+
+    items = list(queue)
+    assert [type(item) for item in items] == [RecordingUpdate, ModelData, ModelData, RecordingUpdate]
+    assert [item.values for item in items if isinstance(item, RecordingUpdate)] == [
+        {"location": "Field"},
+        {"location": "Other field"},
+    ]
+
+
+def test_model_data_queue_abort_stops_blocked_producer():
+    queue = ModelDataQueue(1, batch_rows=1, counter=StageCounter("convert"))
+    queue.put(model_data(1))
+
+    errors = []
+
+    def produce():
+        try:
+            queue.put(model_data(1))
+        except PipelineAbortedError as error:
+            errors.append(error)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    queue.abort()
+    producer.join(timeout=5)
+
+    assert not producer.is_alive()
+    assert len(errors) == 1
+    with pytest.raises(PipelineAbortedError):
+        queue.close()
+
+
+def test_state_of_plain_values_is_restored():
+    state = {"data": {"image": b"image", "rotation": [0.0, 0.0, 0.0, 1.0], "mask": 3}, "resamplers": [{}, None]}
+
+    assert load_state(dump_state(state)) == state
+
+
+def test_state_with_objects_is_rejected():
+    with pytest.raises(TypeError, match="SimpleNamespace"):
+        dump_state({"data": SimpleNamespace(x=1.0)})
+    with pytest.raises(CheckpointStateError, match="SimpleNamespace"):
+        load_state(pickle.dumps({"data": SimpleNamespace(x=1.0)}))
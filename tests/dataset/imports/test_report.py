@@ -0,0 +1,55 @@
+import json
+import sys
+from pathlib import Path
+
+from soccer_diffusion.dataset.imports.report import ImportReport, count_message, count_rows, measure, measured_iter
+
+
+def test_nothing_is_measured_without_active_report():
+    report = ImportReport(Path(__file__))
+    with measure("db", "insert"):
+        count_rows("Image", 1)
+    count_message("/camera/image_proc", 10)
+
+    assert not report.seconds
+    assert not report.rows
+    assert not report.messages
+
+
+def test_active_report_collects_measurements(tmp_path):
+    with ImportReport(tmp_path / "game.log") as report:
+        for _ in measured_iter(range(3), "decode", "mcap"):
+            count_message("/joint_states", 100)
+        with measure("db", "insert"):
+            count_rows("JointStates", 3)
+
+    assert report.calls["decode"]["mcap"] == 4  # Including the end of the iteration
+    assert report.calls["db"]["insert"] == 1
+    assert report.messages["/joint_states"] == 3
+    assert report.message_bytes["/joint_states"] == 300
+    assert report.rows["JointStates"] == 3
+    assert report.memory
+    assert report.peak_rss > 0
+
+
+def test_report_is_saved_as_json(tmp_path):
+    with ImportReport(tmp_path / "game.log") as report:
+        count_message("/gamestate", 5)
+        count_rows("GameState", 1)
+    report.save(tmp_path / "report.json")
+
+    with open(tmp_path / "report.json") as file:
+        saved = json.load(file)
+    assert saved["topics"] == {"/gamestate": {"messages": 1, "bytes": 5}}
+    assert saved["rows"] == {"GameState": 1}
+    assert saved["memory"]["peak_rss_bytes"] == report.peak_rss
+
+
+def test_memory_is_sampled_without_the_resource_module(tmp_path, monkeypatch):
+    # The resource module is not available on Windows
+    monkeypatch.setitem(sys.modules, "resource", None)
+    with ImportReport(tmp_path / "game.log") as report:
+        pass
+
+    assert report.memory
+    assert report.peak_rss == max(rss for _, rss in report.memory)
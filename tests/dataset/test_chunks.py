@@ -0,0 +1,125 @@
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select, update
+
+from soccer_diffusion.dataset.chunks import (
+    CHUNKED_MODELS,
+    chunk_database,
+    count_samples,
+    decode_chunk,
+    encode_chunk,
+    read_samples,
+)
+from soccer_diffusion.dataset.models import ChunkDtype, ImportProgress, JointStates, JointStatesChunk, RotationChunk
+
+pytestmark = pytest.mark.dummy_data(num_recordings=2, image_step=50)
+
+
+def decode(chunk: dict) -> tuple[np.ndarray, np.ndarray]:
+    return decode_chunk(
+        chunk["start_stamp"],
+        chunk["dtype"],
+        chunk["value_offset"],
+        chunk["value_scale"],
+        chunk["stamps"],
+        chunk["data"],
+    )
+
+
+@pytest.mark.parametrize("dtype, tolerance", [(ChunkDtype.FLOAT32, 1e-6), (ChunkDtype.INT16, 2 * np.pi / 65535)])
+def test_chunk_roundtrip(dtype, tolerance):
+    rng = np.random.default_rng(0)
+    stamps = 1000.0 + np.arange(64) / 50
+    values = rng.uniform(0, 2 * np.pi, (64, 22))
+
+    chunk = encode_chunk(stamps, values, dtype)
+    decoded_stamps, decoded_values = decode(chunk)
+
+    assert chunk["dtype"] == dtype.value
+    assert len(chunk["data"]) == values.size * np.dtype(dtype.value).itemsize
+    np.testing.assert_allclose(decoded_stamps, stamps, atol=1e-5)
+    assert decoded_values.dtype == np.float32
+    np.testing.assert_allclose(decoded_values, values, atol=tolerance)
+
+
+def test_chunks_with_nan_values_are_stored_as_float32():
+    values = np.zeros((4, 2))
+    values[1, 1] = np.nan
+
+    chunk = encode_chunk(np.arange(4.0), values, ChunkDtype.INT16)
+
+    assert chunk["dtype"] == ChunkDtype.FLOAT32.value
+    assert np.isnan(decode(chunk)[1][1, 1])
+
+
+@pytest.mark.parametrize("start, stop", [(0, 10), (14, 18), (30, 70), (90, 120), (5, 5)])
+def test_read_samples_equals_reading_rows(db, start, stop):
+    chunk_database(db, chunk_size=16)
+    columns = CHUNKED_MODELS[JointStatesChunk][1]
+    expected = db.session.execute(
+        select(JointStates.stamp, *(JointStates.__table__.c[column] for column in columns))
+        .where(JointStates.recording_id == 2)
+        .order_by(JointStates.tick)
+        .offset(start)
+        .limit(max(stop - start, 0))
+    ).all()
+    expected = np.array(expected, dtype=np.float64).reshape(-1, len(columns) + 1)
+
+    with sqlite3.connect(db.db_path) as connection:
+        stamps, values = read_samples(connection, JointStatesChunk, 2, start, stop)
+
+    np.testing.assert_allclose(stamps, expected[:, 0], atol=1e-5)
+    np.testing.assert_allclose(values, expected[:, 1:], atol=1e-6)
+
+
+def test_chunk_database_replaces_chunks_and_drops_rows(db):
+    chunk_database(db, chunk_size=16)
+    chunk_database(db, ChunkDtype.INT16, chunk_size=32, drop_rows=True)
+
+    assert db.session.scalar(select(func.count()).select_from(JointStates)) == 0
+    assert db.session.scalars(select(RotationChunk.dtype).distinct()).all() == [ChunkDtype.INT16.value]
+    with sqlite3.connect(db.db_path) as connection:
+        assert count_samples(connection, RotationChunk) == {1: 100, 2: 100}
+        assert read_samples(connection, RotationChunk, 1, 90, 200)[1].shape == (10, 4)
+
+
+def test_chunking_again_keeps_the_chunks_of_dropped_rows(db):
+    chunk_database(db, chunk_size=16, drop_rows=True)
+    chunk_database(db, ChunkDtype.INT16, chunk_size=32)
+
+    assert db.session.scalars(select(RotationChunk.dtype).distinct()).all() == [ChunkDtype.FLOAT32.value]
+    with sqlite3.connect(db.db_path) as connection:
+        assert count_samples(connection, RotationChunk) == {1: 100, 2: 100}
+
+
+def test_unfinished_imports_are_not_chunked(db):
+    db.session.add(ImportProgress(recording_id=1, position=0, stamp=0.0, state=b"", updated=datetime.now()))
+    db.session.commit()
+
+    chunk_database(db, chunk_size=16, drop_rows=True)
+
+    assert db.session.scalar(select(func.count()).select_from(JointStates).where(JointStates.recording_id == 1)) == 100
+    with sqlite3.connect(db.db_path) as connection:
+        assert count_samples(connection, RotationChunk) == {2: 100}
+
+
+def test_chunk_positions_are_the_ticks(db):
+    # A stamp out of tick order, e.g. of a message received late
+    db.session.execute(
+        update(JointStates)
+        .where(JointStates.recording_id == 1, JointStates.tick == 3)
+        .values(stamp=JointStates.stamp + 1)
+    )
+    db.session.commit()
+    expected = db.session.scalars(
+        select(JointStates.stamp).where(JointStates.recording_id == 1).order_by(JointStates.tick).limit(10)
+    ).all()
+
+    chunk_database(db, chunk_size=16)
+
+    with sqlite3.connect(db.db_path) as connection:
+        stamps, _ = read_samples(connection, JointStatesChunk, 1, 0, 10)
+    np.testing.assert_allclose(stamps, expected, atol=1e-5)
@@ -0,0 +1,89 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from soccer_diffusion.dataset.columnar import (
+    EXPORTED_MODELS,
+    ColumnarFormat,
+    export_columnar,
+    exported_columns,
+    load_columnar,
+)
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.defaults import EXPORTED_TABLES
+from soccer_diffusion.dataset.models import GameState, Image, JointStates, Recording
+from soccer_diffusion.dataset.shards import shard_database
+
+pytest.importorskip("pyarrow")
+pytestmark = pytest.mark.dummy_data(num_recordings=2, image_step=10)
+
+
+def rows(db: Database, model: type, recording_id: int) -> list[tuple]:
+    columns = [model.__table__.c[column] for column in exported_columns(model)]
+    return db.session.execute(select(*columns).where(model.recording_id == recording_id).order_by(model.stamp)).all()
+
+
+@pytest.mark.parametrize("fmt", list(ColumnarFormat))
+def test_tables_are_exported_per_recording(db, tmp_path, fmt):
+    export_columnar(db, tmp_path / "columnar", fmt, batch_size=32)
+
+    assert (tmp_path / "columnar" / "JointStates" / "recording_id=2" / f"part-0.{fmt.value}").exists()
+    for model in (JointStates, GameState, Image):
+        table = load_columnar(tmp_path / "columnar", model.__tablename__, recording_ids=[2])
+        assert set(table["recording_id"].to_pylist()) == {2}
+        exported = list(zip(*(table[column].to_pylist() for column in exported_columns(model))))
+        assert exported == [tuple(row) for row in rows(db, model, 2)]
+
+    stamps = load_columnar(tmp_path / "columnar", "JointStates", columns=["stamp"])["stamp"].to_numpy()
+    assert stamps.dtype == np.float64 and len(stamps) == 200
+    recordings = load_columnar(tmp_path / "columnar", "Recording").to_pylist()
+    assert [recording["original_file"] for recording in recordings] == db.session.scalars(
+        select(Recording.original_file).order_by(Recording._id)
+    ).all()
+
+
+def test_images_are_exported_without_data(db, tmp_path):
+    export_columnar(db, tmp_path / "columnar", models=[Image])
+
+    table = load_columnar(tmp_path / "columnar", "Image")
+    assert "data" not in table.column_names
+    assert table.num_rows == 20
+    assert not (tmp_path / "columnar" / "JointStates").exists()
+
+
+def test_exporting_recordings_again_replaces_their_files(db, tmp_path):
+    export_columnar(db, tmp_path / "columnar", recording_ids=[1])
+    db.session.execute(JointStates.__table__.delete().where(JointStates.recording_id == 1, JointStates.stamp >= 0.5))
+    db.session.commit()
+    export_columnar(db, tmp_path / "columnar", recording_ids=[1, 2])
+
+    table = load_columnar(tmp_path / "columnar", "JointStates", recording_ids=[1])
+    assert table.num_rows == len(rows(db, JointStates, 1)) < 100
+    assert load_columnar(tmp_path / "columnar", "Recording").num_rows == 2
+    assert not list((tmp_path / "columnar").rglob(".*.tmp"))
+
+
+def test_catalog_is_exported_with_its_shards(db, tmp_path):
+    catalog_path = shard_database(db, tmp_path / "sharded")
+    catalog = Database(catalog_path).create_session(create_schema=False)
+
+    export_columnar(catalog, tmp_path / "columnar", ColumnarFormat.PARQUET, models=[JointStates])
+
+    table = load_columnar(tmp_path / "columnar", "JointStates", columns=["recording_id", "stamp"])
+    assert sorted(set(table["recording_id"].to_pylist())) == catalog.session.scalars(select(Recording._id)).all()
+    assert table.num_rows == 200
+
+
+def test_exported_tables_are_the_exported_models():
+    assert tuple(model.__tablename__ for model in EXPORTED_MODELS) == EXPORTED_TABLES
+
+
+def test_cli_arguments_are_parsed_without_importing_pyarrow():
+    modules = subprocess.check_output(
+        [sys.executable, "-c", "import sys, soccer_diffusion.dataset.cli.args; print(*sys.modules)"], text=True
+    ).split()
+    assert "pyarrow" not in modules
+    assert "soccer_diffusion.dataset.columnar" not in modules
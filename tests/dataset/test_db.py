@@ -0,0 +1,43 @@
+import sqlite3
+
+import pytest
+
+from soccer_diffusion.dataset.db import WalCheckpointPolicy, begin_snapshot
+from soccer_diffusion.dataset.dummy_data import insert_dummy_data
+
+pytestmark = pytest.mark.dummy_data(num_recordings=1, image_step=10)
+
+
+@pytest.fixture
+def reader(db):
+    connection = sqlite3.connect(f"file:{db.db_path}?mode=ro", uri=True, isolation_level=None)
+    yield connection
+    connection.close()
+
+
+def count_recordings(connection: sqlite3.Connection) -> int:
+    return connection.execute("SELECT COUNT(*) FROM Recording").fetchone()[0]
+
+
+def test_snapshot_is_pinned_until_the_next_one(db, reader):
+    begin_snapshot(reader)
+    insert_dummy_data(db.session, num_recordings=1, num_samples_per_rec=100, image_step=10, seed=1)
+
+    assert count_recordings(reader) == 1
+    begin_snapshot(reader)
+    assert count_recordings(reader) == 2
+
+
+def test_wal_is_truncated_once_no_reader_uses_it(db, reader):
+    policy = WalCheckpointPolicy(max_wal_size=0, busy_timeout=0.0)
+    wal_path = db.db_path.with_name(db.db_path.name + "-wal")
+    begin_snapshot(reader)
+    insert_dummy_data(db.session, num_recordings=1, num_samples_per_rec=100, image_step=10, seed=1)
+
+    # The reader uses the pages written before its snapshot
+    assert not policy.checkpoint(db.session)
+    assert wal_path.stat().st_size > 0
+
+    reader.execute("COMMIT")
+    assert policy.checkpoint(db.session)
+    assert wal_path.stat().st_size == 0
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import func, select
+
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.dummy_data import database_size, insert_dummy_data
+from soccer_diffusion.dataset.models import GameState, Image, JointStates, Recording, Rotation
+
+
+def count(db: Database, model: type) -> int:
+    return db.session.scalar(select(func.count()).select_from(model))
+
+
+def test_dummy_data_is_inserted(db):
+    insert_dummy_data(db.session, num_recordings=2, num_samples_per_rec=100, image_step=10, seed=0)
+
+    assert count(db, Recording) == 2
+    assert count(db, Image) == 2 * 10
+    for model in (Rotation, JointStates, GameState):
+        assert count(db, model) == 2 * 100
+    assert db.session.scalar(select(func.max(JointStates.stamp))) == pytest.approx(0.99)
+
+
+def test_dummy_data_is_reproducible(tmp_path):
+    rotations = []
+    for run in range(2):
+        db = Database(tmp_path / f"db{run}.sqlite3").create_session(create_schema=True)
+        insert_dummy_data(db.session, num_recordings=1, num_samples_per_rec=50, image_step=10, seed=42)
+        rotations.append(db.session.execute(select(Rotation.x, Rotation.w).order_by(Rotation.stamp)).all())
+    assert rotations[0] == rotations[1]
+
+
+def test_dummy_data_is_inserted_until_target_size(db):
+    insert_dummy_data(db.session, num_recordings=1, num_samples_per_rec=100, image_step=10, target_size=10 * 2**20)
+
+    assert database_size(db.session) >= 10 * 2**20
+    assert count(db, Recording) > 1
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.dummy_data import insert_dummy_data
+from soccer_diffusion.dataset.game_state_intervals import append_game_state_intervals
+from soccer_diffusion.dataset.models import GameState, GameStateInterval, Recording, RobotState
+
+STATES = ["STOPPED", "STOPPED", "POSITIONING", "PLAYING", "PLAYING", "PLAYING", "STOPPED", "STOPPED"]
+
+
+def add_recording(db: Database) -> int:
+    recording = Recording(
+        allow_public=False,
+        original_file="game.mcap",
+        team_name="Team",
+        robot_type="Robot",
+        location="Location",
+        simulated=False,
+        img_width=4,
+        img_height=2,
+        img_width_scaling=1.0,
+        img_height_scaling=1.0,
+    )
+    db.session.add(recording)
+    db.session.flush()
+    return recording._id
+
+
+def intervals(db: Database, recording_id: int) -> list[tuple[float, float, RobotState]]:
+    rows = db.session.scalars(
+        select(GameStateInterval)
+        .where(GameStateInterval.recording_id == recording_id)
+        .order_by(GameStateInterval.start_stamp)
+    )
+    return [(interval.start_stamp, interval.end_stamp, interval.state) for interval in rows]
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3, len(STATES)])
+def test_intervals_do_not_depend_on_batches(db, batch_size):
+    recording_id = add_recording(db)
+    stamps = np.arange(len(STATES)) / 10
+    for start in range(0, len(STATES), batch_size):
+        batch = slice(start, start + batch_size)
+        append_game_state_intervals(db.session, recording_id, stamps[batch], STATES[batch])
+
+    assert intervals(db, recording_id) == [
+        (0.0, 0.2, RobotState.STOPPED),
+        (0.2, 0.3, RobotState.POSITIONING),
+        (0.3, 0.6, RobotState.PLAYING),
+        (0.6, 0.7, RobotState.STOPPED),
+    ]
+
+
+def test_dummy_data_intervals_match_game_states(db):
+    insert_dummy_data(db.session, num_recordings=2, num_samples_per_rec=50, image_step=50, seed=0)
+
+    for recording_id in (1, 2):
+        game_states = db.session.execute(
+            select(GameState.stamp, GameState.state)
+            .where(GameState.recording_id == recording_id)
+            .order_by(GameState.stamp)
+        ).all()
+        recording_intervals = intervals(db, recording_id)
+        starts = np.array([start for start, _, _ in recording_intervals])
+
+        assert recording_intervals[-1][1] == game_states[-1].stamp
+        for stamp, state in game_states:
+            # The game state of each stamp is the one of the last interval starting before it
+            assert recording_intervals[np.searchsorted(starts, stamp, side="right") - 1][2] == RobotState(state)
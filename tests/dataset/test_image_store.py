@@ -0,0 +1,66 @@
+import sqlite3
+
+import numpy as np
+import pytest
+from mcap_ros2.reader import read_ros2_messages
+from sqlalchemy import select
+
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.image_store import ImageStore, image_store_dir, move_images
+from soccer_diffusion.dataset.models import Image
+from soccer_diffusion.dataset.recording2mcap import recording2mcap
+
+pytestmark = pytest.mark.dummy_data(num_recordings=2, image_step=10)
+
+
+def image_data(db: Database) -> dict[int, bytes]:
+    db.session.expire_all()
+    return {image._id: image.resolved_data for image in db.session.scalars(select(Image))}
+
+
+def test_store_appends_and_reads_images(tmp_path):
+    store = ImageStore(tmp_path / "db.images")
+    assert store.append(3, [b"abc", b"de"]) == [0, 3]
+    assert store.append(3, [b"fgh"]) == [5]
+
+    assert store.read(3, 3, 2) == b"de"
+    assert store.read(3, 5, 3) == b"fgh"
+    assert store.path(3).read_bytes() == b"abcdefgh"
+
+
+def test_images_are_moved_and_restored(db):
+    images = image_data(db)
+
+    move_images(db)
+
+    assert set(db.session.scalars(select(Image.data))) == {b""}
+    assert sorted(path.name for path in image_store_dir(db.db_path).iterdir()) == [
+        "recording_1.bin",
+        "recording_2.bin",
+    ]
+    assert image_data(db) == images
+    with sqlite3.connect(db.db_path) as connection:
+        assert ImageStore.of(connection).directory == image_store_dir(db.db_path)
+
+    move_images(db, restore=True)
+
+    assert db.session.scalars(select(Image).where(Image.blob_offset.is_not(None))).first() is None
+    assert not image_store_dir(db.db_path).exists()
+    assert image_data(db) == images
+
+
+def test_moved_images_are_exported_to_mcap(db, tmp_path):
+    recording2mcap(db.session, 1, tmp_path / "before")
+    move_images(db)
+    recording2mcap(db.session, 1, tmp_path / "after")
+
+    def exported_images(path):
+        return [
+            np.frombuffer(message.ros_msg.data, dtype=np.uint8)
+            for message in read_ros2_messages(path, topics=["/image"])
+        ]
+
+    before = exported_images(tmp_path / "before" / "before_0.mcap")
+    after = exported_images(tmp_path / "after" / "after_0.mcap")
+    assert len(after) == len(before) > 0
+    assert all(np.array_equal(a, b) for a, b in zip(before, after))
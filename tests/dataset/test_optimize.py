@@ -0,0 +1,54 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from soccer_diffusion.dataset.cli.args import CLIArgs, CLIArgumentError
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.optimize import optimize_database
+
+pytestmark = pytest.mark.dummy_data(num_recordings=1, num_samples_per_rec=50, image_step=10)
+
+
+@pytest.fixture
+def db_path(db):
+    path = Path(db.db_path)
+    db.close_session().engine.dispose()
+
+    # The indexes of a database created before the covering indexes were added
+    connection = sqlite3.connect(path)
+    connection.execute('DROP INDEX "ix_Rotation_recording_id"')
+    connection.execute('CREATE INDEX "ix_Rotation_recording_id" ON "Rotation" (recording_id, stamp ASC)')
+    connection.close()
+    return path
+
+
+def index_columns(connection: sqlite3.Connection, name: str) -> list[str]:
+    return [column for _, _, column in connection.execute(f'PRAGMA index_info("{name}")')]
+
+
+def test_optimize_creates_covering_indexes_and_changes_the_page_size(db_path):
+    db = Database(db_path).create_session()
+    optimize_database(db, page_size=8192)
+    db.close_session()
+
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute("PRAGMA page_size").fetchone()[0] == 8192
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert index_columns(connection, "ix_Rotation_recording_id") == ["recording_id", "stamp", "x", "y", "z", "w"]
+        assert index_columns(connection, "ix_GameState_recording_id") == ["recording_id", "stamp", "state"]
+        assert connection.execute("SELECT count(*) FROM sqlite_stat1").fetchone()[0] > 0
+        plan = connection.execute(
+            "EXPLAIN QUERY PLAN SELECT stamp, x, y, z, w FROM Rotation WHERE recording_id = 1 ORDER BY stamp LIMIT 10"
+        ).fetchall()
+        assert "COVERING INDEX ix_Rotation_recording_id" in plan[0][3]
+        assert connection.execute("SELECT count(*) FROM Rotation").fetchone()[0] == 50
+
+
+def test_optimize_rejects_invalid_page_sizes(monkeypatch, db_path):
+    monkeypatch.setattr("sys.argv", ["cli", "--db-path", str(db_path), "db", "optimize"])
+    assert CLIArgs().parse_args().page_size is None
+
+    monkeypatch.setattr("sys.argv", ["cli", "--db-path", str(db_path), "db", "optimize", "--page-size", "5000"])
+    with pytest.raises(CLIArgumentError):
+        CLIArgs().parse_args()
@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pytest
+from mcap_ros2.reader import read_ros2_messages
+
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.game_state_intervals import append_game_state_intervals
+from soccer_diffusion.dataset.imports.data import JOINT_NAMES
+from soccer_diffusion.dataset.models import GameState, Image, JointCommands, JointStates, Recording, Rotation
+from soccer_diffusion.dataset.recording2mcap import recording2mcap, recordings2mcap, select_recordings
+
+NUM_SAMPLES = 5
+
+
+def add_recording(db: Database, original_file: str, team_name: str = "Team", location: str = "Location") -> Recording:
+    recording = Recording(
+        allow_public=False,
+        original_file=original_file,
+        team_name=team_name,
+        robot_type="Robot",
+        location=location,
+        simulated=False,
+        img_width=4,
+        img_height=2,
+        img_width_scaling=1.0,
+        img_height_scaling=1.0,
+    )
+    db.session.add(recording)
+    joints = {name: 0.0 for name in JOINT_NAMES} | {"r_knee": 0.5}
+    for idx in range(NUM_SAMPLES):
+        stamp = idx / 10
+        db.session.add(Image(stamp, np.full((2, 4, 3), idx, dtype=np.uint8), recording=recording))
+        db.session.add(Rotation(stamp=stamp, recording=recording, x=0.0, y=0.0, z=0.0, w=1.0))
+        db.session.add(JointStates(stamp=stamp, recording=recording, **joints))
+        db.session.add(JointCommands(stamp=stamp, recording=recording, **joints))
+        db.session.add(GameState(stamp=stamp, recording=recording, state="PLAYING"))
+    db.session.flush()
+    stamps = np.arange(NUM_SAMPLES) / 10
+    append_game_state_intervals(db.session, recording._id, stamps, ["PLAYING"] * NUM_SAMPLES)
+    db.session.commit()
+    return recording
+
+
+@pytest.fixture
+def db(db):
+    recording = add_recording(db, "game.mcap")
+    # The duplicate of the last image references its data
+    db.session.add(Image(1.0, np.zeros((2, 4, 3), dtype=np.uint8), recording=recording))
+    db.session.flush()
+    duplicate = db.session.query(Image).filter(Image.stamp == 1.0).one()
+    duplicate.data = b""
+    duplicate.reference_id = db.session.query(Image).filter(Image.stamp == 0.4).one()._id
+    db.session.commit()
+    return db
+
+
+def test_recording_is_converted_to_mcap(db, tmp_path):
+    output = tmp_path / "export"
+    recording2mcap(db.session, "game.mcap", output)
+
+    messages: dict[str, list] = {}
+    for message in read_ros2_messages(output / "export_0.mcap"):
+        messages.setdefault(message.channel.topic, []).append(message.ros_msg)
+
+    info = json.loads(messages["/recording"][0].data)
+    assert info["num_images"] == NUM_SAMPLES + 1
+    assert info["num_joint_states"] == NUM_SAMPLES
+
+    images = messages["/image"]
+    assert [bytes(image.data)[0] for image in images] == [0, 1, 2, 3, 4, 4]
+    assert (images[0].height, images[0].width, images[0].step) == (2, 4, 12)
+    assert images[1].header.stamp.nanosec == 100_000_000
+
+    assert len(messages["/rotation"]) == len(messages["/rotation/euler"]) == NUM_SAMPLES
+    joint_state = messages["/joint_states"][0]
+    positions = dict(zip(joint_state.name, joint_state.position))
+    assert positions["r_knee"] == 0.5
+    assert positions["head_pan"] == 0.0
+    assert [state.data for state in messages["/game_state"]] == ["PLAYING"]
+
+
+def test_recordings_are_selected_by_id_filename_and_metadata(db):
+    other = add_recording(db, "other.mcap", team_name="Other")
+    add_recording(db, "elsewhere.mcap", team_name="Other", location="Elsewhere")
+
+    def selected(*args, **kwargs) -> list[str]:
+        return [recording.original_file for recording in select_recordings(db.session, *args, **kwargs)]
+
+    assert selected(["game.mcap", str(other._id)]) == ["game.mcap", "other.mcap"]
+    assert selected([], team_name="Other") == ["other.mcap", "elsewhere.mcap"]
+    assert selected([], team_name="Other", location="Location") == ["other.mcap"]
+    assert selected(["game.mcap"], team_name="Other") == []
+    with pytest.raises(ValueError):
+        selected(["missing.mcap"])
+
+
+def test_multiple_recordings_are_converted_in_parallel(db, tmp_path):
+    add_recording(db, "other.mcap")
+    recordings = select_recordings(db.session, [])
+    recordings2mcap(tmp_path / "db.sqlite3", recordings, tmp_path / "export", workers=2)
+
+    for recording in recordings:
+        mcap_file = tmp_path / "export" / f"recording_{recording._id}" / f"recording_{recording._id}_0.mcap"
+        info = json.loads(next(iter(read_ros2_messages(mcap_file, topics=["/recording"]))).ros_msg.data)
+        assert info["original_file"] == recording.original_file
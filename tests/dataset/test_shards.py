@@ -0,0 +1,108 @@
+import pickle
+import sqlite3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.image_store import move_images
+from soccer_diffusion.dataset.models import (
+    GameStateInterval,
+    Image,
+    ImportProgress,
+    JointCommands,
+    Recording,
+    Rotation,
+    Shard,
+)
+from soccer_diffusion.dataset.shards import (
+    ShardConnections,
+    add_shards,
+    is_catalog,
+    read_catalog,
+    shard_database,
+    shard_path,
+)
+
+pytestmark = pytest.mark.dummy_data(num_recordings=2, image_step=10)
+
+
+def count(db: Database, model: type, recording_id: int) -> int:
+    return db.session.scalar(select(func.count()).select_from(model).where(model.recording_id == recording_id))
+
+
+def connect(path):
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def test_database_is_split_into_shards(db, tmp_path):
+    move_images(db)
+    catalog_path = shard_database(db, tmp_path / "sharded")
+    catalog = Database(catalog_path).create_session(create_schema=False)
+
+    assert catalog.session.scalars(select(Recording.original_file).order_by(Recording._id)).all() == [
+        recording.original_file for recording in db.session.scalars(select(Recording).order_by(Recording._id))
+    ]
+    for shard in catalog.session.scalars(select(Shard)):
+        assert shard.num_samples == count(db, JointCommands, shard.shard_recording_id)
+        shard_db = Database(catalog_path.parent / shard.path).create_session(create_schema=False)
+        assert shard_db.session.scalars(select(Recording._id)).all() == [shard.shard_recording_id]
+        for model in (Image, JointCommands, Rotation, GameStateInterval):
+            assert count(shard_db, model, shard.shard_recording_id) == count(db, model, shard.shard_recording_id)
+        # The moved images are read from the image store of the shard
+        images = shard_db.session.scalars(select(Image).where(Image.blob_offset.is_not(None))).all()
+        assert images and all(len(image.resolved_data) == image.blob_size for image in images)
+
+    with connect(catalog_path) as connection:
+        assert is_catalog(connection)
+    with connect(db.db_path) as connection:
+        assert not is_catalog(connection)
+
+
+def test_registering_a_shard_again_replaces_its_recordings(db, tmp_path):
+    catalog_path = shard_database(db, tmp_path / "sharded", recording_ids=[1])
+    catalog = Database(catalog_path).create_session(create_schema=False)
+    path = shard_path(catalog_path, "recording_1")
+
+    # A new import of the recording is not registered, until it is complete
+    shard = Database(path).create_session(create_schema=False)
+    shard.session.add(ImportProgress(recording_id=1, position=0, stamp=0.0, state=b"", updated=datetime.now()))
+    shard.session.commit()
+    assert add_shards(catalog, [path]) == []
+    assert catalog.session.scalar(select(func.count()).select_from(Recording)) == 0
+
+    shard.session.query(ImportProgress).delete()
+    shard.session.commit()
+    assert len(add_shards(catalog, [path])) == 1
+    [recording_id] = add_shards(catalog, [path])
+    assert catalog.session.scalars(select(Shard.recording_id)).all() == [recording_id]
+    assert catalog.session.scalar(select(func.count()).select_from(Recording)) == 1
+
+
+def test_missing_shards_are_skipped(db, tmp_path):
+    catalog_path = shard_database(db, tmp_path / "sharded")
+    shard_path(catalog_path, "recording_1").unlink()
+
+    with connect(catalog_path) as connection:
+        locations = read_catalog(connection, catalog_path)
+
+    assert list(locations) == [2]
+    assert locations[2].path == shard_path(catalog_path, "recording_2")
+    assert locations[2].num_samples == 100
+
+
+def test_shard_connections_are_opened_lazily(db, tmp_path):
+    catalog_path = shard_database(db, tmp_path / "sharded")
+    with connect(catalog_path) as connection:
+        shards = ShardConnections(read_catalog(connection, catalog_path), connect, max_open=1)
+
+    connection, _, shard_recording_id = shards.get(2)
+    assert shard_recording_id == 2
+    assert connection.execute("SELECT COUNT(*) FROM JointCommands").fetchone()[0] == 100
+    shards.get(1)
+    # The least recently used shard is closed
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
+    assert pickle.loads(pickle.dumps(shards))._connections == {}
+    shards.close()
@@ -0,0 +1,218 @@
+import sqlite3
+from collections import Counter
+
+import cv2
+import numpy as np
+import pytest
+from mcap_ros2.reader import read_ros2_messages
+from rich.console import Console
+from sqlalchemy import func, select
+
+from soccer_diffusion import DEFAULT_RESAMPLE_RATE_HZ, IMAGE_MAX_RESAMPLE_RATE_HZ
+from soccer_diffusion.dataset.cli.args import ImportType
+from soccer_diffusion.dataset.converters.game_state_converter.b_human_game_state_converter import (
+    BHumanGameStateConverter,
+)
+from soccer_diffusion.dataset.converters.game_state_converter.bit_bots_game_state_converter import (
+    BitBotsGameStateConverter,
+)
+from soccer_diffusion.dataset.converters.image_converter import BHumanImageConverter, BitbotsImageConverter
+from soccer_diffusion.dataset.converters.synced_data_converter import SyncedDataConverter
+from soccer_diffusion.dataset.db import Database
+from soccer_diffusion.dataset.dummy_data import generate_test_image
+from soccer_diffusion.dataset.import_benchmark import log_configs, print_results
+from soccer_diffusion.dataset.imports.model_importer import ImportMetadata, ModelImporter
+from soccer_diffusion.dataset.imports.strategies.b_human import BHumanImportStrategy, SmartFrame, SmartRecord
+from soccer_diffusion.dataset.imports.strategies.bit_bots import BitBotsImportStrategy
+from soccer_diffusion.dataset.models import (
+    Base,
+    GameState,
+    GameStateInterval,
+    Image,
+    ImportProgress,
+    JointCommands,
+    JointStates,
+    Recording,
+    Rotation,
+)
+from soccer_diffusion.dataset.resampling.max_rate_resampler import MaxRateResampler
+from soccer_diffusion.dataset.resampling.original_rate_resampler import OriginalRateResampler
+from soccer_diffusion.dataset.resampling.previous_interpolation_resampler import PreviousInterpolationResampler
+from soccer_diffusion.dataset.synthetic_logs import (
+    BHumanLogConfig,
+    BitBotsLogConfig,
+    encode_b_human_jpeg,
+    write_b_human_log,
+    write_bit_bots_mcap,
+)
+
+METADATA = ImportMetadata(False, "Team", "Robot", "Location", True)
+
+
+def count(db: Database, model: type) -> int:
+    return db.session.scalar(select(func.count()).select_from(model))
+
+
+def test_bit_bots_mcap_contains_all_topics(tmp_path):
+    path = tmp_path / "game.mcap"
+    write_bit_bots_mcap(path, BitBotsLogConfig(duration=1.0, camera_rate=5.0, image_width=320, image_height=240))
+
+    topics: Counter[str] = Counter()
+    log_times = []
+    for message in read_ros2_messages(path):
+        topics[message.channel.topic] += 1
+        log_times.append(message.log_time_ns)
+        if message.channel.topic == "/camera/image_to_record":
+            assert (message.ros_msg.width, message.ros_msg.height, message.ros_msg.encoding) == (320, 240, "rgb8")
+            assert len(message.ros_msg.data) == 320 * 240 * 3
+
+    assert topics == {
+        "/joint_states": 200,
+        "/DynamixelController/command": 200,
+        "/imu/data": 200,
+        "/tf": 100,
+        "/gamestate": 2,
+        "/camera/image_to_record": 5,
+    }
+    assert log_times == sorted(log_times)
+
+
+@pytest.mark.parametrize("imu_rate", [200.0, 0.0])
+def test_bit_bots_mcap_is_imported(db, tmp_path, imu_rate):
+    path = tmp_path / "game.mcap"
+    write_bit_bots_mcap(
+        path, BitBotsLogConfig(duration=2.0, imu_rate=imu_rate, image_width=320, image_height=240, seed=0)
+    )
+    strategy = BitBotsImportStrategy(
+        METADATA,
+        BitbotsImageConverter(MaxRateResampler(IMAGE_MAX_RESAMPLE_RATE_HZ)),
+        BitBotsGameStateConverter(OriginalRateResampler()),
+        SyncedDataConverter(PreviousInterpolationResampler(DEFAULT_RESAMPLE_RATE_HZ)),
+    )
+    ModelImporter(db, strategy, image_threads=0).import_to_db(path)
+
+    assert count(db, Recording) == 1
+    assert count(db, Image) == 19
+    for model in (JointStates, JointCommands, Rotation):
+        assert count(db, model) == pytest.approx(2.0 * DEFAULT_RESAMPLE_RATE_HZ, abs=2)
+        # The synced models have consecutive ticks on the resampled grid
+        ticks = db.session.scalars(select(model.tick).order_by(model.stamp)).all()
+        assert ticks == list(range(count(db, model)))
+    assert count(db, GameState) > 0
+
+
+def table_rows(db_path) -> dict[str, list[tuple]]:
+    with sqlite3.connect(db_path) as connection:
+        return {
+            table.name: connection.execute(f'SELECT * FROM "{table.name}" ORDER BY rowid').fetchall()
+            for table in Base.metadata.sorted_tables
+        }
+
+
+def create_bit_bots_strategy() -> BitBotsImportStrategy:
+    return BitBotsImportStrategy(
+        METADATA,
+        BitbotsImageConverter(MaxRateResampler(IMAGE_MAX_RESAMPLE_RATE_HZ)),
+        BitBotsGameStateConverter(OriginalRateResampler()),
+        SyncedDataConverter(PreviousInterpolationResampler(DEFAULT_RESAMPLE_RATE_HZ)),
+    )
+
+
+def test_resumed_bit_bots_import_equals_uninterrupted_import(tmp_path):
+    path = tmp_path / "game.mcap"
+    write_bit_bots_mcap(path, BitBotsLogConfig(duration=2.0, image_width=64, image_height=48, seed=0))
+    db = Database(tmp_path / "uninterrupted.sqlite3").create_session(create_schema=True)
+    ModelImporter(db, create_bit_bots_strategy(), image_threads=1).import_to_db(path)
+    db.close_session()
+
+    db = Database(tmp_path / "resumed.sqlite3").create_session(create_schema=True)
+    interrupted = create_bit_bots_strategy()
+    collect = interrupted._collect
+    collected = []
+
+    def interrupted_collect(model_data):
+        if len(collected) == 300:
+            raise RuntimeError("Interrupted import")
+        collected.append(model_data)
+        collect(model_data)
+
+    interrupted._collect = interrupted_collect  # type: ignore[method-assign]
+    with pytest.raises(RuntimeError, match="Interrupted import"):
+        ModelImporter(db, interrupted, image_threads=1, checkpoint_interval=0).import_to_db(path)
+    assert count(db, ImportProgress) == 1 and count(db, JointStates) > 0
+    ModelImporter(db, create_bit_bots_strategy(), image_threads=1).import_to_db(path)
+    db.close_session()
+
+    assert table_rows(tmp_path / "resumed.sqlite3") == table_rows(tmp_path / "uninterrupted.sqlite3")
+
+
+def test_b_human_jpeg_is_decoded_to_the_image():
+    image = cv2.cvtColor(generate_test_image(320, 240, 1.0), cv2.COLOR_RGB2BGR)
+    data, width, height = encode_b_human_jpeg(image)
+    jpeg_image = {"timestamp": 0, "size": len(data), "height": height, "width": width, "_data": data}
+
+    decoded = SmartFrame({"JPEGImage": SmartRecord.from_data(jpeg_image)}, "Upper").image()
+
+    assert (width, height) == (160, 120)
+    assert decoded.shape == image.shape
+    assert np.abs(decoded.astype(int) - image).mean() < 8  # Only JPEG compression artifacts
+
+
+def test_b_human_log_is_imported_from_its_cache(db, tmp_path):
+    path = tmp_path / "2024-07-20_12-00" / "game.log"
+    cache_dir = tmp_path / "cache"
+    cache = write_b_human_log(path, cache_dir, BHumanLogConfig(duration=2.0, image_width=320, image_height=240))
+    assert len(cache) == 167 + 2 * 60
+
+    strategy = BHumanImportStrategy(
+        METADATA,
+        BHumanImageConverter(MaxRateResampler(IMAGE_MAX_RESAMPLE_RATE_HZ)),
+        BHumanImageConverter(MaxRateResampler(IMAGE_MAX_RESAMPLE_RATE_HZ)),
+        BHumanGameStateConverter(OriginalRateResampler()),
+        SyncedDataConverter(PreviousInterpolationResampler(DEFAULT_RESAMPLE_RATE_HZ)),
+        caching=True,
+        cache_dir=cache_dir,
+    )
+    ModelImporter(db, strategy, image_threads=0).import_to_db(path)
+
+    recording = db.session.scalars(select(Recording)).one()
+    assert recording.team_color == "RED"
+    assert count(db, Image) == pytest.approx(2 * 2.0 * IMAGE_MAX_RESAMPLE_RATE_HZ, abs=2)  # Upper and lower
+    for model in (JointStates, JointCommands, Rotation):
+        assert count(db, model) == pytest.approx(2.0 * DEFAULT_RESAMPLE_RATE_HZ, abs=2)
+    states = set(db.session.scalars(select(GameState.state)))
+    assert states == {"STOPPED", "POSITIONING", "PLAYING"}
+    # The intervals contain each change of the game state
+    game_states = db.session.scalars(select(GameState.state).order_by(GameState.stamp, GameState._id)).all()
+    changes = [state for i, state in enumerate(game_states) if i == 0 or state != game_states[i - 1]]
+    intervals = db.session.scalars(select(GameStateInterval).order_by(GameStateInterval.start_stamp)).all()
+    assert [interval.state.value for interval in intervals] == changes
+
+
+def test_log_configs_use_the_defaults_of_the_log_type():
+    bit_bots = log_configs(ImportType.BIT_BOTS, [1.0, 2.0], (320, 240), joint_rate=100.0, imu_rate=0.0, seed=3)
+    assert [config.duration for config in bit_bots] == [1.0, 2.0]
+    assert bit_bots[0] == BitBotsLogConfig(
+        duration=1.0,
+        joint_state_rate=100.0,
+        joint_command_rate=100.0,
+        imu_rate=0.0,
+        image_width=320,
+        image_height=240,
+        seed=3,
+    )
+
+    b_human = log_configs(ImportType.B_HUMAN, [1.0], camera_rate=15.0, joint_rate=100.0, imu_rate=0.0)
+    assert b_human == [BHumanLogConfig(duration=1.0, motion_rate=100.0, camera_rate=15.0)]
+
+
+def test_b_human_results_are_labelled_as_cached_conversion():
+    report = {"duration_s": 1.0, "topics": {}, "rows": {}, "memory": {"peak_rss_bytes": 0}}
+    result = {"type": "b-human", "measured": "cached conversion", "config": {"duration": 1.0}, "log_bytes": 0}
+    console = Console(record=True, width=200)
+    print_results([result | {"report": report}], console)
+
+    # The title and caption are wrapped to the width of the table
+    output = " ".join(console.export_text().split())
+    assert "Import Throughput of the cached conversion" in output
+    assert "parsing the logs with pybh and extracting their fields is not measured" in output